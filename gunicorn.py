@@ -1,6 +1,8 @@
+import gc
 from os import environ
 
-from naas.library.selfsigned import generate_selfsigned_cert
+from naas.library.selfsigned import cached_selfsigned_cert
+from naas.library.tls import server_context
 
 # Setup basic attributes of our web-server
 bind = "0.0.0.0:443"
@@ -10,6 +12,10 @@ worker_class = "gthread"
 threads = 32
 timeout = 300
 
+# Import the app once in the master and fork the workers from it, so they share its memory
+# copy-on-write. GUNICORN_PRELOAD=false imports the app in each worker instead.
+preload_app = environ.get("GUNICORN_PRELOAD", "true").lower() == "true"
+
 # Configure access logging
 accesslog = "-"  # "-" means log to stdout
 # Format: date proc_name remote_addr X-Forwarded-For X-Request-ID method/path status_code response_length user_agent
@@ -46,9 +52,15 @@ NAAS_CERT = environ.get("NAAS_CERT", None)
 NAAS_KEY = environ.get("NAAS_KEY", None)
 NAAS_CA_BUNDLE = environ.get("NAAS_CA_BUNDLE", None)
 
-CERT_FILE = "/tmp/cert.pem"
-KEY_FILE = "/tmp/key.pem"
-CA_BUNDLE_FILE: str | None = "/tmp/ca_bundle.pem"
+# Directory the certificate files are written to. Mount a volume here to keep a generated
+# self-signed certificate across container restarts.
+TLS_DIR = environ.get("NAAS_TLS_DIR", "/tmp")
+# Key type of a generated self-signed certificate: "rsa" or "ecdsa" (P-256, cheaper handshakes)
+TLS_KEY_TYPE = environ.get("NAAS_TLS_KEY_TYPE", "rsa").lower()
+
+CERT_FILE = f"{TLS_DIR}/cert.pem"
+KEY_FILE = f"{TLS_DIR}/key.pem"
+CA_BUNDLE_FILE: str | None = f"{TLS_DIR}/ca_bundle.pem"
 
 # If we were provided a cert/key/bundle, use those by printing into files for Gunicorn to ingest.
 if NAAS_CERT and NAAS_KEY and NAAS_CA_BUNDLE:
@@ -60,21 +72,50 @@ if NAAS_CERT and NAAS_KEY and NAAS_CA_BUNDLE:
     with open(CA_BUNDLE_FILE, "w") as bundle:
         bundle.write(NAAS_CA_BUNDLE + "\n")
 
-# Otherwise if we can't find a cert or key lets make something up and put _that_ into the files for Gunicorn
+# Otherwise use a self-signed certificate, generated on the first start and reused after that
 else:
-    (
-        cert,
-        key,
-    ) = generate_selfsigned_cert("naas.local")
-    with open(CERT_FILE, "w") as c:
-        c.write(cert.decode())
-    with open(KEY_FILE, "w") as k:
-        k.write(key.decode())
+    CERT_FILE = f"{TLS_DIR}/selfsigned-cert.pem"
+    KEY_FILE = f"{TLS_DIR}/selfsigned-key.pem"
+    cached_selfsigned_cert(CERT_FILE, KEY_FILE, "naas.local", TLS_KEY_TYPE)
     CA_BUNDLE_FILE = None
 
 # Crypto configuration
 keyfile = KEY_FILE
 certfile = CERT_FILE
 ca_certs = CA_BUNDLE_FILE
-ssl_version = 5
 ciphers = "HIGH:!aNULL:!eNULL:!EXPORT:!DES:!RC4:!3DES:!MD5:!PSK"
+
+
+def ssl_context(conf, default_ssl_context_factory):
+    """Build the SSL context once, rather than per connection, so TLS sessions can be resumed."""
+    return server_context(default_ssl_context_factory)
+
+
+def when_ready(server):
+    """Build the SSL context and the preloaded app's shared state before the first worker is forked."""
+    from gunicorn.sock import ssl_context as build_ssl_context
+
+    build_ssl_context(server.cfg)  # Shared by every worker, so their session tickets are interchangeable
+    if preload_app:
+        from naas.app import prepare_fork
+
+        prepare_fork()
+
+
+def pre_fork(server, worker):
+    """
+    Freeze the master's heap before forking a worker.
+
+    The worker's garbage collector then skips those objects instead of writing to them,
+    keeping their pages shared.
+    """
+    gc.collect()
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    """Give each worker its own Redis connections."""
+    if preload_app:
+        from naas.app import init_worker
+
+        init_worker()
@@ -10,18 +10,22 @@ Description: Main app setup/config
 import logging
 import os
 
-from flask import Flask, request
+from flask import Flask, g, request
 from flask_restful import Api
-from prometheus_client import Gauge
+from prometheus_client import REGISTRY
 from prometheus_flask_exporter import PrometheusMetrics
 from pythonjsonlogger.json import JsonFormatter
+from redis import Redis
 
-from naas.config import app_configure
+from naas.config import QUEUE_LANES, app_configure
 from naas.library.errorhandlers import api_error_generator
-from naas.library.worker_cache import get_cached_workers
+from naas.library.json_response import JSONProvider, output_json
+from naas.library.queue_metrics import QueueCollector
+from naas.library.redis_client import adopt_pool
+from naas.library.tracing import init_tracing
 from naas.resources.cancel_job import CancelJob
 from naas.resources.get_results import GetResults
-from naas.resources.healthcheck import HealthCheck
+from naas.resources.healthcheck import HealthCheck, Liveness
 from naas.resources.list_jobs import ListJobs
 from naas.resources.send_command import SendCommand
 from naas.resources.send_command_structured import SendCommandStructured
@@ -29,24 +33,17 @@ from naas.resources.send_config import SendConfig
 from naas.spec import spec
 
 app = Flask(__name__)
+app.json = JSONProvider(app)
 
 app_configure(app)
 
-# Prometheus metrics — request counts/latency via exporter, NAAS-specific gauges manually updated
+# Prometheus metrics — request counts/latency via exporter, queue/worker gauges read from Redis at scrape time
 metrics = PrometheusMetrics(app, path="/metrics", default_labels={"app": "naas"})
-_queue_depth = Gauge("naas_queue_depth", "Number of jobs waiting in queue")
-_workers_active = Gauge("naas_workers_active", "Number of active RQ workers")
-
-
-@app.before_request
-def _update_queue_metrics() -> None:
-    """Refresh queue/worker gauges on each request."""
-    q = app.config.get("q")
-    redis = app.config.get("redis")
-    if q is not None:
-        _queue_depth.set(len(q))
-    if redis is not None:
-        _workers_active.set(len(get_cached_workers(redis)))
+REGISTRY.register(
+    QueueCollector(
+        app.config["redis"], QUEUE_LANES.values(), [lanes["normal"].connection for lanes in app.config["shards"]]
+    )
+)
 
 
 # Structured JSON logging
@@ -64,14 +61,18 @@ logger = logging.getLogger(name="NAAS")
 app.logger.handlers = logger.handlers
 app.logger.setLevel(logger.level)
 
+init_tracing("naas-api")
+
 # Get the error handling dict
 api_errors = api_error_generator()
 
 # Instantiate your API
 api = Api(app, errors=api_errors, catch_all_404s=True)
+api.representations["application/json"] = output_json
 
 # Versioned routes (canonical)
 api.add_resource(HealthCheck, "/", "/healthcheck", "/v1/healthcheck")
+api.add_resource(Liveness, "/livez", "/v1/livez")
 api.add_resource(SendCommand, "/v1/send_command")
 api.add_resource(SendCommandStructured, "/v1/send_command_structured")
 api.add_resource(SendConfig, "/v1/send_config")
@@ -98,6 +99,15 @@ def add_version_headers(response):
     return response
 
 
+@app.after_request
+def add_rate_limit_headers(response):
+    """Inject RateLimit-* headers on responses to rate limited endpoints."""
+    rate_limit = g.get("rate_limit")
+    if rate_limit is not None:
+        response.headers.update(rate_limit.headers())
+    return response
+
+
 # Register legacy routes on the same resources (after after_request is defined)
 api.add_resource(SendCommand, "/send_command", endpoint="send_command_legacy")
 api.add_resource(SendConfig, "/send_config", endpoint="send_config_legacy")
@@ -109,3 +119,29 @@ api.add_resource(
 )
 
 spec.register(app)
+
+
+def prepare_fork() -> None:
+    """
+    Finish building the app's shared state in gunicorn's master before it forks the workers.
+
+    With preload_app, the URL matcher and the OpenAPI document are built once here and
+    shared copy-on-write, instead of by the first request each worker serves. The master's
+    Redis connections are closed so no worker inherits a socket.
+    """
+    app.url_map.update()
+    with app.app_context():
+        _ = spec.spec
+    for redis in _redis_clients():
+        redis.connection_pool.disconnect()
+
+
+def init_worker() -> None:
+    """Set up a worker's own per-process resources after gunicorn forks it from a preloaded master."""
+    for redis in _redis_clients():
+        adopt_pool(redis)
+
+
+def _redis_clients() -> list[Redis]:
+    """Return the main Redis client and each job shard's."""
+    return [app.config["redis"], *(lanes["normal"].connection for lanes in app.config["shards"])]
@@ -11,9 +11,6 @@ import os
 import random
 import string
 
-from redis import Redis
-from rq import Queue
-
 # Cert/Key File Locations
 CERT_KEY_FILE = "/tmp/key.pem"
 CERT_FILE = "/tmp/cert.pem"
@@ -23,12 +20,113 @@ CERT_BUNDLE_FILE = "/tmp/bundle.crt"
 REDIS_HOST = os.environ.get("REDIS_HOST", "redis")
 REDIS_PORT = os.environ.get("REDIS_PORT", 6379)
 REDIS_PASSWORD = os.environ.get("REDIS_PASSWORD", "mah_redis_pw")
+REDIS_SOCKET = os.environ.get("REDIS_SOCKET", "")  # Unix socket path; overrides host and port
+REDIS_PROTOCOL = int(os.environ.get("REDIS_PROTOCOL", 2))  # 3 for RESP3
+# Connection pool: most connections per process, and seconds a thread waits for a free one
+REDIS_MAX_CONNECTIONS = int(os.environ.get("REDIS_MAX_CONNECTIONS", 40))
+REDIS_POOL_TIMEOUT = float(os.environ.get("REDIS_POOL_TIMEOUT", 5))
+REDIS_CONNECT_TIMEOUT = float(os.environ.get("REDIS_CONNECT_TIMEOUT", 5))
+REDIS_HEALTH_CHECK_INTERVAL = int(os.environ.get("REDIS_HEALTH_CHECK_INTERVAL", 30))  # Idle seconds before a PING
+# Commands failing on a dropped connection are retried, backing off exponentially with jitter (seconds)
+REDIS_RETRIES = int(os.environ.get("REDIS_RETRIES", 3))
+REDIS_RETRY_BACKOFF = float(os.environ.get("REDIS_RETRY_BACKOFF", 0.05))
+REDIS_RETRY_BACKOFF_MAX = float(os.environ.get("REDIS_RETRY_BACKOFF_MAX", 2))
+# Job shards: "host:port" of each Redis instance holding job queues and results (comma separated).
+# Empty keeps jobs on REDIS_HOST. A job's shard is a hash of its ID, so changing the list
+# remaps existing jobs: drain the queues before adding or removing a shard.
+REDIS_SHARDS = [s.strip() for s in os.environ.get("REDIS_SHARDS", "").split(",") if s.strip()]
 
 # Job TTL config (seconds)
 JOB_TTL_SUCCESS = int(os.environ.get("JOB_TTL_SUCCESS", 86400))  # 24h
 JOB_TTL_FAILED = int(os.environ.get("JOB_TTL_FAILED", 604800))  # 7 days
 JOB_TIMEOUT = int(os.environ.get("JOB_TIMEOUT", 120))  # 2 minutes; covers delay_factor=1 + buffer
 
+# Result blob store config: results larger than the threshold (bytes) are written to
+# RESULT_STORE_PATH instead of Redis. Must be a directory shared by the API and workers.
+RESULT_STORE_PATH = os.environ.get("RESULT_STORE_PATH", "")  # Empty disables offloading
+RESULT_STORE_THRESHOLD = int(os.environ.get("RESULT_STORE_THRESHOLD", 1048576))  # 1 MiB
+
+# Priority lanes: request priority -> RQ queue name. "normal" is the original "naas" queue.
+QUEUE_LANES = {"high": "naas_high", "normal": "naas", "low": "naas_low"}
+# Relative share of dequeues each lane gets first pick of, so bulk work is never starved
+QUEUE_LANE_WEIGHTS = {
+    "naas_high": int(os.environ.get("QUEUE_WEIGHT_HIGH", 6)),
+    "naas": int(os.environ.get("QUEUE_WEIGHT_NORMAL", 3)),
+    "naas_low": int(os.environ.get("QUEUE_WEIGHT_LOW", 1)),
+}
+# Users allowed to submit high priority jobs (comma separated); empty allows everyone
+PRIORITY_HIGH_USERS = [u.strip() for u in os.environ.get("PRIORITY_HIGH_USERS", "").split(",") if u.strip()]
+PRIORITY_HIGH_RATE_LIMIT = int(os.environ.get("PRIORITY_HIGH_RATE_LIMIT", 30))  # per user per minute
+
+# Per-device session limits: max concurrent jobs against one device IP (0 disables).
+# DEVICE_SESSION_LIMITS overrides the default per device IP or platform, e.g. "cisco_ios=5,192.0.2.1=2"
+DEVICE_SESSION_LIMIT = int(os.environ.get("DEVICE_SESSION_LIMIT", 0))
+DEVICE_SESSION_LIMITS = {
+    key.strip(): int(limit)
+    for key, limit in (
+        item.split("=", 1) for item in os.environ.get("DEVICE_SESSION_LIMITS", "").split(",") if "=" in item
+    )
+}
+# Jobs that can't get a session slot are deferred with exponential backoff (seconds)
+DEVICE_SESSION_BACKOFF = float(os.environ.get("DEVICE_SESSION_BACKOFF", 2))
+DEVICE_SESSION_BACKOFF_MAX = float(os.environ.get("DEVICE_SESSION_BACKOFF_MAX", 60))
+DEVICE_SESSION_MAX_DEFERS = int(os.environ.get("DEVICE_SESSION_MAX_DEFERS", 20))
+
+# API rate limiting, off unless enabled: a token bucket per user (or tenant) per endpoint
+RATE_LIMIT_ENABLED = os.environ.get("RATE_LIMIT_ENABLED", "false").lower() == "true"
+RATE_LIMIT_RATE = float(os.environ.get("RATE_LIMIT_RATE", 5))  # Requests per second refilled
+RATE_LIMIT_BURST = int(os.environ.get("RATE_LIMIT_BURST", 20))  # Bucket capacity
+# Per-endpoint overrides as "endpoint=rate:burst", e.g. "send_config=1:5,get_results=20:100"
+RATE_LIMIT_ENDPOINTS = {
+    endpoint.strip(): (float(limits.split(":")[0]), int(limits.split(":")[1]))
+    for endpoint, limits in (
+        item.split("=", 1) for item in os.environ.get("RATE_LIMIT_ENDPOINTS", "").split(",") if "=" in item
+    )
+}
+# Users that share a tenant's bucket as "user=tenant"; other users get their own bucket
+RATE_LIMIT_TENANTS = {
+    user.strip(): tenant.strip()
+    for user, tenant in (
+        item.split("=", 1) for item in os.environ.get("RATE_LIMIT_TENANTS", "").split(",") if "=" in item
+    )
+}
+
+# Compiled TextFSM templates kept per process (LRU)
+TEXTFSM_CACHE_SIZE = int(os.environ.get("TEXTFSM_CACHE_SIZE", 128))
+# Structured results are parsed when first read, in a pool of processes per API worker
+PARSE_POOL_SIZE = int(os.environ.get("PARSE_POOL_SIZE", 2))
+PARSE_TIMEOUT = float(os.environ.get("PARSE_TIMEOUT", 10))  # Seconds a read waits before returning raw output
+
+# Worker supervisor: recycle worker processes after this many jobs or above this RSS (0 disables)
+WORKER_MAX_JOBS = int(os.environ.get("WORKER_MAX_JOBS", 1000))
+WORKER_MAX_RSS_MB = int(os.environ.get("WORKER_MAX_RSS_MB", 0))
+# Autoscaling between the minimum and maximum process counts (see worker.py)
+WORKER_SCALE_UP_WAIT = float(os.environ.get("WORKER_SCALE_UP_WAIT", 5))  # Oldest queued job age (s) to scale up
+WORKER_SCALE_DOWN_DELAY = float(os.environ.get("WORKER_SCALE_DOWN_DELAY", 300))  # Seconds of surplus before shrinking
+WORKER_SUPERVISE_INTERVAL = float(os.environ.get("WORKER_SUPERVISE_INTERVAL", 5))  # Seconds between supervisor checks
+
+# Worker Prometheus metrics port (0 disables); requires PROMETHEUS_MULTIPROC_DIR
+WORKER_METRICS_PORT = int(os.environ.get("WORKER_METRICS_PORT", 9100))
+
+# Seconds the fleet snapshot behind the health check and queue/worker gauges is shared between
+# API processes through Redis before one of them refreshes it (0 reads Redis every time)
+FLEET_CACHE_TTL = float(os.environ.get("FLEET_CACHE_TTL", 5))
+
+# Optional OpenTelemetry tracing (needs the "tracing" extra). Spans are exported over OTLP,
+# configured with the standard OTEL_EXPORTER_OTLP_* variables, or as JSON lines to TRACING_FILE.
+TRACING_ENABLED = os.environ.get("TRACING_ENABLED", "false").lower() == "true"
+TRACING_EXPORTER = os.environ.get("TRACING_EXPORTER", "otlp").lower()  # "otlp" or "file"
+TRACING_FILE = os.environ.get("TRACING_FILE", "/tmp/naas-traces.jsonl")
+
+# Job serialization format ("msgpack" or "pickle"); both formats are always readable
+JOB_SERIALIZER = os.environ.get("JOB_SERIALIZER", "msgpack").lower()
+
+# JSON encoder for API responses ("orjson" or "json")
+JSON_ENCODER = os.environ.get("JSON_ENCODER", "orjson").lower()
+
+# Smallest API response body, in bytes, compressed for clients sending Accept-Encoding
+COMPRESS_MIN_SIZE = int(os.environ.get("COMPRESS_MIN_SIZE", 1024))
+
 # Circuit breaker config
 CIRCUIT_BREAKER_ENABLED = os.environ.get("CIRCUIT_BREAKER_ENABLED", "true").lower() == "true"
 CIRCUIT_BREAKER_THRESHOLD = int(os.environ.get("CIRCUIT_BREAKER_THRESHOLD", 5))
@@ -79,7 +177,9 @@ def app_configure(app):
     app.config["JSON_SORT_KEYS"] = False
 
     # Initialize a Redis connection and store it for later
-    redis = Redis(host=REDIS_HOST, port=REDIS_PORT, password=REDIS_PASSWORD)
+    from naas.library.redis_client import redis_client
+
+    redis = redis_client()
     redis.ping()  # Fail fast if Redis is unavailable at startup
     app.config["redis"] = redis
 
@@ -88,6 +188,22 @@ def app_configure(app):
     # all connection pool keys and in-flight job auth checks.
     redis.setnx("naas_cred_salt", "".join(random.choice(string.ascii_lowercase) for _ in range(10)))
 
-    # Initialize an rq Queue and store it for later
-    q = Queue("naas", connection=redis)
-    app.config["q"] = q
+    # Initialize an rq Queue per priority lane and store them for later.
+    # "q" is the normal lane, and can look up jobs from any lane.
+    from naas.library.lanes import LaneQueue
+    from naas.library.serializers import job_serializer
+
+    app.config["queues"] = {
+        lane: LaneQueue(name, connection=redis, serializer=job_serializer) for lane, name in QUEUE_LANES.items()
+    }
+    app.config["q"] = app.config["queues"]["normal"]
+
+    # With REDIS_SHARDS, jobs are spread over the shards instead: each has its own lanes,
+    # while lockouts, rate limits and the salt stay on REDIS_HOST (see lanes.shard_lanes)
+    app.config["shards"] = []
+    for address in REDIS_SHARDS:
+        shard = redis_client(*address.rsplit(":", 1))
+        shard.ping()
+        app.config["shards"].append(
+            {lane: LaneQueue(name, connection=shard, serializer=job_serializer) for lane, name in QUEUE_LANES.items()}
+        )
@@ -9,6 +9,7 @@ from flask import current_app
 from redis import Redis
 
 from naas.library.audit import emit_audit_event
+from naas.library.lanes import job_queue
 
 if TYPE_CHECKING:
     from rq.job import Job
@@ -34,12 +35,12 @@ def job_unlocker(salted_creds: str, job_id: str) -> bool:
     :return:
     """
 
-    q = current_app.config["q"]
+    q = job_queue(job_id)
 
     try:
         current_app.logger.debug("Attempting to unlock job %s with %s", job_id, salted_creds)
         job = q.fetch_job(job_id=job_id)
-        stored_hash = job.meta.get("hash", "")
+        stored_hash = job.meta.get("hash", "") if job is not None else ""
         if stored_hash == salted_creds:
             return True
         else:
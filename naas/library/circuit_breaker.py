@@ -13,12 +13,10 @@ from redis import Redis
 from naas.config import (
     CIRCUIT_BREAKER_THRESHOLD,
     CIRCUIT_BREAKER_TIMEOUT,
-    REDIS_HOST,
-    REDIS_PASSWORD,
-    REDIS_PORT,
 )
 from naas.library.audit import emit_audit_event
 from naas.library.auth import device_lockout
+from naas.library.redis_client import redis_client
 
 if TYPE_CHECKING:
     pass
@@ -30,11 +28,17 @@ _circuit_breakers: dict[str, pybreaker.CircuitBreaker] = {}
 _redis_client: Redis | None = None
 
 
+def use_redis(client: Redis) -> None:
+    """Use client for circuit breaker and lockout traffic: in a worker, the RQ connection, so it shares its pool."""
+    global _redis_client
+    _redis_client = client
+
+
 def _get_redis() -> Redis:
-    """Lazily initialise the shared Redis client for circuit breaker storage."""
+    """Return the Redis client for circuit breaker storage, creating one if none was set with use_redis()."""
     global _redis_client
     if _redis_client is None:  # pragma: no cover  # tests inject fakeredis before first call
-        _redis_client = Redis(host=REDIS_HOST, port=int(REDIS_PORT), password=REDIS_PASSWORD)
+        _redis_client = redis_client()
     return _redis_client
 
 
@@ -0,0 +1,157 @@
+"""
+compression.py
+Content-Encoding negotiation and conditional GETs for API responses.
+
+Responses of at least COMPRESS_MIN_SIZE bytes are compressed with the best encoding the
+client accepts: zstd and br with the zstandard and brotli packages (the "compression"
+extra), gzip always. A finished job's results never change, so GetResults gives them a
+strong ETag built from the job's metadata. Polls sending it back in If-None-Match get a
+304 without the results being loaded, and the compressed body is cached in Redis under
+that ETag, so it is compressed once for every API process rather than on each request.
+"""
+
+import hashlib
+import itertools
+import json
+import zlib
+from collections.abc import Callable, Iterable
+
+from flask import Response, request
+from redis import Redis
+from rq.job import Job
+
+from naas import __version__
+from naas.config import COMPRESS_MIN_SIZE, JSON_ENCODER
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover  # optional dependency; installed with the dev extra
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover  # optional dependency; installed with the dev extra
+    zstandard = None  # type: ignore[assignment]
+
+
+def _gzip() -> Callable[[bytes | None], bytes]:
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31: gzip header and trailer
+    return lambda chunk: compressor.compress(chunk) if chunk is not None else compressor.flush()
+
+
+def _brotli() -> Callable[[bytes | None], bytes]:
+    compressor = brotli.Compressor(mode=brotli.MODE_TEXT, quality=5)  # The default, 11, is far too slow per request
+    return lambda chunk: compressor.process(chunk) if chunk is not None else compressor.finish()
+
+
+def _zstd() -> Callable[[bytes | None], bytes]:
+    compressor = zstandard.ZstdCompressor(level=3).compressobj()
+    return lambda chunk: compressor.compress(chunk) if chunk is not None else compressor.flush()
+
+
+# Supported Content-Encodings, most preferred first. Each builds a compressor that takes
+# the body in chunks, then None to finish the stream.
+ENCODINGS: dict[str, Callable[[], Callable[[bytes | None], bytes]]] = {}
+if zstandard is not None:  # pragma: no branch
+    ENCODINGS["zstd"] = _zstd
+if brotli is not None:  # pragma: no branch
+    ENCODINGS["br"] = _brotli
+ENCODINGS["gzip"] = _gzip
+
+
+def negotiate() -> str | None:
+    """Return the Content-Encoding to use for this request's response, or None for identity."""
+    return request.accept_encodings.best_match(list(ENCODINGS))
+
+
+def compress(chunks: Iterable[bytes], encoding: str) -> bytes:
+    """Compress a body, given as chunks, with one of ENCODINGS."""
+    compressor = ENCODINGS[encoding]()
+    return b"".join([*(compressor(chunk) for chunk in chunks), compressor(None)])
+
+
+def result_etag(job: Job, variant: str) -> str:
+    """
+    Return the strong entity tag of a finished job's results response.
+
+    Args:
+        job: The finished job.
+        variant: Which form of the results the response holds ("raw" or "parsed").
+
+    Returns:
+        The unquoted tag, derived from the job's metadata so the results needn't be loaded.
+        Compressed responses carry it suffixed with their encoding, as the bytes differ.
+    """
+    ended_at = job.ended_at.isoformat() if job.ended_at else None
+    key = json.dumps([__version__, JSON_ENCODER, job.id, ended_at, variant, job.meta.get("timings")])
+    return hashlib.sha256(key.encode()).hexdigest()[:32]
+
+
+def not_modified(etag: str) -> Response | None:
+    """Return a 304 response if the request's If-None-Match matches etag in any encoding, else None."""
+    for tag in (etag, *(f"{etag}-{encoding}" for encoding in ENCODINGS)):
+        if request.if_none_match.contains_weak(tag):
+            response = Response(status=304)
+            response.set_etag(tag)
+            response.headers["Vary"] = "Accept-Encoding"
+            return response
+    return None
+
+
+def _cache_key(etag: str, encoding: str) -> str:
+    return f"naas_encoded_{etag}_{encoding}"
+
+
+def cached_response(redis: Redis, etag: str) -> Response | None:
+    """Return the compressed response cached for etag in the negotiated encoding, if any."""
+    encoding = negotiate()
+    if encoding is None:
+        return None
+    body = redis.get(_cache_key(etag, encoding))
+    if body is None:
+        return None
+    return _response(body, 200, etag, encoding)  # type: ignore[arg-type]
+
+
+def json_response(
+    chunks: Iterable[bytes], status: int = 200, etag: str | None = None, cache: tuple[Redis, int] | None = None
+) -> Response:
+    """
+    Build a JSON response, compressed if the client accepts an encoding and it is large enough.
+
+    Args:
+        chunks: The encoded JSON body, in chunks. Streamed as they come when not compressed.
+        status: HTTP status code.
+        etag: Strong entity tag of the uncompressed body, if it has one.
+        cache: (Redis connection, TTL) to cache the compressed body in under etag.
+
+    Returns:
+        The response, with Vary: Accept-Encoding.
+    """
+    encoding = negotiate()
+    if encoding is None:
+        return _response(chunks, status, etag, None)
+
+    chunks = iter(chunks)
+    head = b""
+    for chunk in chunks:
+        head += chunk
+        if len(head) >= COMPRESS_MIN_SIZE:
+            break
+    else:
+        return _response(head, status, etag, None)  # Too small to be worth compressing
+    compressed = compress(itertools.chain([head], chunks), encoding)
+    if etag is not None and cache is not None:
+        redis, ttl = cache
+        redis.set(_cache_key(etag, encoding), compressed, ex=ttl)
+    return _response(compressed, status, etag, encoding)
+
+
+def _response(body: bytes | Iterable[bytes], status: int, etag: str | None, encoding: str | None) -> Response:
+    response = Response(body, status=status, mimetype="application/json")
+    response.headers["Vary"] = "Accept-Encoding"
+    if etag is not None:
+        response.set_etag(f"{etag}-{encoding}" if encoding else etag)
+    if encoding is not None:
+        response.headers["Content-Encoding"] = encoding
+    return response
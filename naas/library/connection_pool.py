@@ -44,6 +44,10 @@ class ConnectionPool:
         self._pool: dict[tuple, _PoolEntry] = {}
         self._salt: str | None = None
 
+    def __len__(self) -> int:
+        """Return the number of pooled connections."""
+        return len(self._pool)
+
     def set_salt(self, salt: str) -> None:
         """
         Set the credential salt used for pool key hashing.
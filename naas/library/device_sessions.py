@@ -0,0 +1,87 @@
+"""
+device_sessions.py
+Distributed per-device session semaphore.
+
+Many devices only allow a handful of concurrent SSH (VTY) sessions. Workers take a slot
+for the target device before running a job, so concurrent jobs against one device never
+exceed its limit no matter how many workers pick them up.
+
+Slots are members of a Redis sorted set per device, scored by lease expiry. Leases outlive
+the job timeout, so slots held by a worker that died are reclaimed automatically.
+"""
+
+import time
+
+from redis import Redis
+
+from naas.config import DEVICE_SESSION_LIMIT, DEVICE_SESSION_LIMITS
+
+
+def _sessions_key(ip: str) -> str:
+    return f"naas_device_sessions_{ip}"
+
+
+def session_limit(ip: str, platform: str | None = None) -> int:
+    """
+    Return the concurrent session limit for a device.
+
+    A DEVICE_SESSION_LIMITS entry for the IP wins over one for the platform, which wins
+    over DEVICE_SESSION_LIMIT.
+
+    Args:
+        ip: Device IP.
+        platform: Netmiko device_type, if known.
+
+    Returns:
+        The maximum number of concurrent jobs, or 0 for no limit.
+    """
+    if ip in DEVICE_SESSION_LIMITS:
+        return DEVICE_SESSION_LIMITS[ip]
+    if platform is not None and platform in DEVICE_SESSION_LIMITS:
+        return DEVICE_SESSION_LIMITS[platform]
+    return DEVICE_SESSION_LIMIT
+
+
+def acquire_session(redis: Redis, ip: str, token: str, limit: int, lease: float) -> bool:
+    """
+    Try to take a session slot for a device.
+
+    The slot is added optimistically and given back if that takes the device over its limit.
+    The steps run in one MULTI/EXEC, so concurrent workers can never over-admit.
+
+    Args:
+        redis: Redis connection.
+        ip: Device IP.
+        token: Unique holder ID (the job ID).
+        limit: Maximum concurrent sessions for the device.
+        lease: Seconds until the slot is reclaimed if never released.
+
+    Returns:
+        True if a slot was acquired.
+    """
+    key = _sessions_key(ip)
+    now = time.time()
+    with redis.pipeline() as pipe:
+        pipe.zremrangebyscore(key, 0, now)
+        pipe.zadd(key, {token: now + lease})
+        pipe.zcard(key)
+        # Keep the key alive as long as its longest lease (NX sets a first TTL, GT only extends)
+        pipe.expire(key, int(lease) + 1, nx=True)
+        pipe.expire(key, int(lease) + 1, gt=True)
+        _, _, in_use, _, _ = pipe.execute()
+    if in_use <= limit:
+        return True
+    redis.zrem(key, token)
+    return False
+
+
+def release_session(redis: Redis, ip: str, token: str) -> None:
+    """
+    Give back a session slot taken with acquire_session().
+
+    Args:
+        redis: Redis connection.
+        ip: Device IP.
+        token: The holder ID the slot was acquired with.
+    """
+    redis.zrem(_sessions_key(ip), token)
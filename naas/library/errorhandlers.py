@@ -2,7 +2,7 @@
 # -*- coding: UTF-8 -*-
 
 
-from werkzeug.exceptions import BadRequest, Forbidden, Unauthorized, UnprocessableEntity
+from werkzeug.exceptions import BadRequest, Forbidden, TooManyRequests, Unauthorized, UnprocessableEntity
 
 from naas import __base_response__
 
@@ -27,6 +27,10 @@ class NoJSON(BadRequest):
     pass
 
 
+class RateLimited(TooManyRequests):
+    pass
+
+
 def api_error_generator():
     """
     API error dict generator for Flask-restful
@@ -50,6 +54,7 @@ def api_error_generator():
             "error": "Invalid type of data in request payload, please see documentation",
         },
         "InvalidIP": {"status": 422, "error": "Invalid IPv4 address in 'ip' field of payload"},
+        "RateLimited": {"status": 429, "error": "Rate limit exceeded, please retry after the Retry-After interval"},
         "InternalServerError": {
             "status": 500,
             "error": (
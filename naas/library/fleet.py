@@ -0,0 +1,143 @@
+"""
+fleet.py
+Fleet-wide queue and worker summary, shared by every API process through Redis.
+
+The health check and the queue gauges both need the same picture of the fleet: each
+lane's length, registry sizes and oldest job, and the status every worker publishes
+(see worker_status). Rather than each gunicorn process reading it for itself, one
+snapshot is kept in Redis. When it is older than FLEET_CACHE_TTL, the first process to
+take the refresh lock (SET NX) rebuilds it while every other process keeps serving the
+previous snapshot, so the cost of reading the fleet is one refresh per TTL however many
+API processes there are. Readers only GET the snapshot key.
+
+With REDIS_SHARDS, each shard's lanes and workers are read and summed into one snapshot,
+which is kept on REDIS_HOST.
+"""
+
+import json
+import time
+from collections.abc import Iterable, Sequence
+from typing import Any
+
+from redis import Redis
+from rq.utils import now, utcparse
+
+from naas.config import FLEET_CACHE_TTL
+from naas.library.worker_status import WORKER_STATUS_KEY, live_statuses
+
+# Redis keys of the shared snapshot, and of the lock electing the process that refreshes it
+SNAPSHOT_KEY = "naas_fleet_snapshot"
+REFRESH_LOCK_KEY = "naas_fleet_snapshot_refresh"
+
+# A snapshot no process has been able to refresh for this many TTLs is dropped
+_STALE_TTLS = 12
+
+# RQ job registries per queue, by their Redis key prefix ("started" is RQ's "wip")
+REGISTRIES = {
+    "started": "wip",
+    "deferred": "deferred",
+    "scheduled": "scheduled",
+    "finished": "finished",
+    "failed": "failed",
+    "canceled": "canceled",
+}
+
+
+def fleet_snapshot(redis: Redis, queue_names: Iterable[str], shards: Sequence[Redis] = ()) -> dict[str, Any]:
+    """
+    Return the shared fleet snapshot, refreshing it if this process is elected to.
+
+    Args:
+        redis: Redis connection the snapshot is kept in.
+        queue_names: RQ queue name of each lane.
+        shards: Connections to the job shards to read, if not redis itself.
+
+    Returns:
+        The snapshot, as returned by read_fleet().
+    """
+    queue_names = list(queue_names)
+    if FLEET_CACHE_TTL <= 0:
+        return read_shards(shards or [redis], queue_names)
+
+    cached = redis.get(SNAPSHOT_KEY)
+    snapshot: dict[str, Any] | None = json.loads(cached) if cached else None
+    if snapshot is not None and time.time() - snapshot["at"] < FLEET_CACHE_TTL:
+        return snapshot
+
+    ttl_ms = int(FLEET_CACHE_TTL * 1000)
+    # The lock isn't released: it expires after one TTL, so at most one refresh runs per TTL
+    if not redis.set(REFRESH_LOCK_KEY, 1, nx=True, px=ttl_ms):
+        if snapshot is not None:
+            return snapshot  # Another process is refreshing it
+        return read_shards(shards or [redis], queue_names)  # Nothing cached yet to serve instead
+
+    snapshot = read_shards(shards or [redis], queue_names)
+    redis.set(SNAPSHOT_KEY, json.dumps(snapshot, separators=(",", ":")), px=ttl_ms * _STALE_TTLS)
+    return snapshot
+
+
+def read_fleet(redis: Redis, queue_names: Iterable[str]) -> dict[str, Any]:
+    """
+    Read the queue and worker state from Redis.
+
+    Lane lengths, head jobs, registry sizes and the worker statuses are read in one
+    pipelined round trip, and the head jobs' enqueue times in a second.
+
+    Args:
+        redis: Redis connection.
+        queue_names: RQ queue name of each lane.
+
+    Returns:
+        {
+            "at": epoch time read,
+            "lanes": {queue name: {"queued": n, <registry>: n, ..., "oldest_age": seconds}},
+            "workers": {worker name: status},
+        }
+    """
+    queue_names = list(queue_names)
+    with redis.pipeline(transaction=False) as pipe:
+        pipe.hgetall(WORKER_STATUS_KEY)
+        for name in queue_names:
+            pipe.llen(f"rq:queue:{name}")
+            pipe.lindex(f"rq:queue:{name}", 0)
+            for prefix in REGISTRIES.values():
+                pipe.zcard(f"rq:{prefix}:{name}")
+        raw_statuses, *replies = pipe.execute()
+
+    lanes: dict[str, dict[str, Any]] = {}
+    heads: dict[str, str] = {}
+    per_lane = 2 + len(REGISTRIES)
+    for i, name in enumerate(queue_names):
+        queued, head, *registries = replies[i * per_lane : (i + 1) * per_lane]
+        lanes[name] = {"queued": queued, **dict(zip(REGISTRIES, registries, strict=True)), "oldest_age": 0.0}
+        if head is not None:
+            heads[name] = head.decode()
+
+    if heads:
+        with redis.pipeline(transaction=False) as pipe:
+            for job_id in heads.values():
+                pipe.hget(f"rq:job:{job_id}", "enqueued_at")
+            enqueued = pipe.execute()
+        for name, ts in zip(heads, enqueued, strict=True):
+            if ts:
+                lanes[name]["oldest_age"] = round((now() - utcparse(ts.decode())).total_seconds(), 3)
+
+    return {"at": time.time(), "lanes": lanes, "workers": live_statuses(redis, raw_statuses)}
+
+
+def read_shards(shards: Sequence[Redis], queue_names: Iterable[str]) -> dict[str, Any]:
+    """
+    Read the queue and worker state of every job shard, combined as read_fleet() returns it.
+
+    Lane counts are summed, the oldest age is the oldest on any shard, and workers (whose
+    names are unique) are merged.
+    """
+    queue_names = list(queue_names)
+    snapshot, *others = (read_fleet(shard, queue_names) for shard in shards)
+    for other in others:
+        for name, lane in other["lanes"].items():
+            totals = snapshot["lanes"][name]
+            for field, value in lane.items():
+                totals[field] = max(totals[field], value) if field == "oldest_age" else totals[field] + value
+        snapshot["workers"].update(other["workers"])
+    return snapshot
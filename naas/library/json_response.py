@@ -0,0 +1,67 @@
+"""
+json_response.py
+JSON encoding for API responses.
+
+Flask (which encodes the responses of spectree-validated resources) and flask_restful
+encode with the stdlib json module. With JSON_ENCODER set to "orjson" (the default) both
+encode with orjson instead, which is several times faster for the multi-megabyte command
+output job results carry. "json" keeps the stdlib encoder.
+
+Results the API already holds as encoded JSON are wrapped in RawJSON and written into
+the response as they are, rather than being decoded and encoded again.
+"""
+
+import json
+from typing import Any
+
+import orjson
+from flask import Response, make_response
+from flask.json.provider import DefaultJSONProvider
+
+from naas.config import JSON_ENCODER
+
+
+class RawJSON:
+    """Already-encoded JSON, embedded in a response as-is."""
+
+    __slots__ = ("data",)
+
+    def __init__(self, data: bytes) -> None:
+        self.data = data
+
+
+def _orjson_default(obj: Any) -> Any:
+    if isinstance(obj, RawJSON):
+        return orjson.Fragment(obj.data)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _json_default(obj: Any) -> Any:
+    if isinstance(obj, RawJSON):
+        return json.loads(obj.data)  # The stdlib encoder can't embed raw JSON
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(obj: Any) -> bytes:
+    """Encode obj, which may contain RawJSON values, with the configured encoder."""
+    if JSON_ENCODER == "orjson":
+        return orjson.dumps(obj, default=_orjson_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, default=_json_default, separators=(",", ":")).encode()
+
+
+class JSONProvider(DefaultJSONProvider):
+    """Flask JSON provider encoding with dumps()."""
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        return dumps(obj).decode()
+
+    def response(self, *args: Any, **kwargs: Any) -> Response:
+        obj = self._prepare_response_obj(args, kwargs)
+        return Response(dumps(obj) + b"\n", mimetype=self.mimetype)
+
+
+def output_json(data: Any, code: int, headers: dict | None = None) -> Response:
+    """flask_restful representation for application/json, encoding with dumps()."""
+    response = make_response(dumps(data) + b"\n", code)
+    response.headers.extend(headers or {})
+    return response
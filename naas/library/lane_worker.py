@@ -0,0 +1,154 @@
+"""
+lane_worker.py
+RQ Worker that dequeues from the priority lanes in weighted order and enforces per-device
+session limits.
+"""
+
+import random
+import time
+from datetime import timedelta
+
+from redis import Redis
+from redis.client import Pipeline
+from rq import Queue, Worker
+from rq.job import Job
+from rq.utils import now
+
+from naas.config import (
+    DEVICE_SESSION_BACKOFF,
+    DEVICE_SESSION_BACKOFF_MAX,
+    DEVICE_SESSION_MAX_DEFERS,
+    JOB_TIMEOUT,
+    QUEUE_LANE_WEIGHTS,
+)
+from naas.library import tracing
+from naas.library.connection_pool import pool
+from naas.library.device_sessions import acquire_session, release_session, session_limit
+from naas.library.metrics import device_session_deferrals, device_sessions_in_use, queue_wait_seconds
+from naas.library.timings import observe_phases
+from naas.library.worker_status import publish_status, remove_status
+
+# Extra time a session lease outlives the job timeout, covering connect and teardown
+_LEASE_MARGIN = 60
+
+
+class LaneWorker(Worker):
+    """
+    Worker using smooth weighted round-robin to pick which lane gets first pick of the next dequeue.
+
+    RQ pops from the first non-empty queue in _ordered_queues. A strict high > normal > low
+    order would let a steady stream of high priority jobs starve the other lanes, so after
+    each dequeue one lane is moved to the front in proportion to its QUEUE_LANE_WEIGHTS entry
+    (queues not in the table weigh 1). The remaining lanes keep their priority order, so an
+    idle lane's turn falls through to the next highest priority work.
+
+    Before a job runs, the worker takes a session slot for its device (see device_sessions).
+    Jobs whose device is at its limit are deferred back to their queue with backoff instead
+    of occupying a work horse.
+
+    Once a job's work horse has exited, the worker observes the phase timings the job left
+    in its meta (see timings), so the short-lived horses write no metrics of their own.
+
+    Each heartbeat also publishes the worker's status to the summary hash read by the
+    health check (see worker_status).
+
+    Session slots are counted on shared_connection, which defaults to the worker's own
+    connection; with REDIS_SHARDS it is REDIS_HOST, so limits hold across every shard.
+    """
+
+    def __init__(self, *args, shared_connection: Redis | None = None, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.shared_connection = shared_connection or self.connection
+        self._lane_priority = list(self._ordered_queues)
+        self._lane_credit = {q.name: 0 for q in self._lane_priority}
+        self._job_started: float | None = None
+
+    def heartbeat(self, timeout: int | None = None, pipeline: Pipeline | None = None) -> None:
+        """Extend the worker's TTL as RQ does, and publish its status summary with the same TTL."""
+        super().heartbeat(timeout, pipeline)
+        publish_status(
+            pipeline if pipeline is not None else self.connection,
+            self.name,
+            self.hostname or "",
+            self._job_started,
+            len(pool),
+            timeout or self.worker_ttl + 60,
+        )
+
+    def register_death(self) -> None:
+        """Unregister the worker, removing its status summary."""
+        super().register_death()
+        remove_status(self.connection, self.name)
+
+    def reorder_queues(self, reference_queue: Queue) -> None:
+        """Move the lane with the most accumulated credit to the front of the dequeue order."""
+        total = 0
+        for q in self._lane_priority:
+            weight = QUEUE_LANE_WEIGHTS.get(q.name, 1)
+            self._lane_credit[q.name] += weight
+            total += weight
+        first = max(self._lane_priority, key=lambda q: self._lane_credit[q.name])
+        self._lane_credit[first.name] -= total
+        self._ordered_queues = [first] + [q for q in self._lane_priority if q is not first]
+
+    def execute_job(self, job: Job, queue: Queue) -> None:
+        """
+        Take a session slot for the job's device, record its queue wait, then execute it, marked busy.
+
+        Afterwards, observe the phase timings the work horse stored on the job.
+        """
+        ip: str = job.kwargs.get("ip", "")
+        limit = session_limit(ip, job.kwargs.get("device_type")) if ip else 0
+        if limit:
+            timeout = job.timeout if job.timeout and job.timeout > 0 else JOB_TIMEOUT
+            if not acquire_session(self.shared_connection, ip, job.id, limit, timeout + _LEASE_MARGIN):
+                self.defer_job(job, queue, ip, limit)
+                return
+            device_sessions_in_use.labels(device=ip).inc()
+
+        if job.enqueued_at is not None:
+            queue_wait_seconds.labels(lane=queue.name).observe((now() - job.enqueued_at).total_seconds())
+        self._job_started = time.time()
+        try:
+            super().execute_job(job, queue)
+            observe_phases(job)
+        finally:
+            self._job_started = None
+            if limit:
+                release_session(self.shared_connection, ip, job.id)
+                device_sessions_in_use.labels(device=ip).dec()
+
+    def perform_job(self, job: Job, queue: Queue) -> bool:
+        """Perform the job, then export its trace spans before the work horse exits."""
+        try:
+            return super().perform_job(job, queue)
+        finally:
+            tracing.flush()
+
+    def defer_job(self, job: Job, queue: Queue, ip: str, limit: int) -> None:
+        """
+        Put a job whose device is busy back on its queue after an exponential backoff delay.
+
+        The job is scheduled rather than requeued immediately so workers don't spin on it.
+        After DEVICE_SESSION_MAX_DEFERS attempts the job fails instead.
+        """
+        defers = job.meta.get("session_defers", 0) + 1
+        if defers > DEVICE_SESSION_MAX_DEFERS:
+            self.log.warning("Job %s: device %s still at its session limit, giving up", job.id, ip)
+            self.handle_job_failure(
+                job,
+                queue,
+                exc_string=f"Device {ip} remained at its session limit ({limit}) after {defers - 1} retries",
+            )
+            return
+
+        # Jitter spreads out jobs deferred together so they don't retry in lockstep
+        delay = min(DEVICE_SESSION_BACKOFF * 2 ** (defers - 1), DEVICE_SESSION_BACKOFF_MAX) * random.uniform(0.5, 1)
+        job.meta["session_defers"] = defers
+        self.log.debug("Job %s: device %s at its session limit, deferring %.1fs", job.id, ip, delay)
+        with self.connection.pipeline() as pipe:
+            queue.schedule_job(job, now() + timedelta(seconds=delay), pipeline=pipe)
+            # Single-queue workers dequeue into RQ's intermediate queue; drop it from there too
+            pipe.lrem(queue.intermediate_queue_key, 1, job.id)
+            pipe.execute()
+        device_session_deferrals.labels(device=ip).inc()
@@ -0,0 +1,142 @@
+"""
+lanes.py
+Priority lanes: separate RQ queues for interactive and bulk traffic.
+
+Each submit request carries a priority ("high", "normal" or "low") which maps to its
+own queue (see QUEUE_LANES). Workers listen on all lanes and use LaneWorker's weighted
+dequeue order so high priority work is drained first without starving the other lanes.
+
+With REDIS_SHARDS, every shard has its own set of lanes and each job lives wholly on one
+shard, chosen by a hash of its ID: its queue entry, registries, result and cached outputs.
+Anything looking a job up routes by its ID, and listings read every shard.
+"""
+
+import time
+import zlib
+from uuid import uuid4
+
+from flask import current_app
+from redis import Redis
+from rq import Queue
+from rq.exceptions import NoSuchJobError
+from rq.job import Job
+
+from naas.config import PRIORITY_HIGH_RATE_LIMIT, PRIORITY_HIGH_USERS, QUEUE_LANES
+from naas.library import tracing
+
+_LANE_QUEUE_NAMES = frozenset(QUEUE_LANES.values())
+
+
+class LaneQueue(Queue):
+    """
+    RQ Queue whose fetch_job() returns jobs from any NAAS lane, not only its own.
+
+    Jobs it creates carry the enqueuing request's trace context in their meta.
+    """
+
+    def create_job(self, *args, **kwargs) -> Job:
+        """Create a job as RQ does, storing the current trace context in its meta."""
+        job = super().create_job(*args, **kwargs)
+        tracing.inject(job.meta)
+        return job
+
+    def fetch_job(self, job_id: str) -> Job | None:
+        """
+        Fetch a job by ID regardless of which lane it was enqueued on.
+
+        Args:
+            job_id: The job ID.
+
+        Returns:
+            The Job, or None if it does not exist or was not enqueued on a NAAS lane.
+        """
+        try:
+            job = self.job_class.fetch(job_id, connection=self.connection, serializer=self.serializer)
+        except NoSuchJobError:
+            return None
+        return job if job.origin in _LANE_QUEUE_NAMES else None
+
+
+def resolve_priority(requested: str, username: str, redis: Redis) -> str:
+    """
+    Apply per-user policy to a requested priority.
+
+    High priority is limited to PRIORITY_HIGH_USERS (if set) and to PRIORITY_HIGH_RATE_LIMIT
+    submissions per user per minute, tracked in a sliding window like the auth lockouts.
+    Requests over the policy are downgraded to normal rather than rejected.
+
+    Args:
+        requested: The priority from the request payload.
+        username: The submitting user.
+        redis: Redis connection.
+
+    Returns:
+        The priority to enqueue with.
+    """
+    if requested != "high":
+        return requested
+
+    if PRIORITY_HIGH_USERS and username not in PRIORITY_HIGH_USERS:
+        current_app.logger.info("%s is not permitted high priority, downgrading to normal", username)
+        return "normal"
+
+    # Count the submission optimistically and take it back if it's over the limit. The steps
+    # run in one MULTI/EXEC, so concurrent submissions can never exceed the limit together.
+    redis_key = f"naas_priority_high_{username}"
+    member = str(uuid4())
+    now = time.time()
+    with redis.pipeline() as pipe:
+        pipe.zremrangebyscore(redis_key, 0, now - 60)
+        pipe.zadd(redis_key, {member: now})
+        pipe.zcard(redis_key)
+        pipe.expire(redis_key, 60)
+        _, _, submitted, _ = pipe.execute()
+    if submitted > PRIORITY_HIGH_RATE_LIMIT:
+        redis.zrem(redis_key, member)
+        current_app.logger.info("%s exceeded the high priority rate limit, downgrading to normal", username)
+        return "normal"
+    return "high"
+
+
+def shard_index(job_id: str, shards: int) -> int:
+    """Return the index of the shard, out of shards, that a job ID is placed on."""
+    return zlib.crc32(job_id.encode()) % shards
+
+
+def queue_for(priority: str, job_id: str | None = None) -> Queue:
+    """
+    Return the RQ queue for a priority lane.
+
+    Args:
+        priority: The lane's priority. Unsharded, the normal lane is app.config["q"].
+        job_id: The job to be enqueued or looked up, which picks the shard when sharded.
+
+    Returns:
+        The queue.
+    """
+    shards = current_app.config.get("shards")
+    if shards and job_id is not None:
+        return shards[shard_index(job_id, len(shards))][priority]  # type: ignore[no-any-return]
+    if priority == "normal":
+        return current_app.config["q"]  # type: ignore[no-any-return]
+    return current_app.config["queues"][priority]  # type: ignore[no-any-return]
+
+
+def job_queue(job_id: str) -> LaneQueue:
+    """Return the queue to fetch a job from: the normal lane of its shard, which finds jobs on any lane."""
+    return queue_for("normal", job_id)  # type: ignore[return-value]
+
+
+def job_redis(job_id: str) -> Redis:
+    """Return the Redis connection holding a job and the keys kept alongside it."""
+    if current_app.config.get("shards"):
+        return job_queue(job_id).connection
+    return current_app.config["redis"]  # type: ignore[no-any-return]
+
+
+def shard_lanes() -> list[tuple[Redis, list[Queue]]]:
+    """Return each shard's Redis connection and its queue for every lane, highest priority first."""
+    shards = current_app.config.get("shards")
+    if not shards:
+        return [(current_app.config["redis"], [queue_for(priority) for priority in QUEUE_LANES])]
+    return [(lanes["normal"].connection, [lanes[priority] for priority in QUEUE_LANES]) for lanes in shards]
@@ -0,0 +1,182 @@
+"""
+lazy_parse.py
+Parse structured job results when they are first read.
+
+send_command_structured jobs store the raw command output. The first read of a job's
+results parses it with TextFSM in a process pool and caches the parsed form in Redis
+next to the raw result, expiring with it. Later reads get the cached form; reads asking
+for raw output get the stored output without parsing.
+
+Parsing runs in a small process pool so it doesn't hold the GIL of a threaded API
+worker. A parse still running when a read gives up waiting (PARSE_TIMEOUT) completes in
+the background and is cached for the next read. Its duration is added to the job's
+timings as the parse phase.
+
+TextFSM and netmiko are only imported in the parse processes, never in the API process.
+"""
+
+import json
+import logging
+import multiprocessing
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from prometheus_client import Histogram
+from redis import Redis
+from rq.job import Job
+
+from naas.config import JOB_TTL_SUCCESS, PARSE_POOL_SIZE, PARSE_TIMEOUT, RESULT_STORE_PATH, RESULT_STORE_THRESHOLD
+from naas.library.json_response import RawJSON, dumps
+from naas.library.result_store import BLOB_KEY, OUTPUTS_KEY, open_blob, read_outputs, store_blob
+
+logger = logging.getLogger(name="NAAS")
+
+STRUCTURED_FUNC = "naas.library.netmiko_lib.netmiko_send_command_structured"
+
+# How a cached parse that was offloaded to the blob store starts, rather than the parsed JSON itself
+_BLOB_POINTER = f'{{"{BLOB_KEY}"'.encode()
+
+# Parses allowed to wait per pool process; past this, reads are served raw instead of queueing
+_QUEUE_DEPTH = 4
+
+_parse_seconds = Histogram(
+    "naas_parse_seconds",
+    "Time to parse a structured job's results on first read, including waiting for a parse process",
+    ["platform"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+
+_pool: ProcessPoolExecutor | None = None
+_lock = threading.Lock()
+_inflight: dict[str, Future] = {}
+
+
+def _parsed_key(job_id: str) -> str:
+    return f"naas_parsed_{job_id}"
+
+
+def _init_parser() -> None:
+    """Load the ntc-templates index when a parse process starts."""
+    from naas.library.textfsm_templates import template_index
+
+    template_index()
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    """Return this process's parse pool, creating it on first use."""
+    global _pool
+    if _pool is None:
+        # API workers are threaded, so start pool processes from a clean forkserver rather than forking
+        context = multiprocessing.get_context("forkserver")
+        context.set_forkserver_preload(["naas.library.lazy_parse", "naas.library.textfsm_templates"])
+        _pool = ProcessPoolExecutor(max_workers=PARSE_POOL_SIZE, mp_context=context, initializer=_init_parser)
+    return _pool
+
+
+def parse_results(results: dict, platform: str, template: str | None, ttl: int) -> bytes:
+    """
+    Parse a job's raw results and return the JSON to cache. Runs in the parse pool.
+
+    Args:
+        results: The command -> raw output dict, or a blob store pointer to it.
+        platform: Netmiko device type to pick ntc-templates by.
+        template: Custom TextFSM template text.
+        ttl: Seconds the parsed form should be kept, if it is large enough for the blob store.
+
+    Returns:
+        The JSON-encoded command -> parsed output dict, or a blob store pointer to it.
+    """
+    from naas.library.textfsm_templates import parse_output
+
+    if BLOB_KEY in results:
+        f = open_blob(results[BLOB_KEY]["digest"])
+        if f is None:
+            raise FileNotFoundError(f"Result blob {results[BLOB_KEY]['digest']} is missing")
+        with f:
+            results = json.load(f)
+
+    parsed = {
+        command: parse_output(output, platform, command, template) if isinstance(output, str) else output
+        for command, output in results.items()
+    }
+    encoded = dumps(parsed)
+    if RESULT_STORE_PATH and len(encoded) > RESULT_STORE_THRESHOLD:
+        return json.dumps(store_blob(encoded, ttl)).encode()
+    return encoded
+
+
+def _submit(redis: Redis, job: Job, results: dict, platform: str) -> Future | None:
+    """Start parsing a job's results, or join a parse already running. Returns None if the pool is saturated."""
+    with _lock:
+        future = _inflight.get(job.id)
+        if future is not None:
+            return future
+        if len(_inflight) >= PARSE_POOL_SIZE * _QUEUE_DEPTH:
+            return None
+
+        ttl = redis.ttl(job.key)
+        ttl = ttl if ttl > 0 else JOB_TTL_SUCCESS
+        started = time.perf_counter()
+        future = _get_pool().submit(parse_results, results, platform, job.kwargs.get("textfsm_template"), ttl)
+        _inflight[job.id] = future
+
+    def cache(done: Future) -> None:
+        if done.exception() is None:
+            elapsed = time.perf_counter() - started
+            redis.set(_parsed_key(job.id), done.result(), ex=ttl)
+            _parse_seconds.labels(platform=platform).observe(elapsed)
+            job.meta.setdefault("timings", {})["parse"] = round(elapsed, 4)
+            job.save_meta()
+        else:
+            logger.error("%s: Parsing results failed: %s", job.id, done.exception())
+        with _lock:
+            _inflight.pop(job.id, None)
+
+    future.add_done_callback(cache)
+    return future
+
+
+def is_parsed(redis: Redis, job: Job) -> bool:
+    """Return whether the parsed form of a structured job's results is cached."""
+    return bool(redis.exists(_parsed_key(job.id)))
+
+
+def structured_results(redis: Redis, job: Job, results: dict, platform: str) -> RawJSON | dict | None:
+    """
+    Return the parsed form of a structured job's results, parsing them on first read.
+
+    Args:
+        redis: Redis connection.
+        job: The finished send_command_structured job.
+        results: The job's raw results (command -> output dict, or an outputs or blob store pointer).
+        platform: Device type to parse for (the detected platform for autodetect jobs).
+
+    Returns:
+        The parsed command -> output dict as cached, encoded JSON (or a blob store pointer
+        to it), or None if it could not be produced in time and the raw results should be
+        returned instead.
+    """
+    cached: bytes | None = redis.get(_parsed_key(job.id))  # type: ignore[assignment]
+    if cached is None:
+        if OUTPUTS_KEY in results:
+            # Parse processes have no Redis connection, so hand them the outputs themselves
+            outputs = read_outputs(redis, job.id, results)
+            if outputs is None:
+                return None
+            results = outputs
+        future = _submit(redis, job, results, platform)
+        if future is None:
+            logger.warning("%s: Parse pool is saturated, returning raw output", job.id)
+            return None
+        try:
+            cached = future.result(timeout=PARSE_TIMEOUT)
+        except FutureTimeoutError:
+            logger.warning("%s: Parsing results is taking over %ss, returning raw output", job.id, PARSE_TIMEOUT)
+            return None
+        except Exception:
+            return None  # Logged by the cache callback
+    if cached.startswith(_BLOB_POINTER):
+        return json.loads(cached)  # type: ignore[no-any-return]
+    return RawJSON(cached)
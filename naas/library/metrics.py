@@ -0,0 +1,102 @@
+"""
+metrics.py
+Worker-side Prometheus metrics.
+
+RQ workers run as many processes per host, so metrics use prometheus_client's
+multiprocess mode: each process writes to files in PROMETHEUS_MULTIPROC_DIR and the
+worker supervisor serves the aggregate. PROMETHEUS_MULTIPROC_DIR must be set in the
+environment before this module is imported.
+"""
+
+import logging
+import os
+from pathlib import Path
+
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, start_http_server
+from prometheus_client.multiprocess import MultiProcessCollector
+
+logger = logging.getLogger(name="NAAS")
+
+queue_wait_seconds = Histogram(
+    "naas_queue_wait_seconds",
+    "Time jobs spend queued before a worker starts them",
+    ["lane"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 900, 3600),
+)
+
+job_phase_seconds = Histogram(
+    "naas_job_phase_seconds",
+    "Time jobs spend in each phase of their device session (see naas.library.timings)",
+    ["phase", "platform", "pool"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300),
+)
+
+device_sessions_in_use = Gauge(
+    "naas_device_sessions_in_use",
+    "Per-device session slots currently held by workers",
+    ["device"],
+    multiprocess_mode="livesum",
+)
+
+device_session_deferrals = Counter(
+    "naas_device_session_deferrals_total",
+    "Jobs deferred because their device had no free session slot",
+    ["device"],
+)
+
+supervisor_workers = Gauge(
+    "naas_supervisor_workers",
+    "Worker processes currently running under this host's supervisor",
+    multiprocess_mode="mostrecent",
+)
+
+supervisor_desired_workers = Gauge(
+    "naas_supervisor_desired_workers",
+    "Worker process count this host's supervisor is scaling towards",
+    multiprocess_mode="mostrecent",
+)
+
+supervisor_worker_exits = Counter(
+    "naas_supervisor_worker_exits_total",
+    "Worker processes that exited, by reason (crashed, recycled, rss, scaled_down)",
+    ["reason"],
+)
+
+supervisor_scale_events = Counter(
+    "naas_supervisor_scale_events_total",
+    "Supervisor decisions to change the worker process count, by direction",
+    ["direction"],
+)
+
+
+def start_metrics_server(port: int) -> bool:
+    """
+    Serve metrics aggregated across all worker processes on this host.
+
+    Clears files left in PROMETHEUS_MULTIPROC_DIR by previous runs (keeping this process's
+    own), so this must be called before worker processes start.
+
+    Args:
+        port: TCP port to listen on.
+
+    Returns:
+        True if the server was started, False if disabled or multiprocess mode is not configured.
+    """
+    multiproc_dir = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if not port:
+        return False
+    if not multiproc_dir:
+        logger.warning("PROMETHEUS_MULTIPROC_DIR is not set, worker metrics are disabled")
+        return False
+
+    Path(multiproc_dir).mkdir(parents=True, exist_ok=True)
+    own_suffix = f"_{os.getpid()}.db"
+    for path in Path(multiproc_dir).glob("*.db"):
+        if not path.name.endswith(own_suffix):
+            path.unlink()
+
+    registry = CollectorRegistry()
+    MultiProcessCollector(registry, path=multiproc_dir)
+    start_http_server(port, registry=registry)
+    logger.info("Serving worker metrics on port %s", port)
+    return True
@@ -17,6 +17,8 @@ from naas.library.audit import emit_audit_event
 from naas.library.auth import tacacs_auth_lockout
 from naas.library.circuit_breaker import _get_redis, with_circuit_breaker
 from naas.library.connection_pool import pool
+from naas.library.result_store import offload_result
+from naas.library.timings import JobTimings, timed_connect
 
 # Common error patterns across IOS, NX-OS, EOS, JunOS, and similar platforms
 _CONFIG_ERROR_PATTERN = r"(?i)(% invalid|% incomplete|% ambiguous|% error|error:|invalid input|syntax error)"
@@ -95,13 +97,11 @@ def netmiko_send_command(
             port,
             read_timeout,
             expect_string,
-            False,  # use_textfsm
-            None,  # textfsm_template
             verbose,
             request_id,
         )
     return _netmiko_send_command_impl(
-        ip, credentials, device_type, commands, port, read_timeout, expect_string, False, None, verbose, request_id
+        ip, credentials, device_type, commands, port, read_timeout, expect_string, verbose, request_id
     )
 
 
@@ -113,31 +113,34 @@ def _netmiko_send_command_impl(
     port: int = 22,
     read_timeout: float = 30.0,
     expect_string: str | None = None,
-    use_textfsm: bool = False,
-    textfsm_template: str | None = None,
     verbose: bool = False,
     request_id: str = "",
 ) -> "tuple[dict | None, str | None]":
     start_time = time.time()
+    timings = JobTimings(
+        device_type, "netmiko.send_command", {"naas.ip": ip, "naas.port": port, "naas.request_id": request_id}
+    )
 
     # Handle platform autodetect
     detected_platform = None
     if device_type == "autodetect":
+        timings.begin("autodetect")
         device_type_result, error = _autodetect_platform(
             ip, port, credentials.username, credentials.password, credentials.enable, request_id
         )
         if error is not None:
+            timings.record()
             duration_ms = int((time.time() - start_time) * 1000)
             emit_audit_event("job.completed", request_id=request_id, status="failed", duration_ms=duration_ms)
             return None, error
         if device_type_result is None:  # pragma: no cover
             # Should never happen - error check above ensures this
             raise RuntimeError("Autodetect succeeded but returned None platform")
-        device_type = device_type_result
+        device_type = timings.platform = device_type_result
         detected_platform = device_type
 
-    # Skip pool for autodetect or TextFSM (template state makes pooling unreliable)
-    use_pool = CONNECTION_POOL_ENABLED and detected_platform is None and not use_textfsm
+    # Skip pool for autodetect
+    use_pool = CONNECTION_POOL_ENABLED and detected_platform is None
 
     netmiko_device = {
         "device_type": device_type,
@@ -162,16 +165,19 @@ def _netmiko_send_command_impl(
         if net_connect is None:
             logger.debug("%s %s:Establishing connection...", request_id, ip)
             netmiko_device["keepalive"] = CONNECTION_POOL_KEEPALIVE if use_pool else 0
-            net_connect = netmiko.ConnectHandler(**netmiko_device)
+            net_connect = timed_connect(timings, netmiko_device)
         else:
             # Verify pooled connection is at a clean prompt before use
+            timings.pool = "hit"
+            timings.begin("pool_check")
             try:
                 net_connect.find_prompt()
             except Exception:
                 logger.debug("%s %s:Pooled connection in bad state, reconnecting", request_id, ip)
                 pool._evict((ip, port, pool._cred_hash(credentials.username, credentials.password), device_type))
                 netmiko_device["keepalive"] = CONNECTION_POOL_KEEPALIVE
-                net_connect = netmiko.ConnectHandler(**netmiko_device)
+                timings.pool = "miss"
+                net_connect = timed_connect(timings, netmiko_device)
 
         net_output = {}
         for command in commands:
@@ -179,33 +185,37 @@ def _netmiko_send_command_impl(
             kwargs: dict[str, float | str | bool] = {"read_timeout": read_timeout}
             if expect_string is not None:
                 kwargs["expect_string"] = expect_string
-            if use_textfsm:
-                kwargs["use_textfsm"] = True
-                if textfsm_template is not None:
-                    kwargs["textfsm_template"] = textfsm_template
-            net_output[command] = net_connect.send_command(command, **kwargs)
+            with timings.command(command):
+                net_output[command] = net_connect.send_command(command, **kwargs)
 
         if use_pool:
+            timings.begin("release")
             pool.release(ip, port, credentials.username, credentials.password, device_type, net_connect)
         else:
+            timings.begin("disconnect")
             net_connect.disconnect()
 
     except (TimeoutError, netmiko.NetMikoTimeoutException) as e:
         logger.debug("%s %s:Netmiko timed out connecting to device: %s", request_id, ip, e)
+        timings.fail(e)
         duration_ms = int((time.time() - start_time) * 1000)
         emit_audit_event("job.completed", request_id=request_id, status="failed", duration_ms=duration_ms)
         raise  # Re-raise to trigger circuit breaker
     except netmiko.NetMikoAuthenticationException as e:
         logger.debug("%s %s:Netmiko authentication failure connecting to device: %s", request_id, ip, e)
+        timings.fail(e)
         tacacs_auth_lockout(username=credentials.username, redis=_get_redis(), report_failure=True)
         duration_ms = int((time.time() - start_time) * 1000)
         emit_audit_event("job.completed", request_id=request_id, status="failed", duration_ms=duration_ms)
         return None, str(e)  # Don't trigger circuit breaker for auth failures
     except (ssh_exception.SSHException, ValueError) as e:
         logger.debug("%s %s:Netmiko cannot connect to device: %s", request_id, ip, e)
+        timings.fail(e)
         duration_ms = int((time.time() - start_time) * 1000)
         emit_audit_event("job.completed", request_id=request_id, status="failed", duration_ms=duration_ms)
         raise  # Re-raise to trigger circuit breaker
+    finally:
+        timings.record()
 
     logger.debug("%s %s:Netmiko executed successfully.", request_id, ip)
     duration_ms = int((time.time() - start_time) * 1000)
@@ -215,7 +225,7 @@ def _netmiko_send_command_impl(
     if detected_platform is not None:
         net_output["_detected_platform"] = detected_platform
 
-    return net_output, None
+    return offload_result(net_output), None
 
 
 def netmiko_send_command_structured(
@@ -230,9 +240,11 @@ def netmiko_send_command_structured(
     request_id: str = "",
 ) -> "tuple[dict | None, str | None]":
     """
-    Send commands with TextFSM parsing for structured output.
+    Send commands whose output is returned as structured data.
 
-    Thin wrapper around _netmiko_send_command_impl with use_textfsm=True.
+    Thin wrapper around _netmiko_send_command_impl. The raw output is stored as the job
+    result and parsed with TextFSM (textfsm_template, or ntc-templates) when the results
+    are first read (see lazy_parse), so the device session isn't held open while parsing.
     """
     if CIRCUIT_BREAKER_ENABLED:
         return with_circuit_breaker(  # type: ignore[no-any-return]
@@ -246,13 +258,11 @@ def netmiko_send_command_structured(
             port,
             read_timeout,
             None,  # expect_string
-            True,  # use_textfsm
-            textfsm_template,
             verbose,
             request_id,
         )
     return _netmiko_send_command_impl(
-        ip, credentials, device_type, commands, port, read_timeout, None, True, textfsm_template, verbose, request_id
+        ip, credentials, device_type, commands, port, read_timeout, None, verbose, request_id
     )
 
 
@@ -317,6 +327,9 @@ def _netmiko_send_config_impl(
     request_id: str = "",
 ) -> "tuple[dict | None, str | None]":
     start_time = time.time()
+    timings = JobTimings(
+        device_type, "netmiko.send_config", {"naas.ip": ip, "naas.port": port, "naas.request_id": request_id}
+    )
     netmiko_device = {
         "device_type": device_type,
         "ip": ip,
@@ -333,10 +346,11 @@ def _netmiko_send_config_impl(
 
     try:
         logger.debug("%s %s:Establishing connection...", request_id, ip)
-        net_connect = netmiko.ConnectHandler(**netmiko_device)
+        net_connect = timed_connect(timings, netmiko_device)
 
         net_output = {}
         logger.debug("%s %s:Sending config_set: %s", request_id, ip, commands)
+        timings.begin("config")
         net_output["config_set_output"] = net_connect.send_config_set(
             commands, read_timeout=read_timeout, error_pattern=_CONFIG_ERROR_PATTERN
         )
@@ -344,6 +358,7 @@ def _netmiko_send_config_impl(
         if save_config:
             try:
                 logger.debug("%s %s: Saving configuration", request_id, ip)
+                timings.begin("save")
                 net_connect.save_config()
             except NotImplementedError:
                 logger.debug(
@@ -356,37 +371,45 @@ def _netmiko_send_config_impl(
         if commit:
             try:
                 logger.debug("%s %s: Committing configuration", request_id, ip)
+                timings.begin("commit")
                 net_connect.commit()
             except AttributeError:
                 logger.debug(
                     "%s %s: This device_type (%s) does not support the commit operation", request_id, ip, device_type
                 )
 
+        timings.begin("disconnect")
         net_connect.disconnect()
 
     except netmiko.ConfigInvalidException as e:
         logger.debug("%s %s:Config rejected by device: %s", request_id, ip, e)
+        timings.fail(e)
         duration_ms = int((time.time() - start_time) * 1000)
         emit_audit_event("job.completed", request_id=request_id, status="failed", duration_ms=duration_ms)
         return None, str(e)  # Config error — do not trigger circuit breaker
     except (TimeoutError, netmiko.NetMikoTimeoutException) as e:
         logger.debug("%s %s:Netmiko timed out connecting to device: %s", request_id, ip, e)
+        timings.fail(e)
         duration_ms = int((time.time() - start_time) * 1000)
         emit_audit_event("job.completed", request_id=request_id, status="failed", duration_ms=duration_ms)
         raise  # Re-raise to trigger circuit breaker
     except netmiko.NetMikoAuthenticationException as e:
         logger.debug("%s %s:Netmiko authentication failure connecting to device: %s", request_id, ip, e)
+        timings.fail(e)
         tacacs_auth_lockout(username=credentials.username, redis=_get_redis(), report_failure=True)
         duration_ms = int((time.time() - start_time) * 1000)
         emit_audit_event("job.completed", request_id=request_id, status="failed", duration_ms=duration_ms)
         return None, str(e)  # Don't trigger circuit breaker for auth failures
     except (ssh_exception.SSHException, ValueError) as e:
         logger.debug("%s %s:Netmiko cannot connect to device: %s", request_id, ip, e)
+        timings.fail(e)
         duration_ms = int((time.time() - start_time) * 1000)
         emit_audit_event("job.completed", request_id=request_id, status="failed", duration_ms=duration_ms)
         raise  # Re-raise to trigger circuit breaker
+    finally:
+        timings.record()
 
     logger.debug("%s %s:Netmiko executed successfully.", request_id, ip)
     duration_ms = int((time.time() - start_time) * 1000)
     emit_audit_event("job.completed", request_id=request_id, status="finished", duration_ms=duration_ms)
-    return net_output, None
+    return offload_result(net_output), None
@@ -0,0 +1,75 @@
+"""
+queue_metrics.py
+API-side Prometheus gauges for the queues and workers, computed when /metrics is scraped.
+
+The gauges describe state shared by every API process (Redis), so they are read at scrape
+time rather than refreshed inside client requests, from the fleet snapshot that all API
+processes share (see fleet).
+"""
+
+import logging
+from collections.abc import Iterable, Iterator, Sequence
+from typing import Any
+
+from prometheus_client.core import GaugeMetricFamily
+from prometheus_client.registry import Collector
+from redis import Redis
+from redis.exceptions import RedisError
+
+from naas.library.fleet import REGISTRIES, fleet_snapshot
+
+logger = logging.getLogger(name="NAAS")
+
+
+class QueueCollector(Collector):
+    """Prometheus collector for queue depth, registry sizes, oldest job age and worker counts."""
+
+    def __init__(self, redis: Redis, queue_names: Iterable[str], shards: Sequence[Redis] = ()) -> None:
+        """
+        Args:
+            redis: Redis connection.
+            queue_names: RQ queue name of each lane.
+            shards: Connections to the job shards, if not redis itself.
+        """
+        self.redis = redis
+        self.queue_names = list(queue_names)
+        self.shards = list(shards)
+
+    def describe(self) -> Iterator[GaugeMetricFamily]:
+        """Describe the metrics without reading Redis, so registering the collector is free."""
+        return self._families({"lanes": {}, "workers": {}})
+
+    def collect(self) -> Iterator[GaugeMetricFamily]:
+        """Return the gauges for the current snapshot; nothing if Redis is unavailable."""
+        try:
+            snapshot = fleet_snapshot(self.redis, self.queue_names, self.shards)
+        except RedisError as e:
+            logger.warning("Could not read queue metrics from Redis: %s", e)
+            return iter(())
+        return self._families(snapshot)
+
+    @staticmethod
+    def _families(snapshot: dict[str, Any]) -> Iterator[GaugeMetricFamily]:
+        """Build the metric families from a fleet snapshot."""
+        lanes = snapshot["lanes"]
+        depth = GaugeMetricFamily("naas_queue_depth", "Number of jobs waiting in all priority lanes")
+        depth.add_metric([], sum(lane["queued"] for lane in lanes.values()))
+        jobs = GaugeMetricFamily(
+            "naas_queue_jobs",
+            "Jobs per priority lane waiting in the queue (queued) or held in each RQ registry",
+            labels=["lane", "registry"],
+        )
+        oldest = GaugeMetricFamily(
+            "naas_queue_oldest_job_age_seconds",
+            "Time the oldest job waiting in each priority lane has been queued (0 when empty)",
+            labels=["lane"],
+        )
+        for name, lane in lanes.items():
+            for registry in ("queued", *REGISTRIES):
+                jobs.add_metric([name, registry], lane[registry])
+            oldest.add_metric([name], lane["oldest_age"])
+        workers = GaugeMetricFamily("naas_workers_active", "Number of live RQ worker processes")
+        workers.add_metric([], len(snapshot["workers"]))
+        busy = GaugeMetricFamily("naas_workers_busy", "Number of worker processes running a job")
+        busy.add_metric([], sum(1 for status in snapshot["workers"].values() if status["state"] == "busy"))
+        return iter((depth, jobs, oldest, workers, busy))
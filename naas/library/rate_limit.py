@@ -0,0 +1,104 @@
+"""
+rate_limit.py
+Token-bucket rate limiting for API requests.
+
+Each user (or tenant, see RATE_LIMIT_TENANTS) has a bucket per endpoint holding up to
+burst tokens, refilled at rate tokens per second. A request takes one token; a request
+that finds the bucket empty is rejected with 429.
+
+The refill, take and TTL update run as one Lua script, so a check is a single atomic
+round trip to Redis. Time comes from the Redis server clock, so API instances with
+skewed clocks share buckets correctly.
+"""
+
+import math
+from dataclasses import dataclass
+
+from redis import Redis
+from redis.commands.core import Script
+
+from naas.config import RATE_LIMIT_BURST, RATE_LIMIT_ENDPOINTS, RATE_LIMIT_RATE, RATE_LIMIT_TENANTS
+
+# KEYS[1]: bucket key. ARGV: refill rate (tokens/s), burst capacity.
+# Returns {allowed, tokens left, seconds until a token is available, seconds until full}.
+# Floats are returned as strings; Redis truncates Lua numbers to integers.
+_TOKEN_BUCKET_LUA = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+
+local allowed = 0
+local retry_after = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+else
+    retry_after = (1 - tokens) / rate
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return {allowed, tostring(tokens), tostring(retry_after), tostring((burst - tokens) / rate)}
+"""
+
+_script: Script | None = None
+
+
+@dataclass
+class RateLimitResult:
+    """Outcome of a rate limit check, in the units used by the RateLimit-* headers."""
+
+    allowed: bool
+    limit: int
+    remaining: int
+    retry_after: int
+    reset: int
+
+    def headers(self) -> dict[str, str]:
+        """Return the RateLimit-* response headers for this result."""
+        return {
+            "RateLimit-Limit": str(self.limit),
+            "RateLimit-Remaining": str(self.remaining),
+            "RateLimit-Reset": str(self.reset),
+        }
+
+
+def endpoint_limits(endpoint: str) -> tuple[float, int]:
+    """Return the (rate, burst) for an endpoint, applying any RATE_LIMIT_ENDPOINTS override."""
+    return RATE_LIMIT_ENDPOINTS.get(endpoint, (RATE_LIMIT_RATE, RATE_LIMIT_BURST))
+
+
+def check_rate_limit(redis: Redis, username: str, endpoint: str) -> RateLimitResult:
+    """
+    Take a token from the caller's bucket for an endpoint.
+
+    Args:
+        redis: Redis connection.
+        username: The authenticated user.
+        endpoint: Endpoint name, e.g. "send_command".
+
+    Returns:
+        A RateLimitResult; allowed is False if the bucket was empty.
+    """
+    global _script
+    if _script is None:
+        _script = redis.register_script(_TOKEN_BUCKET_LUA)
+
+    rate, burst = endpoint_limits(endpoint)
+    subject = RATE_LIMIT_TENANTS.get(username, username)
+    allowed, tokens, retry_after, reset = _script(
+        keys=[f"naas_ratelimit_{endpoint}_{subject}"], args=[rate, burst], client=redis
+    )
+    return RateLimitResult(
+        allowed=bool(allowed),
+        limit=burst,
+        remaining=math.floor(float(tokens)),
+        retry_after=math.ceil(float(retry_after)),
+        reset=math.ceil(float(reset)),
+    )
@@ -0,0 +1,148 @@
+"""
+redis_client.py
+The Redis client every API and worker process talks to Redis through.
+
+Clients share one BlockingConnectionPool per process, sized by REDIS_MAX_CONNECTIONS.
+redis-py's default pool opens a socket for every thread that needs one, with no upper
+bound; a bounded pool makes threads wait up to REDIS_POOL_TIMEOUT for a connection
+instead, so a burst of requests can't exhaust Redis's client limit. Idle connections are
+health-checked before reuse, and commands failing on a dropped connection are retried
+with jittered exponential backoff. REDIS_SOCKET connects over a unix socket instead of
+TCP, and REDIS_PROTOCOL=3 speaks RESP3.
+
+Time spent waiting for a free connection, connections in use and waits that timed out
+are exported as Prometheus metrics.
+"""
+
+import os
+import time
+from functools import partial
+from queue import Empty, LifoQueue
+from typing import Any
+
+from prometheus_client import Counter, Gauge, Histogram
+from redis import BlockingConnectionPool, Redis
+from redis.backoff import ExponentialWithJitterBackoff
+from redis.connection import UnixDomainSocketConnection
+from redis.retry import Retry
+
+from naas.config import (
+    REDIS_CONNECT_TIMEOUT,
+    REDIS_HEALTH_CHECK_INTERVAL,
+    REDIS_HOST,
+    REDIS_MAX_CONNECTIONS,
+    REDIS_PASSWORD,
+    REDIS_POOL_TIMEOUT,
+    REDIS_PORT,
+    REDIS_PROTOCOL,
+    REDIS_RETRIES,
+    REDIS_RETRY_BACKOFF,
+    REDIS_RETRY_BACKOFF_MAX,
+    REDIS_SOCKET,
+)
+
+_pool_wait_seconds = Histogram(
+    "naas_redis_pool_wait_seconds",
+    "Time spent waiting for a free connection from the Redis connection pool",
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5),
+)
+
+_pool_in_use = Gauge(
+    "naas_redis_pool_connections_in_use",
+    "Redis connections currently checked out of the connection pool",
+    multiprocess_mode="livesum",
+)
+
+_pool_exhausted = Counter(
+    "naas_redis_pool_exhausted_total",
+    "Waits for a Redis connection that timed out because every connection in the pool was in use",
+)
+
+
+class _MeteredQueue(LifoQueue):
+    """
+    The pool's queue of idle connections, recording checkouts.
+
+    BlockingConnectionPool fills it with None placeholders, one per connection it may
+    open, and opens a connection when a placeholder is taken.
+
+    Only queues in the process that created the client are metered. An RQ work horse
+    inherits its worker's client, and the pool replaces its queue in the new process;
+    in multiprocess mode each horse metering would leave metric files of its own.
+    Processes forked to keep the client, such as gunicorn workers, take it over with
+    adopt_pool.
+    """
+
+    def __init__(self, maxsize: int = 0, owner_pid: int | None = None) -> None:
+        super().__init__(maxsize)
+        self._metered = owner_pid in (None, os.getpid())
+
+    def get(self, block: bool = True, timeout: float | None = None) -> Any:
+        if not self._metered:
+            return super().get(block, timeout)
+        start = time.perf_counter()
+        try:
+            return super().get(block, timeout)
+        except Empty:
+            _pool_exhausted.inc()
+            raise
+        finally:
+            _pool_wait_seconds.observe(time.perf_counter() - start)
+
+    def _get(self) -> Any:
+        if self._metered:
+            _pool_in_use.inc()
+        return super()._get()
+
+    def _put(self, item: Any) -> None:
+        if self._metered and item is not None:  # A returned connection, rather than a placeholder
+            _pool_in_use.dec()
+        super()._put(item)
+
+
+def redis_client(
+    host: str | None = None,
+    port: int | str | None = None,
+    password: str | None = None,
+) -> Redis:
+    """
+    Create a Redis client with its own connection pool. Create one per process and share it.
+
+    Args:
+        host: Redis host, REDIS_HOST by default. Ignored when REDIS_SOCKET is set.
+        port: Redis port, REDIS_PORT by default. Ignored when REDIS_SOCKET is set.
+        password: Redis password, REDIS_PASSWORD by default. "" connects without one.
+
+    Returns:
+        The client. Its connections are opened as they are first needed.
+    """
+    connection: dict[str, Any] = (
+        {"connection_class": UnixDomainSocketConnection, "path": REDIS_SOCKET}
+        if REDIS_SOCKET
+        else {"host": host or REDIS_HOST, "port": int(port or REDIS_PORT), "socket_keepalive": True}
+    )
+    pool = BlockingConnectionPool(
+        max_connections=REDIS_MAX_CONNECTIONS,
+        timeout=REDIS_POOL_TIMEOUT,
+        queue_class=partial(_MeteredQueue, owner_pid=os.getpid()),
+        password=password if password is not None else REDIS_PASSWORD,
+        protocol=REDIS_PROTOCOL,
+        socket_connect_timeout=REDIS_CONNECT_TIMEOUT,
+        health_check_interval=REDIS_HEALTH_CHECK_INTERVAL,
+        retry=Retry(ExponentialWithJitterBackoff(cap=REDIS_RETRY_BACKOFF_MAX, base=REDIS_RETRY_BACKOFF), REDIS_RETRIES),
+        **connection,
+    )
+    return Redis(connection_pool=pool)
+
+
+def adopt_pool(redis: Redis) -> None:
+    """
+    Take over a client created by the parent process after forking: drop the connections
+    inherited with its pool and meter the pool in this process.
+
+    Args:
+        redis: A client created by redis_client.
+    """
+    pool = redis.connection_pool
+    pool.queue_class = partial(_MeteredQueue, owner_pid=os.getpid())  # type: ignore[attr-defined]
+    pool.reset()
@@ -0,0 +1,328 @@
+"""
+result_store.py
+Storage for job results, laid out so the API can read just the commands it is asked for.
+
+Workers store each command's output under its own Redis key, and return a pointer listing
+the commands as the RQ job result. The API then fetches only the outputs a request
+selects, and with GETRANGE only the bytes it asks for, rather than one job result holding
+every output.
+
+Outputs above RESULT_STORE_THRESHOLD bytes are instead written to a shared directory as
+content-addressed files, keeping Redis memory bounded. Files are stored already
+JSON-encoded so the API can stream them into the response body without decoding, and the
+pointer records where each command's output lies in the file.
+
+Each file's mtime holds its expiry time (the longest TTL of any job referencing it);
+purge_expired() removes files past that time.
+"""
+
+import hashlib
+import json
+import logging
+import mmap
+import os
+import tempfile
+import time
+from collections.abc import Iterator
+from pathlib import Path
+from typing import IO
+
+from redis import Redis
+from rq import get_current_job
+from rq.job import Job
+
+from naas.config import JOB_TTL_SUCCESS, RESULT_STORE_PATH, RESULT_STORE_THRESHOLD
+
+logger = logging.getLogger(name="NAAS")
+
+# Result dict keys marking an offloaded result and one stored per command
+BLOB_KEY = "_blob"
+OUTPUTS_KEY = "_outputs"
+_CHUNK_SIZE = 1024 * 1024  # 1 MiB
+
+
+def _blob_path(digest: str) -> Path:
+    """Return the on-disk path for a content digest, fanned out by its first two hex characters."""
+    return Path(RESULT_STORE_PATH) / digest[:2] / digest
+
+
+def offload_result(results: dict) -> dict:
+    """
+    Store a job's results per command in Redis, or in the blob store if they exceed its size threshold.
+
+    Args:
+        results: The command -> output dict produced by a job.
+
+    Returns:
+        A pointer dict, either {"_outputs": [command, ...]} or, for results in the blob store,
+        {"_blob": {"digest": str, "size": int, "commands": {command: [offset, length]}}}.
+        A "_detected_platform" entry is kept on the pointer so the API can read it without
+        loading the outputs. Outside a job (or if an output is not text) with results under
+        the blob store threshold, the original dict is returned.
+    """
+    payload = dict(results)
+    detected_platform = payload.pop("_detected_platform", None)
+
+    # Expiry follows the job's result TTL
+    job = get_current_job()
+    ttl = job.result_ttl if job is not None and job.result_ttl is not None else JOB_TTL_SUCCESS
+
+    pointer = None
+    if RESULT_STORE_PATH:
+        encoded, commands = _encode_outputs(payload)
+        if len(encoded) > RESULT_STORE_THRESHOLD:
+            pointer = store_blob(encoded, ttl)
+            pointer[BLOB_KEY]["commands"] = commands
+            logger.debug("Offloaded %d byte result to blob store as %s", len(encoded), pointer[BLOB_KEY]["digest"])
+    if pointer is None and job is not None and all(isinstance(output, str) for output in payload.values()):
+        pointer = _store_outputs(job, payload, ttl)
+    if pointer is None:
+        return results
+
+    if detected_platform is not None:
+        pointer["_detected_platform"] = detected_platform
+    return pointer
+
+
+def _encode_outputs(payload: dict) -> tuple[bytes, dict[str, list[int]]]:
+    """JSON-encode results, noting the [offset, length] of each command's encoded output."""
+    parts = [b"{"]
+    commands = {}
+    offset = 1
+    for command, output in payload.items():
+        key = (b"," if len(parts) > 1 else b"") + json.dumps(command).encode() + b":"
+        value = json.dumps(output, separators=(",", ":")).encode()
+        commands[command] = [offset + len(key), len(value)]
+        offset += len(key) + len(value)
+        parts += [key, value]
+    parts.append(b"}")
+    return b"".join(parts), commands
+
+
+def _output_key(job_id: str, index: int) -> str:
+    return f"naas_output_{job_id}_{index}"
+
+
+def _store_outputs(job: Job, payload: dict, ttl: int) -> dict:
+    """Write each command's output to its own Redis key, returning the {"_outputs": [...]} pointer."""
+    pipe = job.connection.pipeline(transaction=False)
+    for index, output in enumerate(payload.values()):
+        pipe.set(_output_key(job.id, index), output, ex=ttl if ttl > 0 else None)
+    pipe.execute()
+    return {OUTPUTS_KEY: list(payload)}
+
+
+def range_slice(spec: str, first: int) -> slice:
+    """
+    Turn an inclusive range from a request into a slice.
+
+    Args:
+        spec: "a-b", "a-" (a to the end) or "-n" (the last n).
+        first: The number the range counts from: 0 for bytes, 1 for lines.
+    """
+    start, _, end = spec.partition("-")
+    if not start:
+        return slice(-int(end), None)
+    return slice(int(start) - first, int(end) - first + 1 if end else None)
+
+
+def read_outputs(
+    redis: Redis,
+    job_id: str,
+    results: dict,
+    commands: list[str] | None = None,
+    byte_range: slice | None = None,
+    line_range: slice | None = None,
+) -> dict | None:
+    """
+    Read some or all of a job's command outputs, fetching only what is selected from storage.
+
+    Args:
+        redis: Redis connection.
+        job_id: The job's ID.
+        results: The job's result: an outputs or blob store pointer, or the outputs themselves.
+        commands: Commands to return the output of, or None for all. Unknown commands are left out.
+        byte_range: Slice of each output's UTF-8 bytes to return. Characters cut by it are
+            replaced with U+FFFD.
+        line_range: Slice of each output's lines to return.
+
+    Returns:
+        The selected command -> output dict, or None if the outputs are no longer stored.
+    """
+    if OUTPUTS_KEY in results:
+        return _read_redis_outputs(redis, job_id, results[OUTPUTS_KEY], commands, byte_range, line_range)
+
+    if BLOB_KEY in results:
+        f = open_blob(results[BLOB_KEY]["digest"])
+        if f is None:
+            return None
+        with f:
+            offsets = results[BLOB_KEY].get("commands")
+            if offsets is None:
+                results = json.load(f)  # Offloaded before offsets were recorded
+            else:
+                results = {}
+                for command, (offset, length) in offsets.items():
+                    if commands is None or command in commands:
+                        f.seek(offset)
+                        results[command] = json.loads(f.read(length))
+
+    return {
+        command: _slice_output(output, byte_range, line_range)
+        for command, output in results.items()
+        if commands is None or command in commands
+    }
+
+
+def _read_redis_outputs(
+    redis: Redis,
+    job_id: str,
+    names: list[str],
+    commands: list[str] | None,
+    byte_range: slice | None,
+    line_range: slice | None,
+) -> dict | None:
+    selected = [(index, name) for index, name in enumerate(names) if commands is None or name in commands]
+    keys = [_output_key(job_id, index) for index, _ in selected]
+    if not keys:
+        return {}
+
+    if byte_range is not None:
+        # GETRANGE's end is inclusive, and it returns b"" for missing keys, so check they exist too
+        end = byte_range.stop - 1 if byte_range.stop is not None else -1
+        pipe = redis.pipeline(transaction=False)
+        for key in keys:
+            pipe.getrange(key, byte_range.start, end)
+        pipe.exists(*keys)
+        *values, found = pipe.execute()
+        if found < len(keys):
+            return None
+    else:
+        values = redis.mget(keys)
+        if any(value is None for value in values):
+            return None
+
+    return {
+        name: _slice_output(value.decode(errors="replace"), None, line_range)
+        for (_, name), value in zip(selected, values, strict=True)
+    }
+
+
+def _slice_output(output: object, byte_range: slice | None, line_range: slice | None) -> object:
+    if not isinstance(output, str):
+        return output  # Parsed output
+    if byte_range is not None:
+        output = output.encode()[byte_range].decode(errors="replace")
+    if line_range is not None:
+        output = _slice_lines(output, line_range)
+    return output
+
+
+def _slice_lines(output: str, line_range: slice) -> str:
+    """Slice output by newline-terminated lines, scanning only as far into it as the range needs."""
+    if line_range.start < 0:
+        # The last lines: scan back from the end, where a trailing newline ends the last line
+        pos = len(output) - 1 if output.endswith("\n") else len(output)
+        for _ in range(-line_range.start):
+            pos = output.rfind("\n", 0, pos)
+            if pos == -1:
+                break
+        return output[pos + 1 :]
+    begin = _line_offset(output, line_range.start)
+    end = _line_offset(output, line_range.stop) if line_range.stop is not None else len(output)
+    return output[begin:end]
+
+
+def _line_offset(output: str, line: int) -> int:
+    """Return where the given 0-based line starts in output, or its length if it has fewer lines."""
+    pos = 0
+    for _ in range(line):
+        pos = output.find("\n", pos) + 1
+        if pos == 0:
+            return len(output)
+    return pos
+
+
+def store_blob(encoded: bytes, ttl: int) -> dict:
+    """
+    Write JSON-encoded results to the blob store.
+
+    Args:
+        encoded: The JSON-encoded results.
+        ttl: Seconds to keep the blob. An existing identical blob's expiry is never shortened,
+            since other jobs may reference it.
+
+    Returns:
+        A pointer dict of the form {"_blob": {"digest": str, "size": int}}.
+    """
+    digest = hashlib.sha256(encoded).hexdigest()
+    path = _blob_path(digest)
+    if not path.exists():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write to a temp file and rename so readers never see a partial blob
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        with os.fdopen(fd, "wb") as f:
+            f.write(encoded)
+        os.chmod(tmp, 0o644)  # mkstemp's 0600 would hide it from an API running as another user
+        os.replace(tmp, path)
+
+    expires_at = max(time.time() + ttl, path.stat().st_mtime)
+    os.utime(path, (expires_at, expires_at))
+    return {BLOB_KEY: {"digest": digest, "size": len(encoded)}}
+
+
+def open_blob(digest: str) -> IO[bytes] | None:
+    """
+    Open an offloaded result for reading.
+
+    Args:
+        digest: SHA256 hex digest from the result pointer.
+
+    Returns:
+        A binary file object, or None if the blob is missing (expired or store not shared).
+    """
+    try:
+        return _blob_path(digest).open("rb")
+    except FileNotFoundError:
+        return None
+
+
+def iter_blob(f: IO[bytes]) -> Iterator[bytes]:
+    """
+    Yield the contents of an open blob in fixed-size chunks via mmap, then close it.
+
+    The file is memory-mapped rather than read so large results are paged in by the
+    kernel as they are sent instead of being loaded into Python memory at once.
+    """
+    try:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for offset in range(0, len(mm), _CHUNK_SIZE):
+                yield mm[offset : offset + _CHUNK_SIZE]
+    finally:
+        f.close()
+
+
+def purge_expired() -> int:
+    """
+    Delete blobs whose expiry time has passed.
+
+    Returns:
+        The number of blobs removed.
+    """
+    if not RESULT_STORE_PATH:
+        return 0
+
+    now = time.time()
+    removed = 0
+    for path in Path(RESULT_STORE_PATH).glob("*/*"):
+        if path.name.startswith("."):
+            continue  # In-progress write
+        try:
+            if path.stat().st_mtime < now:
+                path.unlink()
+                removed += 1
+        except FileNotFoundError:  # pragma: no cover  # raced with another purger
+            pass
+    if removed:
+        logger.debug("Purged %d expired result blobs", removed)
+    return removed
@@ -21,6 +21,7 @@
 # Original Source: https://gist.github.com/bloodearnest/9017111a313777b9cce5
 # Edited Source: https://gist.github.com/lykinsbd/588462f8f37b846c605c8dee477245c5
 
+import os
 from datetime import datetime, timedelta
 from ipaddress import IPv4Address, IPv4Network, IPv6Address, IPv6Network
 from typing import TYPE_CHECKING
@@ -28,28 +29,39 @@ from typing import TYPE_CHECKING
 from cryptography import x509
 from cryptography.hazmat.backends import default_backend
 from cryptography.hazmat.primitives import hashes, serialization
-from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.hazmat.primitives.asymmetric import ec, rsa
 from cryptography.x509.oid import NameOID
 
 if TYPE_CHECKING:
     pass
 
+# A cached self-signed certificate is replaced once it expires within this long
+_RENEW_BEFORE = timedelta(days=30)
+
 
 def generate_selfsigned_cert(
     hostname: str,
     public_ip: "IPv4Address | IPv4Network | IPv6Address | IPv6Network | None" = None,
     private_ip: "IPv4Address | IPv4Network | IPv6Address | IPv6Network | None" = None,
+    key_type: str = "rsa",
 ) -> "tuple[bytes, bytes]":
     """
     Generate a self-signed X509 certificate.
     :param hostname:  Must provide a hostname
     :param public_ip:  Can optionally provide a public IP
     :param private_ip:  Can optionally provide a private IP
+    :param key_type:  "rsa" (2048 bit) or "ecdsa" (P-256, faster to generate and to handshake with)
     :return: A tuple of the certificate PEM and the key PEM
     """
 
     # Generate our key
-    key = rsa.generate_private_key(public_exponent=65537, key_size=2048, backend=default_backend())
+    key: rsa.RSAPrivateKey | ec.EllipticCurvePrivateKey
+    if key_type == "ecdsa":
+        key = ec.generate_private_key(ec.SECP256R1())
+    elif key_type == "rsa":
+        key = rsa.generate_private_key(public_exponent=65537, key_size=2048, backend=default_backend())
+    else:
+        raise ValueError(f"Unknown key type {key_type!r}, expected 'rsa' or 'ecdsa'")
 
     name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, hostname)])
 
@@ -99,3 +111,45 @@ def generate_selfsigned_cert(
     )
 
     return cert_pem, key_pem
+
+
+def cached_selfsigned_cert(cert_file: str, key_file: str, hostname: str, key_type: str = "rsa") -> bool:
+    """
+    Make sure cert_file and key_file hold a self-signed certificate for hostname, reusing the
+    one written by a previous start if it is still usable.
+
+    A cached certificate is reused if it is for the same hostname and key type and is valid
+    for at least another 30 days; otherwise a new one is generated and written, the key
+    readable only by its owner.
+    :param cert_file:  Path of the certificate PEM
+    :param key_file:  Path of the key PEM
+    :param hostname:  Hostname the certificate is for
+    :param key_type:  "rsa" or "ecdsa"
+    :return: True if a new certificate was generated
+    """
+    try:
+        with open(cert_file, "rb") as c, open(key_file, "rb") as k:
+            cert = x509.load_pem_x509_certificate(c.read())
+            # The key is checked against the certificate below; skip RSA's much slower self-check
+            key = serialization.load_pem_private_key(k.read(), password=None, unsafe_skip_rsa_key_validation=True)
+    except (OSError, ValueError):
+        pass
+    else:
+        key_class = ec.EllipticCurvePrivateKey if key_type == "ecdsa" else rsa.RSAPrivateKey
+        if (
+            isinstance(key, key_class)
+            and cert.public_key() == key.public_key()
+            and cert.subject.get_attributes_for_oid(NameOID.COMMON_NAME)[0].value == hostname
+            and cert.not_valid_after_utc - _RENEW_BEFORE > datetime.now(cert.not_valid_after_utc.tzinfo)
+        ):
+            return False
+
+    cert_pem, key_pem = generate_selfsigned_cert(hostname, key_type=key_type)
+    for path, pem, mode in ((cert_file, cert_pem, 0o644), (key_file, key_pem, 0o600)):
+        # Write and rename, so a concurrent or interrupted start never sees half a file
+        tmp = f"{path}.{os.getpid()}.tmp"
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, mode)
+        with os.fdopen(fd, "wb") as f:
+            f.write(pem)
+        os.replace(tmp, path)
+    return True
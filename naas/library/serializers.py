@@ -0,0 +1,83 @@
+"""
+serializers.py
+RQ job serializers for NAAS job arguments, metadata and results.
+
+RQ pickles everything by default. NAAS job payloads are plain data (strings, lists,
+dicts, the (results, error) tuple) plus the Credentials object, so they pack into
+msgpack without Python-specific blobs in Redis, and faster than pickle for large outputs.
+
+Both serializers read either format, so jobs enqueued before a serializer change
+(or by an API/worker still on the old setting) can still be loaded.
+"""
+
+import pickle
+from typing import Any
+
+import msgpack
+
+from naas.config import JOB_SERIALIZER
+from naas.library.auth import Credentials
+
+# Pickle protocol 2+ always starts with the PROTO opcode followed by the protocol number.
+# A lone 0x80 byte is a valid msgpack message (empty map), so require at least two bytes.
+_PICKLE_PROTO = b"\x80"
+_CREDENTIALS_EXT = 1
+
+
+def _default(obj: Any) -> Any:
+    """msgpack default hook: encode the non-native types NAAS puts in jobs."""
+    if isinstance(obj, Credentials):
+        return msgpack.ExtType(_CREDENTIALS_EXT, msgpack.packb([obj.username, obj.password, obj.enable]))
+    raise TypeError(f"Object of type {type(obj).__name__} is not msgpack serializable")
+
+
+def _ext_hook(code: int, data: bytes) -> Any:
+    """msgpack ext hook: rebuild Credentials packed by _default()."""
+    if code == _CREDENTIALS_EXT:
+        username, password, enable = msgpack.unpackb(data)
+        return Credentials(username=username, password=password, enable=enable)
+    return msgpack.ExtType(code, data)
+
+
+def _loads(data: bytes) -> Any:
+    """Deserialize msgpack or legacy pickle data, detected by the leading bytes."""
+    if data[:1] == _PICKLE_PROTO and len(data) > 1:
+        return pickle.loads(data)
+    return msgpack.unpackb(data, ext_hook=_ext_hook)
+
+
+class MsgpackSerializer:
+    """Compact msgpack serializer that can still read pickled (legacy) jobs."""
+
+    @staticmethod
+    def dumps(obj: Any) -> bytes:
+        """Serialize obj to msgpack."""
+        return msgpack.packb(obj, default=_default)  # type: ignore[no-any-return]  # msgpack stubs return Any
+
+    @staticmethod
+    def loads(data: bytes) -> Any:
+        """Deserialize msgpack, falling back to pickle for legacy data."""
+        return _loads(data)
+
+
+class PickleSerializer:
+    """Pickle serializer that can also read msgpack jobs; used while migrating a fleet between formats."""
+
+    @staticmethod
+    def dumps(obj: Any) -> bytes:
+        """Serialize obj with pickle."""
+        return pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def loads(data: bytes) -> Any:
+        """Deserialize pickle or msgpack data."""
+        return _loads(data)
+
+
+_SERIALIZERS: dict[str, type[MsgpackSerializer] | type[PickleSerializer]] = {
+    "msgpack": MsgpackSerializer,
+    "pickle": PickleSerializer,
+}
+
+# Serializer shared by the API Queue, RQ Workers and registry/job lookups
+job_serializer = _SERIALIZERS.get(JOB_SERIALIZER, MsgpackSerializer)
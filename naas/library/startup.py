@@ -0,0 +1,58 @@
+"""
+startup.py
+Worker host startup: wait for Redis to be ready, and warm the parent process that workers fork from.
+"""
+
+import importlib
+import logging
+import time
+
+from redis import Redis
+from redis.exceptions import ConnectionError, TimeoutError
+
+logger = logging.getLogger(name="NAAS")
+
+# Modules every worker needs, imported once in the parent so forked workers share them
+# copy-on-write instead of each importing them (or first touching them mid-job)
+_PRELOAD_MODULES = (
+    "paramiko",
+    "netmiko",
+    "naas.library.netmiko_lib",
+    "naas.library.lane_worker",
+    "naas.library.connection_pool",
+)
+
+
+def wait_for_redis(redis: Redis, timeout: float, max_delay: float = 5.0) -> None:
+    """
+    Poll Redis with exponential backoff until it answers PING.
+
+    A Redis that is still loading its dataset raises BusyLoadingError (a ConnectionError),
+    so it is waited for too.
+
+    Args:
+        redis: Redis connection.
+        timeout: Seconds to keep trying before giving up.
+        max_delay: Longest pause between attempts.
+
+    Raises:
+        ConnectionError or TimeoutError: Redis was not ready within timeout.
+    """
+    deadline = time.monotonic() + timeout
+    delay = 0.1
+    while True:
+        try:
+            redis.ping()
+            return
+        except (ConnectionError, TimeoutError) as e:
+            if time.monotonic() + delay > deadline:
+                raise
+            logger.info("Redis not ready (%s), retrying in %.1fs", e, delay)
+        time.sleep(delay)
+        delay = min(delay * 2, max_delay)
+
+
+def preload() -> None:
+    """Import the modules workers use, so they are part of the image every worker is forked from."""
+    for module in _PRELOAD_MODULES:
+        importlib.import_module(module)
@@ -0,0 +1,258 @@
+"""
+supervisor.py
+Self-healing, queue-driven supervisor for a host's RQ worker processes.
+
+The supervisor keeps between min_workers and max_workers worker processes running:
+
+- Workers that exit are replaced: crashes, and workers recycled after WORKER_MAX_JOBS jobs
+  (they exit cleanly via RQ's max_jobs).
+- Workers whose RSS exceeds WORKER_MAX_RSS_MB are asked to stop (SIGTERM is a warm
+  shutdown, so the current job finishes) and are then replaced.
+- The process count follows demand read from Redis: when the oldest queued job has
+  waited WORKER_SCALE_UP_WAIT seconds the host scales up to cover busy workers plus the
+  backlog; once fewer workers are needed for WORKER_SCALE_DOWN_DELAY seconds, idle
+  workers are stopped.
+
+Every host runs its own supervisor against the same queues, so max_workers bounds how
+far each host grows when they all see the same backlog.
+
+While Redis is unreachable the supervisor keeps going on local process state alone: exited
+workers are still replaced, and autoscaling resumes once Redis is back.
+"""
+
+import gc
+import logging
+import os
+import signal
+import time
+from collections.abc import Callable
+from multiprocessing.context import ForkProcess as Process
+
+from prometheus_client import multiprocess
+from redis import Redis
+from redis.exceptions import RedisError
+from rq.utils import now, utcparse
+
+from naas.config import WORKER_MAX_RSS_MB, WORKER_SCALE_DOWN_DELAY, WORKER_SCALE_UP_WAIT
+from naas.library.metrics import (
+    supervisor_desired_workers,
+    supervisor_scale_events,
+    supervisor_worker_exits,
+    supervisor_workers,
+)
+
+logger = logging.getLogger(name="NAAS")
+
+
+def _rss_bytes(pid: int) -> int | None:
+    """Return a process's resident set size from /proc, or None if unavailable (exited, or not Linux)."""
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return None
+
+
+class WorkerSupervisor:
+    """
+    Keep a host's worker processes alive and sized to the queue backlog.
+
+    Args:
+        target: Function run in each worker process; called with name= plus worker_kwargs.
+        worker_kwargs: Extra keyword arguments for target.
+        redis: Redis connection for reading queue and worker state.
+        queue_names: RQ queue names the workers listen on.
+        min_workers: Fewest processes to run.
+        max_workers: Most processes to run.
+        name_prefix: Worker names are name_prefix plus a sequence number, unique per spawn
+            since RQ refuses to register a name that is still alive in Redis.
+    """
+
+    def __init__(
+        self,
+        target: Callable[..., None],
+        worker_kwargs: dict,
+        redis: Redis,
+        queue_names: list[str],
+        min_workers: int,
+        max_workers: int,
+        name_prefix: str,
+    ) -> None:
+        self.target = target
+        self.worker_kwargs = worker_kwargs
+        self.redis = redis
+        self.queue_names = queue_names
+        self.min_workers = min_workers
+        self.max_workers = max(max_workers, min_workers)
+        self.name_prefix = name_prefix
+        self.desired = min_workers
+        self.procs: dict[str, Process] = {}
+        self._seq = 0
+        self._stopping: dict[str, str] = {}  # Worker name -> reason it was asked to stop
+        self._over_since: float | None = None
+
+    def spawn(self) -> None:
+        """
+        Fork one worker process.
+
+        Workers are always forked (never spawned), so they inherit the parent's preloaded
+        modules. The parent's heap is frozen first: the worker's garbage collector then
+        skips those objects instead of writing to them, keeping their pages shared.
+        """
+        self._seq += 1
+        name = f"{self.name_prefix}{self._seq}"
+        gc.collect()
+        gc.freeze()
+        proc = Process(target=self.target, kwargs={"name": name, **self.worker_kwargs})
+        proc.start()
+        self.procs[name] = proc
+
+    def stop_worker(self, name: str, reason: str) -> None:
+        """Ask a worker to finish its current job and exit."""
+        pid = self.procs[name].pid
+        if name in self._stopping or pid is None:  # pid is only None before start()
+            return
+        self._stopping[name] = reason
+        os.kill(pid, signal.SIGTERM)
+
+    def reap(self) -> None:
+        """Forget exited workers and record why they exited."""
+        for name, proc in list(self.procs.items()):
+            if proc.is_alive():
+                continue
+            reason = self._stopping.pop(name, "recycled" if proc.exitcode == 0 else "crashed")
+            if reason == "crashed":
+                logger.warning("Worker %s exited with code %s, replacing it", name, proc.exitcode)
+            supervisor_worker_exits.labels(reason=reason).inc()
+            if os.environ.get("PROMETHEUS_MULTIPROC_DIR") and proc.pid is not None:
+                multiprocess.mark_process_dead(proc.pid)
+            del self.procs[name]
+
+    def recycle_oversized(self) -> None:
+        """Stop workers whose RSS is above WORKER_MAX_RSS_MB so they are replaced by fresh ones."""
+        if not WORKER_MAX_RSS_MB:
+            return
+        for name, proc in self.procs.items():
+            rss = _rss_bytes(proc.pid) if proc.pid is not None else None
+            if rss is not None and rss > WORKER_MAX_RSS_MB * 1024 * 1024:
+                logger.info("Worker %s RSS %d MiB is over the limit, recycling", name, rss // (1024 * 1024))
+                self.stop_worker(name, "rss")
+
+    def queue_stats(self) -> tuple[int, float]:
+        """
+        Read the backlog from Redis.
+
+        Returns:
+            (jobs queued across all queues, seconds the oldest queued job has waited)
+        """
+        with self.redis.pipeline(transaction=False) as pipe:
+            for queue_name in self.queue_names:
+                pipe.llen(f"rq:queue:{queue_name}")
+                pipe.lindex(f"rq:queue:{queue_name}", 0)
+            replies = pipe.execute()
+        depth = sum(replies[0::2])
+        heads = [job_id.decode() for job_id in replies[1::2] if job_id is not None]
+        if not heads:
+            return depth, 0.0
+
+        with self.redis.pipeline(transaction=False) as pipe:
+            for job_id in heads:
+                pipe.hget(f"rq:job:{job_id}", "enqueued_at")
+            enqueued = [utcparse(ts.decode()) for ts in pipe.execute() if ts]
+        wait = (now() - min(enqueued)).total_seconds() if enqueued else 0.0
+        return depth, wait
+
+    def worker_states(self) -> dict[str, str]:
+        """Return each running worker's RQ state ("busy", "idle", ...) as registered in Redis."""
+        names = list(self.procs)
+        with self.redis.pipeline(transaction=False) as pipe:
+            for name in names:
+                pipe.hget(f"rq:worker:{name}", "state")
+            states = pipe.execute()
+        return {name: state.decode() if state else "" for name, state in zip(names, states, strict=True)}
+
+    def autoscale(self, now: float, busy: int) -> None:
+        """Move the desired process count towards the backlog, scaling down only after a sustained surplus."""
+        depth, wait = self.queue_stats()
+        if not depth:
+            wanted = busy
+        elif wait >= WORKER_SCALE_UP_WAIT:
+            wanted = busy + depth
+        else:
+            wanted = self.desired  # The backlog is being served quickly enough
+        target = min(max(wanted, self.min_workers), self.max_workers)
+
+        if target > self.desired:
+            logger.info("Scaling up from %d to %d workers (%d queued, oldest %.0fs)", self.desired, target, depth, wait)
+            self.desired = target
+            supervisor_scale_events.labels(direction="up").inc()
+        if target >= self.desired:
+            self._over_since = None
+        elif self._over_since is None:
+            self._over_since = now
+        elif now - self._over_since >= WORKER_SCALE_DOWN_DELAY:
+            logger.info("Scaling down from %d to %d workers", self.desired, target)
+            self.desired = target
+            self._over_since = None
+            supervisor_scale_events.labels(direction="down").inc()
+
+    def reconcile(self, states: dict[str, str] | None) -> None:
+        """
+        Start or stop workers so the number not already stopping matches the desired count.
+
+        Without worker states (Redis is unreachable) there is no telling which workers are
+        busy, so missing workers are started but none are stopped.
+        """
+        running = [name for name in self.procs if name not in self._stopping]
+        for _ in range(self.desired - len(running)):
+            self.spawn()
+        if states is None:
+            return
+        surplus = len(running) - self.desired
+        for name in running:
+            if surplus <= 0:
+                break
+            if states.get(name) != "busy":
+                self.stop_worker(name, "scaled_down")
+                surplus -= 1
+
+    def tick(self, now: float | None = None) -> None:
+        """Run one supervision pass: reap, recycle, autoscale and reconcile."""
+        now = time.monotonic() if now is None else now
+        self.reap()
+        self.recycle_oversized()
+        states: dict[str, str] | None
+        try:
+            states = self.worker_states()
+            if self.max_workers > self.min_workers:
+                self.autoscale(now, busy=sum(state == "busy" for state in states.values()))
+        except RedisError as e:
+            logger.warning("Could not read worker and queue state from Redis, skipping autoscaling: %s", e)
+            states = None
+        self.reconcile(states)
+        supervisor_workers.set(len(self.procs))
+        supervisor_desired_workers.set(self.desired)
+
+    def start(self) -> None:
+        """Start the initial workers."""
+        for _ in range(self.desired):
+            self.spawn()
+        supervisor_workers.set(len(self.procs))
+        supervisor_desired_workers.set(self.desired)
+
+    def shutdown(self, timeout: float) -> None:
+        """
+        Ask every worker to stop and wait for them to exit.
+
+        Args:
+            timeout: Seconds to wait in total before killing workers that are still running.
+        """
+        for name in list(self.procs):
+            self.stop_worker(name, "shutdown")
+        deadline = time.monotonic() + timeout
+        for proc in self.procs.values():
+            proc.join(max(0.0, deadline - time.monotonic()))
+            if proc.is_alive():
+                proc.kill()
+        self.procs.clear()
+        self._stopping.clear()
@@ -0,0 +1,116 @@
+"""
+textfsm_templates.py
+TextFSM parsing with per-process caches for the ntc-templates index, index lookups and
+compiled templates.
+
+Netmiko rebuilds a CliTable and recompiles the template for every command it parses, and
+treats a custom template as a file path. Here custom templates are compiled from their
+text, keyed by content hash, and every compiled template is kept in a bounded LRU.
+
+Parsing runs in the API's parse pool (see lazy_parse), whose long-lived processes keep
+these caches across jobs.
+"""
+
+import hashlib
+import io
+from collections import OrderedDict
+from collections.abc import Callable
+from functools import cache, lru_cache
+from pathlib import Path
+
+import textfsm
+from netmiko.utilities import get_structured_data_textfsm, get_template_dir
+from textfsm import clitable
+
+from naas.config import TEXTFSM_CACHE_SIZE
+
+# Compiled templates by key ("sha256:<digest>" for custom templates, "ntc:<file>" for ntc-templates)
+_compiled: OrderedDict[str, textfsm.TextFSM] = OrderedDict()
+
+
+@cache
+def template_dir() -> str:
+    """Return the ntc-templates directory (or NET_TEXTFSM), looked up once per process."""
+    return get_template_dir()
+
+
+@cache
+def template_index() -> clitable.IndexTable:
+    """Load the ntc-templates index, once per process."""
+    return clitable.CliTable("index", template_dir()).index
+
+
+@lru_cache(maxsize=1024)
+def resolve_templates(platform: str, command: str) -> tuple[str, ...]:
+    """
+    Find the ntc-templates template file(s) for a platform and command.
+
+    Returns:
+        Template file names, empty if the index has no match.
+    """
+    index = template_index()
+    row = index.GetRowMatch({"Platform": platform, "Command": command})
+    return tuple(index.index[row]["Template"].split(":")) if row else ()
+
+
+def compile_template(key: str, load: Callable[[], str]) -> textfsm.TextFSM:
+    """
+    Return the compiled template for key, compiling load() on a miss.
+
+    The template is Reset() so it is ready to parse.
+    """
+    fsm = _compiled.get(key)
+    if fsm is None:
+        fsm = textfsm.TextFSM(io.StringIO(load()))
+        _compiled[key] = fsm
+        if len(_compiled) > TEXTFSM_CACHE_SIZE:
+            _compiled.popitem(last=False)
+    else:
+        _compiled.move_to_end(key)
+        fsm.Reset()
+    return fsm
+
+
+def _parse(fsm: textfsm.TextFSM, raw_output: str) -> list[dict[str, str]] | str:
+    """Parse raw_output into one dict per record, keyed by lowercased Value name, as Netmiko does."""
+    header = [name.lower() for name in fsm.header]
+    records = [dict(zip(header, row, strict=True)) for row in fsm.ParseText(raw_output)]
+    return records or raw_output
+
+
+def parse_output(
+    raw_output: str, platform: str, command: str, template: str | None = None
+) -> list[dict[str, str]] | str:
+    """
+    Parse command output with a custom TextFSM template, or the ntc-templates one for the platform and command.
+
+    Args:
+        raw_output: Command output from the device.
+        platform: Netmiko device type.
+        command: The command that was sent.
+        template: Custom TextFSM template text.
+
+    Returns:
+        A list of records, or raw_output unchanged if no template matched or nothing was parsed.
+    """
+    command = command.strip()
+    if template is not None:
+        key = "sha256:" + hashlib.sha256(template.encode()).hexdigest()
+        try:
+            return _parse(compile_template(key, lambda: template), raw_output)
+        except textfsm.TextFSMTemplateError:
+            return raw_output
+
+    templates = resolve_templates(platform, command)
+    if len(templates) > 1:
+        # Multi-template index rows merge tables on their Key values; let Netmiko handle those
+        return get_structured_data_textfsm(raw_output, platform=platform, command=command)
+    output: list[dict[str, str]] | str = raw_output
+    if templates:
+        template_file = Path(template_dir()) / templates[0]
+        output = _parse(compile_template(f"ntc:{templates[0]}", template_file.read_text), raw_output)
+
+    # Netmiko retries IOS-XE output with the IOS templates
+    if isinstance(output, str) and "cisco_xe" in platform:
+        return parse_output(raw_output, "cisco_ios", command)
+    return output
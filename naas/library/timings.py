@@ -0,0 +1,213 @@
+"""
+timings.py
+Per-phase timing of device jobs.
+
+A job's time on the worker is split into the phases of its device session: TCP connect,
+SSH key exchange, authentication, session preparation (opening the shell, prompt
+detection, disabling paging), each command, and disconnecting or returning the
+connection to the pool. The timings are stored in the job's meta, where GetResults
+returns them, and observed in the naas_job_phase_seconds histogram by platform and by
+whether the connection came from the pool. With tracing on, the job and each of its
+phases and commands are also spans.
+
+Jobs run in a work horse forked for each one, and in multiprocess mode every process
+observing a metric writes its own files, so the horse only stores its phase samples in
+the job's meta and the worker observes them once the horse has exited (observe_phases).
+"""
+
+import logging
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import Any
+
+import netmiko
+import paramiko
+from netmiko.base_connection import BaseConnection
+from netmiko.base_connection import log as netmiko_log
+from rq import get_current_job
+from rq.job import Job
+
+from naas.library import tracing
+from naas.library.metrics import job_phase_seconds
+
+logger = logging.getLogger(name="NAAS")
+
+# Timings are stored to the 0.1ms
+_PRECISION = 4
+
+# timed_connect hooks these private BaseConnection methods, which ConnectHandler connects through in Netmiko 4
+_HOOKABLE = all(hasattr(BaseConnection, method) for method in ("_connect_params_dict", "_open"))
+
+# Job meta key for the phase samples the worker observes after the work horse exits
+_PHASES_META_KEY = "phase_samples"
+
+
+def _observe(platform: str, pool: str, samples: list[tuple[str, float]]) -> None:
+    for phase, seconds in samples:
+        job_phase_seconds.labels(phase=phase, platform=platform, pool=pool).observe(seconds)
+
+
+def observe_phases(job: Job) -> None:
+    """Observe the phase histograms for a job whose work horse has exited, from the samples in its meta."""
+    try:
+        phases = job.get_meta().get(_PHASES_META_KEY)
+    except Exception as e:  # As for saving them, losing the timings must not fail the worker
+        logger.warning("%s: Could not read job timings: %s", job.id, e)
+        return
+    if phases:
+        _observe(phases["platform"], phases["pool"], phases["samples"])
+
+
+class JobTimings:
+    """
+    Lap timer for the phases of one job.
+
+    begin() ends the running phase and starts the next, so phases can be marked from
+    callbacks deep in paramiko without nesting. Time spent in a phase that is begun
+    more than once is summed.
+    """
+
+    def __init__(self, platform: str, name: str = "job", attributes: dict[str, Any] | None = None) -> None:
+        """
+        Start timing a job.
+
+        Args:
+            platform: Device type, for the histogram's platform label.
+            name: Name of the job's span.
+            attributes: Attributes for the job's span, e.g. the device IP.
+        """
+        self.platform = platform
+        self.pool = "miss"
+        self.phases: dict[str, float] = {}
+        self.commands: dict[str, float] = {}
+        self._phase: str | None = None
+        self._error: BaseException | None = None
+        self._span = tracing.start_span(name, attributes={"naas.platform": platform, **(attributes or {})})
+        self._phase_span: tracing.Span | None = None
+        self._start = self._lap = time.perf_counter()
+
+    def begin(self, phase: str) -> None:
+        """End the running phase, if any, and start timing phase."""
+        self.end()
+        self._phase = phase
+        self._phase_span = tracing.start_span(phase, parent=self._span)
+
+    def end(self) -> None:
+        """End the running phase, if any."""
+        lap = time.perf_counter()
+        if self._phase is not None:
+            self.phases[self._phase] = self.phases.get(self._phase, 0.0) + lap - self._lap
+        tracing.end_span(self._phase_span)
+        self._phase = self._phase_span = None
+        self._lap = lap
+
+    def fail(self, error: BaseException) -> None:
+        """Record the error the job failed with on the running phase's span, and on the job's span."""
+        self._error = error
+        tracing.set_error(self._phase_span, error)
+
+    @contextmanager
+    def command(self, command: str) -> Iterator[None]:
+        """Time one command, separately from the other phases."""
+        self.end()
+        span = tracing.start_span("command", parent=self._span, attributes={"naas.command": command})
+        try:
+            yield
+        except BaseException as e:
+            tracing.set_error(span, e)
+            raise
+        finally:
+            lap = time.perf_counter()
+            self.commands[command] = self.commands.get(command, 0.0) + lap - self._lap
+            self._lap = lap
+            tracing.end_span(span)
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the timings so far, in seconds, as stored in job meta."""
+        timings: dict[str, Any] = {phase: round(seconds, _PRECISION) for phase, seconds in self.phases.items()}
+        if self.commands:
+            timings["commands"] = {command: round(seconds, _PRECISION) for command, seconds in self.commands.items()}
+        timings["total"] = round(time.perf_counter() - self._start, _PRECISION)
+        return timings
+
+    def record(self) -> None:
+        """
+        Stop timing and store the timings and phase samples in the running job's meta.
+
+        Outside a job there is no worker to observe the phase histograms, so they are observed here.
+        """
+        self.end()
+        samples = list(self.phases.items()) + [("command", seconds) for seconds in self.commands.values()]
+        if self._error is not None:
+            tracing.set_error(self._span, self._error)
+        tracing.end_span(self._span, {"naas.platform": self.platform, "naas.pool": self.pool})
+
+        job = get_current_job()
+        if job is None:
+            _observe(self.platform, self.pool, samples)
+            return
+        timings = self.as_dict()
+        if job.enqueued_at is not None and job.started_at is not None:
+            timings["queue_wait"] = round((job.started_at - job.enqueued_at).total_seconds(), _PRECISION)
+        job.meta["timings"] = timings
+        job.meta[_PHASES_META_KEY] = {"platform": self.platform, "pool": self.pool, "samples": samples}
+        try:
+            job.save_meta()
+        except Exception as e:  # Losing the timings must not fail the job
+            logger.warning("%s: Could not save job timings: %s", job.id, e)
+
+
+class _PhaseTransport(paramiko.Transport):
+    """Transport that marks the end of key exchange and of authentication on a JobTimings."""
+
+    timings: JobTimings | None = None
+
+    def start_client(self, *args: Any, **kwargs: Any) -> None:
+        super().start_client(*args, **kwargs)
+        if self.timings is not None:
+            self.timings.begin("auth")
+
+    def open_channel(self, *args: Any, **kwargs: Any) -> paramiko.Channel:
+        if self.timings is not None:
+            self.timings.begin("session_prep")
+            self.timings = None  # Pooled connections outlive the job
+        return super().open_channel(*args, **kwargs)
+
+
+def timed_connect(timings: JobTimings, netmiko_device: dict[str, Any]) -> netmiko.BaseConnection:
+    """
+    Open a Netmiko connection, timing its tcp_connect, key_exchange, auth and session_prep phases.
+
+    Netmiko connects through paramiko's SSHClient.connect, which builds its Transport right
+    after the TCP connection is up; passing a transport_factory marks the phases from there.
+    Telnet connections, and connections with Netmiko versions lacking the private methods
+    hooked to pass it, are timed as tcp_connect alone.
+    """
+
+    def transport_factory(sock: Any, **kwargs: Any) -> paramiko.Transport:
+        timings.begin("key_exchange")
+        transport = _PhaseTransport(sock, **kwargs)
+        transport.timings = timings
+        return transport
+
+    timings.begin("tcp_connect")
+    try:
+        if not _HOOKABLE:  # Other Netmiko versions connect as usual, timed as tcp_connect alone
+            return netmiko.ConnectHandler(**netmiko_device)
+        net_connect = netmiko.ConnectHandler(**netmiko_device, auto_connect=False)
+        connect_params = net_connect._connect_params_dict
+        net_connect._connect_params_dict = lambda: {**connect_params(), "transport_factory": transport_factory}  # type: ignore[method-assign]
+        try:
+            net_connect._open()
+        except Exception:
+            # As ConnectHandler does when auto-connecting: don't leave its secrets filter on Netmiko's logger
+            if hasattr(net_connect, "_secrets_filter"):
+                netmiko_log.removeFilter(net_connect._secrets_filter)
+            raise
+        return net_connect
+    except Exception as e:
+        timings.fail(e)
+        raise
+    finally:
+        timings.end()
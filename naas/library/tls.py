@@ -0,0 +1,35 @@
+"""
+tls.py
+The API server's SSL context, built once and shared by every connection and worker.
+
+Gunicorn's default builds a new SSLContext for every connection, reloading the certificate
+chain each time, and a TLS session can only be resumed with the context that issued its
+ticket. Building the context once in the gunicorn master, before the workers are forked,
+gives every worker the same context and so the same session ticket keys: a client that
+reconnects resumes its session whichever worker accepts it, skipping the key exchange and
+certificate signature of a full handshake.
+"""
+
+import ssl
+from collections.abc import Callable
+
+_context: ssl.SSLContext | None = None
+
+
+def server_context(factory: Callable[[], ssl.SSLContext]) -> ssl.SSLContext:
+    """
+    Return this process's server SSL context, building it with factory on first use.
+
+    Args:
+        factory: Builds the context from the server's certificate, key and ciphers.
+
+    Returns:
+        The shared context, requiring TLS 1.2 or later and issuing session tickets.
+    """
+    global _context
+    if _context is None:
+        context = factory()
+        context.minimum_version = ssl.TLSVersion.TLSv1_2
+        context.options &= ~ssl.OP_NO_TICKET
+        _context = context
+    return _context
@@ -0,0 +1,161 @@
+"""
+tracing.py
+Optional OpenTelemetry tracing, from the API request through the queue to device commands.
+
+With TRACING_ENABLED and the opentelemetry-sdk package installed (the "tracing" extra),
+the API creates a server span per request, continuing any W3C traceparent header sent by
+the client, with child spans for validation and enqueueing. The context of the span that
+enqueued a job is stored in the job's meta, and the worker continues the trace from there:
+each job gets a span with a child span per phase of its device session (see timings).
+
+When tracing is disabled every function here is a cheap no-op.
+"""
+
+import logging
+import os
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import Any
+
+from flask import request
+from rq import get_current_job
+
+from naas.config import TRACING_ENABLED, TRACING_EXPORTER, TRACING_FILE
+
+try:
+    from opentelemetry import propagate, trace
+    from opentelemetry.sdk.resources import SERVICE_NAME, Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter, SpanExporter
+    from opentelemetry.trace import Span, SpanKind, Status, StatusCode
+except ImportError:  # pragma: no cover  # optional dependency; installed with the dev extra
+    trace = None  # type: ignore[assignment]
+
+logger = logging.getLogger(name="NAAS")
+
+# Job meta key holding the trace context of the span that enqueued the job
+TRACE_META_KEY = "trace"
+
+_provider: "TracerProvider | None" = None
+_tracer: "trace.Tracer | None" = None
+
+
+def init_tracing(service_name: str) -> bool:
+    """
+    Start exporting spans from this process, if tracing is enabled.
+
+    Args:
+        service_name: service.name for this process's spans, unless OTEL_SERVICE_NAME is set.
+
+    Returns:
+        True if tracing is on, False if disabled or OpenTelemetry is not installed.
+    """
+    global _provider, _tracer
+    if not TRACING_ENABLED:
+        return False
+    if trace is None:  # pragma: no cover  # optional dependency; installed with the dev extra
+        logger.warning("TRACING_ENABLED is set but opentelemetry-sdk is not installed, tracing is disabled")
+        return False
+
+    _provider = TracerProvider(
+        resource=Resource.create({SERVICE_NAME: os.environ.get("OTEL_SERVICE_NAME", service_name)})
+    )
+    _provider.add_span_processor(BatchSpanProcessor(_exporter()))
+    _tracer = _provider.get_tracer("naas")
+    logger.info("Exporting traces for %s (%s)", service_name, TRACING_EXPORTER)
+    return True
+
+
+def _exporter() -> "SpanExporter":
+    """Return the span exporter selected by TRACING_EXPORTER."""
+    if TRACING_EXPORTER == "file":
+        return ConsoleSpanExporter(
+            out=open(TRACING_FILE, "a", buffering=1),  # noqa: SIM115  # Open for the life of the process
+            formatter=lambda span: span.to_json(indent=None) + "\n",
+        )
+    from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+
+    return OTLPSpanExporter()
+
+
+def flush() -> None:
+    """Export finished spans now, e.g. before a work horse exits without running atexit handlers."""
+    if _provider is not None:
+        _provider.force_flush()
+
+
+@contextmanager
+def request_span() -> Iterator["Span | None"]:
+    """
+    Run a Flask request in a server span, continuing the client's trace if it sent one.
+
+    Usable as a decorator on resource methods.
+    """
+    if _tracer is None:
+        yield None
+        return
+    route = str(request.url_rule or request.path)
+    with _tracer.start_as_current_span(
+        f"{request.method} {route}",
+        context=propagate.extract(request.headers),
+        kind=SpanKind.SERVER,
+        attributes={"http.request.method": request.method, "http.route": route, "url.path": request.path},
+    ) as span:
+        yield span
+
+
+@contextmanager
+def span(name: str, attributes: dict[str, Any] | None = None) -> Iterator["Span | None"]:
+    """Run a block in a child span of the current span."""
+    if _tracer is None:
+        yield None
+        return
+    with _tracer.start_as_current_span(name, attributes=attributes) as current:
+        yield current
+
+
+def inject(meta: dict) -> None:
+    """Store the current trace context in a job's meta, for the worker to continue the trace."""
+    if _tracer is None:
+        return
+    carrier: dict[str, str] = {}
+    propagate.inject(carrier)
+    if carrier:
+        meta[TRACE_META_KEY] = carrier
+
+
+def start_span(name: str, parent: "Span | None" = None, attributes: dict[str, Any] | None = None) -> "Span | None":
+    """
+    Start a span that is ended explicitly with end_span().
+
+    Args:
+        name: Span name.
+        parent: Parent span. Without one, the span continues the trace stored in the running
+            job's meta, or starts a new trace.
+        attributes: Span attributes.
+
+    Returns:
+        The span, or None if tracing is off.
+    """
+    if _tracer is None:
+        return None
+    if parent is not None:
+        return _tracer.start_span(name, context=trace.set_span_in_context(parent), attributes=attributes)
+    job = get_current_job()
+    context = propagate.extract(job.meta.get(TRACE_META_KEY, {})) if job is not None else None
+    return _tracer.start_span(name, context=context, attributes=attributes)
+
+
+def set_error(span: "Span | None", error: BaseException) -> None:
+    """Record an exception on a span and mark it failed."""
+    if span is not None:
+        span.record_exception(error)
+        span.set_status(Status(StatusCode.ERROR, str(error)))
+
+
+def end_span(span: "Span | None", attributes: dict[str, Any] | None = None) -> None:
+    """End a span from start_span(), setting any final attributes."""
+    if span is not None:
+        if attributes:
+            span.set_attributes(attributes)
+        span.end()
@@ -2,13 +2,17 @@
 # -*- coding: UTF-8 -*-
 
 
+import re
 from uuid import UUID
 
-from flask import current_app, request
+from flask import current_app, g, request
 from werkzeug.exceptions import BadRequest
 
+from naas.config import RATE_LIMIT_ENABLED
 from naas.library.auth import tacacs_auth_lockout
-from naas.library.errorhandlers import DuplicateRequestID, LockedOut, NoAuth, NoJSON
+from naas.library.errorhandlers import DuplicateRequestID, LockedOut, NoAuth, NoJSON, RateLimited
+from naas.library.lanes import job_queue
+from naas.library.rate_limit import check_rate_limit
 
 
 class Validate:
@@ -48,6 +52,22 @@ class Validate:
                 current_app.logger.error(f"{request.authorization.username} is currently locked out.")
                 raise LockedOut
 
+    @staticmethod
+    def rate_limited() -> None:
+        """Take a token from this user's bucket for the endpoint, or raise RateLimited if it is empty."""
+        if not RATE_LIMIT_ENABLED or not request.authorization or not request.authorization.username:
+            return
+        # Name the endpoint after its resource class (SendCommand -> send_command), so legacy
+        # and versioned routes to the same resource share a bucket
+        view_class = current_app.view_functions[request.endpoint].view_class  # type: ignore[union-attr,index]  # flask-restful views always have view_class
+        endpoint = re.sub(r"(?<!^)(?=[A-Z])", "_", view_class.__name__).lower()
+
+        username = request.authorization.username
+        g.rate_limit = check_rate_limit(current_app.config["redis"], username, endpoint)
+        if not g.rate_limit.allowed:
+            current_app.logger.warning("%s exceeded the %s rate limit", username, endpoint)
+            raise RateLimited(retry_after=g.rate_limit.retry_after)
+
     @staticmethod
     def is_uuid(uuid: str) -> None:
         """Validate that a provided string is a version 4 UUID."""
@@ -60,5 +80,5 @@ class Validate:
     @staticmethod
     def is_duplicate_job(job_id: str) -> None:
         """Validate there isn't already a job by this ID."""
-        if current_app.config["q"].fetch_job(job_id=job_id) is not None:
+        if job_queue(job_id).fetch_job(job_id=job_id) is not None:
             raise DuplicateRequestID
@@ -0,0 +1,83 @@
+"""
+worker_status.py
+Compact worker status summary in one Redis hash, for O(1) health checks.
+
+Each worker process writes one field of WORKER_STATUS_KEY on every RQ heartbeat: its
+host, whether it is busy, when its current job started and how many connections its
+pool holds. The API reads the whole fleet with one HGETALL (see fleet) instead of
+loading every RQ worker and its current job.
+
+A field is valid until its expiry, the same TTL RQ gives the worker's own key, so
+entries left by workers that died without unregistering are ignored and pruned.
+"""
+
+import json
+import time
+from typing import Any
+
+from redis import Redis
+from redis.client import Pipeline
+
+# Redis hash of worker name -> JSON status
+WORKER_STATUS_KEY = "naas_worker_status"
+
+
+def publish_status(
+    connection: Redis | Pipeline,
+    name: str,
+    hostname: str,
+    job_started: float | None,
+    pool_size: int,
+    ttl: int,
+) -> None:
+    """
+    Write a worker's status to the summary hash.
+
+    Args:
+        connection: Redis connection, or a pipeline to add the write to.
+        name: RQ worker name.
+        hostname: Host the worker runs on.
+        job_started: Epoch time the current job started, or None if idle.
+        pool_size: Connections held by the worker's connection pool.
+        ttl: Seconds the status is valid for without another heartbeat.
+    """
+    status = {
+        "host": hostname,
+        "state": "busy" if job_started is not None else "idle",
+        "job_started": job_started,
+        "pool": pool_size,
+        "expires": round(time.time() + ttl, 3),
+    }
+    connection.hset(WORKER_STATUS_KEY, name, json.dumps(status, separators=(",", ":")))
+
+
+def remove_status(connection: Redis, name: str) -> None:
+    """Remove a worker's status, e.g. when it shuts down."""
+    connection.hdel(WORKER_STATUS_KEY, name)
+
+
+def live_statuses(redis: Redis, raw: dict[bytes, bytes]) -> dict[str, dict[str, Any]]:
+    """
+    Parse the summary hash, as read with HGETALL, into the statuses of live workers.
+
+    Expired entries are left out, and deleted from the hash.
+
+    Args:
+        redis: Redis connection.
+        raw: Contents of WORKER_STATUS_KEY.
+
+    Returns:
+        Worker name -> status dict.
+    """
+    now = time.time()
+    workers: dict[str, dict[str, Any]] = {}
+    expired = []
+    for name, value in raw.items():
+        status = json.loads(value)
+        if status["expires"] < now:
+            expired.append(name)
+        else:
+            workers[name.decode()] = status
+    if expired:
+        redis.hdel(WORKER_STATUS_KEY, *expired)
+    return workers
@@ -1,13 +1,19 @@
 """Pydantic models for request/response validation."""
 
 import logging
+from pathlib import Path
 from typing import Any, Literal
 
-from netmiko import platforms as netmiko_platforms
 from pydantic import BaseModel, Field, IPvAnyAddress, field_validator, model_validator
 
 logger = logging.getLogger(__name__)
 
+# Netmiko device types, snapshotted from netmiko.platforms when the image is built
+# (invoke export-platforms), so the API validates platforms without importing netmiko
+NETMIKO_PLATFORMS = frozenset((Path(__file__).parent / "data" / "netmiko_platforms.txt").read_text().split())
+
+Priority = Literal["high", "normal", "low"]
+
 
 def _handle_device_type(data: dict[str, Any]) -> dict[str, Any]:
     """
@@ -42,6 +48,7 @@ class _BaseCommandRequest(BaseModel):
     port: int = Field(default=22, ge=1, le=65535, description="SSH port")
     platform: str = Field(default="cisco_ios", description="Netmiko device type (use 'autodetect' for SSHDetect)")
     read_timeout: float = Field(default=30.0, ge=1.0, description="Read timeout in seconds for device responses")
+    priority: Priority = Field(default="normal", description="Queue priority lane (high, normal, or low)")
 
     @model_validator(mode="before")
     @classmethod
@@ -61,7 +68,7 @@ class _BaseCommandRequest(BaseModel):
     @classmethod
     def platform_is_valid(cls, v: str) -> str:
         """Ensure platform is a valid Netmiko device type."""
-        if v not in netmiko_platforms:
+        if v not in NETMIKO_PLATFORMS:
             raise ValueError(f"Invalid platform '{v}'. Must be a valid Netmiko device type.")
         return v
 
@@ -112,6 +119,7 @@ class SendConfigRequest(BaseModel):
     read_timeout: float = Field(default=30.0, ge=1.0, description="Read timeout in seconds for device responses")
     save_config: bool = Field(default=False, description="Save configuration after applying")
     commit: bool = Field(default=False, description="Commit configuration (Juniper)")
+    priority: Priority = Field(default="normal", description="Queue priority lane (high, normal, or low)")
 
     @model_validator(mode="before")
     @classmethod
@@ -131,7 +139,7 @@ class SendConfigRequest(BaseModel):
     @classmethod
     def platform_is_valid(cls, v: str) -> str:
         """Ensure platform is a valid Netmiko device type."""
-        if v not in netmiko_platforms:
+        if v not in NETMIKO_PLATFORMS:
             raise ValueError(f"Invalid platform '{v}'. Must be a valid Netmiko device type.")
         return v
 
@@ -150,6 +158,7 @@ class JobResponse(BaseModel):
 
     job_id: str = Field(..., description="Unique job identifier")
     message: str = Field(..., description="Status message")
+    priority: Priority = Field(default="normal", description="Priority lane the job was enqueued on")
 
 
 class JobResultResponse(BaseModel):
@@ -160,6 +169,49 @@ class JobResultResponse(BaseModel):
     results: Any | None = None
     error: str | None = None
     detected_platform: str | None = None
+    results_format: Literal["parsed", "raw"] | None = Field(
+        default=None,
+        description="Whether finished jobs' results are parsed or raw command output. Structured jobs are returned raw "
+        "when raw output was asked for, or when parsing didn't finish in time; later reads return the parsed form",
+    )
+    timings: dict[str, Any] | None = Field(
+        default=None,
+        description="Seconds the job spent in each phase (queue_wait, tcp_connect, key_exchange, auth, "
+        "session_prep, per-command times under commands, disconnect, parse, total), once it has run",
+    )
+
+
+class GetResultsQuery(BaseModel):
+    """Query parameters for the job results endpoints.
+
+    NOTE: No strict=True here — query params arrive as strings (see ListJobsQuery).
+    """
+
+    raw: bool = Field(
+        default=False, description="Return structured jobs' raw command output instead of the parsed output"
+    )
+    command: list[str] | None = Field(
+        default=None, description="Only return the output of this command (repeatable); unknown commands are left out"
+    )
+    bytes: str | None = Field(
+        default=None,
+        pattern=r"^(\d{1,18}-\d{0,18}|-[1-9]\d{0,17})$",  # Up to 18 digits, inside Redis's 64-bit offsets
+        description="Return this byte range of each output: 'a-b' (0-based, inclusive), 'a-' or '-n' (the last n). "
+        "Implies raw",
+    )
+    lines: str | None = Field(
+        default=None,
+        pattern=r"^([1-9]\d{0,17}-\d{0,18}|-[1-9]\d{0,17})$",
+        description="Return this line range of each output: 'a-b' (1-based, inclusive), 'a-' or '-n' (the last n). "
+        "Implies raw",
+    )
+
+    @model_validator(mode="after")
+    def one_range(self) -> "GetResultsQuery":
+        """A byte range and a line range can't be combined."""
+        if self.bytes is not None and self.lines is not None:
+            raise ValueError("Only one of 'bytes' or 'lines' may be given")
+        return self
 
 
 class ListJobsQuery(BaseModel):
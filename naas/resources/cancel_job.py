@@ -1,12 +1,13 @@
 """API resource for job cancellation."""
 
-from flask import current_app, request
+from flask import request
 from flask_restful import Resource
 from werkzeug.exceptions import Conflict, Forbidden
 
 from naas import __base_response__
 from naas.library.audit import emit_audit_event
 from naas.library.auth import Credentials, job_unlocker
+from naas.library.lanes import job_queue
 from naas.library.validation import Validate
 
 
@@ -31,6 +32,7 @@ class CancelJob(Resource):
         v = Validate()
         v.is_uuid(uuid=job_id)
         v.has_auth()
+        v.rate_limited()
 
         auth = request.authorization
         if (
@@ -42,7 +44,7 @@ class CancelJob(Resource):
         if not job_unlocker(salted_creds=creds.salted_hash(), job_id=job_id):
             raise Forbidden
 
-        q = current_app.config["q"]
+        q = job_queue(job_id)
         job = q.fetch_job(job_id)
 
         if job is None:
@@ -1,20 +1,40 @@
 # API Resources
 
-from flask import current_app, request
+import json
+
+from flask import Response, current_app, request
 from flask_restful import Resource
 from werkzeug.exceptions import Forbidden
 
 from naas import __base_response__
+from naas.config import JOB_TTL_SUCCESS
+from naas.library import tracing
 from naas.library.auth import Credentials, job_unlocker
+from naas.library.compression import cached_response, json_response, not_modified, result_etag
+from naas.library.json_response import RawJSON, dumps
+from naas.library.lanes import job_queue, job_redis
+from naas.library.lazy_parse import STRUCTURED_FUNC, is_parsed, structured_results
+from naas.library.result_store import BLOB_KEY, OUTPUTS_KEY, iter_blob, open_blob, range_slice, read_outputs
 from naas.library.validation import Validate
-from naas.models import JobResultResponse
+from naas.models import GetResultsQuery, JobResultResponse
+from naas.spec import spec
 
 
 class GetResults(Resource):
     @staticmethod
+    @tracing.request_span()
+    @spec.validate(query=GetResultsQuery)
     def get(job_id: str):
         """
         Given the requested job_id, return status and/or any results if finished.
+        Query parameters:
+        - raw: Return a structured job's raw command output instead of the parsed output (default: false)
+        - command: Only return the output of this command; repeat it to select several
+        - bytes: Return a byte range of each output: a-b (0-based, inclusive), a- or -n for the last n bytes
+        - lines: Return a line range of each output: a-b (1-based, inclusive), a- or -n for the last n lines
+        Only the selected commands and ranges are read from storage. A range implies raw.
+        Finished jobs' results carry a strong ETag; a request sending it in If-None-Match gets 304 Not Modified.
+        Responses are compressed (zstd, br or gzip) for clients sending Accept-Encoding.
         :param job_id:
         :return: A dict of job status and/or results if finished.
         """
@@ -23,6 +43,7 @@ class GetResults(Resource):
         v = Validate()
         v.is_uuid(uuid=job_id)
         v.has_auth()
+        v.rate_limited()
 
         # Ensure this user can access the job...
         auth = request.authorization
@@ -39,7 +60,7 @@ class GetResults(Resource):
             raise Forbidden
 
         # Fetch your job, and return the job status and results (if it's finished)
-        q = current_app.config["q"]
+        q = job_queue(job_id)
         job = q.fetch_job(job_id)
 
         if job is None:
@@ -48,9 +69,27 @@ class GetResults(Resource):
             return r, 404
 
         job_status = job.get_status()
-        r = JobResultResponse(job_id=job_id, status=job_status).model_dump()
+        r = JobResultResponse(job_id=job_id, status=job_status, timings=job.meta.get("timings")).model_dump()
 
         if job_status == "finished":
+            redis = job_redis(job_id)
+            # Structured jobs store raw output; parse it on first read unless raw output was asked for
+            query: GetResultsQuery = request.context.query  # type: ignore[attr-defined]  # set by spectree
+            ranged = query.bytes is not None or query.lines is not None
+            selected = ranged or query.command is not None
+            structured = job.func_name == STRUCTURED_FUNC and not query.raw and not ranged
+            selection = request.query_string.decode()
+
+            # Answer conditional and repeat requests before loading the results, when the form they're
+            # returned in is already known: anything but a structured job that hasn't been parsed yet
+            if not structured or is_parsed(redis, job):
+                etag = result_etag(job, f"{'parsed' if structured else 'raw'}?{selection}")
+                response = not_modified(etag)
+                if response is None and not selected:
+                    response = cached_response(redis, etag)
+                if response is not None:
+                    return response
+
             results = job.result
             result_dict = results[0]
             r["results"] = result_dict
@@ -58,8 +97,80 @@ class GetResults(Resource):
             # Extract detected_platform if present
             if result_dict and "_detected_platform" in result_dict:
                 r["detected_platform"] = result_dict.pop("_detected_platform")
+            parsed = None
+            if result_dict and structured:
+                platform = r["detected_platform"] or job.kwargs.get("device_type", "")
+                parsed = structured_results(redis, job, result_dict, platform)
+                if parsed is not None:
+                    result_dict = r["results"] = parsed
+                    r["timings"] = job.meta.get("timings")  # Now with the parse time, if this request parsed it
+            r["results_format"] = "parsed" if parsed is not None else "raw"
+
+            # Read only the selected commands and ranges from storage
+            if isinstance(result_dict, RawJSON) and query.command is not None:
+                result_dict = json.loads(result_dict.data)
+            if isinstance(result_dict, dict) and (selected or OUTPUTS_KEY in result_dict):
+                result_dict = r["results"] = read_outputs(
+                    redis,
+                    job.id,
+                    result_dict,
+                    query.command,
+                    range_slice(query.bytes, 0) if query.bytes else None,
+                    range_slice(query.lines, 1) if query.lines else None,
+                )
+                if result_dict is None:
+                    return _gone(r)
+
+            etag = result_etag(job, f"{'parsed' if parsed is not None else 'raw'}?{selection}")
+            response = not_modified(etag)
+            if response is not None:
+                return response
+            # Only the full results are cached: every selection cached would be another copy, kept as long as the job
+            cache = None
+            if not selected:
+                ttl = redis.ttl(job.key)
+                cache = (redis, ttl if ttl > 0 else JOB_TTL_SUCCESS)
+            if isinstance(result_dict, dict) and BLOB_KEY in result_dict:
+                return _stream_blob_result(r, result_dict[BLOB_KEY]["digest"], etag, cache)
+            r.update(__base_response__)
+            return json_response([dumps(r)], etag=etag, cache=cache)
         elif job_status == "failed":
             r["error"] = str(job.exc_info).strip() if job.exc_info else "Job failed"
 
         r.update(__base_response__)
         return r
+
+
+def _stream_blob_result(r: dict, digest: str, etag: str, cache: tuple | None) -> "Response | tuple[dict, int]":
+    """
+    Stream a response whose results live in the blob store.
+
+    The blob is already JSON-encoded, so it is spliced into the response body as-is
+    rather than being decoded and re-encoded.
+    :param r: The response dict, without results
+    :param digest: Blob digest from the job's result pointer
+    :param etag: The response's entity tag
+    :param cache: (Redis connection, TTL) to cache a compressed response in, or None
+    :return: A streaming Response, or a 410 payload if the blob is no longer available
+    """
+    f = open_blob(digest)
+    if f is None:
+        current_app.logger.error("%s: Result blob %s is missing", r["job_id"], digest)
+        return _gone(r)
+    r.pop("results")
+    r.update(__base_response__)
+
+    def generate():
+        yield b'{"results":'
+        yield from iter_blob(f)
+        yield b"," + dumps(r)[1:]
+
+    return json_response(generate(), etag=etag, cache=cache)
+
+
+def _gone(r: dict) -> tuple[dict, int]:
+    """Return the 410 payload for a finished job whose results are no longer stored."""
+    r.pop("results")
+    r.update(__base_response__)
+    r["error"] = "Job results are no longer available"
+    return r, 410
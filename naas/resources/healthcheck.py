@@ -7,7 +7,9 @@ from flask_restful import Resource
 from redis.exceptions import RedisError
 
 from naas import __version__
-from naas.library.worker_cache import get_cached_workers
+from naas.config import QUEUE_LANES
+from naas.library.fleet import fleet_snapshot
+from naas.library.lanes import shard_lanes
 
 _START_TIME = time.time()
 
@@ -24,7 +26,7 @@ class HealthCheck(Resource):
                     "uptime_seconds": int,  # Seconds since API start
                     "components": {
                         "redis": {"status": str},  # "healthy" or "unhealthy"
-                        "queue": {"status": str, "depth": int},  # Queue status and job count
+                        "queue": {"status": str, "depth": int},  # "healthy" or "unhealthy", and job count across all lanes
                         "workers": {
                             "status": str,  # "healthy" or "no_workers"
                             "count": int,  # Number of worker pods/hosts
@@ -34,19 +36,20 @@ class HealthCheck(Resource):
                 }
         """
         redis = current_app.config["redis"]
-        q = current_app.config["q"]
 
-        # Check Redis connectivity
+        # Read the fleet snapshot shared by all API processes (see fleet), which also checks Redis connectivity
         try:
-            redis.ping()
+            snapshot = fleet_snapshot(redis, QUEUE_LANES.values(), [shard for shard, _ in shard_lanes()])
             redis_status = "healthy"
         except RedisError:
+            snapshot = {"lanes": {}, "workers": {}}
             redis_status = "unhealthy"
+        workers = snapshot["workers"]
+        depth = sum(lane["queued"] for lane in snapshot["lanes"].values())
 
         # Check workers — count unique hostnames (pods/hosts), not individual processes
-        workers = get_cached_workers(redis) if redis_status == "healthy" else []
-        worker_count = len({w.hostname for w in workers})
-        active_jobs = sum(1 for w in workers if w.get_current_job() is not None)
+        worker_count = len({w["host"] for w in workers.values()})
+        active_jobs = sum(1 for w in workers.values() if w["state"] == "busy")
         worker_status = "healthy" if worker_count > 0 else "no_workers"
 
         if redis_status != "healthy":
@@ -62,7 +65,19 @@ class HealthCheck(Resource):
             "uptime_seconds": int(time.time() - _START_TIME),
             "components": {
                 "redis": {"status": redis_status},
-                "queue": {"status": "healthy", "depth": len(q)},
+                "queue": {"status": redis_status, "depth": depth},
                 "workers": {"status": worker_status, "count": worker_count, "active_jobs": active_jobs},
             },
         }
+
+
+class Liveness(Resource):
+    @staticmethod
+    def get():
+        """
+        Report that the API process is up and serving requests.
+
+        Touches nothing outside the process, so a Redis outage doesn't get API pods restarted;
+        use /healthcheck for readiness.
+        """
+        return {"status": "alive", "version": __version__}
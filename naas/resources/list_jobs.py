@@ -1,11 +1,15 @@
 # API Resources
 
-from flask import current_app, request
+from flask import request
 from flask_restful import Resource
 from rq.job import Job
 from rq.registry import FailedJobRegistry, FinishedJobRegistry, StartedJobRegistry
 
 from naas import __base_response__
+from naas.library.compression import json_response
+from naas.library.json_response import dumps
+from naas.library.lanes import shard_lanes
+from naas.library.serializers import job_serializer
 from naas.library.validation import Validate
 from naas.models import ListJobsQuery
 from naas.spec import spec
@@ -21,79 +25,67 @@ class ListJobs(Resource):
         - page: Page number (default: 1)
         - per_page: Results per page (default: 20, max: 100)
         - status: Filter by status (finished, failed, started, queued)
+        Responses are compressed (zstd, br or gzip) for clients sending Accept-Encoding.
         :return: Dict with jobs list and pagination info
         """
         # Validate auth
         v = Validate()
         v.has_auth()
+        v.rate_limited()
 
         query: ListJobsQuery = request.context.query
 
-        # Get queue and registries
-        q = current_app.config["q"]
-        redis_conn = current_app.config["redis"]
-
-        # Collect job IDs based on status filter
-        job_ids = []
-        total_count = 0
-
-        if query.status == "finished":
-            registry = FinishedJobRegistry(queue=q)
-            total_count = registry.count
-            start = (query.page - 1) * query.per_page
-            end = start + query.per_page - 1
-            job_ids = registry.get_job_ids(start=start, end=end)
-        elif query.status == "failed":
-            registry = FailedJobRegistry(queue=q)
-            total_count = registry.count
-            start = (query.page - 1) * query.per_page
-            end = start + query.per_page - 1
-            job_ids = registry.get_job_ids(start=start, end=end)
-        elif query.status == "started":
-            registry = StartedJobRegistry(queue=q)
-            total_count = registry.count
-            start = (query.page - 1) * query.per_page
-            end = start + query.per_page - 1
-            job_ids = registry.get_job_ids(start=start, end=end)
-        elif query.status == "queued":
-            total_count = len(q)
-            start = (query.page - 1) * query.per_page
-            job_ids = q.get_job_ids(offset=start, length=query.per_page)
-        else:
-            # No filter - paginate across all registries without fetching all IDs
-            finished_reg = FinishedJobRegistry(queue=q)
-            failed_reg = FailedJobRegistry(queue=q)
-            started_reg = StartedJobRegistry(queue=q)
-
-            # (registry_or_queue, count, is_queue)
-            sources: list[tuple] = [
-                (finished_reg, finished_reg.count, False),
-                (failed_reg, failed_reg.count, False),
-                (started_reg, started_reg.count, False),
-                (q, len(q), True),
-            ]
-            total_count = sum(c for _, c, _ in sources)
+        # Build the (shard, registry_or_queue, count, is_queue) sources for the status filter,
+        # across every lane of every shard
+        shards = shard_lanes()
+        registry_classes = {
+            "finished": FinishedJobRegistry,
+            "failed": FailedJobRegistry,
+            "started": StartedJobRegistry,
+        }
+        sources: list[tuple] = []
+        for status, registry_class in registry_classes.items():
+            if query.status in (None, status):
+                for shard, (_, lanes) in enumerate(shards):
+                    for lane_q in lanes:
+                        registry = registry_class(queue=lane_q)
+                        sources.append((shard, registry, registry.count, False))
+        if query.status in (None, "queued"):
+            sources.extend(
+                (shard, lane_q, len(lane_q), True) for shard, (_, lanes) in enumerate(shards) for lane_q in lanes
+            )
+        total_count = sum(c for _, _, c, _ in sources)
 
-            # Walk sources in order, collecting IDs for the requested page
-            start = (query.page - 1) * query.per_page
-            remaining_skip = start
-            remaining_take = query.per_page
-            for source, count, is_queue in sources:
-                if remaining_take == 0:
-                    break
-                if remaining_skip >= count:
-                    remaining_skip -= count
-                    continue
-                reg_start = remaining_skip
-                if is_queue:
-                    chunk = source.get_job_ids(offset=reg_start, length=remaining_take)
-                else:
-                    chunk = source.get_job_ids(start=reg_start, end=reg_start + remaining_take - 1)
-                job_ids.extend(chunk)
-                remaining_take -= len(chunk)
-                remaining_skip = 0
+        # Walk sources in order, collecting (shard, ID) for the requested page without fetching all IDs
+        page: list[tuple[int, str]] = []
+        start = (query.page - 1) * query.per_page
+        remaining_skip = start
+        remaining_take = query.per_page
+        for shard, source, count, is_queue in sources:
+            if remaining_take == 0:
+                break
+            if remaining_skip >= count:
+                remaining_skip -= count
+                continue
+            reg_start = remaining_skip
+            if is_queue:
+                chunk = source.get_job_ids(offset=reg_start, length=remaining_take)
+            else:
+                chunk = source.get_job_ids(start=reg_start, end=reg_start + remaining_take - 1)
+            page.extend((shard, job_id) for job_id in chunk)
+            remaining_take -= len(chunk)
+            remaining_skip = 0
 
-        # Fetch job details in a single pipeline call
+        # Fetch job details in a single pipeline call per shard, keeping the page's order
+        fetched: list[Job | None] = [None] * len(page)
+        for shard, (connection, _) in enumerate(shards):
+            slots = [i for i, (job_shard, _) in enumerate(page) if job_shard == shard]
+            if slots:
+                jobs_on_shard = Job.fetch_many(
+                    [page[i][1] for i in slots], connection=connection, serializer=job_serializer
+                )
+                for i, job in zip(slots, jobs_on_shard, strict=True):
+                    fetched[i] = job
         jobs = [
             {
                 "job_id": job.id,
@@ -101,7 +93,7 @@ class ListJobs(Resource):
                 "created_at": job.created_at.isoformat() if job.created_at else None,
                 "ended_at": job.ended_at.isoformat() if job.ended_at else None,
             }
-            for job in Job.fetch_many(job_ids, connection=redis_conn)
+            for job in fetched
             if job is not None
         ]
 
@@ -120,4 +112,4 @@ class ListJobs(Resource):
         }
         r_dict.update(__base_response__)
 
-        return r_dict
+        return json_response([dumps(r_dict)])
@@ -6,11 +6,13 @@ from spectree import Response
 
 from naas import __base_response__
 from naas.config import JOB_TIMEOUT, JOB_TTL_FAILED, JOB_TTL_SUCCESS
+from naas.library import tracing
 from naas.library.audit import emit_audit_event
 from naas.library.auth import device_lockout, job_locker
 from naas.library.decorators import valid_post
 from naas.library.errorhandlers import LockedOut
-from naas.library.netmiko_lib import netmiko_send_command_structured
+from naas.library.lanes import queue_for, resolve_priority
+from naas.library.lazy_parse import STRUCTURED_FUNC
 from naas.models import JobResponse, SendCommandStructuredRequest
 from naas.spec import spec
 
@@ -65,21 +67,25 @@ class SendCommandStructured(Resource):
             validated.commands,
         )
 
-        job = current_app.config["q"].enqueue(
-            netmiko_send_command_structured,
-            ip=ip_str,
-            port=validated.port,
-            device_type=validated.platform,
-            credentials=g.credentials,
-            commands=validated.commands,
-            read_timeout=validated.read_timeout,
-            textfsm_template=validated.textfsm_template,
-            request_id=g.request_id,
-            job_id=g.request_id,
-            job_timeout=JOB_TIMEOUT,
-            result_ttl=JOB_TTL_SUCCESS,
-            failure_ttl=JOB_TTL_FAILED,
-        )
+        priority = resolve_priority(validated.priority, g.credentials.username, current_app.config["redis"])
+        with tracing.span(
+            "enqueue", {"naas.ip": ip_str, "naas.platform": validated.platform, "naas.priority": priority}
+        ):
+            job = queue_for(priority, g.request_id).enqueue(
+                STRUCTURED_FUNC,
+                ip=ip_str,
+                port=validated.port,
+                device_type=validated.platform,
+                credentials=g.credentials,
+                commands=validated.commands,
+                read_timeout=validated.read_timeout,
+                textfsm_template=validated.textfsm_template,
+                request_id=g.request_id,
+                job_id=g.request_id,
+                job_timeout=JOB_TIMEOUT,
+                result_ttl=JOB_TTL_SUCCESS,
+                failure_ttl=JOB_TTL_FAILED,
+            )
         job_id = job.id
         current_app.logger.info(
             "%s: Enqueued structured job for %s@%s:%s", job_id, g.credentials.username, ip_str, validated.port
@@ -98,6 +104,6 @@ class SendCommandStructured(Resource):
             request_id=job_id,
         )
 
-        response = JobResponse(job_id=job_id, message="Job enqueued").model_dump()
+        response = JobResponse(job_id=job_id, message="Job enqueued", priority=priority).model_dump()
         response.update(__base_response__)
         return response, 202, {"X-Request-ID": job_id}
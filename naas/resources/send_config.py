@@ -6,11 +6,12 @@ from spectree import Response
 
 from naas import __base_response__
 from naas.config import JOB_TIMEOUT, JOB_TTL_FAILED, JOB_TTL_SUCCESS
+from naas.library import tracing
 from naas.library.audit import emit_audit_event
 from naas.library.auth import device_lockout, job_locker
 from naas.library.decorators import valid_post
 from naas.library.errorhandlers import LockedOut
-from naas.library.netmiko_lib import netmiko_send_config
+from naas.library.lanes import queue_for, resolve_priority
 from naas.models import JobResponse, SendConfigRequest
 from naas.spec import spec
 
@@ -72,22 +73,26 @@ class SendConfig(Resource):
             ip_str,
             validated.port,
         )
-        job = current_app.config["q"].enqueue(
-            netmiko_send_config,
-            ip=ip_str,
-            port=validated.port,
-            device_type=validated.platform,
-            credentials=g.credentials,
-            commands=validated.config,
-            save_config=validated.save_config,
-            commit=validated.commit,
-            read_timeout=validated.read_timeout,
-            request_id=g.request_id,
-            job_id=g.request_id,
-            job_timeout=JOB_TIMEOUT,
-            result_ttl=JOB_TTL_SUCCESS,
-            failure_ttl=JOB_TTL_FAILED,
-        )
+        priority = resolve_priority(validated.priority, g.credentials.username, current_app.config["redis"])
+        with tracing.span(
+            "enqueue", {"naas.ip": ip_str, "naas.platform": validated.platform, "naas.priority": priority}
+        ):
+            job = queue_for(priority, g.request_id).enqueue(
+                "naas.library.netmiko_lib.netmiko_send_config",
+                ip=ip_str,
+                port=validated.port,
+                device_type=validated.platform,
+                credentials=g.credentials,
+                commands=validated.config,
+                save_config=validated.save_config,
+                commit=validated.commit,
+                read_timeout=validated.read_timeout,
+                request_id=g.request_id,
+                job_id=g.request_id,
+                job_timeout=JOB_TIMEOUT,
+                result_ttl=JOB_TTL_SUCCESS,
+                failure_ttl=JOB_TTL_FAILED,
+            )
         job_id = job.id
         current_app.logger.info("%s: Enqueued job for %s@%s:%s", job_id, g.credentials.username, ip_str, validated.port)
 
@@ -109,6 +114,6 @@ class SendConfig(Resource):
         )
 
         # Return our payload containing job_id added to the base response, a 202 Accepted, and the X-Request-ID header
-        response = JobResponse(job_id=job_id, message="Job enqueued").model_dump()
+        response = JobResponse(job_id=job_id, message="Job enqueued", priority=priority).model_dump()
         response.update(__base_response__)
         return response, 202, {"X-Request-ID": job_id}
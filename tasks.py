@@ -1,5 +1,7 @@
 """Development tasks for NAAS project."""
 
+import time
+
 from invoke import task
 
 
@@ -27,6 +29,63 @@ def test_all(c):
     c.run("pytest")
 
 
+@task(
+    optional=["compare"],
+    help={
+        "save": "Save the run as a named baseline under .benchmarks/",
+        "compare": "Compare against a saved run, by number (e.g. 0001); the latest if no value is given",
+        "fail": "Fail when a benchmark's median is slower than the baseline by more than this (default: 10%)",
+    },
+)
+def bench(c, save=None, compare=None, fail="10%"):
+    """Run the pytest-benchmark suite, optionally saving a baseline or comparing against one."""
+    # Logging capture keeps every record of every round in memory, so turn it off
+    cmd = "pytest tests/benchmarks --benchmark-only --no-cov -p no:logging"
+    if save:
+        cmd += f" --benchmark-save={save}"
+    if compare:
+        cmd += " --benchmark-compare" + ("" if compare is True else f"={compare}")
+        cmd += f" --benchmark-compare-fail=median:{fail}"
+    c.run(cmd)
+
+
+@task(
+    help={
+        "rate": "Requests per second (default: 10)",
+        "duration": "Seconds to issue requests for (default: 60)",
+        "mix": "Request kinds and weights, e.g. send_command=3,list_jobs=1",
+        "workers": "Worker processes (default: 8)",
+        "devices": "cisshgo devices to spread jobs over (default: 10)",
+        "output": "Summary JSON to write (default: .benchmarks/load/<timestamp>.json)",
+        "compare": "Summary JSON from an earlier run to compare against",
+        "keep": "Leave the stack running afterwards",
+        "shards": "Spread jobs over three Redis shards, splitting the workers between them",
+    }
+)
+def load(c, rate=10, duration=60, mix=None, workers=8, devices=10, output=None, compare=None, keep=False, shards=False):
+    """Run the load generator against the Docker Compose stack with cisshgo devices."""
+    compose = "docker compose -f tests/integration/docker-compose.test.yml -f tests/load/docker-compose.load.yml"
+    if shards:
+        compose += " -f tests/load/docker-compose.shards.yml"
+    env = {
+        "LOAD_WORKERS": str(workers),
+        "LOAD_SHARD_WORKERS": str(max(int(workers) // 3, 1)),
+        "LOAD_DEVICES": str(devices),
+    }
+    c.run(f"{compose} up -d --build --wait", env=env)
+    output = output or time.strftime(".benchmarks/load/%Y%m%d-%H%M%S.json")
+    cmd = f"python tests/load/loadgen.py --rate {rate} --duration {duration} --devices {devices} --output {output}"
+    if mix:
+        cmd += f" --mix {mix}"
+    if compare:
+        cmd += f" --compare {compare}"
+    try:
+        c.run(cmd)
+    finally:
+        if not keep:
+            c.run(f"{compose} down -v")
+
+
 @task
 def lint(c):
     """Run ruff linter."""
@@ -100,8 +159,8 @@ def export_spec(c):
     import fakeredis
 
     # Patch Redis before importing app (app_configure hits Redis at import time)
-    with patch("naas.config.Redis", return_value=fakeredis.FakeStrictRedis()):
-        with patch("naas.config.Queue"):
+    with patch("naas.library.redis_client.Redis", return_value=fakeredis.FakeStrictRedis()):
+        with patch("naas.library.lanes.LaneQueue"):
             from naas.app import app
 
             with app.test_client() as client:
@@ -111,12 +170,24 @@ def export_spec(c):
 
     output_path = "docs/swagger/openapi.json"
     with open(output_path, "w") as f:
-        json.dump(spec, f, indent=2)
+        json.dump(spec, f, indent=2, sort_keys=True)
         f.write("\n")
 
     print(f"✅ OpenAPI spec written to {output_path}")
 
 
+@task
+def export_platforms(c):
+    """Snapshot the installed netmiko's device types to naas/data/netmiko_platforms.txt."""
+    import netmiko
+
+    output_path = "naas/data/netmiko_platforms.txt"
+    with open(output_path, "w") as f:
+        f.write("\n".join(netmiko.platforms) + "\n")
+
+    print(f"✅ {len(netmiko.platforms)} netmiko platforms written to {output_path}")
+
+
 @task
 def changelog_draft(c):
     """Preview changelog for next release."""
@@ -0,0 +1,97 @@
+"""
+Benchmark API startup with and without gunicorn's preload_app: boot time and per-worker memory.
+
+Starts gunicorn with gunicorn.py, once with GUNICORN_PRELOAD=false and once with it on,
+and reports how long after launch /livez first answered, then the memory of the master
+and each worker. PSS (proportional set size) splits shared pages between the processes
+sharing them, so RSS - PSS shows how much of each worker is shared copy-on-write with
+the master.
+
+Needs a real Redis at REDIS_HOST/REDIS_PORT/REDIS_PASSWORD, since app_configure pings it,
+and Linux for /proc.
+
+Usage:
+    REDIS_HOST=localhost python tests/benchmarks/bench_api_startup.py [workers] [app]
+"""
+
+import os
+import signal
+import ssl
+import subprocess
+import sys
+import time
+import urllib.request
+from pathlib import Path
+
+_ROOT = Path(__file__).resolve().parents[2]
+_TIMEOUT = 60
+_PORT = 8443
+
+
+def _memory_kib(pid: int) -> dict[str, int]:
+    """Return the Rss, Pss and Shared_* figures (KiB) from /proc/<pid>/smaps_rollup."""
+    fields = {}
+    for line in Path(f"/proc/{pid}/smaps_rollup").read_text().splitlines()[1:]:
+        key, value = line.split(":", 1)
+        fields[key] = int(value.split()[0])
+    return fields
+
+
+def _children(pid: int) -> list[int]:
+    return [int(child) for child in Path(f"/proc/{pid}/task/{pid}/children").read_text().split()]
+
+
+def _live() -> bool:
+    context = ssl._create_unverified_context()
+    try:
+        with urllib.request.urlopen(f"https://127.0.0.1:{_PORT}/livez", context=context, timeout=1) as response:
+            return response.status == 200
+    except OSError:
+        return False
+
+
+def run(workers: int, app: str, preload: bool) -> None:
+    # The gunicorn script rather than "python -m gunicorn", which the repo's gunicorn.py would shadow
+    cmd = [str(Path(sys.executable).parent / "gunicorn"), "-c", "gunicorn.py", "--chdir", str(_ROOT)]
+    cmd += ["--bind", f"127.0.0.1:{_PORT}", "--workers", str(workers), "--log-level", "warning", app]
+    env = {**os.environ, "GUNICORN_PRELOAD": str(preload).lower()}
+
+    start = time.perf_counter()
+    proc = subprocess.Popen(cmd, cwd=_ROOT, env=env, stdout=subprocess.DEVNULL)
+    try:
+        while not _live():
+            if time.perf_counter() - start > _TIMEOUT:
+                raise SystemExit(f"/livez did not answer within {_TIMEOUT}s")
+            time.sleep(0.01)
+        boot = time.perf_counter() - start
+
+        # Let every worker finish loading the app before measuring memory
+        while len(_children(proc.pid)) < workers:
+            time.sleep(0.1)
+        time.sleep(3)
+
+        print(f"preload: {preload}, workers: {workers}, time to first response: {boot:.2f}s")
+        print(f"{'pid':>8} {'rss MiB':>9} {'pss MiB':>9} {'shared MiB':>11}")
+        master = _memory_kib(proc.pid)
+        print(f"{'master':>8} {master['Rss'] / 1024:>9.1f} {master['Pss'] / 1024:>9.1f}")
+        pss = 0
+        for pid in _children(proc.pid):
+            mem = _memory_kib(pid)
+            pss += mem["Pss"]
+            shared = mem["Shared_Clean"] + mem["Shared_Dirty"]
+            print(f"{pid:>8} {mem['Rss'] / 1024:>9.1f} {mem['Pss'] / 1024:>9.1f} {shared / 1024:>11.1f}")
+        print(f"total pss: {(master['Pss'] + pss) / 1024:.1f} MiB\n")
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        proc.wait()
+
+
+def main() -> None:
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    app = sys.argv[2] if len(sys.argv) > 2 else "naas.app:app"
+    for preload in (False, True):
+        run(workers, app, preload)
+
+
+if __name__ == "__main__":
+    main()
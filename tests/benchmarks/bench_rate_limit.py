@@ -0,0 +1,55 @@
+"""
+Benchmark the API rate limiter's per-request overhead.
+
+Times check_rate_limit() against a bare PING (one Redis round trip) and against the
+per-request Redis work valid_post already does (the tacacs_auth_lockout check), so the
+limiter's cost can be read relative to the existing request path.
+
+Runs against the Redis at REDIS_HOST/REDIS_PORT/REDIS_PASSWORD if reachable, otherwise
+against fakeredis (which measures the in-process Lua interpreter, not a network hop).
+
+Usage:
+    REDIS_HOST=localhost python tests/benchmarks/bench_rate_limit.py
+"""
+
+import timeit
+
+from redis import Redis
+from redis.exceptions import ConnectionError
+
+from naas.config import REDIS_HOST, REDIS_PASSWORD, REDIS_PORT
+from naas.library.auth import tacacs_auth_lockout
+from naas.library.rate_limit import check_rate_limit
+
+_NUMBER = 5_000
+
+
+def _connect() -> tuple[Redis, str]:
+    redis = Redis(host=REDIS_HOST, port=int(REDIS_PORT), password=REDIS_PASSWORD, socket_connect_timeout=1)
+    try:
+        redis.ping()
+        return redis, f"redis://{REDIS_HOST}:{REDIS_PORT}"
+    except ConnectionError:
+        from fakeredis import FakeStrictRedis
+
+        return FakeStrictRedis(), "fakeredis"
+
+
+def main() -> None:
+    redis, target = _connect()
+    print(f"target: {target}, {_NUMBER} calls each")
+    cases = {
+        "ping (1 round trip)": redis.ping,
+        "auth lockout check": lambda: tacacs_auth_lockout(username="bench", redis=redis),
+        "rate limit check": lambda: check_rate_limit(redis, "bench", "send_command"),
+    }
+    print(f"{'case':<22} {'us/call':>10}")
+    for name, func in cases.items():
+        func()  # Warm up (loads the Lua script)
+        us = timeit.timeit(func, number=_NUMBER) / _NUMBER * 1e6
+        print(f"{name:<22} {us:>10.1f}")
+    redis.delete("naas_ratelimit_send_command_bench", "naas_failures_bench")
+
+
+if __name__ == "__main__":
+    main()
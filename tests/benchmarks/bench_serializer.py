@@ -0,0 +1,55 @@
+"""
+Benchmark RQ job serializers: encode/decode time and stored size.
+
+Compares RQ's default pickle serializer with NAAS's msgpack serializer for a
+representative job payload (func name + kwargs with Credentials) and for
+small and large (result, error) tuples.
+
+Usage:
+    python tests/benchmarks/bench_serializer.py
+"""
+
+import timeit
+
+from rq.serializers import DefaultSerializer
+
+from naas.library.auth import Credentials
+from naas.library.serializers import MsgpackSerializer
+
+_JOB_DATA = (
+    "naas.library.netmiko_lib.netmiko_send_command",
+    None,
+    [],
+    {
+        "ip": "192.0.2.1",
+        "port": 22,
+        "device_type": "cisco_ios",
+        "credentials": Credentials("netops", "hunter2"),
+        "commands": ["show version", "show ip interface brief"],
+        "read_timeout": 30.0,
+        "expect_string": None,
+        "request_id": "550e8400-e29b-41d4-a716-446655440000",
+    },
+)
+_LINE = "GigabitEthernet0/1        192.0.2.1       YES NVRAM  up                    up      \n"
+_PAYLOADS = {
+    "job data": _JOB_DATA,
+    "result 4KB": ({"show ip interface brief": _LINE * 50}, None),
+    "result 5MB": ({"show tech-support": _LINE * 60_000}, None),
+}
+_SERIALIZERS = {"pickle": DefaultSerializer, "msgpack": MsgpackSerializer}
+
+
+def main() -> None:
+    print(f"{'payload':<12} {'serializer':<10} {'bytes':>10} {'dumps us':>10} {'loads us':>10}")
+    for payload_name, payload in _PAYLOADS.items():
+        number = 20 if "MB" in payload_name else 20_000
+        for name, serializer in _SERIALIZERS.items():
+            blob = serializer.dumps(payload)
+            dumps_us = timeit.timeit(lambda: serializer.dumps(payload), number=number) / number * 1e6  # noqa: B023
+            loads_us = timeit.timeit(lambda: serializer.loads(blob), number=number) / number * 1e6  # noqa: B023
+            print(f"{payload_name:<12} {name:<10} {len(blob):>10} {dumps_us:>10.1f} {loads_us:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
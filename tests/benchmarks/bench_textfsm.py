@@ -0,0 +1,53 @@
+"""
+Benchmark TextFSM parsing: Netmiko's per-call parse path against the cached one.
+
+Netmiko builds a CliTable, searches the ntc-templates index and compiles the template
+for every command. parse_output() loads the index once, caches index lookups and keeps
+compiled templates, so after the first command only the parse itself remains.
+
+The custom template case gives Netmiko a template file, since it only accepts paths.
+
+Usage:
+    python tests/benchmarks/bench_textfsm.py
+"""
+
+import tempfile
+import timeit
+from pathlib import Path
+
+from netmiko.utilities import get_structured_data_textfsm
+
+from naas.library.textfsm_templates import parse_output, template_index
+
+_NUMBER = 500
+
+_OUTPUT = "Interface              IP-Address      OK? Method Status                Protocol\n" + "".join(
+    f"GigabitEthernet0/{i:<8}     192.0.2.{i:<8} YES NVRAM  up                    up\n" for i in range(48)
+)
+_TEMPLATE = "Value INTF (\\S+)\nValue IP (\\S+)\n\nStart\n  ^${INTF}\\s+${IP}\\s+YES -> Record\n"
+_COMMAND = "show ip interface brief"
+
+
+def main() -> None:
+    # Both paths share CliTable's per-process index, so load it up front as a parse pool process does
+    template_index()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        template_file = Path(tmp) / "custom.textfsm"
+        template_file.write_text(_TEMPLATE)
+        cases = {
+            "ntc: netmiko": lambda: get_structured_data_textfsm(_OUTPUT, "cisco_ios", _COMMAND),
+            "ntc: cached": lambda: parse_output(_OUTPUT, "cisco_ios", _COMMAND),
+            "custom: netmiko": lambda: get_structured_data_textfsm(_OUTPUT, template=str(template_file)),
+            "custom: cached": lambda: parse_output(_OUTPUT, "cisco_ios", _COMMAND, _TEMPLATE),
+        }
+        print(f"{len(_OUTPUT.splitlines())} line output, {_NUMBER} parses each")
+        print(f"{'case':<18} {'us/parse':>10}")
+        for name, func in cases.items():
+            assert func() == cases[name.split(":")[0] + ": netmiko"]()
+            us = timeit.timeit(func, number=_NUMBER) / _NUMBER * 1e6
+            print(f"{name:<18} {us:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
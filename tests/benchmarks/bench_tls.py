@@ -0,0 +1,118 @@
+"""
+Benchmark the API's TLS setup: self-signed certificate cold start and handshakes/sec.
+
+Cold start compares generating an RSA 2048 or ECDSA P-256 certificate with reusing the
+one cached on disk by a previous start. Handshakes/sec serves TLS from a thread in this
+process, with the context built per connection (gunicorn's default) or once (see
+naas.library.tls), and a client that either starts a full handshake every time or
+resumes its previous session.
+
+Usage:
+    python tests/benchmarks/bench_tls.py [seconds per run]
+"""
+
+import socket
+import ssl
+import sys
+import tempfile
+import threading
+import time
+from collections.abc import Callable
+
+from naas.library import tls
+from naas.library.selfsigned import cached_selfsigned_cert, generate_selfsigned_cert
+
+_CIPHERS = "HIGH:!aNULL:!eNULL:!EXPORT:!DES:!RC4:!3DES:!MD5:!PSK"
+
+
+def cold_start(tmp: str) -> None:
+    print(f"{'certificate':<28} {'ms':>8}")
+    for key_type in ("rsa", "ecdsa"):
+        start = time.perf_counter()
+        for _ in range(5):
+            generate_selfsigned_cert("naas.local", key_type=key_type)
+        print(f"{'generate ' + key_type:<28} {(time.perf_counter() - start) / 5 * 1000:>8.1f}")
+
+        cert, key = f"{tmp}/{key_type}-cert.pem", f"{tmp}/{key_type}-key.pem"
+        cached_selfsigned_cert(cert, key, "naas.local", key_type)
+        start = time.perf_counter()
+        for _ in range(50):
+            assert not cached_selfsigned_cert(cert, key, "naas.local", key_type)
+        print(f"{'reuse cached ' + key_type:<28} {(time.perf_counter() - start) / 50 * 1000:>8.1f}")
+    print()
+
+
+def _factory(cert: str, key: str) -> Callable[[], ssl.SSLContext]:
+    """The context gunicorn's default_ssl_context_factory builds from gunicorn.py's settings."""
+
+    def factory() -> ssl.SSLContext:
+        context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+        context.load_cert_chain(certfile=cert, keyfile=key)
+        context.verify_mode = ssl.CERT_NONE
+        context.set_ciphers(_CIPHERS)
+        return context
+
+    return factory
+
+
+def _serve(listener: socket.socket, context: Callable[[], ssl.SSLContext], stop: threading.Event) -> None:
+    while not stop.is_set():
+        try:
+            conn, _ = listener.accept()
+        except OSError:
+            return
+        try:
+            with context().wrap_socket(conn, server_side=True) as tls_conn:
+                tls_conn.sendall(b"x")
+        except (OSError, ssl.SSLError):
+            pass
+
+
+def handshakes(cert: str, key: str, shared: bool, resume: bool, seconds: float) -> tuple[float, float]:
+    """Return (handshakes/sec, fraction of sessions resumed)."""
+    factory = _factory(cert, key)
+    tls._context = None
+    context = (lambda: tls.server_context(factory)) if shared else factory
+
+    listener = socket.create_server(("127.0.0.1", 0))
+    stop = threading.Event()
+    server = threading.Thread(target=_serve, args=(listener, context, stop), daemon=True)
+    server.start()
+
+    client = ssl._create_unverified_context()
+    session = None
+    count = reused = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        with socket.create_connection(listener.getsockname()) as sock:
+            with client.wrap_socket(sock, session=session if resume else None) as tls_conn:
+                tls_conn.recv(1)  # TLS 1.3 session tickets arrive with the first data
+                reused += tls_conn.session_reused
+                session = tls_conn.session
+        count += 1
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    listener.shutdown(socket.SHUT_RDWR)  # Wakes the server's accept()
+    listener.close()
+    server.join()
+    return count / elapsed, reused / count
+
+
+def main() -> None:
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 3.0
+    with tempfile.TemporaryDirectory() as tmp:
+        cold_start(tmp)
+        print(f"{'key':<6} {'context':<15} {'client':<8} {'handshakes/s':>13} {'resumed':>8}")
+        for key_type in ("rsa", "ecdsa"):
+            cert, key = f"{tmp}/{key_type}-cert.pem", f"{tmp}/{key_type}-key.pem"
+            for shared in (False, True):
+                for resume in (False, True):
+                    rate, resumed = handshakes(cert, key, shared, resume, seconds)
+                    context = "shared" if shared else "per connection"
+                    client = "resume" if resume else "full"
+                    print(f"{key_type:<6} {context:<15} {client:<8} {rate:>13.0f} {resumed:>8.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Benchmark worker host startup: time to first job and per-worker memory.
+
+Starts worker.py with a few workers on a private queue holding one job, and reports how
+long after launch the job finished, then the memory of each forked worker process. PSS
+(proportional set size) splits shared pages between the processes sharing them, so
+RSS - PSS shows how much of each worker is shared copy-on-write with the parent.
+
+Needs a real Redis at REDIS_HOST/REDIS_PORT/REDIS_PASSWORD, since the workers are
+separate processes, and Linux for /proc.
+
+Usage:
+    REDIS_HOST=localhost python tests/benchmarks/bench_worker_startup.py [workers]
+"""
+
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from redis import Redis
+from rq import Queue
+
+from naas.config import REDIS_HOST, REDIS_PASSWORD, REDIS_PORT
+from naas.library.serializers import job_serializer
+
+_ROOT = Path(__file__).resolve().parents[2]
+_TIMEOUT = 60
+
+
+def _memory_kib(pid: int) -> dict[str, int]:
+    """Return the Rss, Pss and Shared_* figures (KiB) from /proc/<pid>/smaps_rollup."""
+    fields = {}
+    for line in Path(f"/proc/{pid}/smaps_rollup").read_text().splitlines()[1:]:
+        key, value = line.split(":", 1)
+        fields[key] = int(value.split()[0])
+    return fields
+
+
+def _children(pid: int) -> list[int]:
+    return [int(child) for child in Path(f"/proc/{pid}/task/{pid}/children").read_text().split()]
+
+
+def main() -> None:
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    redis = Redis(host=REDIS_HOST, port=int(REDIS_PORT), password=REDIS_PASSWORD)
+    redis.ping()
+
+    queue = Queue(f"naas_bench_{os.getpid()}", connection=redis, serializer=job_serializer)
+    job = queue.enqueue("os.getpid")
+    cmd = [sys.executable, "worker.py", str(workers), "-q", queue.name, "-r", REDIS_HOST, "-p", str(REDIS_PORT)]
+    cmd += ["-m", "0", "-l", "WARNING"] + (["-a", REDIS_PASSWORD] if REDIS_PASSWORD else [])
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {**os.environ, "WORKER_HEARTBEAT_FILE": f"{tmp}/heartbeat"}
+        env.pop("PROMETHEUS_MULTIPROC_DIR", None)
+        start = time.perf_counter()
+        proc = subprocess.Popen(cmd, cwd=_ROOT, env=env)
+        try:
+            while job.get_status(refresh=True) != "finished":
+                if time.perf_counter() - start > _TIMEOUT:
+                    raise SystemExit(f"No job finished within {_TIMEOUT}s")
+                time.sleep(0.01)
+            first_job = time.perf_counter() - start
+
+            # Let every worker finish starting up before measuring memory
+            while len(_children(proc.pid)) < workers or redis.scard(f"rq:workers:{queue.name}") < workers:
+                time.sleep(0.1)
+            time.sleep(1)
+
+            print(f"workers: {workers}, time to first job: {first_job:.2f}s")
+            print(f"{'pid':>8} {'rss MiB':>9} {'pss MiB':>9} {'shared MiB':>11}")
+            parent = _memory_kib(proc.pid)
+            print(f"{'parent':>8} {parent['Rss'] / 1024:>9.1f} {parent['Pss'] / 1024:>9.1f}")
+            for pid in _children(proc.pid):
+                mem = _memory_kib(pid)
+                shared = mem["Shared_Clean"] + mem["Shared_Dirty"]
+                print(f"{pid:>8} {mem['Rss'] / 1024:>9.1f} {mem['Pss'] / 1024:>9.1f} {shared / 1024:>11.1f}")
+        finally:
+            proc.send_signal(signal.SIGTERM)
+            proc.wait()
+            job.delete()
+            redis.delete(queue.key)
+
+
+if __name__ == "__main__":
+    main()
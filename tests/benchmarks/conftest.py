@@ -0,0 +1,78 @@
+"""
+Fixtures for the pytest-benchmark suite.
+
+Unlike the unit tests, the API here runs against real RQ lane queues on fakeredis, with
+rate limiting and lockout checks left on, so each request does the Redis work it does in
+production. Timings include fakeredis's in-process command handling and are meant for
+comparing runs against a saved baseline, not as absolute latencies.
+"""
+
+from base64 import b64encode
+from unittest.mock import patch
+
+import pytest
+from fakeredis import FakeStrictRedis
+from rq.job import JobStatus
+from rq.results import Result
+
+from naas.config import JOB_TTL_SUCCESS, QUEUE_LANES
+from naas.library.auth import Credentials
+from naas.library.lanes import LaneQueue
+from naas.library.serializers import job_serializer
+
+USERNAME = "benchuser"
+PASSWORD = "benchpass"
+
+
+@pytest.fixture(scope="session")
+def redis():
+    """Redis shared by the whole benchmark session."""
+    return FakeStrictRedis()
+
+
+@pytest.fixture(scope="session")
+def app(redis):
+    """Flask app wired to real lane queues on the session's Redis."""
+    with (
+        patch("naas.library.redis_client.Redis", return_value=redis),
+        # Put the token bucket in the request path (it is off by default), but never let it reject a benchmark request
+        patch("naas.library.validation.RATE_LIMIT_ENABLED", True),
+        patch("naas.library.rate_limit.RATE_LIMIT_RATE", 1e9),
+        patch("naas.library.rate_limit.RATE_LIMIT_BURST", 1_000_000_000),
+    ):
+        from naas.app import app as flask_app
+
+        redis.setnx("naas_cred_salt", "benchsalt")
+        flask_app.config["TESTING"] = True
+        flask_app.config["redis"] = redis
+        flask_app.config["queues"] = {
+            lane: LaneQueue(name, connection=redis, serializer=job_serializer) for lane, name in QUEUE_LANES.items()
+        }
+        flask_app.config["q"] = flask_app.config["queues"]["normal"]
+        yield flask_app
+
+
+@pytest.fixture(scope="session")
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture(scope="session")
+def auth_headers():
+    return {"Authorization": "Basic " + b64encode(f"{USERNAME}:{PASSWORD}".encode()).decode()}
+
+
+@pytest.fixture(scope="session")
+def finished_job(app, redis):
+    """Factory for a finished job (send_command by default) owned by the benchmark user, with the given results."""
+
+    def create(results: dict, func: str = "naas.library.netmiko_lib.netmiko_send_command") -> str:
+        with app.app_context():
+            job = app.config["q"].enqueue(func, ip="192.0.2.1", device_type="cisco_ios", commands=list(results))
+            job.meta["hash"] = Credentials(USERNAME, PASSWORD).salted_hash()
+            job.save_meta()
+        job.set_status(JobStatus.FINISHED)
+        Result.create(job, Result.Type.SUCCESSFUL, ttl=JOB_TTL_SUCCESS, return_value=(results, None))
+        return job.id
+
+    return create
@@ -0,0 +1,234 @@
+"""Benchmarks for the API request paths, end to end through the Flask test client."""
+
+import json
+import subprocess
+import sys
+from unittest.mock import patch
+from uuid import uuid4
+
+import pytest
+from fakeredis import FakeStrictRedis
+from rq.job import Job, JobStatus
+from rq.registry import FailedJobRegistry, FinishedJobRegistry
+from rq.utils import now
+
+from naas.config import QUEUE_LANES
+from naas.library.compression import ENCODINGS, compress
+from naas.library.lanes import LaneQueue
+from naas.library.lazy_parse import STRUCTURED_FUNC
+from naas.library.result_store import OUTPUTS_KEY
+from naas.library.serializers import job_serializer
+
+SEND_COMMAND = {"ip": "192.0.2.1", "platform": "cisco_ios", "commands": ["show version", "show ip int brief"]}
+
+
+def _running_config(mb: int) -> str:
+    """Roughly mb MB of "show running-config" style output."""
+    return "".join(
+        f"interface GigabitEthernet0/{i}\n description uplink {i}\n no shutdown\n!\n" for i in range(13_600 * mb)
+    )
+
+
+def _ip_int_brief(mb: int) -> list[dict]:
+    """Roughly mb MB of parsed "show ip interface brief" rows, as JSON."""
+    return [
+        {"interface": f"GigabitEthernet0/{i}", "ip_address": "192.0.2.1", "status": "up", "proto": "up"}
+        for i in range(11_000 * mb)
+    ]
+
+
+@pytest.fixture(params=["orjson", "json"])
+def encoder(request):
+    """Run a benchmark with each JSON_ENCODER."""
+    with patch("naas.library.json_response.JSON_ENCODER", request.param):
+        yield request.param
+
+
+_JOB_COUNT = 100_000
+
+_IMPORT_APP = """
+from unittest.mock import patch
+import fakeredis
+with patch("naas.library.redis_client.Redis", return_value=fakeredis.FakeStrictRedis()):
+    import naas.app
+"""
+
+
+def test_import_app(benchmark):
+    """Importing naas.app in a fresh interpreter, as every gunicorn worker does at startup."""
+    benchmark.pedantic(subprocess.run, ([sys.executable, "-c", _IMPORT_APP],), {"check": True}, rounds=5)
+
+
+def test_send_command(benchmark, client, auth_headers):
+    """SendCommand.post: validation, lockout and rate limit checks, enqueue and job locking."""
+    response = benchmark(client.post, "/v1/send_command", json=SEND_COMMAND, headers=auth_headers)
+    assert response.status_code == 202
+
+
+@pytest.mark.parametrize(
+    "results",
+    [
+        pytest.param({"show version": "Cisco IOS Software, Version 15.2(4)M7\n"}, id="small"),
+        pytest.param({"show running-config": _running_config(1)}, id="1mb"),
+        pytest.param({"show running-config": _running_config(10)}, id="10mb"),
+    ],
+)
+def test_get_results(benchmark, client, auth_headers, finished_job, encoder, results):
+    """GetResults.get for a finished job: job unlock, result fetch and JSON response."""
+    job_id = finished_job(results)
+    response = benchmark(client.get, f"/v1/send_command/{job_id}", headers=auth_headers)
+    assert response.status_code == 200
+    assert response.json["results"] == results
+
+
+@pytest.mark.parametrize("mb", [1, 10], ids=["1mb", "10mb"])
+def test_get_structured_results(benchmark, client, auth_headers, finished_job, redis, encoder, mb):
+    """GetResults.get for a structured job whose parsed results are cached as JSON."""
+    parsed = {"show ip interface brief": _ip_int_brief(mb)}
+    job_id = finished_job({"show ip interface brief": "raw"}, func=STRUCTURED_FUNC)
+    redis.set(f"naas_parsed_{job_id}", json.dumps(parsed, separators=(",", ":")))
+    response = benchmark(client.get, f"/v1/send_command_structured/{job_id}", headers=auth_headers)
+    assert response.status_code == 200
+    assert response.json["results"] == parsed
+
+
+def test_get_results_not_modified(benchmark, client, auth_headers, finished_job):
+    """GetResults.get polled with the ETag of a 10MB finished result: a 304 without loading it."""
+    job_id = finished_job({"show running-config": _running_config(10)})
+    etag = client.get(f"/v1/send_command/{job_id}", headers=auth_headers).headers["ETag"]
+    response = benchmark(client.get, f"/v1/send_command/{job_id}", headers={**auth_headers, "If-None-Match": etag})
+    assert response.status_code == 304
+
+
+@pytest.mark.parametrize("encoding", ENCODINGS)
+def test_get_results_compressed(benchmark, client, auth_headers, finished_job, encoding):
+    """GetResults.get for a 10MB finished result, repeated with Accept-Encoding: served from the compressed cache."""
+    job_id = finished_job({"show running-config": _running_config(10)})
+    headers = {**auth_headers, "Accept-Encoding": encoding}
+    response = benchmark(client.get, f"/v1/send_command/{job_id}", headers=headers)
+    assert response.headers["Content-Encoding"] == encoding
+
+
+_FIFTY_COMMANDS = {f"show interface GigabitEthernet0/{i}": _running_config(1)[: 200 * 1024] for i in range(50)}
+
+
+@pytest.mark.parametrize("layout", ["inline", "per-command"])
+@pytest.mark.parametrize(
+    "query",
+    [
+        "",
+        "?command=show+interface+GigabitEthernet0/7",
+        "?command=show+interface+GigabitEthernet0/7&bytes=0-4095",
+        "?lines=1-20",
+    ],
+    ids=["all", "one-command", "one-command-4kb", "first-20-lines"],
+)
+def test_get_results_selected(benchmark, client, auth_headers, finished_job, redis, layout, query):
+    """GetResults.get for a 50 command, 10MB job, reading all of it or only the selected commands and ranges."""
+    if layout == "inline":
+        job_id = finished_job(_FIFTY_COMMANDS)
+    else:
+        job_id = finished_job({OUTPUTS_KEY: list(_FIFTY_COMMANDS)})
+        for index, output in enumerate(_FIFTY_COMMANDS.values()):
+            redis.set(f"naas_output_{job_id}_{index}", output)
+    response = benchmark(client.get, f"/v1/send_command/{job_id}{query}", headers=auth_headers)
+    assert response.status_code == 200
+
+
+@pytest.mark.parametrize("encoding", ENCODINGS)
+def test_compress(benchmark, encoding):
+    """Compressing a 10MB results body, the cost the compressed cache saves on every repeat request."""
+    body = json.dumps({"results": {"show running-config": _running_config(10)}}).encode()
+    benchmark(compress, [body], encoding)
+
+
+def _fill(q, count: int) -> None:
+    """Store count jobs on q's lane: a tenth failed, a tenth queued and the rest finished."""
+    redis = q.connection
+    template = Job.create(
+        "naas.library.netmiko_lib.netmiko_send_command",
+        kwargs={"ip": "192.0.2.1", "commands": ["show version"]},
+        connection=redis,
+        serializer=job_serializer,
+        origin=q.name,
+    )
+    template.ended_at = now()
+    expires = now().timestamp() + 86400
+    job_ids = [str(uuid4()) for _ in range(count)]
+    failed = job_ids[: count // 10]
+    queued = job_ids[count // 10 : count // 5]
+    finished = job_ids[count // 5 :]
+
+    for ids, status in ((failed, JobStatus.FAILED), (queued, JobStatus.QUEUED), (finished, JobStatus.FINISHED)):
+        mapping = {**template.to_dict(), "status": status.value}
+        with redis.pipeline(transaction=False) as pipe:
+            for job_id in ids:
+                pipe.hset(Job.key_for(job_id), mapping=mapping)
+            pipe.execute()
+    redis.zadd(FailedJobRegistry(queue=q).key, dict.fromkeys(failed, expires))
+    redis.zadd(FinishedJobRegistry(queue=q).key, dict.fromkeys(finished, expires))
+    redis.rpush(q.key, *queued)
+
+
+@pytest.fixture(scope="module")
+def many_jobs(app):
+    """Fill the normal lane with 100k jobs: finished, failed and queued."""
+    _fill(app.config["q"], _JOB_COUNT)
+
+
+@pytest.fixture(scope="module")
+def shards():
+    """Lanes on three Redis shards, as app.config["shards"] holds them with REDIS_SHARDS set."""
+    return [
+        {lane: LaneQueue(name, connection=shard, serializer=job_serializer) for lane, name in QUEUE_LANES.items()}
+        for shard in (FakeStrictRedis() for _ in range(3))
+    ]
+
+
+@pytest.fixture(scope="module")
+def many_sharded_jobs(shards):
+    """The same 100k jobs as many_jobs, spread over the shards."""
+    for lanes in shards:
+        _fill(lanes["normal"], _JOB_COUNT // len(shards))
+
+
+@pytest.fixture
+def sharded(app, shards, monkeypatch):
+    """Route the app's jobs to the shards for one benchmark."""
+    monkeypatch.setitem(app.config, "shards", shards)
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        pytest.param("", id="first-page"),
+        pytest.param(f"?page={_JOB_COUNT // 100 - 1}&per_page=100", id="deep-page"),
+        pytest.param("?status=queued&per_page=100", id="queued"),
+    ],
+)
+def test_list_jobs(benchmark, client, auth_headers, many_jobs, query):
+    """ListJobs.get against 100k jobs: registry counts, page walk and job fetch."""
+    response = benchmark(client.get, f"/v1/jobs{query}", headers=auth_headers)
+    assert response.status_code == 200
+    assert response.json["jobs"]
+
+
+def test_send_command_sharded(benchmark, client, auth_headers, sharded):
+    """SendCommand.post with REDIS_SHARDS: the job goes to its shard, shared state stays on the main Redis."""
+    response = benchmark(client.post, "/v1/send_command", json=SEND_COMMAND, headers=auth_headers)
+    assert response.status_code == 202
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        pytest.param("", id="first-page"),
+        pytest.param(f"?page={_JOB_COUNT // 100 - 1}&per_page=100", id="deep-page"),
+        pytest.param("?status=queued&per_page=100", id="queued"),
+    ],
+)
+def test_list_jobs_sharded(benchmark, client, auth_headers, many_sharded_jobs, sharded, query):
+    """ListJobs.get against 100k jobs on three shards: every shard's counts, then a fetch per shard."""
+    response = benchmark(client.get, f"/v1/jobs{query}", headers=auth_headers)
+    assert response.status_code == 200
+    assert response.json["jobs"]
@@ -0,0 +1,55 @@
+"""Benchmarks for whole Netmiko jobs against the in-process fake device, over real SSH on localhost."""
+
+from unittest.mock import patch
+
+import pytest
+
+from naas.library import circuit_breaker
+from naas.library.auth import Credentials
+from naas.library.connection_pool import ConnectionPool
+from naas.library.netmiko_lib import netmiko_send_command
+from tests.fake_device import FakeDevice
+
+CREDS = Credentials(username="admin", password="admin")
+COMMANDS = ["show version", "show ip interface brief"]
+
+
+@pytest.fixture
+def device():
+    with FakeDevice("cisco_ios") as fake_device:
+        yield fake_device
+
+
+@pytest.fixture(autouse=True)
+def worker_state(redis):
+    """A fresh connection pool and circuit breakers for each benchmark, on the session's Redis."""
+    pool = ConnectionPool()
+    pool.set_salt("benchsalt")
+    with (
+        patch("naas.library.netmiko_lib.pool", pool),
+        patch("naas.library.circuit_breaker._redis_client", redis),
+        patch.dict(circuit_breaker._circuit_breakers, clear=True),
+    ):
+        yield
+    pool.drain()
+
+
+@pytest.mark.parametrize("pooled", [True, False], ids=["pooled", "new-connection"])
+def test_send_command_job(benchmark, device, pooled):
+    """A two command job, reusing a pooled session or opening and closing one per job."""
+    with patch("naas.library.netmiko_lib.CONNECTION_POOL_ENABLED", pooled):
+        results, error = benchmark.pedantic(
+            netmiko_send_command, ("127.0.0.1", CREDS, "cisco_ios", COMMANDS, device.port), rounds=20
+        )
+    assert error is None
+    assert set(results) == set(COMMANDS)
+    assert device.stats.sessions == (1 if pooled else 20)
+
+
+def test_circuit_open_fast_fail(benchmark, device):
+    """A job for a device whose breaker is open, rejected without connecting."""
+    circuit_breaker._get_circuit_breaker("127.0.0.1").open()
+    results, error = benchmark(netmiko_send_command, "127.0.0.1", CREDS, "cisco_ios", COMMANDS, device.port)
+    assert results is None
+    assert "Circuit breaker open" in error
+    assert device.stats.sessions == 0
@@ -0,0 +1,102 @@
+"""Benchmarks for the lockout, circuit breaker, connection pool and audit paths every job goes through."""
+
+import time
+
+import pybreaker
+import pytest
+
+from naas.library.audit import emit_audit_event
+from naas.library.auth import _is_locked_out
+from naas.library.circuit_breaker import RedisCircuitBreakerStorage
+from naas.library.connection_pool import ConnectionPool
+
+_LOCKOUT_KEY = "naas_failures_benchuser"
+
+
+class _Connection:
+    """Stand-in for a live Netmiko connection."""
+
+    def is_alive(self) -> bool:
+        return True
+
+    def disconnect(self) -> None:
+        pass
+
+
+@pytest.fixture
+def recent_failures(redis):
+    """Give the lockout key a few failures inside the window, below the lockout threshold."""
+
+    def seed() -> None:
+        redis.delete(_LOCKOUT_KEY)
+        redis.zadd(_LOCKOUT_KEY, {f"failure-{i}": time.time() for i in range(5)})
+
+    seed()
+    return seed
+
+
+def test_is_locked_out(benchmark, redis, recent_failures):
+    """Lockout check on every API request and before each device connection."""
+    assert benchmark(_is_locked_out, _LOCKOUT_KEY, redis) is False
+
+
+def test_is_locked_out_report_failure(benchmark, redis, recent_failures):
+    """Recording a failed login or connection, then checking the window."""
+    benchmark.pedantic(_is_locked_out, (_LOCKOUT_KEY, redis, True), setup=recent_failures, rounds=2000)
+
+
+def test_circuit_breaker_call(benchmark, redis):
+    """A call through a closed breaker, reading and resetting its state in Redis."""
+    breaker = pybreaker.CircuitBreaker(
+        fail_max=5, reset_timeout=60, state_storage=RedisCircuitBreakerStorage("device_bench", redis)
+    )
+    assert benchmark(breaker.call, lambda: "output") == "output"
+
+
+def test_circuit_breaker_storage_failure(benchmark, redis):
+    """Counting a connection failure against a device's breaker."""
+    storage = RedisCircuitBreakerStorage("device_bench_failure", redis)
+
+    def record_failure() -> int:
+        storage.increment_counter()
+        return storage.counter
+
+    assert benchmark(record_failure) > 0
+
+
+@pytest.fixture
+def connection_pool():
+    pool = ConnectionPool()
+    pool.set_salt("benchsalt")
+    return pool
+
+
+def test_connection_pool_hit(benchmark, connection_pool):
+    """Taking a pooled connection for a job and handing it back afterwards."""
+    args = ("192.0.2.1", 22, "benchuser", "benchpass", "cisco_ios")
+    connection_pool.release(*args, _Connection())
+
+    def get_release() -> None:
+        connection = connection_pool.get(*args)
+        connection_pool.release(*args, connection)
+
+    benchmark(get_release)
+
+
+def test_connection_pool_miss(benchmark, connection_pool):
+    """Looking up a device with no pooled connection."""
+    assert benchmark(connection_pool.get, "192.0.2.1", 22, "benchuser", "benchpass", "cisco_ios") is None
+
+
+def test_emit_audit_event(benchmark, app):
+    """Schema check and structured log record for an audit event, through the app's JSON log handler."""
+    benchmark(
+        emit_audit_event,
+        "job.submitted",
+        ip="192.0.2.1",
+        platform="cisco_ios",
+        port=22,
+        command_count=2,
+        user_hash="0" * 128,
+        request_id="00000000-0000-4000-8000-000000000000",
+    )
@@ -3,6 +3,9 @@ from unittest.mock import MagicMock, patch
 import pytest
 from fakeredis import FakeStrictRedis
 
+from naas.library.fleet import REFRESH_LOCK_KEY, SNAPSHOT_KEY
+from naas.library.worker_status import WORKER_STATUS_KEY
+
 
 @pytest.fixture
 def fake_redis():
@@ -10,12 +13,24 @@ def fake_redis():
     return FakeStrictRedis()
 
 
+def _empty_lane() -> MagicMock:
+    """Mock RQ queue for a priority lane with no jobs."""
+    lane = MagicMock()
+    lane.__len__.return_value = 0
+    lane.get_job_ids.return_value = []
+    return lane
+
+
 @pytest.fixture
 def app():
     """Provide Flask app for testing."""
-    # Mock Redis and RQ before importing app
-    with patch("naas.config.Redis", return_value=FakeStrictRedis()):
-        with patch("naas.config.Queue") as mock_queue:
+    # Mock Redis and RQ before importing app. The app and its Redis are shared across tests,
+    # so rate limiting is disabled here and enabled by the tests that cover it.
+    with patch("naas.library.redis_client.Redis", return_value=FakeStrictRedis()):
+        with (
+            patch("naas.library.lanes.LaneQueue") as mock_queue,
+            patch("naas.library.validation.RATE_LIMIT_ENABLED", False),
+        ):
             mock_job = MagicMock()
             mock_job.id = "test-job-id"
             mock_job.meta = {}
@@ -32,7 +47,14 @@ def app():
             from naas.app import app as flask_app
 
             flask_app.config["TESTING"] = True
+            # Don't carry the fleet snapshot shared between API processes over from other tests
+            flask_app.config["redis"].delete(SNAPSHOT_KEY, REFRESH_LOCK_KEY, WORKER_STATUS_KEY)
             flask_app.config["q"] = mock_queue.return_value
+            flask_app.config["queues"] = {
+                "high": _empty_lane(),
+                "normal": mock_queue.return_value,
+                "low": _empty_lane(),
+            }
             yield flask_app
 
 
@@ -0,0 +1,13 @@
+"""
+In-process fake network devices for tests and benchmarks, without Docker or a network.
+
+FakeDevice runs a paramiko SSH server on a local port that Netmiko can drive like an
+IOS, NX-OS or EOS device, with latency, output size, auth delay, session limits and
+failures set by a Behavior. Run `python -m tests.fake_device --help` to serve devices
+from the command line.
+"""
+
+from tests.fake_device.platforms import PLATFORMS, Platform
+from tests.fake_device.server import Behavior, FakeDevice, Stats
+
+__all__ = ["PLATFORMS", "Behavior", "FakeDevice", "Platform", "Stats"]
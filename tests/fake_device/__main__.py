@@ -0,0 +1,59 @@
+"""
+Serve fake devices until interrupted, on consecutive ports like cisshgo's listeners.
+
+Usage:
+    python -m tests.fake_device --platform cisco_ios --port 10022 --devices 10 --latency 0.05
+"""
+
+import argparse
+import threading
+
+from tests.fake_device import PLATFORMS, Behavior, FakeDevice
+
+
+def main() -> None:
+    argparser = argparse.ArgumentParser(description="Serve fake SSH network devices.")
+    argparser.add_argument("--platform", choices=sorted(PLATFORMS), default="cisco_ios", help="CLI to emulate")
+    argparser.add_argument("--host", default="127.0.0.1", help="Address to listen on")
+    argparser.add_argument("--port", type=int, default=10022, help="Port of the first device")
+    argparser.add_argument("--devices", type=int, default=1, help="Number of devices, on consecutive ports")
+    argparser.add_argument("--username", default="admin", help="Login username")
+    argparser.add_argument("--password", default="admin", help="Login password")
+    argparser.add_argument("--latency", type=float, default=0.0, help="Seconds before each command's output")
+    argparser.add_argument("--output-size", type=int, default=0, help="Pad show output to this many bytes")
+    argparser.add_argument("--auth-delay", type=float, default=0.0, help="Seconds to check a password")
+    argparser.add_argument("--max-sessions", type=int, default=0, help="Concurrent sessions per device (0: unlimited)")
+    argparser.add_argument("--drop-rate", type=float, default=0.0, help="Chance a command drops the session")
+    argparser.add_argument("--hang", action="append", default=[], help="Command that never answers (repeatable)")
+    args = argparser.parse_args()
+
+    behavior = Behavior(
+        latency=args.latency,
+        output_size=args.output_size,
+        auth_delay=args.auth_delay,
+        max_sessions=args.max_sessions,
+        drop_rate=args.drop_rate,
+        hang_commands=frozenset(args.hang),
+    )
+    devices = [
+        FakeDevice(
+            args.platform,
+            behavior,
+            host=args.host,
+            port=args.port + i,
+            username=args.username,
+            password=args.password,
+            hostname=f"fake-device-{i + 1}",
+        ).start()
+        for i in range(args.devices)
+    ]
+    print(f"Serving {args.devices} {args.platform} device(s) on {args.host}:{args.port}-{args.port + args.devices - 1}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        for device in devices:
+            device.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""CLI profiles for the platforms the fake device can emulate: prompts, session setup replies and canned output."""
+
+from dataclasses import dataclass, field
+
+_IOS_SHOW_VERSION = """\
+Cisco IOS Software, C2960X Software (C2960X-UNIVERSALK9-M), Version 15.2(4)E10, RELEASE SOFTWARE (fc2)
+Technical Support: http://www.cisco.com/techsupport
+Copyright (c) 1986-2020 by Cisco Systems, Inc.
+
+ROM: Bootstrap program is C2960X boot loader
+BOOTLDR: C2960X Boot Loader (C2960X-HBOOT-M) Version 15.2(4r)E5, RELEASE SOFTWARE (fc4)
+
+{hostname} uptime is 1 year, 2 weeks, 3 days, 4 hours, 5 minutes
+System returned to ROM by power-on
+System image file is "flash:c2960x-universalk9-mz.152-4.E10.bin"
+
+cisco WS-C2960X-48FPD-L (APM86XXX) processor (revision B0) with 524288K bytes of memory.
+Processor board ID FOC1234X5YZ
+Last reset from power-on
+1 Virtual Ethernet interface
+52 Gigabit Ethernet interfaces
+The password-recovery mechanism is enabled.
+
+512K bytes of flash-simulated non-volatile configuration memory.
+Base ethernet MAC Address       : 00:11:22:33:44:55
+Motherboard assembly number     : 73-16286-05
+Model number                    : WS-C2960X-48FPD-L
+System serial number            : FOC1234X5YZ
+
+Configuration register is 0xF
+"""
+
+_IOS_SHOW_IP_INT_BRIEF = """\
+Interface              IP-Address      OK? Method Status                Protocol
+Vlan1                  192.0.2.10      YES NVRAM  up                    up
+GigabitEthernet0/1     unassigned      YES unset  up                    up
+GigabitEthernet0/2     unassigned      YES unset  down                  down
+GigabitEthernet0/3     unassigned      YES unset  administratively down down
+"""
+
+_NXOS_SHOW_VERSION = """\
+Cisco Nexus Operating System (NX-OS) Software
+TAC support: http://www.cisco.com/tac
+Copyright (C) 2002-2021, Cisco and/or its affiliates.
+
+Software
+  BIOS: version 05.45
+  NXOS: version 9.3(8)
+
+Hardware
+  cisco Nexus9000 C93180YC-EX chassis
+  Intel(R) Xeon(R) CPU  @ 1.80GHz with 24632252 kB of memory.
+  Processor Board ID FDO12345678
+
+  Device name: {hostname}
+  bootflash: 53298520 kB
+
+Kernel uptime is 123 day(s), 4 hour(s), 5 minute(s), 6 second(s)
+"""
+
+_NXOS_SHOW_IP_INT_BRIEF = """\
+IP Interface Status for VRF "default"(1)
+Interface            IP Address      Interface Status
+Vlan10               192.0.2.10      protocol-up/link-up/admin-up
+Lo0                  198.51.100.1    protocol-up/link-up/admin-up
+"""
+
+_EOS_SHOW_VERSION = """\
+Arista DCS-7050SX3-48YC8-R
+Hardware version: 11.00
+Serial number: JPE12345678
+Hardware MAC address: 0011.2233.4455
+System MAC address: 0011.2233.4455
+
+Software image version: 4.27.3F
+Architecture: x86_64
+Internal build version: 4.27.3F-26379303.4273F
+Internal build ID: 2a2fdb63-a0b3-4e2c-8a1f-5b7f1a2b3c4d
+
+Uptime: 12 weeks, 3 days, 4 hours and 5 minutes
+Total memory: 8099732 kB
+Free memory: 5312248 kB
+"""
+
+_EOS_SHOW_IP_INT_BRIEF = """\
+                                                                        Address
+Interface       IP Address          Status     Protocol          MTU    Owner
+--------------- ------------------- ---------- ------------- ---------- -------
+Ethernet1       192.0.2.10/31       up         up               1500
+Loopback0       198.51.100.1/32     up         up              65535
+"""
+
+
+@dataclass(frozen=True)
+class Platform:
+    """How a platform's CLI looks and answers the commands Netmiko sends while setting up a session."""
+
+    name: str
+    config_command: str = "configure terminal"
+    config_prompt: str = "(config)#"
+    save_command: str = "write mem"
+    save_output: str = "Building configuration...\n[OK]"
+    invalid_input: str = "% Invalid input detected at '^' marker."
+    # Replies to session setup commands (terminal width, paging) that print something
+    setup_replies: dict[str, str] = field(default_factory=dict)
+    outputs: dict[str, str] = field(default_factory=dict)
+
+
+PLATFORMS = {
+    platform.name: platform
+    for platform in (
+        Platform(
+            name="cisco_ios",
+            outputs={"show version": _IOS_SHOW_VERSION, "show ip interface brief": _IOS_SHOW_IP_INT_BRIEF},
+        ),
+        Platform(
+            name="cisco_nxos",
+            save_command="copy running-config startup-config",
+            save_output="[########################################] 100%\nCopy complete.",
+            invalid_input="% Invalid command at '^' marker.",
+            outputs={"show version": _NXOS_SHOW_VERSION, "show ip interface brief": _NXOS_SHOW_IP_INT_BRIEF},
+        ),
+        Platform(
+            name="arista_eos",
+            save_command="copy running-config startup-config",
+            save_output="Copy completed successfully.",
+            invalid_input="% Invalid input",
+            setup_replies={
+                "terminal width 511": "Width set to 511 columns.",
+                "terminal length 0": "Pagination disabled.",
+            },
+            outputs={"show version": _EOS_SHOW_VERSION, "show ip interface brief": _EOS_SHOW_IP_INT_BRIEF},
+        ),
+    )
+}
@@ -0,0 +1,307 @@
+"""
+A fake network device: a paramiko SSH server speaking an IOS, NX-OS or EOS style CLI.
+
+It answers what Netmiko sends (session setup, prompt detection, show commands, config
+mode, saving) with canned output, and can be made slow or unreliable through Behavior.
+"""
+
+import logging
+import random
+import re
+import socket
+import threading
+import time
+from dataclasses import dataclass, field
+from functools import cache
+
+import paramiko
+
+from tests.fake_device.platforms import PLATFORMS, Platform
+
+_NEWLINE = re.compile(r"\r\n|\r|\n")
+
+# Server side transport errors (mostly clients disconnecting) are expected; keep them off stderr
+logger = logging.getLogger("tests.fake_device")
+logger.addHandler(logging.NullHandler())
+
+
+@dataclass
+class Behavior:
+    """How the device performs and fails. The defaults answer instantly and never fail."""
+
+    latency: float = 0.0  # Seconds before each command's output
+    command_latency: dict[str, float] = field(default_factory=dict)  # Per-command overrides of latency
+    output_size: int = 0  # Pad show command output to at least this many bytes
+    banner_delay: float = 0.0  # Seconds before the SSH handshake starts, to trigger connect timeouts
+    auth_delay: float = 0.0  # Seconds to check a password
+    max_sessions: int = 0  # Concurrent sessions allowed (VTY lines), 0 for unlimited
+    drop_rate: float = 0.0  # Chance that a command drops the session instead of answering
+    hang_commands: frozenset[str] = frozenset()  # Commands that never answer, to trigger read timeouts
+    invalid_commands: frozenset[str] = frozenset()  # Commands (in either mode) rejected as invalid input
+    page_length: int = 24  # Lines per page until paging is disabled with "terminal length 0"
+
+
+@dataclass
+class Stats:
+    """Counters for what the device has seen, e.g. to check session reuse or limits."""
+
+    sessions: int = 0  # Sessions accepted
+    rejected: int = 0  # Connections closed because max_sessions were open
+    active: int = 0
+    peak_active: int = 0
+    commands: int = 0
+
+
+@cache
+def _host_key() -> paramiko.PKey:
+    """Host key shared by every fake device in the process (ECDSA, as it is quick to generate)."""
+    return paramiko.ECDSAKey.generate()
+
+
+def _matches(typed: str, command: str) -> bool:
+    """Whether typed is command, or an abbreviation of each of its words ("sh ip int br")."""
+    typed_words, words = typed.split(), command.split()
+    return len(typed_words) == len(words) and all(w.startswith(t) for t, w in zip(typed_words, words, strict=True))
+
+
+class FakeDevice:
+    """
+    An SSH server on a local port emulating one network device.
+
+    Use it as a context manager, or call start() and stop():
+
+        with FakeDevice("cisco_ios", Behavior(latency=0.05)) as device:
+            ConnectHandler(device_type="cisco_ios", host=device.host, port=device.port, ...)
+    """
+
+    def __init__(
+        self,
+        platform: str = "cisco_ios",
+        behavior: Behavior | None = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        username: str = "admin",
+        password: str = "admin",
+        hostname: str = "fake-device",
+    ) -> None:
+        self.platform: Platform = PLATFORMS[platform]
+        self.behavior = behavior or Behavior()
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.hostname = hostname
+        self.running_config: list[str] = []
+        self.stats = Stats()
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._listener: socket.socket | None = None
+
+    def __enter__(self) -> "FakeDevice":
+        return self.start()
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.stop()
+
+    def start(self) -> "FakeDevice":
+        """Start listening; with port 0 a free port is picked and stored in self.port."""
+        self._listener = socket.create_server((self.host, self.port))
+        self._listener.settimeout(0.2)
+        self.port = self._listener.getsockname()[1]
+        threading.Thread(target=self._accept, name=f"fake-device-{self.port}", daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        """Stop accepting connections. Open sessions end as their clients disconnect."""
+        self._stopped.set()
+        if self._listener is not None:
+            self._listener.close()
+
+    def _accept(self) -> None:
+        while not self._stopped.is_set():
+            try:
+                sock, _ = self._listener.accept()  # type: ignore[union-attr]
+            except TimeoutError:
+                continue
+            except OSError:
+                return  # Listener closed
+            threading.Thread(target=self._serve, args=(sock,), daemon=True).start()
+
+    def _serve(self, sock: socket.socket) -> None:
+        """Run one SSH connection, holding a session slot for its lifetime."""
+        with self._lock:
+            if self.behavior.max_sessions and self.stats.active >= self.behavior.max_sessions:
+                self.stats.rejected += 1
+                sock.close()
+                return
+            self.stats.sessions += 1
+            self.stats.active += 1
+            self.stats.peak_active = max(self.stats.peak_active, self.stats.active)
+
+        time.sleep(self.behavior.banner_delay)
+        transport = paramiko.Transport(sock)
+        transport.set_log_channel(f"{logger.name}.transport")
+        try:
+            transport.add_server_key(_host_key())
+            server = _SSHServer(self)
+            transport.start_server(server=server)
+            channel = transport.accept(timeout=10)
+            if channel is not None and server.shell_requested.wait(10):
+                _Session(self, channel).run()
+        except (paramiko.SSHException, EOFError, OSError):
+            pass  # Client went away
+        finally:
+            transport.close()
+            with self._lock:
+                self.stats.active -= 1
+
+
+class _SSHServer(paramiko.ServerInterface):
+    """Password authentication and a single interactive shell channel."""
+
+    def __init__(self, device: FakeDevice) -> None:
+        self.device = device
+        self.shell_requested = threading.Event()
+
+    def get_allowed_auths(self, username: str) -> str:
+        return "password"
+
+    def check_auth_password(self, username: str, password: str) -> int:
+        time.sleep(self.device.behavior.auth_delay)
+        if username == self.device.username and password == self.device.password:
+            return paramiko.AUTH_SUCCESSFUL
+        return paramiko.AUTH_FAILED
+
+    def check_channel_request(self, kind: str, chanid: int) -> int:
+        if kind == "session":
+            return paramiko.OPEN_SUCCEEDED
+        return paramiko.OPEN_FAILED_ADMINISTRATIVELY_PROHIBITED
+
+    def check_channel_pty_request(self, *args: object) -> bool:
+        return True
+
+    def check_channel_shell_request(self, channel: paramiko.Channel) -> bool:
+        self.shell_requested.set()
+        return True
+
+
+class _Session:
+    """The CLI on one shell channel: echo each line, run it and print the prompt."""
+
+    def __init__(self, device: FakeDevice, channel: paramiko.Channel) -> None:
+        self.device = device
+        self.platform = device.platform
+        self.behavior = device.behavior
+        self.channel = channel
+        self.config_mode = False
+        self.paging = True
+
+    def prompt(self) -> str:
+        return self.device.hostname + (self.platform.config_prompt if self.config_mode else "#")
+
+    def send(self, text: str) -> None:
+        self.channel.sendall(text.replace("\n", "\r\n").encode())
+
+    def run(self) -> None:
+        self.send(f"\n{self.prompt()}")
+        buffer = ""
+        while True:
+            data = self.channel.recv(4096)
+            if not data:
+                return
+            buffer += data.decode(errors="replace")
+            *lines, buffer = _NEWLINE.split(buffer)
+            for line in lines:
+                if not self.handle(line.strip()):
+                    self.channel.close()
+                    return
+
+    def handle(self, line: str) -> bool:
+        """Answer one line of input. Returns False when the session should end."""
+        self.send(line + "\n")
+        if not line:
+            self.send(self.prompt())
+            return True
+
+        with self.device._lock:
+            self.device.stats.commands += 1
+        if any(_matches(line, command) for command in self.behavior.hang_commands):
+            while not self.channel.closed:
+                time.sleep(0.1)
+            return False
+        if random.random() < self.behavior.drop_rate:
+            return False
+        time.sleep(self.behavior.command_latency.get(line, self.behavior.latency))
+
+        if not self.config_mode and line in ("exit", "logout", "quit"):
+            return False
+        output = self.execute(line)
+        if output:
+            self.send_paged(output.rstrip("\n") + "\n")
+        self.send(self.prompt())
+        return True
+
+    def execute(self, line: str) -> str:
+        """Return a command's output, updating the session and device state."""
+        if any(_matches(line, command) for command in self.behavior.invalid_commands):
+            return f"{' ' * len(self.prompt())}^\n{self.platform.invalid_input}\n"
+        if line.startswith("terminal "):
+            if _matches(line, "terminal length 0"):
+                self.paging = False
+            return self.platform.setup_replies.get(line, "")
+        if self.config_mode:
+            if line in ("end", "exit"):
+                self.config_mode = False
+            else:
+                with self.device._lock:
+                    self.device.running_config.append(line)
+            return ""
+        if _matches(line, self.platform.config_command):
+            self.config_mode = True
+            return "Enter configuration commands, one per line.  End with CNTL/Z."
+        if line == "enable":
+            return ""  # Sessions start privileged
+        if _matches(line, self.platform.save_command):
+            return self.platform.save_output
+        if _matches(line, "show running-config"):
+            return self.pad(self.running_config_text())
+        for command, output in self.platform.outputs.items():
+            if _matches(line, command):
+                return self.pad(output.format(hostname=self.device.hostname))
+        if line.startswith("sh") and self.behavior.output_size:
+            return self.pad("")
+        return f"{' ' * len(self.prompt())}^\n{self.platform.invalid_input}\n"
+
+    def running_config_text(self) -> str:
+        with self.device._lock:
+            config = list(self.device.running_config)
+        return "\n".join(
+            ["Building configuration...", "", "!", f"hostname {self.device.hostname}", "!", *config, "end"]
+        )
+
+    def pad(self, output: str) -> str:
+        """Pad show output with filler lines up to the configured output size."""
+        missing = self.behavior.output_size - len(output)
+        if missing <= 0:
+            return output
+        filler = "".join(
+            f" filler line {i:08d} padding the output of this command to size\n" for i in range(missing // 64 + 1)
+        )
+        return output + filler
+
+    def send_paged(self, output: str) -> None:
+        """Send output a page at a time, waiting for a key at each --More-- until paging is disabled."""
+        lines = output.splitlines(keepends=True)
+        if not self.paging or len(lines) <= self.behavior.page_length:
+            self.send(output)
+            return
+        for start in range(0, len(lines), self.behavior.page_length):
+            self.send("".join(lines[start : start + self.behavior.page_length]))
+            if start + self.behavior.page_length >= len(lines):
+                return
+            self.send(" --More-- ")
+            key = self.channel.recv(1)
+            self.send("\b" * 10 + " " * 10 + "\b" * 10)
+            if key in (b"", b"q"):
+                self.send("\n")
+                return
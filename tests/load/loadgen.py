@@ -0,0 +1,290 @@
+"""
+Load generator: drive a mix of requests at a target rate against a running NAAS stack and
+measure throughput and latency from submit to result.
+
+Start the integration stack with the load overrides (the worker supervisor, several
+cisshgo devices and no per-user rate limit), or let `invoke load` do it:
+
+    docker compose -f tests/integration/docker-compose.test.yml -f tests/load/docker-compose.load.yml up -d --build
+
+Requests are issued open-loop at --rate per second, picked from --mix by weight:
+send_command, send_command_structured and send_config submit a job to one of the
+cisshgo devices and poll it until it finishes; get_results re-reads a finished job;
+list_jobs lists the first page of jobs. Queue wait and execution time are read from the
+jobs' RQ timestamps in Redis.
+
+Usage:
+    python tests/load/loadgen.py --rate 20 --duration 60 --output load.json
+    python tests/load/loadgen.py --mix send_command=3,list_jobs=1 --compare load.json
+"""
+
+import argparse
+import json
+import random
+import statistics
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import requests
+import urllib3
+from redis import Redis
+from rq.utils import utcparse
+
+urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+SUBMIT_KINDS = ("send_command", "send_command_structured", "send_config")
+READ_KINDS = ("get_results", "list_jobs")
+DEFAULT_MIX = "send_command=6,send_command_structured=2,send_config=1,get_results=2,list_jobs=1"
+
+_PAYLOADS = {
+    "send_command": {"commands": ["show version"]},
+    "send_command_structured": {"commands": ["show ip interface brief"]},
+    "send_config": {"config": ["interface Loopback0", "description load test"]},
+}
+_METRICS = ("submit_latency", "queue_wait", "execution", "time_to_result")
+
+
+class LoadGenerator:
+    """Issues the request mix and collects a record per request."""
+
+    def __init__(self, args: argparse.Namespace) -> None:
+        self.args = args
+        self.mix = _parse_mix(args.mix)
+        self.redis = Redis.from_url(args.redis) if args.redis else None
+        self.records: list[dict] = []
+        self.finished: list[tuple[str, str]] = []  # (kind, job_id) of jobs whose results can be re-read
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._random = random.Random(args.seed)
+        self._device = 0
+        self.lag: list[float] = []  # Seconds each request started behind schedule
+
+    def _session(self) -> requests.Session:
+        """Return this thread's HTTP session, so connections are reused."""
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = requests.Session()
+            session.auth = (self.args.username, self.args.password)
+            session.verify = False
+        return session
+
+    def _record(self, record: dict) -> None:
+        with self._lock:
+            self.records.append(record)
+
+    def _next_port(self) -> int:
+        with self._lock:
+            self._device = (self._device + 1) % self.args.devices
+            return self.args.device_port + self._device
+
+    def submit(self, kind: str) -> None:
+        """Submit a job and poll until it finishes, recording its timings."""
+        payload = {
+            "ip": self.args.device_ip,
+            "port": self._next_port(),
+            "platform": "cisco_ios",
+            **_PAYLOADS[kind],
+        }
+        record: dict = {"kind": kind}
+        start = time.perf_counter()
+        try:
+            r = self._session().post(f"{self.args.url}/v1/{kind}", json=payload, timeout=30)
+        except requests.RequestException as e:
+            self._record({**record, "status": "error", "error": str(e)})
+            return
+        record["submit_latency"] = time.perf_counter() - start
+        if r.status_code != 202:
+            self._record({**record, "status": f"http_{r.status_code}"})
+            return
+        job_id = record["job_id"] = r.json()["job_id"]
+
+        deadline = start + self.args.timeout
+        polls = 0
+        status = "timed_out"
+        while time.perf_counter() < deadline:
+            time.sleep(self.args.poll_interval)
+            polls += 1
+            try:
+                r = self._session().get(f"{self.args.url}/v1/{kind}/{job_id}", timeout=30)
+            except requests.RequestException:
+                continue
+            if r.status_code == 200 and r.json()["status"] in ("finished", "failed"):
+                record["time_to_result"] = time.perf_counter() - start
+                status = r.json()["status"]
+                break
+        record.update(status=status, polls=polls, **self._job_timings(job_id))
+        self._record(record)
+        if status == "finished":
+            with self._lock:
+                self.finished.append((kind, job_id))
+
+    def _job_timings(self, job_id: str) -> dict:
+        """Read a job's queue wait and execution time from its RQ timestamps."""
+        if self.redis is None:
+            return {}
+        enqueued, started, ended = self.redis.hmget(f"rq:job:{job_id}", "enqueued_at", "started_at", "ended_at")
+        if not (enqueued and started and ended):
+            return {}
+        enqueued_at, started_at, ended_at = (utcparse(ts.decode()) for ts in (enqueued, started, ended))
+        return {
+            "queue_wait": (started_at - enqueued_at).total_seconds(),
+            "execution": (ended_at - started_at).total_seconds(),
+        }
+
+    def read(self, kind: str) -> None:
+        """Issue a get_results or list_jobs request, recording its latency."""
+        if kind == "get_results":
+            with self._lock:
+                if not self.finished:
+                    return  # Nothing to re-read yet
+                job_kind, job_id = self._random.choice(self.finished)
+            url = f"{self.args.url}/v1/{job_kind}/{job_id}"
+        else:
+            url = f"{self.args.url}/v1/jobs?per_page=20"
+        start = time.perf_counter()
+        try:
+            r = self._session().get(url, timeout=30)
+        except requests.RequestException as e:
+            self._record({"kind": kind, "status": "error", "error": str(e)})
+            return
+        self._record({"kind": kind, "status": r.status_code, "latency": time.perf_counter() - start})
+
+    def _dispatch(self, kind: str, due: float) -> None:
+        """Run one request, noting how late it started against the schedule."""
+        with self._lock:
+            self.lag.append(max(time.perf_counter() - due, 0.0))
+        if kind in SUBMIT_KINDS:
+            self.submit(kind)
+        else:
+            self.read(kind)
+
+    def run(self) -> float:
+        """Issue requests at the target rate for the run's duration. Returns the wall time taken."""
+        kinds, weights = zip(*self.mix.items(), strict=True)
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.args.concurrency) as pool:
+            for i in range(int(self.args.rate * self.args.duration)):
+                due = start + i / self.args.rate
+                time.sleep(max(due - time.perf_counter(), 0))
+                pool.submit(self._dispatch, self._random.choices(kinds, weights)[0], due)
+        return time.perf_counter() - start
+
+
+def _parse_mix(mix: str) -> dict[str, float]:
+    """Parse "kind=weight,..." into a dict, checking the kinds."""
+    parsed = {kind: float(weight) for kind, weight in (item.split("=", 1) for item in mix.split(","))}
+    unknown = set(parsed) - set(SUBMIT_KINDS) - set(READ_KINDS)
+    if unknown:
+        raise SystemExit(f"Unknown request kinds in --mix: {', '.join(sorted(unknown))}")
+    return parsed
+
+
+def _summarise(values: list[float]) -> dict:
+    """Count, mean and percentiles of a list of durations, in milliseconds."""
+    if not values:
+        return {"count": 0}
+    ms = sorted(v * 1000 for v in values)
+    centiles = statistics.quantiles(ms, n=100, method="inclusive") if len(ms) > 1 else ms * 99
+    return {
+        "count": len(ms),
+        "mean": round(statistics.fmean(ms), 2),
+        "p50": round(centiles[49], 2),
+        "p95": round(centiles[94], 2),
+        "p99": round(centiles[98], 2),
+        "max": round(ms[-1], 2),
+    }
+
+
+def report(records: list[dict], lag: list[float], elapsed: float, args: argparse.Namespace) -> dict:
+    """Summarise the run's records."""
+    jobs = [r for r in records if "job_id" in r]
+    results = [r for r in jobs if "time_to_result" in r]
+    statuses = Counter(f"{r['kind']}:{r['status']}" for r in records)
+    # Throughput runs from the first submit to the last result, including the drain after submitting stops
+    return {
+        "config": {k: v for k, v in vars(args).items() if k not in ("password", "output", "compare")},
+        "elapsed_s": round(elapsed, 2),
+        "jobs_submitted": len(jobs),
+        "jobs_completed": len(results),
+        "jobs_per_sec": round(len(results) / elapsed, 2),
+        "statuses": dict(sorted(statuses.items())),
+        **{metric: _summarise([r[metric] for r in jobs if metric in r]) for metric in _METRICS},
+        "time_to_result_by_kind": {
+            kind: _summarise([r["time_to_result"] for r in results if r["kind"] == kind])
+            for kind in SUBMIT_KINDS
+            if any(r["kind"] == kind for r in results)
+        },
+        "request_latency": {
+            kind: _summarise([r["latency"] for r in records if r["kind"] == kind and "latency" in r])
+            for kind in READ_KINDS
+        },
+        "schedule_lag": _summarise(lag),
+    }
+
+
+def print_report(summary: dict, baseline: dict | None) -> None:
+    """Print the summary, with the change against a baseline run if one is given."""
+    print(
+        f"\n{summary['jobs_completed']}/{summary['jobs_submitted']} jobs completed in {summary['elapsed_s']}s: "
+        f"{summary['jobs_per_sec']} jobs/sec" + (f" (baseline {baseline['jobs_per_sec']})" if baseline else "")
+    )
+    print("  " + ", ".join(f"{k}={v}" for k, v in summary["statuses"].items()))
+    rows = [(metric, summary[metric], baseline and baseline.get(metric)) for metric in _METRICS]
+    rows += [
+        (f"{kind} latency", stats, baseline and baseline["request_latency"].get(kind))
+        for kind, stats in summary["request_latency"].items()
+    ]
+    print(f"\n{'ms':<24} {'count':>7} {'p50':>10} {'p95':>10} {'p99':>10} {'max':>10}")
+    for name, stats, base in rows:
+        if not stats["count"]:
+            continue
+        print(f"{name:<24} {stats['count']:>7}", end="")
+        for p in ("p50", "p95", "p99", "max"):
+            change = f" {(stats[p] - base[p]) / base[p]:+.0%}" if base and base.get("count") and base[p] else ""
+            print(f" {stats[p]:>10.1f}{change}", end="")
+        print()
+    if summary["schedule_lag"].get("p99", 0) > 1000:
+        print("\nRequests started over a second behind schedule: raise --concurrency or lower --rate")
+
+
+def main() -> None:
+    argparser = argparse.ArgumentParser(description="Drive a request mix against NAAS and measure time to result.")
+    argparser.add_argument("--url", default="https://localhost:18443", help="NAAS API URL")
+    argparser.add_argument("--username", default="admin", help="API and device username")
+    argparser.add_argument("--password", default="admin", help="API and device password")
+    argparser.add_argument(
+        "--redis", default="redis://:test_password@localhost:16379", help="Redis URL, '' to skip job timings"
+    )
+    argparser.add_argument("--device-ip", default="240.11.2.100", help="cisshgo address as seen by the workers")
+    argparser.add_argument("--device-port", type=int, default=10022, help="First cisshgo listener port")
+    argparser.add_argument("--devices", type=int, default=10, help="Number of cisshgo listeners to spread jobs over")
+    argparser.add_argument("--rate", type=float, default=10, help="Requests per second")
+    argparser.add_argument("--duration", type=float, default=60, help="Seconds to issue requests for")
+    argparser.add_argument("--mix", default=DEFAULT_MIX, help=f"Request kinds and weights (default: {DEFAULT_MIX})")
+    argparser.add_argument(
+        "--concurrency", type=int, default=256, help="Requests allowed in flight, including polling jobs"
+    )
+    argparser.add_argument("--poll-interval", type=float, default=0.25, help="Seconds between result polls")
+    argparser.add_argument("--timeout", type=float, default=120, help="Seconds to wait for a job's result")
+    argparser.add_argument("--seed", type=int, default=0, help="Random seed for the request mix")
+    argparser.add_argument("--output", help="Write the summary as JSON to this file")
+    argparser.add_argument("--compare", help="Summary JSON from an earlier run to compare against")
+    args = argparser.parse_args()
+
+    baseline = json.loads(Path(args.compare).read_text()) if args.compare else None
+    generator = LoadGenerator(args)
+    print(f"Issuing {args.rate}/s for {args.duration}s against {args.url} with mix {args.mix}")
+    elapsed = generator.run()
+    summary = report(generator.records, generator.lag, elapsed, args)
+    print_report(summary, baseline)
+    if args.output:
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.output).write_text(json.dumps(summary, indent=2) + "\n")
+        print(f"\nWrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
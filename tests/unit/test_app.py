@@ -0,0 +1,76 @@
+"""Unit tests for the API process: what it imports, and its setup around gunicorn forking workers."""
+
+import json
+import os
+import subprocess
+import sys
+from unittest.mock import patch
+
+import netmiko
+from redis import Redis
+
+from naas.library.redis_client import redis_client
+from naas.models import NETMIKO_PLATFORMS
+
+# Import the app in a fresh interpreter, as a gunicorn worker does, and list the device libraries it loaded
+_IMPORT_APP = """
+import json, sys
+from unittest.mock import patch
+import fakeredis
+with patch("naas.library.redis_client.Redis", return_value=fakeredis.FakeStrictRedis()):
+    import naas.app
+print(json.dumps([name for name in ("netmiko", "paramiko", "pybreaker", "textfsm") if name in sys.modules]))
+"""
+
+
+def test_app_does_not_import_device_libraries():
+    """The API enqueues jobs by name, so importing it never loads netmiko or paramiko."""
+    result = subprocess.run([sys.executable, "-c", _IMPORT_APP], capture_output=True, text=True, check=True)
+    assert json.loads(result.stdout) == []
+
+
+def test_platform_snapshot_matches_netmiko():
+    """The platform snapshot shipped with the API matches the installed netmiko (invoke export-platforms)."""
+    assert NETMIKO_PLATFORMS == set(netmiko.platforms)
+
+
+def test_prepare_fork(app):
+    """Before gunicorn forks, the shared state is built in the master and its Redis connections closed."""
+    from naas.app import prepare_fork, spec
+
+    with patch.object(app.config["redis"].connection_pool, "disconnect") as disconnect:
+        prepare_fork()
+    disconnect.assert_called_once_with()
+    assert not app.url_map._remap
+    assert hasattr(spec, "_spec")
+
+
+def test_init_worker(app):
+    """A forked worker drops any Redis connections it inherited."""
+    from naas.app import init_worker
+
+    with patch.object(app.config["redis"].connection_pool, "reset") as reset:
+        init_worker()
+    reset.assert_called_once_with()
+
+
+def test_forked_worker_meters_its_pool(app, monkeypatch):
+    """A worker forked from the preloaded master meters the Redis pool it takes over."""
+    from naas.app import init_worker, prepare_fork
+
+    with patch("naas.library.redis_client.Redis", Redis):
+        redis = redis_client()
+    monkeypatch.setitem(app.config, "redis", redis)
+    prepare_fork()
+
+    read_end, write_end = os.pipe()
+    pid = os.fork()
+    if pid == 0:  # pragma: no cover  # The child's coverage isn't collected
+        try:
+            init_worker()
+            os.write(write_end, b"1" if redis.connection_pool.pool._metered else b"0")
+        finally:
+            os._exit(0)
+    os.waitpid(pid, 0)
+    assert os.read(read_end, 1) == b"1"
+    assert redis.connection_pool.pool._metered  # Still metered in the master, which created it
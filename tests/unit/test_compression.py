@@ -0,0 +1,129 @@
+"""Unit tests for response compression and conditional GETs."""
+
+import gzip
+from datetime import datetime
+from unittest.mock import MagicMock
+
+import brotli
+import pytest
+import zstandard
+from fakeredis import FakeStrictRedis
+
+from naas.library.compression import (
+    ENCODINGS,
+    cached_response,
+    compress,
+    json_response,
+    negotiate,
+    not_modified,
+    result_etag,
+)
+
+BODY = b'{"results":"' + b"interface GigabitEthernet0/1\n" * 100 + b'"}'
+
+
+def _unzstd(data: bytes) -> bytes:
+    return zstandard.ZstdDecompressor().decompressobj().decompress(data)  # Streamed frames have no content size
+
+
+DECOMPRESS = {"gzip": gzip.decompress, "br": brotli.decompress, "zstd": _unzstd}
+
+
+@pytest.fixture
+def job():
+    return MagicMock(id="job1", ended_at=datetime(2026, 2, 23, 12, 0, 5), meta={"timings": {"total": 1.5}})
+
+
+@pytest.mark.parametrize(
+    ("accept", "encoding"),
+    [("gzip, deflate, br, zstd", "zstd"), ("gzip, br", "br"), ("gzip;q=1.0, br;q=0.5", "gzip"), ("identity", None)],
+)
+def test_negotiate(app, accept, encoding):
+    """The client's quality values win; between equals, zstd is preferred over br over gzip."""
+    with app.test_request_context(headers={"Accept-Encoding": accept}):
+        assert negotiate() == encoding
+
+
+@pytest.mark.parametrize("encoding", ENCODINGS)
+def test_compress(encoding):
+    """Chunks are compressed into one stream."""
+    assert DECOMPRESS[encoding](compress([BODY[:100], BODY[100:]], encoding)) == BODY
+
+
+class TestResultEtag:
+    """Tests for result_etag."""
+
+    def test_stable(self, job):
+        assert result_etag(job, "raw") == result_etag(job, "raw")
+
+    def test_varies(self, job):
+        """The tag changes with the form of the results and the job's timings."""
+        raw = result_etag(job, "raw")
+        assert result_etag(job, "parsed") != raw
+        job.meta["timings"]["parse"] = 0.2
+        assert result_etag(job, "raw") != raw
+
+
+class TestNotModified:
+    """Tests for not_modified."""
+
+    @pytest.mark.parametrize("if_none_match", ['"abc"', '"abc-gzip"', 'W/"abc"', '"other", "abc"', "*"])
+    def test_match(self, app, if_none_match):
+        with app.test_request_context(headers={"If-None-Match": if_none_match}):
+            response = not_modified("abc")
+        assert response.status_code == 304
+        assert response.headers["Vary"] == "Accept-Encoding"
+        assert response.get_etag()[0] in ("abc", "abc-gzip")
+
+    @pytest.mark.parametrize("headers", [{}, {"If-None-Match": '"other"'}])
+    def test_no_match(self, app, headers):
+        with app.test_request_context(headers=headers):
+            assert not_modified("abc") is None
+
+
+class TestJsonResponse:
+    """Tests for json_response and cached_response."""
+
+    def test_identity(self, app):
+        """Without Accept-Encoding the body is sent as it is, tagged with the plain ETag."""
+        with app.test_request_context():
+            response = json_response([BODY], etag="abc")
+        assert response.get_data() == BODY
+        assert "Content-Encoding" not in response.headers
+        assert response.headers["ETag"] == '"abc"'
+        assert response.headers["Vary"] == "Accept-Encoding"
+
+    def test_small_body_not_compressed(self, app):
+        with app.test_request_context(headers={"Accept-Encoding": "gzip"}):
+            response = json_response([b"{}"], etag="abc")
+        assert response.get_data() == b"{}"
+        assert "Content-Encoding" not in response.headers
+        assert response.headers["ETag"] == '"abc"'
+
+    def test_compressed_and_cached(self, app):
+        """A compressed body gets the ETag suffixed with its encoding, and is cached for later requests."""
+        redis = FakeStrictRedis()
+        with app.test_request_context(headers={"Accept-Encoding": "gzip"}):
+            assert cached_response(redis, "abc") is None
+            response = json_response([BODY[:10], BODY[10:]], status=200, etag="abc", cache=(redis, 60))
+            cached = cached_response(redis, "abc")
+        assert response.headers["Content-Encoding"] == "gzip"
+        assert response.headers["ETag"] == '"abc-gzip"'
+        assert gzip.decompress(response.get_data()) == BODY
+        assert cached.get_data() == response.get_data()
+        assert cached.headers["ETag"] == '"abc-gzip"'
+        assert 0 < redis.ttl("naas_encoded_abc_gzip") <= 60
+
+    def test_identity_not_served_from_cache(self, app):
+        redis = FakeStrictRedis()
+        redis.set("naas_encoded_abc_gzip", b"compressed")
+        with app.test_request_context():
+            assert cached_response(redis, "abc") is None
+
+    def test_untagged_not_cached(self, app):
+        redis = FakeStrictRedis()
+        with app.test_request_context(headers={"Accept-Encoding": "zstd"}):
+            response = json_response([BODY], cache=(redis, 60))
+        assert _unzstd(response.get_data()) == BODY
+        assert "ETag" not in response.headers
+        assert redis.keys() == []
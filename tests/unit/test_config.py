@@ -15,7 +15,7 @@ class TestAppConfigure:
         """Invalid APP_ENVIRONMENT should default to 'dev'."""
         app = Flask(__name__)
         with patch.dict(os.environ, {"APP_ENVIRONMENT": "invalid"}):
-            with patch("naas.config.Redis") as mock_redis:
+            with patch("naas.library.redis_client.Redis") as mock_redis:
                 mock_redis.return_value = MagicMock()
                 app_configure(app)
                 assert app.config["APP_ENVIRONMENT"] == "dev"
@@ -24,7 +24,7 @@ class TestAppConfigure:
         """Dev environment should set LOG_LEVEL to DEBUG by default."""
         app = Flask(__name__)
         with patch.dict(os.environ, {"APP_ENVIRONMENT": "dev"}, clear=True):
-            with patch("naas.config.Redis") as mock_redis:
+            with patch("naas.library.redis_client.Redis") as mock_redis:
                 mock_redis.return_value = MagicMock()
                 app_configure(app)
                 assert app.config["LOG_LEVEL"] == "DEBUG"
@@ -33,7 +33,24 @@ class TestAppConfigure:
         """Production environment should set LOG_LEVEL to INFO by default."""
         app = Flask(__name__)
         with patch.dict(os.environ, {"APP_ENVIRONMENT": "production"}, clear=True):
-            with patch("naas.config.Redis") as mock_redis:
+            with patch("naas.library.redis_client.Redis") as mock_redis:
                 mock_redis.return_value = MagicMock()
                 app_configure(app)
                 assert app.config["LOG_LEVEL"] == "INFO"
+
+    def test_shards(self):
+        """Each of REDIS_SHARDS gets its own client and lanes; the main Redis keeps the app's own queues."""
+        app = Flask(__name__)
+        with (
+            patch("naas.config.REDIS_SHARDS", ["shard-0:6380", "shard-1"]),
+            patch("naas.library.redis_client.redis_client") as mock_redis_client,
+        ):
+            mock_redis_client.side_effect = lambda *args: MagicMock(name=":".join(args) or "main")
+            app_configure(app)
+
+        assert [call.args for call in mock_redis_client.call_args_list] == [(), ("shard-0", "6380"), ("shard-1",)]
+        shards = app.config["shards"]
+        assert [lanes["high"].name for lanes in shards] == ["naas_high", "naas_high"]
+        assert shards[1]["normal"].connection is shards[1]["low"].connection
+        shards[1]["normal"].connection.ping.assert_called_once()
+        assert app.config["q"].connection is app.config["redis"]
@@ -0,0 +1,65 @@
+"""Unit tests for the per-device session semaphore."""
+
+import time
+from unittest.mock import patch
+
+from fakeredis import FakeStrictRedis
+
+from naas.library.device_sessions import acquire_session, release_session, session_limit
+
+
+class TestSessionLimit:
+    """Tests for session_limit."""
+
+    def test_default(self):
+        """With no overrides the global default applies."""
+        with patch("naas.library.device_sessions.DEVICE_SESSION_LIMIT", 5):
+            assert session_limit("192.0.2.1", "cisco_ios") == 5
+
+    def test_ip_override_wins_over_platform(self):
+        """A per-IP override takes precedence over a per-platform one."""
+        limits = {"cisco_ios": 5, "192.0.2.1": 2}
+        with patch("naas.library.device_sessions.DEVICE_SESSION_LIMITS", limits):
+            assert session_limit("192.0.2.1", "cisco_ios") == 2
+            assert session_limit("192.0.2.2", "cisco_ios") == 5
+            assert session_limit("192.0.2.2", "juniper_junos") == 0
+            assert session_limit("192.0.2.2") == 0
+
+
+class TestAcquireSession:
+    """Tests for acquire_session and release_session."""
+
+    def test_acquire_up_to_limit(self):
+        """Slots are granted until the limit, then refused."""
+        redis = FakeStrictRedis()
+        granted = [acquire_session(redis, "192.0.2.1", f"job-{i}", 2, 60) for i in range(3)]
+        assert granted == [True, True, False]
+        # The refused attempt does not hold a slot
+        assert redis.zcard("naas_device_sessions_192.0.2.1") == 2
+
+    def test_limits_are_per_device(self):
+        """A full device does not affect another device."""
+        redis = FakeStrictRedis()
+        assert acquire_session(redis, "192.0.2.1", "a", 1, 60)
+        assert acquire_session(redis, "192.0.2.2", "b", 1, 60)
+
+    def test_release_frees_slot(self):
+        """Releasing a slot lets the next job in."""
+        redis = FakeStrictRedis()
+        assert acquire_session(redis, "192.0.2.1", "a", 1, 60)
+        assert not acquire_session(redis, "192.0.2.1", "b", 1, 60)
+        release_session(redis, "192.0.2.1", "a")
+        assert acquire_session(redis, "192.0.2.1", "b", 1, 60)
+
+    def test_expired_lease_reclaimed(self):
+        """Slots whose lease has passed (e.g. the worker died) are reclaimed."""
+        redis = FakeStrictRedis()
+        redis.zadd("naas_device_sessions_192.0.2.1", {"dead-job": time.time() - 1})
+        assert acquire_session(redis, "192.0.2.1", "a", 1, 60)
+
+    def test_key_ttl_follows_longest_lease(self):
+        """A shorter lease never shortens the key's TTL below an existing holder's lease."""
+        redis = FakeStrictRedis()
+        acquire_session(redis, "192.0.2.1", "long", 2, 600)
+        acquire_session(redis, "192.0.2.1", "short", 2, 60)
+        assert redis.ttl("naas_device_sessions_192.0.2.1") > 500
@@ -0,0 +1,127 @@
+"""Netmiko jobs run end to end against the in-process fake device."""
+
+from unittest.mock import patch
+
+import netmiko
+import paramiko
+import pytest
+from fakeredis import FakeStrictRedis
+
+from naas.library import circuit_breaker
+from naas.library.auth import Credentials
+from naas.library.connection_pool import ConnectionPool
+from naas.library.netmiko_lib import netmiko_send_command, netmiko_send_config
+from tests.fake_device import Behavior, FakeDevice
+
+CREDS = Credentials(username="admin", password="admin")
+
+
+@pytest.fixture(autouse=True)
+def isolated_state():
+    """A fresh connection pool, circuit breakers and Redis for each test."""
+    pool = ConnectionPool()
+    pool.set_salt("salt")
+    with (
+        patch("naas.library.netmiko_lib.pool", pool),
+        patch("naas.library.circuit_breaker._redis_client", FakeStrictRedis()),
+        patch.dict(circuit_breaker._circuit_breakers, clear=True),
+    ):
+        yield pool
+    pool.drain()
+
+
+def _connect(device: FakeDevice, **kwargs) -> netmiko.BaseConnection:
+    return netmiko.ConnectHandler(
+        device_type=device.platform.name,
+        host=device.host,
+        port=device.port,
+        username="admin",
+        password="admin",
+        fast_cli=True,
+        **kwargs,
+    )
+
+
+@pytest.mark.parametrize("platform", ["cisco_ios", "cisco_nxos", "arista_eos"])
+def test_send_command(platform):
+    """Commands, including abbreviated ones, return the platform's output."""
+    with FakeDevice(platform) as device:
+        results, error = netmiko_send_command(
+            "127.0.0.1", CREDS, platform, ["show version", "sh ip int br"], device.port
+        )
+    assert error is None
+    assert "version" in results["show version"].lower()
+    assert "192.0.2.10" in results["sh ip int br"]
+
+
+def test_send_config_and_save():
+    """Config lines are applied in config mode and saved."""
+    with FakeDevice("cisco_ios") as device:
+        results, error = netmiko_send_config(
+            "127.0.0.1", CREDS, "cisco_ios", ["interface Loopback0", "description test"], device.port, save_config=True
+        )
+    assert error is None
+    assert "fake-device(config)#description test" in results["config_set_output"]
+    assert device.running_config == ["interface Loopback0", "description test"]
+
+
+def test_invalid_config_rejected():
+    """A config line the device rejects fails the job without tripping the circuit breaker."""
+    with FakeDevice("cisco_ios", Behavior(invalid_commands=frozenset({"bogus command"}))) as device:
+        results, error = netmiko_send_config("127.0.0.1", CREDS, "cisco_ios", ["bogus command"], device.port)
+    assert results is None
+    assert "Invalid input" in error
+
+
+def test_pooled_connection_reused():
+    """A second job for the same device and credentials reuses the pooled session."""
+    with FakeDevice("cisco_ios") as device, patch("naas.library.netmiko_lib.CONNECTION_POOL_ENABLED", True):
+        netmiko_send_command("127.0.0.1", CREDS, "cisco_ios", ["show version"], device.port)
+        netmiko_send_command("127.0.0.1", CREDS, "cisco_ios", ["show version"], device.port)
+    assert device.stats.sessions == 1
+
+
+def test_wrong_password():
+    """Authentication failures are returned as the job's error."""
+    with FakeDevice("cisco_ios") as device:
+        results, error = netmiko_send_command(
+            "127.0.0.1", Credentials("admin", "wrong"), "cisco_ios", ["show version"], device.port
+        )
+    assert results is None
+    assert "Authentication" in error
+
+
+def test_session_limit():
+    """Connections past the device's session limit are closed before the SSH handshake."""
+    with FakeDevice("cisco_ios", Behavior(max_sessions=1)) as device:
+        held = _connect(device)
+        results, error = netmiko_send_command("127.0.0.1", CREDS, "cisco_ios", ["show version"], device.port)
+        held.disconnect()
+    assert results is None
+    assert "SSH protocol banner" in error
+    assert device.stats.rejected == 1
+
+
+def test_hung_command_times_out():
+    """A command that never answers runs into Netmiko's read timeout."""
+    with FakeDevice("cisco_ios", Behavior(hang_commands=frozenset({"show tech-support"}))) as device:
+        connection = _connect(device)
+        with pytest.raises(netmiko.ReadTimeout):
+            connection.send_command("show tech-support", read_timeout=0.5)
+        connection.remote_conn_pre.close()  # disconnect() would wait on the hung session's prompt
+
+
+def test_paging_until_disabled():
+    """Long output is paged at --More-- until "terminal length 0"."""
+    with FakeDevice("cisco_ios", Behavior(page_length=5)) as device:
+        client = paramiko.SSHClient()
+        client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+        client.connect(device.host, device.port, "admin", "admin", allow_agent=False, look_for_keys=False)
+        shell = client.invoke_shell()
+        shell.settimeout(5)
+        shell.send(b"show version\n")
+        output = b""
+        while b"--More--" not in output:
+            output += shell.recv(4096)
+        client.close()
+    assert output.count(b"\r\n") < 10
@@ -0,0 +1,131 @@
+"""Unit tests for the shared fleet snapshot."""
+
+import json
+import time
+from datetime import timedelta
+from unittest.mock import patch
+
+from fakeredis import FakeStrictRedis
+from rq import Queue
+from rq.utils import now
+
+from naas.library.fleet import REFRESH_LOCK_KEY, SNAPSHOT_KEY, fleet_snapshot, read_fleet
+from naas.library.worker_status import publish_status
+
+LANES = ("naas_high", "naas", "naas_low")
+
+
+def _depth(snapshot: dict) -> int:
+    return sum(lane["queued"] for lane in snapshot["lanes"].values())
+
+
+class TestReadFleet:
+    """Tests for reading the fleet from Redis."""
+
+    def test_read(self):
+        """Lane lengths, registry sizes, the oldest queued job's age and worker statuses are read."""
+        redis = FakeStrictRedis()
+        high = Queue("naas_high", connection=redis)
+        with patch("rq.queue.now", return_value=now() - timedelta(seconds=30)):
+            high.enqueue("os.getcwd")
+        high.enqueue("os.getcwd")
+        redis.zadd("rq:wip:naas", {"running-job": 1})
+        redis.zadd("rq:failed:naas_low", {"failed-job": 1})
+        publish_status(redis, "w1", "host-a", time.time(), 1, 60)
+
+        snapshot = read_fleet(redis, LANES)
+
+        assert list(snapshot["workers"]) == ["w1"]
+        assert snapshot["lanes"]["naas_high"]["queued"] == 2
+        assert 30 <= snapshot["lanes"]["naas_high"]["oldest_age"] < 35
+        assert snapshot["lanes"]["naas"] == {
+            "queued": 0,
+            "started": 1,
+            "deferred": 0,
+            "scheduled": 0,
+            "finished": 0,
+            "failed": 0,
+            "canceled": 0,
+            "oldest_age": 0.0,
+        }
+        assert snapshot["lanes"]["naas_low"]["failed"] == 1
+
+    def test_queued_job_without_hash(self):
+        """A queued ID whose job hash has expired doesn't break the age calculation."""
+        redis = FakeStrictRedis()
+        redis.rpush("rq:queue:naas", "gone")
+        assert read_fleet(redis, LANES)["lanes"]["naas"]["oldest_age"] == 0.0
+
+
+class TestFleetSnapshot:
+    """Tests for sharing the snapshot between API processes."""
+
+    def test_shared_until_expiry(self):
+        """Within FLEET_CACHE_TTL every process gets the snapshot from Redis without reading the fleet."""
+        redis = FakeStrictRedis()
+        assert _depth(fleet_snapshot(redis, LANES)) == 0
+        assert redis.exists(REFRESH_LOCK_KEY)
+
+        Queue("naas", connection=redis).enqueue("os.getcwd")
+        with patch("naas.library.fleet.read_fleet") as mock_read:
+            assert _depth(fleet_snapshot(redis, LANES)) == 0
+        mock_read.assert_not_called()
+
+    def test_one_refresher(self):
+        """Once the snapshot is old, the process taking the lock refreshes it; the others serve the old one."""
+        redis = FakeStrictRedis()
+        with patch("naas.library.fleet.time.time", return_value=time.time() - 10):
+            fleet_snapshot(redis, LANES)
+        redis.delete(REFRESH_LOCK_KEY)  # Expired
+        Queue("naas", connection=redis).enqueue("os.getcwd")
+
+        assert _depth(fleet_snapshot(redis, LANES)) == 1  # Elected
+        redis.set(SNAPSHOT_KEY, json.dumps({**json.loads(redis.get(SNAPSHOT_KEY)), "at": 0}))
+        with patch("naas.library.fleet.read_fleet") as mock_read:
+            assert _depth(fleet_snapshot(redis, LANES)) == 1  # Lock held: stale snapshot served
+        mock_read.assert_not_called()
+
+    def test_cold_start_while_locked(self):
+        """With nothing cached yet, a process that loses the election reads the fleet itself."""
+        redis = FakeStrictRedis()
+        redis.set(REFRESH_LOCK_KEY, 1)
+        Queue("naas", connection=redis).enqueue("os.getcwd")
+        assert _depth(fleet_snapshot(redis, LANES)) == 1
+        assert not redis.exists(SNAPSHOT_KEY)
+
+    def test_cache_disabled(self):
+        """With FLEET_CACHE_TTL at 0 every call reads Redis."""
+        redis = FakeStrictRedis()
+        with patch("naas.library.fleet.FLEET_CACHE_TTL", 0):
+            fleet_snapshot(redis, LANES)
+            Queue("naas", connection=redis).enqueue("os.getcwd")
+            assert _depth(fleet_snapshot(redis, LANES)) == 1
+        assert not redis.exists(SNAPSHOT_KEY)
+
+    def test_sharded(self):
+        """Each shard's lanes and workers are summed into one snapshot, kept on the main Redis."""
+        redis, shards = FakeStrictRedis(), [FakeStrictRedis(), FakeStrictRedis()]
+        with patch("rq.queue.now", return_value=now() - timedelta(seconds=30)):
+            Queue("naas", connection=shards[1]).enqueue("os.getcwd")
+        Queue("naas", connection=shards[0]).enqueue("os.getcwd")
+        shards[0].zadd("rq:failed:naas_low", {"failed-job": 1})
+        shards[1].zadd("rq:failed:naas_low", {"failed-job": 1})
+        publish_status(shards[0], "w1", "host-a", None, 0, 60)
+        publish_status(shards[1], "w2", "host-b", None, 0, 60)
+
+        snapshot = fleet_snapshot(redis, LANES, shards)
+
+        assert snapshot["lanes"]["naas"]["queued"] == 2
+        assert snapshot["lanes"]["naas"]["oldest_age"] >= 30
+        assert snapshot["lanes"]["naas_low"]["failed"] == 2
+        assert set(snapshot["workers"]) == {"w1", "w2"}
+        assert json.loads(redis.get(SNAPSHOT_KEY))["lanes"] == snapshot["lanes"]
+
+
+def test_healthcheck_and_metrics_share_snapshot(client):
+    """The health check and /metrics are served from one fleet read."""
+    with patch("naas.library.fleet.read_fleet", wraps=read_fleet) as mock_read:
+        client.get("/healthcheck")
+        client.get("/healthcheck")
+        client.get("/metrics")
+    mock_read.assert_called_once()
@@ -0,0 +1,59 @@
+"""Unit tests for API response JSON encoding."""
+
+import json
+from unittest.mock import patch
+
+import pytest
+
+from naas.library.json_response import JSONProvider, RawJSON, dumps, output_json
+
+DOC = {"results": RawJSON(b'{"show clock":[{"time":"12:00"}]}'), "status": "finished", "error": None}
+
+
+@pytest.fixture(params=["orjson", "json"])
+def encoder(request):
+    with patch("naas.library.json_response.JSON_ENCODER", request.param):
+        yield request.param
+
+
+def test_dumps(encoder):
+    """Both encoders produce the same document, with RawJSON values embedded."""
+    assert json.loads(dumps(DOC)) == {
+        "results": {"show clock": [{"time": "12:00"}]},
+        "status": "finished",
+        "error": None,
+    }
+
+
+def test_raw_json_passed_through():
+    """orjson writes RawJSON bytes into the output without decoding them."""
+    assert dumps({"results": RawJSON(b'{"a": 1}')}) == b'{"results":{"a": 1}}'
+
+
+def test_non_str_keys(encoder):
+    """Non-string keys are encoded as strings, as the stdlib encoder does."""
+    assert json.loads(dumps({1: "a"})) == {"1": "a"}
+
+
+def test_unserializable(encoder):
+    with pytest.raises(TypeError, match="object is not JSON serializable|Type is not JSON serializable"):
+        dumps({"a": object()})
+
+
+def test_output_json(app):
+    """The flask_restful representation returns the encoded body with the given status and headers."""
+    with app.test_request_context():
+        response = output_json({"a": 1}, 201, {"X-Request-ID": "abc"})
+    assert response.status_code == 201
+    assert response.data == b'{"a":1}\n'
+    assert response.headers["X-Request-ID"] == "abc"
+
+
+def test_json_provider(app):
+    """Flask, and so spectree-validated resources, encode responses with dumps()."""
+    assert isinstance(app.json, JSONProvider)
+    with app.app_context():
+        assert app.json.dumps({"results": RawJSON(b"[1]")}) == '{"results":[1]}'
+        response = app.json.response({"a": 1})
+    assert response.data == b'{"a":1}\n'
+    assert response.mimetype == "application/json"
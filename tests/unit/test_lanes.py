@@ -0,0 +1,369 @@
+"""Unit tests for priority lanes."""
+
+import json
+import time
+from base64 import b64encode
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock, patch
+
+import pytest
+from fakeredis import FakeStrictRedis
+from flask import Flask
+from rq import Queue
+from rq.job import Job
+from rq.registry import ScheduledJobRegistry
+
+from naas.config import QUEUE_LANES
+from naas.library.lane_worker import LaneWorker
+from naas.library.lanes import LaneQueue, job_queue, job_redis, queue_for, resolve_priority, shard_index, shard_lanes
+from naas.library.metrics import queue_wait_seconds
+from naas.library.serializers import job_serializer
+from naas.library.worker_status import WORKER_STATUS_KEY, live_statuses
+
+
+def _statuses(redis) -> dict:
+    return live_statuses(redis, redis.hgetall(WORKER_STATUS_KEY))
+
+
+@pytest.fixture
+def flask_app():
+    """Bare Flask app for functions needing an app context."""
+    app = Flask(__name__)
+    with app.app_context():
+        yield app
+
+
+class TestLaneQueue:
+    """Tests for LaneQueue.fetch_job."""
+
+    def test_fetches_job_from_other_lane(self):
+        """Jobs enqueued on any lane are found through the normal lane queue."""
+        redis = FakeStrictRedis()
+        LaneQueue("naas_high", connection=redis).enqueue("os.getcwd", job_id="high-job")
+
+        job = LaneQueue("naas", connection=redis).fetch_job("high-job")
+        assert job is not None
+        assert job.origin == "naas_high"
+
+    def test_missing_job(self):
+        """Unknown job IDs return None."""
+        assert LaneQueue("naas", connection=FakeStrictRedis()).fetch_job("nope") is None
+
+    def test_ignores_non_naas_queue(self):
+        """Jobs from queues that are not NAAS lanes are not returned."""
+        redis = FakeStrictRedis()
+        Queue("other", connection=redis).enqueue("os.getcwd", job_id="other-job")
+        assert LaneQueue("naas", connection=redis).fetch_job("other-job") is None
+
+
+class TestResolvePriority:
+    """Tests for resolve_priority."""
+
+    @pytest.mark.parametrize("priority", ["normal", "low"])
+    def test_non_high_unchanged(self, flask_app, priority):
+        """Normal and low priority requests are never changed."""
+        assert resolve_priority(priority, "user", FakeStrictRedis()) == priority
+
+    def test_high_allowed(self, flask_app):
+        """High priority is granted with no allowlist and under the rate limit."""
+        assert resolve_priority("high", "user", FakeStrictRedis()) == "high"
+
+    def test_high_not_in_allowlist(self, flask_app):
+        """Users outside PRIORITY_HIGH_USERS are downgraded."""
+        with patch("naas.library.lanes.PRIORITY_HIGH_USERS", ["noc"]):
+            assert resolve_priority("high", "user", FakeStrictRedis()) == "normal"
+            assert resolve_priority("high", "noc", FakeStrictRedis()) == "high"
+
+    def test_high_rate_limited(self, flask_app):
+        """High priority submissions over the per-minute limit are downgraded."""
+        redis = FakeStrictRedis()
+        with patch("naas.library.lanes.PRIORITY_HIGH_RATE_LIMIT", 2):
+            results = [resolve_priority("high", "user", redis) for _ in range(3)]
+        assert results == ["high", "high", "normal"]
+        assert redis.zcard("naas_priority_high_user") == 2  # Downgraded submissions aren't counted
+
+    def test_high_rate_limit_concurrent(self, flask_app):
+        """Concurrent submissions never get more than the limit of high priority between them."""
+        redis = FakeStrictRedis()
+
+        def submit(_):
+            with flask_app.app_context():
+                return resolve_priority("high", "user", redis)
+
+        with (
+            patch("naas.library.lanes.PRIORITY_HIGH_RATE_LIMIT", 5),
+            ThreadPoolExecutor(max_workers=16) as pool,
+        ):
+            results = list(pool.map(submit, range(40)))
+        assert results.count("high") == 5
+
+
+class TestLaneWorker:
+    """Tests for LaneWorker's weighted dequeue order."""
+
+    def _worker(self):
+        redis = FakeStrictRedis()
+        queues = [Queue(name, connection=redis) for name in ("naas_high", "naas", "naas_low")]
+        return LaneWorker(queues, connection=redis)
+
+    def test_initial_order_is_priority_order(self):
+        """Before any dequeue, lanes are ordered highest priority first."""
+        assert self._worker().queue_names() == ["naas_high", "naas", "naas_low"]
+
+    def test_weighted_first_pick(self):
+        """Over a full cycle each lane gets first pick in proportion to its weight."""
+        worker = self._worker()
+        firsts = Counter()
+        for _ in range(10):
+            worker.reorder_queues(reference_queue=worker.queues[0])
+            firsts[worker._ordered_queues[0].name] += 1
+            # Remaining lanes stay in priority order
+            rest = [q.name for q in worker._ordered_queues[1:]]
+            assert rest == [n for n in ("naas_high", "naas", "naas_low") if n in rest]
+        assert firsts == {"naas_high": 6, "naas": 3, "naas_low": 1}
+
+    def test_execute_job_records_queue_wait(self):
+        """Queue wait is observed per lane before the job is executed."""
+        worker = self._worker()
+        job = worker.queues[0].enqueue("os.getcwd")
+        before = queue_wait_seconds.labels(lane="naas_high")._sum.get()
+
+        with patch("naas.library.lane_worker.Worker.execute_job") as mock_execute:
+            worker.execute_job(job, worker.queues[0])
+
+        mock_execute.assert_called_once()
+        assert queue_wait_seconds.labels(lane="naas_high")._sum.get() > before
+
+    def test_execute_job_without_enqueued_at(self):
+        """Jobs with no enqueue time (e.g. run directly) are executed without a wait sample."""
+        worker = self._worker()
+        job = MagicMock(enqueued_at=None, kwargs={})
+        with patch("naas.library.lane_worker.Worker.execute_job") as mock_execute:
+            worker.execute_job(job, worker.queues[0])
+        mock_execute.assert_called_once_with(job, worker.queues[0])
+
+    def test_heartbeat_publishes_status(self):
+        """Heartbeats publish the worker's status, busy with its job's start time while a job runs."""
+        worker = self._worker()
+        worker.register_birth()
+        worker.heartbeat()
+        assert _statuses(worker.connection)[worker.name]["state"] == "idle"
+
+        job = worker.queues[0].enqueue("os.getcwd")
+        with patch("naas.library.lane_worker.Worker.execute_job", side_effect=lambda *_: worker.heartbeat()):
+            worker.execute_job(job, worker.queues[0])
+        # Published from within the job, as RQ's horse does when preparing it
+        status = json.loads(worker.connection.hget(WORKER_STATUS_KEY, worker.name))
+        assert status["state"] == "busy"
+        assert status["job_started"] <= time.time()
+
+        worker.heartbeat(timeout=30, pipeline=worker.connection.pipeline())  # Not executed
+        worker.heartbeat()
+        assert _statuses(worker.connection)[worker.name]["state"] == "idle"
+
+        worker.register_death()
+        assert _statuses(worker.connection) == {}
+
+
+class TestDeviceSessionLimits:
+    """Tests for LaneWorker's per-device session limiting."""
+
+    def _worker(self):
+        redis = FakeStrictRedis()
+        queue = Queue("naas", connection=redis)
+        return LaneWorker([queue], connection=redis), queue
+
+    def test_slot_held_during_execution(self):
+        """A slot is held while the job runs and released afterwards."""
+        worker, queue = self._worker()
+        job = queue.enqueue("os.getcwd", ip="192.0.2.1", device_type="cisco_ios")
+        key = "naas_device_sessions_192.0.2.1"
+
+        def execute(job, queue):
+            assert worker.connection.zscore(key, job.id) is not None
+
+        with (
+            patch("naas.library.device_sessions.DEVICE_SESSION_LIMIT", 1),
+            patch("naas.library.lane_worker.Worker.execute_job", side_effect=execute) as mock_execute,
+        ):
+            worker.execute_job(job, queue)
+
+        mock_execute.assert_called_once()
+        assert worker.connection.zcard(key) == 0
+
+    def test_slot_released_on_error(self):
+        """The slot is released even if execution raises."""
+        worker, queue = self._worker()
+        job = queue.enqueue("os.getcwd", ip="192.0.2.1")
+        with (
+            patch("naas.library.device_sessions.DEVICE_SESSION_LIMIT", 1),
+            patch("naas.library.lane_worker.Worker.execute_job", side_effect=RuntimeError),
+            pytest.raises(RuntimeError),
+        ):
+            worker.execute_job(job, queue)
+        assert worker.connection.zcard("naas_device_sessions_192.0.2.1") == 0
+
+    def test_busy_device_defers_job(self):
+        """A job for a device at its limit is scheduled for later instead of executed."""
+        worker, queue = self._worker()
+        worker.connection.zadd("naas_device_sessions_192.0.2.1", {"other-job": 9999999999})
+        job = queue.enqueue("os.getcwd", ip="192.0.2.1")
+        worker.connection.lpush(queue.intermediate_queue_key, job.id)
+
+        with (
+            patch("naas.library.device_sessions.DEVICE_SESSION_LIMIT", 1),
+            patch("naas.library.lane_worker.Worker.execute_job") as mock_execute,
+        ):
+            worker.execute_job(job, queue)
+
+        mock_execute.assert_not_called()
+        assert job.id in ScheduledJobRegistry(queue=queue).get_job_ids()
+        assert worker.connection.llen(queue.intermediate_queue_key) == 0
+        assert Job.fetch(job.id, connection=worker.connection).meta["session_defers"] == 1
+
+    def test_gives_up_after_max_defers(self):
+        """After DEVICE_SESSION_MAX_DEFERS deferrals the job fails."""
+        worker, queue = self._worker()
+        worker.connection.zadd("naas_device_sessions_192.0.2.1", {"other-job": 9999999999})
+        job = queue.enqueue("os.getcwd", ip="192.0.2.1", meta={"session_defers": 3})
+
+        with (
+            patch("naas.library.device_sessions.DEVICE_SESSION_LIMIT", 1),
+            patch("naas.library.lane_worker.DEVICE_SESSION_MAX_DEFERS", 3),
+            patch("naas.library.lane_worker.Worker.execute_job") as mock_execute,
+        ):
+            worker.execute_job(job, queue)
+
+        mock_execute.assert_not_called()
+        job.refresh()
+        assert job.get_status() == "failed"
+        assert "session limit" in job.latest_result().exc_string
+
+    def test_slots_counted_on_shared_connection(self):
+        """A sharded worker counts sessions on the shared Redis, where other shards' workers see them."""
+        shard, shared = FakeStrictRedis(), FakeStrictRedis()
+        queue = Queue("naas", connection=shard)
+        worker = LaneWorker([queue], connection=shard, shared_connection=shared)
+        shared.zadd("naas_device_sessions_192.0.2.1", {"other-job": 9999999999})
+        job = queue.enqueue("os.getcwd", ip="192.0.2.1")
+
+        with (
+            patch("naas.library.device_sessions.DEVICE_SESSION_LIMIT", 1),
+            patch("naas.library.lane_worker.Worker.execute_job") as mock_execute,
+        ):
+            worker.execute_job(job, queue)
+
+        mock_execute.assert_not_called()
+        assert shard.zcard("naas_device_sessions_192.0.2.1") == 0
+
+
+class TestSharding:
+    """Tests for routing jobs to Redis shards."""
+
+    @pytest.fixture
+    def sharded(self, flask_app):
+        """An app with three shards, each with its own lanes on its own Redis."""
+        flask_app.config["redis"] = FakeStrictRedis()
+        flask_app.config["shards"] = [
+            {lane: LaneQueue(name, connection=shard) for lane, name in QUEUE_LANES.items()}
+            for shard in (FakeStrictRedis() for _ in range(3))
+        ]
+        return flask_app
+
+    def test_shard_index(self):
+        """Placement is a stable hash of the job ID, spread evenly over the shards."""
+        assert shard_index("job-1", 3) == shard_index("job-1", 3)
+        counts = Counter(shard_index(f"job-{i}", 3) for i in range(3000))
+        assert set(counts) == {0, 1, 2}
+        assert min(counts.values()) > 900
+
+    def test_job_routed_to_its_shard(self, sharded):
+        """A job is enqueued on, and found through, the shard its ID hashes to."""
+        shards = sharded.config["shards"]
+        job_id = "5c3f8d2e-2f7e-4b1a-9a44-0c2d1e6b7f10"
+        lanes = shards[shard_index(job_id, 3)]
+
+        queue_for("high", job_id).enqueue("os.getcwd", job_id=job_id)
+
+        assert lanes["high"].job_ids == [job_id]
+        assert job_queue(job_id) is lanes["normal"]
+        assert job_queue(job_id).fetch_job(job_id).origin == "naas_high"
+        assert job_redis(job_id) is lanes["normal"].connection
+        assert sum(len(shard["high"]) for shard in shards) == 1
+
+    def test_shard_lanes(self, sharded):
+        """Each shard is listed with its own connection and lanes, highest priority first."""
+        result = shard_lanes()
+        assert len(result) == 3
+        for (connection, lanes), shard in zip(result, sharded.config["shards"], strict=True):
+            assert connection is shard["normal"].connection
+            assert [q.name for q in lanes] == ["naas_high", "naas", "naas_low"]
+
+    def test_unsharded(self, flask_app):
+        """Without shards, jobs use app.config's queues and Redis connection."""
+        redis = FakeStrictRedis()
+        flask_app.config.update(redis=redis, shards=[], q=MagicMock(), queues={"high": MagicMock(), "low": MagicMock()})
+        assert job_queue("job-1") is flask_app.config["q"]
+        assert queue_for("high", "job-1") is flask_app.config["queues"]["high"]
+        assert job_redis("job-1") is redis
+        assert shard_lanes() == [
+            (redis, [flask_app.config["queues"]["high"], flask_app.config["q"], flask_app.config["queues"]["low"]])
+        ]
+
+
+class TestSubmitPriority:
+    """Tests that submit resources enqueue on the requested lane."""
+
+    def test_high_priority_enqueued_on_high_lane(self, app, client):
+        """A high priority request is enqueued on the high lane queue."""
+        auth = b64encode(b"testuser:testpass").decode()
+        app.config["redis"].set("naas_cred_salt", b"test-salt")
+        high = app.config["queues"]["high"]
+        high.enqueue.return_value = MagicMock(id="high-job", meta={})
+
+        with patch("naas.library.validation.tacacs_auth_lockout", return_value=False):
+            response = client.post(
+                "/v1/send_command",
+                json={"ip": "192.168.1.1", "commands": ["show version"], "priority": "high"},
+                headers={"Authorization": f"Basic {auth}"},
+            )
+
+        assert response.status_code == 202
+        assert response.json["priority"] == "high"
+        high.enqueue.assert_called_once()
+        app.config["q"].enqueue.assert_not_called()
+
+    def test_sharded_submit_poll_and_cancel(self, app, client, monkeypatch):
+        """A job submitted with REDIS_SHARDS lives on its ID's shard, where polls and cancels find it."""
+        auth = {"Authorization": f"Basic {b64encode(b'testuser:testpass').decode()}"}
+        app.config["redis"].set("naas_cred_salt", b"test-salt")
+        shards = [
+            {lane: LaneQueue(name, connection=shard, serializer=job_serializer) for lane, name in QUEUE_LANES.items()}
+            for shard in (FakeStrictRedis(), FakeStrictRedis())
+        ]
+        monkeypatch.setitem(app.config, "shards", shards)
+
+        with patch("naas.library.validation.tacacs_auth_lockout", return_value=False):
+            response = client.post(
+                "/v1/send_command", json={"ip": "192.168.1.1", "commands": ["show ip int br"]}, headers=auth
+            )
+            job_id = response.json["job_id"]
+            lanes = shards[shard_index(job_id, 2)]
+            assert lanes["normal"].job_ids == [job_id]
+            assert client.get(f"/v1/send_command/{job_id}", headers=auth).json["status"] == "queued"
+            assert client.delete(f"/v1/jobs/{job_id}", headers=auth).status_code == 204
+
+        assert lanes["normal"].fetch_job(job_id).get_status() == "canceled"
+        assert not app.config["redis"].exists(f"rq:job:{job_id}")
+
+    def test_invalid_priority_rejected(self, app, client):
+        """Unknown priorities fail validation."""
+        auth = b64encode(b"testuser:testpass").decode()
+        with patch("naas.library.validation.tacacs_auth_lockout", return_value=False):
+            response = client.post(
+                "/v1/send_command",
+                json={"ip": "192.168.1.1", "commands": ["show version"], "priority": "urgent"},
+                headers={"Authorization": f"Basic {auth}"},
+            )
+        assert response.status_code == 422
@@ -0,0 +1,178 @@
+"""Unit tests for parsing structured results on read."""
+
+import json
+from concurrent.futures import Future
+from unittest.mock import MagicMock, patch
+
+import pytest
+from fakeredis import FakeStrictRedis
+from rq import Queue
+
+from naas.library import lazy_parse
+from naas.library.lazy_parse import STRUCTURED_FUNC, parse_results, structured_results
+from naas.library.result_store import BLOB_KEY, OUTPUTS_KEY, store_blob
+
+RAW = {
+    "show ip int brief": (
+        "Interface              IP-Address      OK? Method Status                Protocol\n"
+        "GigabitEthernet0/0     192.0.2.1       YES NVRAM  up                    up\n"
+    ),
+    "show custom thing": "no template for this",
+}
+PARSED_IP_INT_BRIEF = [{"interface": "GigabitEthernet0/0", "ip_address": "192.0.2.1", "status": "up", "proto": "up"}]
+
+
+@pytest.fixture
+def redis():
+    return FakeStrictRedis()
+
+
+@pytest.fixture
+def job(redis):
+    """A finished-looking structured job (only its ID, key and kwargs are used)."""
+    return Queue("naas", connection=redis).enqueue(STRUCTURED_FUNC, device_type="cisco_ios", textfsm_template=None)
+
+
+@pytest.fixture
+def blob_store(tmp_path):
+    with (
+        patch("naas.library.result_store.RESULT_STORE_PATH", str(tmp_path)),
+        patch("naas.library.lazy_parse.RESULT_STORE_PATH", str(tmp_path)),
+    ):
+        yield tmp_path
+
+
+@pytest.fixture
+def pool():
+    """Replace the process pool with a mock whose futures the test completes."""
+    pool = MagicMock()
+    pool.submit.side_effect = lambda *args: Future()
+    with patch("naas.library.lazy_parse._get_pool", return_value=pool):
+        yield pool
+    lazy_parse._inflight.clear()
+
+
+class TestParseResults:
+    """Tests for parse_results, the function run in the parse pool."""
+
+    def test_init_parser_loads_index(self):
+        """Starting a parse process loads the ntc-templates index."""
+        with patch("naas.library.textfsm_templates.template_index") as template_index:
+            lazy_parse._init_parser()
+        template_index.assert_called_once_with()
+
+    def test_parses_each_command(self):
+        """Commands with a template are parsed; others keep their raw output."""
+        parsed = json.loads(parse_results(RAW, "cisco_ios", None, 60))
+        assert parsed == {"show ip int brief": PARSED_IP_INT_BRIEF, "show custom thing": RAW["show custom thing"]}
+
+    def test_already_parsed_values_untouched(self):
+        """Results stored parsed by older workers pass through as-is."""
+        assert json.loads(parse_results({"show x": [{"a": "b"}]}, "cisco_ios", None, 60)) == {"show x": [{"a": "b"}]}
+
+    def test_reads_offloaded_results(self, blob_store):
+        """Raw results in the blob store are read from there."""
+        pointer = store_blob(json.dumps(RAW).encode(), 60)
+        parsed = json.loads(parse_results(pointer, "cisco_ios", None, 60))
+        assert parsed["show ip int brief"] == PARSED_IP_INT_BRIEF
+
+    def test_missing_blob(self, blob_store):
+        """A raw result blob that has expired can't be parsed."""
+        with pytest.raises(FileNotFoundError):
+            parse_results({BLOB_KEY: {"digest": "0" * 64, "size": 1}}, "cisco_ios", None, 60)
+
+    def test_large_parsed_results_offloaded(self, blob_store):
+        """Parsed results over the threshold go to the blob store and a pointer is cached."""
+        with patch("naas.library.lazy_parse.RESULT_STORE_THRESHOLD", 10):
+            pointer = json.loads(parse_results(RAW, "cisco_ios", None, 60))
+        digest = pointer[BLOB_KEY]["digest"]
+        assert (
+            json.loads((blob_store / digest[:2] / digest).read_bytes())["show custom thing"] == RAW["show custom thing"]
+        )
+
+
+class TestStructuredResults:
+    """Tests for structured_results."""
+
+    def test_parses_in_pool_and_caches(self, redis, job):
+        """The first read parses in a real process pool; the second is served from the cache."""
+        redis.expire(job.key, 600)
+        try:
+            parsed = structured_results(redis, job, RAW, "cisco_ios")
+        finally:
+            lazy_parse._pool.shutdown()
+            lazy_parse._pool = None
+        assert json.loads(parsed.data)["show ip int brief"] == PARSED_IP_INT_BRIEF
+        assert 0 < redis.ttl(f"naas_parsed_{job.id}") <= 600
+
+        with patch("naas.library.lazy_parse._submit") as submit:
+            assert structured_results(redis, job, RAW, "cisco_ios").data == parsed.data
+        submit.assert_not_called()
+
+    def test_cached_pointer_decoded(self, redis, job):
+        """A cached blob store pointer is decoded, so the parsed results are streamed from the blob."""
+        pointer = {BLOB_KEY: {"digest": "abc", "size": 10}}
+        redis.set(f"naas_parsed_{job.id}", json.dumps(pointer))
+        assert structured_results(redis, job, RAW, "cisco_ios") == pointer
+
+    def test_slow_parse_returns_none_then_caches(self, redis, job, pool):
+        """A read that times out gets None; the parse still fills the cache when it finishes."""
+        with patch("naas.library.lazy_parse.PARSE_TIMEOUT", 0.01):
+            assert structured_results(redis, job, RAW, "cisco_ios") is None
+        future = lazy_parse._inflight[job.id]
+
+        future.set_result(b'{"show clock":"parsed"}')
+
+        assert lazy_parse._inflight == {}
+        assert redis.ttl(f"naas_parsed_{job.id}") > 0  # Job key has no TTL: the success TTL is used
+        assert structured_results(redis, job, RAW, "cisco_ios").data == b'{"show clock":"parsed"}'
+
+    def test_parse_time_added_to_job_timings(self, redis, job, pool):
+        """A completed parse adds its duration to the job's stored timings."""
+        job.meta["timings"] = {"total": 1.5}
+        job.save_meta()
+        with patch("naas.library.lazy_parse.PARSE_TIMEOUT", 0.01):
+            structured_results(redis, job, RAW, "cisco_ios")
+
+        lazy_parse._inflight[job.id].set_result(b"{}")
+
+        timings = job.fetch(job.id, connection=redis).meta["timings"]
+        assert timings["total"] == 1.5
+        assert timings["parse"] >= 0.01
+
+    def test_concurrent_reads_share_a_parse(self, redis, job, pool):
+        """A read arriving while the job is being parsed waits on the same parse."""
+        with patch("naas.library.lazy_parse.PARSE_TIMEOUT", 0.01):
+            structured_results(redis, job, RAW, "cisco_ios")
+            structured_results(redis, job, RAW, "cisco_ios")
+        pool.submit.assert_called_once()
+
+    def test_parse_error_returns_none(self, redis, job, pool, caplog):
+        """A failed parse is logged, not cached, and the read falls back to raw output."""
+        pool.submit.side_effect = None
+        future = Future()
+        future.set_exception(FileNotFoundError("gone"))
+        pool.submit.return_value = future
+
+        assert structured_results(redis, job, RAW, "cisco_ios") is None
+        assert "Parsing results failed: gone" in caplog.text
+        assert redis.get(f"naas_parsed_{job.id}") is None
+
+    def test_saturated_pool_returns_none(self, redis, job, pool):
+        """When too many parses are waiting, reads are served raw rather than queueing."""
+        with patch("naas.library.lazy_parse._QUEUE_DEPTH", 0):
+            assert structured_results(redis, job, RAW, "cisco_ios") is None
+        pool.submit.assert_not_called()
+
+    def test_outputs_read_for_parsing(self, redis, job, pool):
+        """Outputs stored per command are read from Redis and handed to the parse process."""
+        for index, output in enumerate(RAW.values()):
+            redis.set(f"naas_output_{job.id}_{index}", output)
+        pointer = {OUTPUTS_KEY: list(RAW)}
+        with patch("naas.library.lazy_parse.PARSE_TIMEOUT", 0.01):
+            structured_results(redis, job, pointer, "cisco_ios")
+        assert pool.submit.call_args.args[1] == RAW
+
+    def test_expired_outputs_return_none(self, redis, job, pool):
+        assert structured_results(redis, job, {OUTPUTS_KEY: list(RAW)}, "cisco_ios") is None
+        pool.submit.assert_not_called()
@@ -1,10 +1,24 @@
 """Unit tests for list_jobs resource."""
 
+import gzip
+import json
 from base64 import b64encode
 from datetime import datetime
 from unittest.mock import MagicMock, patch
 
+from fakeredis import FakeStrictRedis
 from rq.job import Job
+from rq.registry import FinishedJobRegistry
+
+from naas.config import QUEUE_LANES
+from naas.library.lanes import LaneQueue
+
+
+def _normal_lane_only(app, registry_inst):
+    """Registry class side effect: registry_inst for the normal lane, an empty registry for other lanes."""
+    empty = MagicMock(count=0)
+    empty.get_job_ids.return_value = []
+    return lambda queue: registry_inst if queue is app.config["q"] else empty
 
 
 class TestListJobs:
@@ -30,17 +44,17 @@ class TestListJobs:
             mock_finished_inst = MagicMock()
             mock_finished_inst.count = 2
             mock_finished_inst.get_job_ids.return_value = ["job1", "job2"]
-            mock_finished.return_value = mock_finished_inst
+            mock_finished.side_effect = _normal_lane_only(app, mock_finished_inst)
 
             mock_failed_inst = MagicMock()
             mock_failed_inst.count = 0
             mock_failed_inst.get_job_ids.return_value = []
-            mock_failed.return_value = mock_failed_inst
+            mock_failed.side_effect = _normal_lane_only(app, mock_failed_inst)
 
             mock_started_inst = MagicMock()
             mock_started_inst.count = 0
             mock_started_inst.get_job_ids.return_value = []
-            mock_started.return_value = mock_started_inst
+            mock_started.side_effect = _normal_lane_only(app, mock_started_inst)
 
             # Mock queue
             app.config["q"].get_job_ids = MagicMock(return_value=[])
@@ -51,7 +65,7 @@ class TestListJobs:
             mock_job.get_status.return_value = "finished"
             mock_job.created_at = datetime(2026, 2, 23, 12, 0, 0)
             mock_job.ended_at = datetime(2026, 2, 23, 12, 0, 5)
-            mock_job_fetch.return_value = [mock_job]
+            mock_job_fetch.return_value = [mock_job, None]  # job2 expired since it was listed
 
             response = client.get("/v1/jobs", headers={"Authorization": f"Basic {auth}"})
 
@@ -61,6 +75,7 @@ class TestListJobs:
         assert "pagination" in data
         assert data["pagination"]["page"] == 1
         assert data["pagination"]["per_page"] == 20
+        assert [job["job_id"] for job in data["jobs"]] == ["job1"]
 
     def test_list_jobs_with_status_filter(self, app, client):
         """Test GET with status filter."""
@@ -74,7 +89,7 @@ class TestListJobs:
             mock_finished_inst = MagicMock()
             mock_finished_inst.count = 5
             mock_finished_inst.get_job_ids.return_value = ["job1"]
-            mock_finished.return_value = mock_finished_inst
+            mock_finished.side_effect = _normal_lane_only(app, mock_finished_inst)
 
             # Mock job fetch
             mock_job = MagicMock(spec=Job)
@@ -104,17 +119,17 @@ class TestListJobs:
             mock_finished_inst = MagicMock()
             mock_finished_inst.count = 0
             mock_finished_inst.get_job_ids.return_value = []
-            mock_finished.return_value = mock_finished_inst
+            mock_finished.side_effect = _normal_lane_only(app, mock_finished_inst)
 
             mock_failed_inst = MagicMock()
             mock_failed_inst.count = 0
             mock_failed_inst.get_job_ids.return_value = []
-            mock_failed.return_value = mock_failed_inst
+            mock_failed.side_effect = _normal_lane_only(app, mock_failed_inst)
 
             mock_started_inst = MagicMock()
             mock_started_inst.count = 0
             mock_started_inst.get_job_ids.return_value = []
-            mock_started.return_value = mock_started_inst
+            mock_started.side_effect = _normal_lane_only(app, mock_started_inst)
 
             # Mock queue
             app.config["q"].get_job_ids = MagicMock(return_value=[])
@@ -158,7 +173,7 @@ class TestListJobs:
             mock_failed_inst = MagicMock()
             mock_failed_inst.count = 3
             mock_failed_inst.get_job_ids.return_value = ["job1"]
-            mock_failed.return_value = mock_failed_inst
+            mock_failed.side_effect = _normal_lane_only(app, mock_failed_inst)
 
             # Mock job fetch
             mock_job = MagicMock(spec=Job)
@@ -186,7 +201,7 @@ class TestListJobs:
             mock_started_inst = MagicMock()
             mock_started_inst.count = 2
             mock_started_inst.get_job_ids.return_value = ["job1"]
-            mock_started.return_value = mock_started_inst
+            mock_started.side_effect = _normal_lane_only(app, mock_started_inst)
 
             # Mock job fetch
             mock_job = MagicMock(spec=Job)
@@ -225,6 +240,30 @@ class TestListJobs:
         data = response.json
         assert data["pagination"]["total"] == 4
 
+    def test_list_jobs_compressed(self, app, client):
+        """A page of jobs is compressed for clients that accept it."""
+        auth = b64encode(b"testuser:testpass").decode()
+
+        with patch("naas.resources.list_jobs.Job.fetch_many") as mock_job_fetch:
+            app.config["q"].__len__ = MagicMock(return_value=100)
+            app.config["q"].get_job_ids = MagicMock(return_value=[f"job{i}" for i in range(100)])
+            jobs = [
+                MagicMock(spec=Job, id=f"job{i}", created_at=datetime(2026, 2, 23), ended_at=None) for i in range(100)
+            ]
+            for job in jobs:
+                job.get_status.return_value = "queued"
+            mock_job_fetch.return_value = jobs
+
+            response = client.get(
+                "/v1/jobs?status=queued&per_page=100",
+                headers={"Authorization": f"Basic {auth}", "Accept-Encoding": "gzip"},
+            )
+
+        assert response.status_code == 200
+        assert response.headers["Content-Encoding"] == "gzip"
+        assert response.headers["Vary"] == "Accept-Encoding"
+        assert len(json.loads(gzip.decompress(response.data))["jobs"]) == 100
+
     def test_list_jobs_unfiltered_stops_early(self, app, client):
         """Unfiltered pagination: stops iterating sources once per_page is satisfied."""
         auth = b64encode(b"testuser:testpass").decode()
@@ -238,17 +277,17 @@ class TestListJobs:
             mock_finished_inst = MagicMock()
             mock_finished_inst.count = 1
             mock_finished_inst.get_job_ids.return_value = ["job1"]
-            mock_finished.return_value = mock_finished_inst
+            mock_finished.side_effect = _normal_lane_only(app, mock_finished_inst)
 
             mock_failed_inst = MagicMock()
             mock_failed_inst.count = 1
             mock_failed_inst.get_job_ids.return_value = ["job2"]
-            mock_failed.return_value = mock_failed_inst
+            mock_failed.side_effect = _normal_lane_only(app, mock_failed_inst)
 
             mock_started_inst = MagicMock()
             mock_started_inst.count = 0
             mock_started_inst.get_job_ids.return_value = []
-            mock_started.return_value = mock_started_inst
+            mock_started.side_effect = _normal_lane_only(app, mock_started_inst)
 
             app.config["q"].__len__ = MagicMock(return_value=0)
             app.config["q"].get_job_ids = MagicMock(return_value=[])
@@ -280,17 +319,17 @@ class TestListJobs:
             mock_finished_inst = MagicMock()
             mock_finished_inst.count = 1  # page 2 skips this entirely
             mock_finished_inst.get_job_ids.return_value = []
-            mock_finished.return_value = mock_finished_inst
+            mock_finished.side_effect = _normal_lane_only(app, mock_finished_inst)
 
             mock_failed_inst = MagicMock()
             mock_failed_inst.count = 0
             mock_failed_inst.get_job_ids.return_value = []
-            mock_failed.return_value = mock_failed_inst
+            mock_failed.side_effect = _normal_lane_only(app, mock_failed_inst)
 
             mock_started_inst = MagicMock()
             mock_started_inst.count = 0
             mock_started_inst.get_job_ids.return_value = []
-            mock_started.return_value = mock_started_inst
+            mock_started.side_effect = _normal_lane_only(app, mock_started_inst)
 
             # Queue has the job for page 2
             app.config["q"].__len__ = MagicMock(return_value=1)
@@ -312,3 +351,23 @@ class TestListJobs:
         assert data["jobs"][0]["job_id"] == "job2"
         # Verify queue was called (is_queue branch) and finished registry was skipped
         app.config["q"].get_job_ids.assert_called_once_with(offset=0, length=1)
+
+    def test_list_jobs_across_shards(self, app, client, monkeypatch):
+        """With REDIS_SHARDS every shard's registries and lanes are listed, in source order across shards."""
+        auth = b64encode(b"testuser:testpass").decode()
+        shards = [
+            {lane: LaneQueue(name, connection=shard) for lane, name in QUEUE_LANES.items()}
+            for shard in (FakeStrictRedis(), FakeStrictRedis())
+        ]
+        monkeypatch.setitem(app.config, "shards", shards)
+        shards[0]["normal"].enqueue("os.getcwd", job_id="queued-0")
+        shards[1]["high"].enqueue("os.getcwd", job_id="queued-1")
+        done = shards[1]["normal"].enqueue("os.getcwd", job_id="done-1")
+        shards[1]["normal"].remove(done)
+        FinishedJobRegistry(queue=shards[1]["normal"]).add(done, ttl=60)
+
+        response = client.get("/v1/jobs", headers={"Authorization": f"Basic {auth}"})
+
+        assert response.status_code == 200
+        assert response.json["pagination"]["total"] == 3
+        assert [job["job_id"] for job in response.json["jobs"]] == ["done-1", "queued-0", "queued-1"]
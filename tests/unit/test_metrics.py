@@ -0,0 +1,39 @@
+"""Unit tests for worker metrics."""
+
+import os
+from unittest.mock import patch
+
+from naas.library.metrics import start_metrics_server
+
+
+class TestStartMetricsServer:
+    """Tests for start_metrics_server."""
+
+    def test_disabled_by_port_zero(self, monkeypatch, tmp_path):
+        """Port 0 disables the metrics server."""
+        monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(tmp_path))
+        with patch("naas.library.metrics.start_http_server") as mock_start:
+            assert start_metrics_server(0) is False
+        mock_start.assert_not_called()
+
+    def test_requires_multiproc_dir(self, monkeypatch):
+        """Without PROMETHEUS_MULTIPROC_DIR the server is not started."""
+        monkeypatch.delenv("PROMETHEUS_MULTIPROC_DIR", raising=False)
+        with patch("naas.library.metrics.start_http_server") as mock_start:
+            assert start_metrics_server(9100) is False
+        mock_start.assert_not_called()
+
+    def test_starts_and_clears_stale_files(self, monkeypatch, tmp_path):
+        """Stale files from previous runs are removed, this process's are kept, and the server is started."""
+        multiproc_dir = tmp_path / "prom"
+        multiproc_dir.mkdir()
+        (multiproc_dir / "histogram_123.db").write_bytes(b"stale")
+        own = multiproc_dir / f"gauge_mostrecent_{os.getpid()}.db"
+        own.write_bytes(b"")
+        monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(multiproc_dir))
+
+        with patch("naas.library.metrics.start_http_server") as mock_start:
+            assert start_metrics_server(9100) is True
+
+        assert list(multiproc_dir.iterdir()) == [own]
+        assert mock_start.call_args.args == (9100,)
@@ -211,40 +211,37 @@ class TestNetmikoSendCommand:
 class TestNetmikoSendCommandStructured:
     """Tests for netmiko_send_command_structured function."""
 
-    def test_structured_with_textfsm(self):
-        """Test structured command with TextFSM parsing."""
+    def test_structured_stores_raw_output(self):
+        """Structured jobs store the raw output; it is parsed when the results are read."""
         creds = Credentials(username="testuser", password="testpass")
 
         with patch("naas.library.netmiko_lib.netmiko.ConnectHandler") as mock_handler:
             mock_conn = MagicMock()
-            mock_conn.send_command.return_value = [{"hostname": "router1", "version": "15.0"}]
+            mock_conn.send_command.return_value = "raw output"
             mock_handler.return_value = mock_conn
 
-            result, error = netmiko_send_command_structured("192.168.1.1", creds, "cisco_ios", ["show version"])
+            result, error = netmiko_send_command_structured(
+                "192.168.1.1", creds, "cisco_ios", ["show version"], textfsm_template="Value X (.*)"
+            )
 
             assert error is None
-            assert result["show version"] == [{"hostname": "router1", "version": "15.0"}]
-            mock_conn.send_command.assert_called_once()
-            call_kwargs = mock_conn.send_command.call_args[1]
-            assert call_kwargs["use_textfsm"] is True
+            assert result["show version"] == "raw output"
+            assert "use_textfsm" not in mock_conn.send_command.call_args[1]
 
-    def test_structured_with_custom_template(self):
-        """Test structured command with custom TextFSM template."""
+    def test_structured_without_circuit_breaker(self):
+        """Structured jobs run directly when the circuit breaker is disabled."""
         creds = Credentials(username="testuser", password="testpass")
-        template = "Value TEST (\\S+)\\n\\nStart\\n  ^${TEST}"
 
-        with patch("naas.library.netmiko_lib.netmiko.ConnectHandler") as mock_handler:
-            mock_conn = MagicMock()
-            mock_conn.send_command.return_value = [{"test": "value"}]
-            mock_handler.return_value = mock_conn
+        with (
+            patch("naas.library.netmiko_lib.CIRCUIT_BREAKER_ENABLED", False),
+            patch("naas.library.netmiko_lib.netmiko.ConnectHandler") as mock_handler,
+        ):
+            mock_handler.return_value.send_command.return_value = "raw output"
 
-            result, error = netmiko_send_command_structured(
-                "192.168.1.1", creds, "cisco_ios", ["show custom"], textfsm_template=template
-            )
+            result, error = netmiko_send_command_structured("192.168.1.1", creds, "cisco_ios", ["show version"])
 
             assert error is None
-            call_kwargs = mock_conn.send_command.call_args[1]
-            assert call_kwargs["textfsm_template"] == template
+            assert result["show version"] == "raw output"
 
     def test_structured_timeout_error(self):
         """Test structured command timeout handling."""
@@ -504,6 +501,13 @@ class TestCircuitBreaker:
                     )
                     assert error is None
 
+    def test_use_redis(self):
+        """A client set with use_redis (the worker's RQ connection) is used instead of opening another."""
+        client = FakeStrictRedis()
+        with patch("naas.library.circuit_breaker._redis_client", None):
+            naas.library.circuit_breaker.use_redis(client)
+            assert naas.library.circuit_breaker._get_redis() is client
+
     def test_redis_storage_properties(self):
         """Test Redis storage class properties."""
         storage = RedisCircuitBreakerStorage("test_device", naas.library.circuit_breaker._redis_client)
@@ -0,0 +1,71 @@
+"""Unit tests for the scrape-time queue and worker gauges."""
+
+import time
+from unittest.mock import MagicMock, patch
+
+from fakeredis import FakeStrictRedis
+from prometheus_client import CollectorRegistry, generate_latest
+from redis.exceptions import ConnectionError as RedisConnectionError
+from rq import Queue
+
+from naas.library.fleet import fleet_snapshot
+from naas.library.queue_metrics import QueueCollector
+from naas.library.worker_status import publish_status
+
+LANES = ("naas_high", "naas", "naas_low")
+
+
+def _sample(registry: CollectorRegistry, name: str, /, **labels) -> float | None:
+    return registry.get_sample_value(name, labels)
+
+
+class TestQueueCollector:
+    """Tests for QueueCollector."""
+
+    def _collector(self, redis) -> tuple[QueueCollector, CollectorRegistry]:
+        collector = QueueCollector(redis, LANES)
+        registry = CollectorRegistry()
+        registry.register(collector)
+        return collector, registry
+
+    def test_gauges(self):
+        """Scraping exposes totals, per-lane and per-registry gauges."""
+        redis = FakeStrictRedis()
+        Queue("naas", connection=redis).enqueue("os.getcwd")
+        redis.zadd("rq:wip:naas_high", {"a": 1, "b": 1})
+        publish_status(redis, "a", "host-a", time.time(), 0, 60)
+        publish_status(redis, "b", "host-a", None, 0, 60)
+        _, registry = self._collector(redis)
+
+        assert _sample(registry, "naas_queue_depth") == 1
+        assert _sample(registry, "naas_queue_jobs", lane="naas", registry="queued") == 1
+        assert _sample(registry, "naas_queue_jobs", lane="naas_high", registry="started") == 2
+        assert _sample(registry, "naas_queue_oldest_job_age_seconds", lane="naas") >= 0
+        assert _sample(registry, "naas_workers_active") == 2
+        assert _sample(registry, "naas_workers_busy") == 1
+
+    def test_register_does_not_read_redis(self):
+        """Registering the collector only describes its metrics."""
+        redis = MagicMock()
+        self._collector(redis)
+        redis.pipeline.assert_not_called()
+        redis.get.assert_not_called()
+
+    def test_redis_unavailable(self, caplog):
+        """If Redis is down the gauges are left out of the scrape rather than failing it."""
+        redis = MagicMock()
+        redis.get.side_effect = RedisConnectionError("down")
+        _, registry = self._collector(redis)
+        assert b"naas_queue_depth" not in generate_latest(registry)
+        assert "Could not read queue metrics from Redis: down" in caplog.text
+
+
+def test_metrics_endpoint(client):
+    """The API's /metrics serves the queue gauges, read from Redis on scrape rather than per request."""
+    with patch("naas.library.queue_metrics.fleet_snapshot", wraps=fleet_snapshot) as mock_snapshot:
+        client.post("/v1/send_command")
+        mock_snapshot.assert_not_called()
+        response = client.get("/metrics")
+    mock_snapshot.assert_called_once()
+    assert response.status_code == 200
+    assert b'naas_queue_oldest_job_age_seconds{lane="naas_high"}' in response.data
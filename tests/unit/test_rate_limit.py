@@ -0,0 +1,151 @@
+"""Unit tests for API rate limiting."""
+
+import os
+import subprocess
+import sys
+from base64 import b64encode
+from unittest.mock import patch
+
+import pytest
+from fakeredis import FakeStrictRedis
+
+from naas.library.rate_limit import check_rate_limit, endpoint_limits
+
+
+class TestCheckRateLimit:
+    """Tests for the token bucket."""
+
+    def test_burst_then_reject(self):
+        """A full bucket allows burst requests, then rejects with a retry time."""
+        redis = FakeStrictRedis()
+        with (
+            patch("naas.library.rate_limit.RATE_LIMIT_RATE", 0.5),
+            patch("naas.library.rate_limit.RATE_LIMIT_BURST", 3),
+        ):
+            results = [check_rate_limit(redis, "user", "send_command") for _ in range(4)]
+
+        assert [r.allowed for r in results] == [True, True, True, False]
+        assert [r.remaining for r in results] == [2, 1, 0, 0]
+        assert results[0].limit == 3
+        assert results[3].retry_after == 2
+        assert results[3].reset == 6
+
+    def test_refill(self):
+        """Tokens are refilled at the configured rate."""
+        redis = FakeStrictRedis()
+        with patch("naas.library.rate_limit.RATE_LIMIT_RATE", 1), patch("naas.library.rate_limit.RATE_LIMIT_BURST", 1):
+            assert check_rate_limit(redis, "user", "send_command").allowed
+            assert not check_rate_limit(redis, "user", "send_command").allowed
+            # Rewind the bucket's last update by two seconds
+            key = "naas_ratelimit_send_command_user"
+            redis.hset(key, "ts", float(redis.hget(key, "ts")) - 2)
+            result = check_rate_limit(redis, "user", "send_command")
+
+        assert result.allowed
+        assert result.remaining == 0
+
+    def test_buckets_per_user_and_endpoint(self):
+        """Each user has a separate bucket per endpoint."""
+        redis = FakeStrictRedis()
+        with patch("naas.library.rate_limit.RATE_LIMIT_BURST", 1):
+            assert check_rate_limit(redis, "alice", "send_command").allowed
+            assert check_rate_limit(redis, "bob", "send_command").allowed
+            assert check_rate_limit(redis, "alice", "get_results").allowed
+            assert not check_rate_limit(redis, "alice", "send_command").allowed
+
+    def test_tenant_shares_bucket(self):
+        """Users mapped to a tenant share its bucket."""
+        redis = FakeStrictRedis()
+        with (
+            patch("naas.library.rate_limit.RATE_LIMIT_BURST", 1),
+            patch("naas.library.rate_limit.RATE_LIMIT_TENANTS", {"alice": "noc", "bob": "noc"}),
+        ):
+            assert check_rate_limit(redis, "alice", "send_command").allowed
+            assert not check_rate_limit(redis, "bob", "send_command").allowed
+
+    def test_bucket_expires(self):
+        """Bucket keys expire once they would have refilled."""
+        redis = FakeStrictRedis()
+        with patch("naas.library.rate_limit.RATE_LIMIT_RATE", 2), patch("naas.library.rate_limit.RATE_LIMIT_BURST", 20):
+            check_rate_limit(redis, "user", "send_command")
+        assert redis.ttl("naas_ratelimit_send_command_user") == 11
+
+    def test_endpoint_override(self):
+        """RATE_LIMIT_ENDPOINTS overrides the default rate and burst for an endpoint."""
+        with patch("naas.library.rate_limit.RATE_LIMIT_ENDPOINTS", {"send_config": (1.0, 5)}):
+            assert endpoint_limits("send_config") == (1.0, 5)
+            assert endpoint_limits("send_command") == (5.0, 20)
+
+
+@pytest.fixture
+def limited_app(app):
+    """App with rate limiting enabled, a burst of 2 and a clean Redis."""
+    app.config["redis"].flushall()
+    app.config["redis"].set("naas_cred_salt", b"test-salt")
+    with (
+        patch("naas.library.validation.RATE_LIMIT_ENABLED", True),
+        patch("naas.library.rate_limit.RATE_LIMIT_BURST", 2),
+        patch("naas.library.rate_limit.RATE_LIMIT_RATE", 0.1),
+        patch("naas.library.validation.tacacs_auth_lockout", return_value=False),
+    ):
+        yield app
+
+
+class TestRateLimitedEndpoints:
+    """Tests for rate limiting on API resources."""
+
+    _auth = {"Authorization": f"Basic {b64encode(b'testuser:testpass').decode()}"}
+    _payload = {"ip": "192.168.1.1", "platform": "cisco_ios", "commands": ["show version"]}
+
+    def test_post_returns_429_with_headers(self, limited_app):
+        """Submits over the limit get 429 with Retry-After and RateLimit-* headers."""
+        client = limited_app.test_client()
+        first = client.post("/v1/send_command", json=self._payload, headers=self._auth)
+        client.post("/v1/send_command", json=self._payload, headers=self._auth)
+        limited = client.post("/v1/send_command", json=self._payload, headers=self._auth)
+
+        assert first.status_code == 202
+        assert first.headers["RateLimit-Limit"] == "2"
+        assert first.headers["RateLimit-Remaining"] == "1"
+        assert limited.status_code == 429
+        assert limited.headers["Retry-After"] == "10"
+        assert limited.headers["RateLimit-Remaining"] == "0"
+        assert "Rate limit exceeded" in limited.json["error"]
+
+    def test_legacy_route_shares_bucket(self, limited_app):
+        """Legacy and versioned routes to the same resource share a bucket."""
+        client = limited_app.test_client()
+        client.post("/v1/send_command", json=self._payload, headers=self._auth)
+        client.post("/send_command", json=self._payload, headers=self._auth)
+        assert client.post("/send_command", json=self._payload, headers=self._auth).status_code == 429
+
+    def test_get_results_limited(self, limited_app):
+        """GET resources are limited separately from submits."""
+        client = limited_app.test_client()
+        url = "/v1/send_command/550e8400-e29b-41d4-a716-446655440000"
+        client.post("/v1/send_command", json=self._payload, headers=self._auth)
+        client.post("/v1/send_command", json=self._payload, headers=self._auth)
+
+        assert client.get(url, headers=self._auth).status_code != 429
+        client.get(url, headers=self._auth)
+        response = client.get(url, headers=self._auth)
+        assert response.status_code == 429
+        assert response.headers["RateLimit-Limit"] == "2"
+
+    def test_healthcheck_not_limited(self, limited_app):
+        """Unauthenticated endpoints carry no rate limit headers."""
+        response = limited_app.test_client().get("/healthcheck")
+        assert "RateLimit-Limit" not in response.headers
+
+    def test_off_by_default(self):
+        """Rate limiting is opt-in, so upgrading doesn't throttle clients polling for results."""
+        env = {name: value for name, value in os.environ.items() if name != "RATE_LIMIT_ENABLED"}
+        # A fresh interpreter reads the config as the API does at startup, without reloading it here
+        result = subprocess.run(
+            [sys.executable, "-c", "from naas.config import RATE_LIMIT_ENABLED; print(RATE_LIMIT_ENABLED)"],
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        assert result.stdout.strip() == "False"
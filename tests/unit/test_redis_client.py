@@ -0,0 +1,97 @@
+"""Unit tests for the Redis client factory and its connection pool metrics."""
+
+import os
+from queue import Empty
+from unittest.mock import patch
+
+import pytest
+from prometheus_client import REGISTRY
+from redis import BlockingConnectionPool
+from redis.connection import Connection, UnixDomainSocketConnection
+
+from naas.library.redis_client import _MeteredQueue, redis_client
+
+
+def _sample(name: str) -> float:
+    return REGISTRY.get_sample_value(name) or 0.0
+
+
+class TestRedisClient:
+    """Tests for redis_client."""
+
+    def test_pool(self):
+        """Clients get a bounded, health-checked pool that retries on dropped connections."""
+        pool = redis_client().connection_pool
+
+        assert isinstance(pool, BlockingConnectionPool)
+        assert pool.max_connections == 40
+        assert pool.timeout == 5
+        assert pool.queue_class.func is _MeteredQueue
+        assert pool.queue_class.keywords == {"owner_pid": os.getpid()}
+        assert pool.connection_class is Connection
+        kwargs = pool.connection_kwargs
+        assert (kwargs["host"], kwargs["port"], kwargs["password"]) == ("redis", 6379, "mah_redis_pw")
+        assert kwargs["health_check_interval"] == 30
+        assert kwargs["protocol"] == 2
+        assert kwargs["retry"].get_retries() == 3
+
+    def test_overrides(self):
+        """The worker passes its own host, port and password; "" connects without a password."""
+        kwargs = redis_client("10.0.0.1", "6380", "").connection_pool.connection_kwargs
+        assert (kwargs["host"], kwargs["port"], kwargs["password"]) == ("10.0.0.1", 6380, "")
+
+    def test_unix_socket(self):
+        with patch("naas.library.redis_client.REDIS_SOCKET", "/run/redis/redis.sock"):
+            pool = redis_client("10.0.0.1").connection_pool
+        assert pool.connection_class is UnixDomainSocketConnection
+        assert pool.connection_kwargs["path"] == "/run/redis/redis.sock"
+        assert "host" not in pool.connection_kwargs
+
+    def test_resp3(self):
+        with patch("naas.library.redis_client.REDIS_PROTOCOL", 3):
+            assert redis_client().connection_pool.connection_kwargs["protocol"] == 3
+
+
+class TestMeteredQueue:
+    """Tests for the pool's connection queue metrics."""
+
+    @pytest.fixture
+    def queue(self):
+        """A queue as BlockingConnectionPool fills it: one placeholder per connection it may open."""
+        queue = _MeteredQueue(2)
+        queue.put_nowait(None)
+        queue.put_nowait(None)
+        return queue
+
+    def test_checkout_and_return(self, queue):
+        """Taking a placeholder or connection counts as in use until a connection is returned."""
+        in_use = _sample("naas_redis_pool_connections_in_use")
+        waits = _sample("naas_redis_pool_wait_seconds_count")
+
+        queue.get()
+        queue.get()
+        assert _sample("naas_redis_pool_connections_in_use") == in_use + 2
+        queue.put_nowait("connection")
+        assert _sample("naas_redis_pool_connections_in_use") == in_use + 1
+        assert _sample("naas_redis_pool_wait_seconds_count") == waits + 2
+
+    def test_exhausted(self, queue):
+        """A wait that times out with every connection in use is counted."""
+        exhausted = _sample("naas_redis_pool_exhausted_total")
+        queue.get()
+        queue.get()
+        with pytest.raises(Empty):
+            queue.get(timeout=0.01)
+        assert _sample("naas_redis_pool_exhausted_total") == exhausted + 1
+
+    def test_not_metered_in_other_processes(self):
+        """A pool reopened in a forked process, such as a work horse, records nothing."""
+        in_use = _sample("naas_redis_pool_connections_in_use")
+        waits = _sample("naas_redis_pool_wait_seconds_count")
+        queue = _MeteredQueue(1, owner_pid=os.getpid() + 1)
+        queue.put_nowait(None)
+
+        queue.get()
+        queue.put_nowait("connection")
+        assert _sample("naas_redis_pool_connections_in_use") == in_use
+        assert _sample("naas_redis_pool_wait_seconds_count") == waits
@@ -1,8 +1,12 @@
 """Unit tests for API resource endpoints."""
 
-from unittest.mock import patch
+import time
+from unittest.mock import MagicMock, patch
+
+from redis.exceptions import ConnectionError as RedisConnectionError
 
 from naas import __version__
+from naas.library.worker_status import publish_status
 
 
 class TestHealthCheck:
@@ -40,33 +44,20 @@ class TestHealthCheck:
         assert data["components"]["workers"]["status"] == "no_workers"
         assert data["components"]["workers"]["count"] == 0
 
-    def test_get_response_values_with_workers(self, client, monkeypatch):
-        """Healthcheck returns healthy status when workers are present."""
-        from unittest.mock import MagicMock
-
-        import naas.library.worker_cache as wc
-
-        mock_worker = MagicMock()
-        mock_worker.get_current_job.return_value = None
-        monkeypatch.setattr("naas.library.worker_cache.Worker.all", lambda connection: [mock_worker])
-        monkeypatch.setattr(wc, "_cache_ts", 0.0)
+    def test_get_response_values_with_workers(self, app, client):
+        """Healthcheck returns healthy status when workers have published their status."""
+        publish_status(app.config["redis"], "worker-1", "host-a", None, 0, 60)
+        publish_status(app.config["redis"], "worker-2", "host-a", None, 0, 60)
         response = client.get("/healthcheck")
         data = response.get_json()
         assert data["status"] == "healthy"
         assert data["components"]["workers"]["status"] == "healthy"
-        assert data["components"]["workers"]["count"] == 1
+        assert data["components"]["workers"]["count"] == 1  # Hosts, not processes
         assert data["components"]["workers"]["active_jobs"] == 0
 
-    def test_get_response_values_with_active_jobs(self, client, monkeypatch):
+    def test_get_response_values_with_active_jobs(self, app, client):
         """Healthcheck counts active jobs on workers."""
-        from unittest.mock import MagicMock
-
-        import naas.library.worker_cache as wc
-
-        mock_worker = MagicMock()
-        mock_worker.get_current_job.return_value = MagicMock()
-        monkeypatch.setattr("naas.library.worker_cache.Worker.all", lambda connection: [mock_worker])
-        monkeypatch.setattr(wc, "_cache_ts", 0.0)
+        publish_status(app.config["redis"], "worker-1", "host-a", time.time(), 2, 60)
         response = client.get("/healthcheck")
         data = response.get_json()
         assert data["components"]["workers"]["active_jobs"] == 1
@@ -74,10 +65,22 @@ class TestHealthCheck:
 
     def test_get_redis_unhealthy(self, app, client):
         """Healthcheck should return degraded when Redis is unreachable."""
-        from redis.exceptions import ConnectionError as RedisConnectionError
-
-        with patch.object(app.config["redis"], "ping", side_effect=RedisConnectionError("connection refused")):
+        with patch.object(app.config["redis"], "get", side_effect=RedisConnectionError("connection refused")):
             response = client.get("/healthcheck")
         data = response.get_json()
         assert data["status"] == "degraded"
         assert data["components"]["redis"]["status"] == "unhealthy"
+        assert data["components"]["queue"]["status"] == "unhealthy"
+
+
+class TestLiveness:
+    """Tests for the /livez endpoint."""
+
+    def test_alive_without_redis(self, app, client):
+        """Liveness doesn't touch Redis, so a Redis outage doesn't get API pods restarted."""
+        redis = MagicMock()
+        with patch.dict(app.config, {"redis": redis}):
+            response = client.get("/v1/livez")
+        assert response.status_code == 200
+        assert response.get_json() == {"status": "alive", "version": __version__}
+        assert redis.mock_calls == []
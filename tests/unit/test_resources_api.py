@@ -1,7 +1,15 @@
 """Unit tests for send_command and send_config resources."""
 
+import gzip
+import json
 from base64 import b64encode
-from unittest.mock import MagicMock, patch
+from unittest.mock import MagicMock, PropertyMock, patch
+
+import brotli
+import pytest
+
+from naas.library.json_response import RawJSON
+from naas.library.lazy_parse import STRUCTURED_FUNC
 
 
 class TestSendCommand:
@@ -381,6 +389,7 @@ class TestGetResults:
 
         # Create a mock job
         job = MagicMock()
+        job.meta = {}
         job.get_status = lambda: "queued"
 
         def fetch_side_effect(job_id_param):
@@ -399,6 +408,8 @@ class TestGetResults:
         assert response.status_code == 200
         assert response.json["status"] == "queued"
         assert response.json["results"] is None
+        assert response.json["timings"] is None
+        assert "ETag" not in response.headers
 
     def test_get_results_finished(self, app, client):
         """Test GET with finished job returns results."""
@@ -408,6 +419,10 @@ class TestGetResults:
         job_id = "22222222-2222-2222-2222-222222222222"
 
         job = MagicMock()
+        job.meta = {"timings": {"connect": 0.2, "commands": {"show version": 0.1}, "total": 0.35}}
+        job.id = job_id
+        job.key = f"rq:job:{job_id}"
+        job.ended_at = None
         job.get_status = lambda: "finished"
         job.result = ("command output", None)
 
@@ -428,6 +443,7 @@ class TestGetResults:
         assert response.json["status"] == "finished"
         assert response.json["results"] == "command output"
         assert response.json["error"] is None
+        assert response.json["timings"] == {"connect": 0.2, "commands": {"show version": 0.1}, "total": 0.35}
 
     def test_get_results_with_detected_platform(self, app, client):
         """Test GET with autodetect returns detected_platform."""
@@ -437,6 +453,10 @@ class TestGetResults:
         job_id = "33333333-3333-3333-3333-333333333333"
 
         job = MagicMock()
+        job.meta = {}
+        job.id = job_id
+        job.key = f"rq:job:{job_id}"
+        job.ended_at = None
         job.get_status = lambda: "finished"
         job.result = ({"show version": "output", "_detected_platform": "cisco_nxos"}, None)
 
@@ -457,6 +477,72 @@ class TestGetResults:
         assert response.json["detected_platform"] == "cisco_nxos"
         assert "_detected_platform" not in response.json["results"]
 
+    def _structured_job(self, app, job_id, result):
+        job = MagicMock()
+        job.meta = {}
+        job.id = job_id
+        job.key = f"rq:job:{job_id}"
+        job.ended_at = None
+        job.get_status = lambda: "finished"
+        job.func_name = STRUCTURED_FUNC
+        job.kwargs = {"device_type": "cisco_ios"}
+        job.result = (result, None)
+        app.config["q"].fetch_job.side_effect = lambda job_id_param: job if job_id_param == job_id else None
+        return job
+
+    def test_get_results_structured_parsed_on_read(self, app, client):
+        """Structured jobs' raw output is replaced by the parsed form, using the detected platform."""
+        auth = b64encode(b"testuser:testpass").decode()
+        job_id = "77777777-7777-7777-7777-777777777777"
+        job = self._structured_job(app, job_id, {"show version": "raw", "_detected_platform": "cisco_nxos"})
+
+        with (
+            patch("naas.resources.get_results.job_unlocker", return_value=True),
+            patch(
+                "naas.resources.get_results.structured_results", return_value=RawJSON(b'{"show version":[{"v":"1"}]}')
+            ) as sr,
+        ):
+            response = client.get(f"/v1/send_command_structured/{job_id}", headers={"Authorization": f"Basic {auth}"})
+
+        assert response.status_code == 200
+        assert b'"results":{"show version":[{"v":"1"}]}' in response.data  # The cached JSON, as-is
+        assert response.json["detected_platform"] == "cisco_nxos"
+        assert response.json["results_format"] == "parsed"
+        sr.assert_called_once_with(app.config["redis"], job, {"show version": "raw"}, "cisco_nxos")
+
+    def test_get_results_structured_raw(self, app, client):
+        """?raw=true returns a structured job's stored output without parsing it."""
+        auth = b64encode(b"testuser:testpass").decode()
+        job_id = "88888888-8888-8888-8888-888888888888"
+        self._structured_job(app, job_id, {"show version": "raw"})
+
+        with (
+            patch("naas.resources.get_results.job_unlocker", return_value=True),
+            patch("naas.resources.get_results.structured_results") as sr,
+        ):
+            response = client.get(
+                f"/v1/send_command_structured/{job_id}?raw=true", headers={"Authorization": f"Basic {auth}"}
+            )
+
+        assert response.json["results"] == {"show version": "raw"}
+        assert response.json["results_format"] == "raw"
+        sr.assert_not_called()
+
+    def test_get_results_structured_parse_unavailable(self, app, client):
+        """If parsing can't finish in time the raw output is returned, marked as raw."""
+        auth = b64encode(b"testuser:testpass").decode()
+        job_id = "99999999-9999-9999-9999-999999999999"
+        self._structured_job(app, job_id, {"show version": "raw"})
+
+        with (
+            patch("naas.resources.get_results.job_unlocker", return_value=True),
+            patch("naas.resources.get_results.structured_results", return_value=None),
+        ):
+            response = client.get(f"/v1/send_command_structured/{job_id}", headers={"Authorization": f"Basic {auth}"})
+
+        assert response.json["results"] == {"show version": "raw"}
+        assert response.json["results_format"] == "raw"
+
     def test_get_results_no_auth(self, client):
         """Test GET without auth returns 401."""
         response = client.get("/v1/send_command/00000000-0000-0000-0000-000000000000")
@@ -469,6 +555,7 @@ class TestGetResults:
 
         job_id = "44444444-4444-4444-4444-444444444444"
         job = MagicMock()
+        job.meta = {}
         job.get_status = lambda: "failed"
         job.exc_info = "NetMikoTimeoutException: Connection timed out"
 
@@ -495,6 +582,7 @@ class TestGetResults:
         job_id = "33333333-3333-3333-3333-333333333333"
 
         job = MagicMock()
+        job.meta = {}
 
         def fetch_side_effect(job_id_param):
             if job_id_param == job_id:
@@ -512,6 +600,261 @@ class TestGetResults:
 
         assert response.status_code == 403
 
+    def test_get_results_streams_offloaded_blob(self, app, client, tmp_path, monkeypatch):
+        """Test GET streams results stored in the blob store."""
+        from naas.library.result_store import offload_result
+
+        monkeypatch.setattr("naas.library.result_store.RESULT_STORE_PATH", str(tmp_path))
+        monkeypatch.setattr("naas.library.result_store.RESULT_STORE_THRESHOLD", 10)
+        auth = b64encode(b"testuser:testpass").decode()
+        app.config["redis"].set("naas_cred_salt", b"test-salt")
+
+        job_id = "55555555-5555-5555-5555-555555555555"
+        job = MagicMock()
+        job.meta = {}
+        job.id = job_id
+        job.key = f"rq:job:{job_id}"
+        job.ended_at = None
+        job.get_status = lambda: "finished"
+        job.result = (offload_result({"show tech": "x" * 100, "_detected_platform": "cisco_ios"}), None)
+        app.config["q"].fetch_job.side_effect = lambda job_id_param: job if job_id_param == job_id else None
+
+        with patch("naas.resources.get_results.job_unlocker", return_value=True):
+            response = client.get(
+                f"/v1/send_command/{job_id}",
+                headers={"Authorization": f"Basic {auth}"},
+            )
+
+        assert response.status_code == 200
+        assert response.is_streamed
+        assert response.json["results"] == {"show tech": "x" * 100}
+        assert response.json["status"] == "finished"
+        assert response.json["detected_platform"] == "cisco_ios"
+        assert response.json["app"] == "naas"
+
+    def test_get_results_missing_blob(self, app, client, tmp_path, monkeypatch):
+        """Test GET returns 410 when an offloaded result's blob is gone."""
+        monkeypatch.setattr("naas.library.result_store.RESULT_STORE_PATH", str(tmp_path))
+        auth = b64encode(b"testuser:testpass").decode()
+        app.config["redis"].set("naas_cred_salt", b"test-salt")
+
+        job_id = "66666666-6666-6666-6666-666666666666"
+        job = MagicMock()
+        job.meta = {}
+        job.id = job_id
+        job.key = f"rq:job:{job_id}"
+        job.ended_at = None
+        job.get_status = lambda: "finished"
+        job.result = ({"_blob": {"digest": "ab" * 32, "size": 100}}, None)
+        app.config["q"].fetch_job.side_effect = lambda job_id_param: job if job_id_param == job_id else None
+
+        with patch("naas.resources.get_results.job_unlocker", return_value=True):
+            response = client.get(
+                f"/v1/send_command/{job_id}",
+                headers={"Authorization": f"Basic {auth}"},
+            )
+
+        assert response.status_code == 410
+        assert response.json["error"] == "Job results are no longer available"
+
+    def _finished_job(self, app, job_id, result):
+        job = MagicMock()
+        job.meta = {"timings": {"total": 1.0}}
+        job.id = job_id
+        job.key = f"rq:job:{job_id}"
+        job.ended_at = None
+        job.get_status = lambda: "finished"
+        job.func_name = "naas.library.netmiko_lib.netmiko_send_command"
+        job.result = (result, None)
+        app.config["q"].fetch_job.side_effect = lambda job_id_param: job if job_id_param == job_id else None
+        return job
+
+    def test_get_results_not_modified(self, app, client):
+        """A poll sending back a finished job's ETag gets a 304 without the results being loaded."""
+        headers = {"Authorization": "Basic " + b64encode(b"testuser:testpass").decode()}
+        job_id = "aaaaaaaa-0000-0000-0000-000000000001"
+        job = self._finished_job(app, job_id, {"show version": "output"})
+
+        with patch("naas.resources.get_results.job_unlocker", return_value=True):
+            etag = client.get(f"/v1/send_command/{job_id}", headers=headers).headers["ETag"]
+            type(job).result = PropertyMock(side_effect=AssertionError("results loaded"))
+            response = client.get(f"/v1/send_command/{job_id}", headers={**headers, "If-None-Match": etag})
+
+        assert response.status_code == 304
+        assert response.headers["ETag"] == etag
+        assert response.data == b""
+
+    def test_get_results_compressed_once(self, app, client):
+        """Finished results are compressed on the first request, and later ones are served from the cache."""
+        headers = {"Authorization": "Basic " + b64encode(b"testuser:testpass").decode(), "Accept-Encoding": "gzip"}
+        job_id = "aaaaaaaa-0000-0000-0000-000000000002"
+        results = {"show running-config": "interface GigabitEthernet0/1\n" * 1000}
+        job = self._finished_job(app, job_id, results)
+
+        with patch("naas.resources.get_results.job_unlocker", return_value=True):
+            first = client.get(f"/v1/send_command/{job_id}", headers=headers)
+            type(job).result = PropertyMock(side_effect=AssertionError("results loaded"))
+            second = client.get(f"/v1/send_command/{job_id}", headers=headers)
+
+        assert first.headers["Content-Encoding"] == "gzip"
+        assert first.headers["ETag"].endswith('-gzip"')
+        assert json.loads(gzip.decompress(first.data))["results"] == results
+        assert second.data == first.data
+        assert second.headers["ETag"] == first.headers["ETag"]
+
+    def test_get_results_blob_compressed(self, app, client, tmp_path, monkeypatch):
+        """Results in the blob store are compressed as they are read."""
+        from naas.library.result_store import offload_result
+
+        monkeypatch.setattr("naas.library.result_store.RESULT_STORE_PATH", str(tmp_path))
+        monkeypatch.setattr("naas.library.result_store.RESULT_STORE_THRESHOLD", 10)
+        headers = {"Authorization": "Basic " + b64encode(b"testuser:testpass").decode(), "Accept-Encoding": "br"}
+        job_id = "aaaaaaaa-0000-0000-0000-000000000003"
+        results = {"show tech": "x" * 5000}
+        self._finished_job(app, job_id, offload_result(results))
+
+        with patch("naas.resources.get_results.job_unlocker", return_value=True):
+            response = client.get(f"/v1/send_command/{job_id}", headers=headers)
+
+        assert response.headers["Content-Encoding"] == "br"
+        assert json.loads(brotli.decompress(response.data))["results"] == results
+
+    def test_get_results_parsed_not_modified(self, app, client):
+        """Once a structured job's parsed results are cached, polls are answered before loading them."""
+        headers = {"Authorization": "Basic " + b64encode(b"testuser:testpass").decode()}
+        job_id = "aaaaaaaa-0000-0000-0000-000000000004"
+        self._structured_job(app, job_id, {"show version": "raw"})
+        app.config["redis"].set(f"naas_parsed_{job_id}", b'{"show version":[]}')
+
+        with (
+            patch("naas.resources.get_results.job_unlocker", return_value=True),
+            patch("naas.resources.get_results.structured_results", return_value=RawJSON(b'{"show version":[]}')) as sr,
+        ):
+            etag = client.get(f"/v1/send_command_structured/{job_id}", headers=headers).headers["ETag"]
+            response = client.get(f"/v1/send_command_structured/{job_id}", headers={**headers, "If-None-Match": etag})
+            raw = client.get(
+                f"/v1/send_command_structured/{job_id}?raw=true", headers={**headers, "If-None-Match": etag}
+            )
+
+        assert response.status_code == 304
+        assert raw.status_code == 200  # The raw form has its own ETag
+        sr.assert_called_once()
+
+    def test_get_results_unparsed_not_modified(self, app, client):
+        """While parsing is unavailable, polls for the raw output it falls back to still get a 304."""
+        headers = {"Authorization": "Basic " + b64encode(b"testuser:testpass").decode()}
+        job_id = "aaaaaaaa-0000-0000-0000-000000000005"
+        self._structured_job(app, job_id, {"show version": "raw"})
+
+        with (
+            patch("naas.resources.get_results.job_unlocker", return_value=True),
+            patch("naas.resources.get_results.structured_results", return_value=None),
+        ):
+            etag = client.get(f"/v1/send_command_structured/{job_id}", headers=headers).headers["ETag"]
+            response = client.get(f"/v1/send_command_structured/{job_id}", headers={**headers, "If-None-Match": etag})
+
+        assert response.status_code == 304
+
+    def _per_command_job(self, app, job_id, results):
+        """A finished job whose outputs were stored per command, as a worker stores them."""
+        from naas.library.result_store import offload_result
+
+        worker_job = MagicMock(id=job_id, result_ttl=600, connection=app.config["redis"])
+        with patch("naas.library.result_store.get_current_job", return_value=worker_job):
+            return self._finished_job(app, job_id, offload_result(results))
+
+    @pytest.mark.parametrize(
+        ("query", "expected"),
+        [
+            ("", {"show version": "Cisco IOS\nuptime 1 day\n", "show clock": "12:00\n"}),
+            ("?command=show+clock&command=show+nothing", {"show clock": "12:00\n"}),
+            ("?command=show+version&bytes=0-4", {"show version": "Cisco"}),
+            ("?lines=-1", {"show version": "uptime 1 day\n", "show clock": "12:00\n"}),
+        ],
+    )
+    def test_get_results_selected(self, app, client, query, expected):
+        """Results can be narrowed to some commands and to a byte or line range of each output."""
+        headers = {"Authorization": "Basic " + b64encode(b"testuser:testpass").decode()}
+        job_id = "aaaaaaaa-0000-0000-0000-000000000006"
+        self._per_command_job(app, job_id, {"show version": "Cisco IOS\nuptime 1 day\n", "show clock": "12:00\n"})
+
+        with patch("naas.resources.get_results.job_unlocker", return_value=True):
+            response = client.get(f"/v1/send_command/{job_id}{query}", headers=headers)
+
+        assert response.status_code == 200
+        assert response.json["results"] == expected
+
+    def test_get_results_selection_etag(self, app, client):
+        """Each selection has its own ETag."""
+        headers = {"Authorization": "Basic " + b64encode(b"testuser:testpass").decode()}
+        job_id = "aaaaaaaa-0000-0000-0000-000000000007"
+        self._finished_job(app, job_id, {"show version": "output"})
+
+        with patch("naas.resources.get_results.job_unlocker", return_value=True):
+            etag = client.get(f"/v1/send_command/{job_id}", headers=headers).headers["ETag"]
+            ranged = client.get(f"/v1/send_command/{job_id}?bytes=0-2", headers={**headers, "If-None-Match": etag})
+
+        assert ranged.status_code == 200
+        assert ranged.json["results"] == {"show version": "out"}
+        assert ranged.headers["ETag"] != etag
+
+    def test_get_results_selection_not_cached(self, app, client):
+        """Only the full results' compressed body is cached, not one per selection."""
+        headers = {"Authorization": "Basic " + b64encode(b"testuser:testpass").decode(), "Accept-Encoding": "gzip"}
+        job_id = "aaaaaaaa-0000-0000-0000-000000000011"
+        self._finished_job(app, job_id, {"show running-config": "interface GigabitEthernet0/1\n" * 1000})
+        redis = app.config["redis"]
+        cached = set(redis.keys("naas_encoded_*"))
+
+        with patch("naas.resources.get_results.job_unlocker", return_value=True):
+            for query in ("?bytes=0-", "?lines=1-", "?command=show+running-config"):
+                response = client.get(f"/v1/send_command/{job_id}{query}", headers=headers)
+                assert response.headers["Content-Encoding"] == "gzip"
+            assert set(redis.keys("naas_encoded_*")) == cached
+            client.get(f"/v1/send_command/{job_id}", headers=headers)
+
+        assert len(set(redis.keys("naas_encoded_*")) - cached) == 1
+
+    def test_get_results_expired_outputs(self, app, client):
+        """A job whose stored outputs have expired returns 410."""
+        headers = {"Authorization": "Basic " + b64encode(b"testuser:testpass").decode()}
+        job_id = "aaaaaaaa-0000-0000-0000-000000000008"
+        self._per_command_job(app, job_id, {"show version": "output"})
+        app.config["redis"].delete(f"naas_output_{job_id}_0")
+
+        with patch("naas.resources.get_results.job_unlocker", return_value=True):
+            response = client.get(f"/v1/send_command/{job_id}", headers=headers)
+
+        assert response.status_code == 410
+        assert response.json["error"] == "Job results are no longer available"
+        assert "results" not in response.json
+
+    def test_get_results_parsed_command(self, app, client):
+        """Parsed results can be narrowed to some commands; a range returns the raw output instead."""
+        headers = {"Authorization": "Basic " + b64encode(b"testuser:testpass").decode()}
+        job_id = "aaaaaaaa-0000-0000-0000-000000000009"
+        self._structured_job(app, job_id, {"show version": "raw version", "show clock": "raw clock"})
+        parsed = RawJSON(b'{"show version":[{"version":"15.1"}],"show clock":[]}')
+
+        with (
+            patch("naas.resources.get_results.job_unlocker", return_value=True),
+            patch("naas.resources.get_results.structured_results", return_value=parsed),
+        ):
+            selected = client.get(f"/v1/send_command_structured/{job_id}?command=show+version", headers=headers)
+            ranged = client.get(f"/v1/send_command_structured/{job_id}?command=show+version&lines=1-", headers=headers)
+
+        assert selected.json["results"] == {"show version": [{"version": "15.1"}]}
+        assert ranged.json["results"] == {"show version": "raw version"}
+
+    @pytest.mark.parametrize(
+        "query",
+        ["bytes=0-1&lines=1-2", "bytes=abc", "lines=0-2", "bytes=9223372036854775808-", "lines=-10000000000000000000"],
+    )
+    def test_get_results_invalid_range(self, app, client, query):
+        headers = {"Authorization": "Basic " + b64encode(b"testuser:testpass").decode()}
+        response = client.get(f"/v1/send_command/aaaaaaaa-0000-0000-0000-000000000010?{query}", headers=headers)
+        assert response.status_code == 422
+
 
 class TestCancelJob:
     """Tests for DELETE /v1/jobs/{job_id}."""
@@ -579,6 +922,9 @@ class TestCancelJob:
 
         job_id = "66666666-6666-6666-6666-666666666666"
         job = MagicMock()
+        job.id = job_id
+        job.key = f"rq:job:{job_id}"
+        job.ended_at = None
         job.get_status = lambda: "finished"
 
         app.config["q"].fetch_job.side_effect = lambda jid: job if jid == job_id else None
@@ -0,0 +1,244 @@
+"""Unit tests for the result blob store."""
+
+import json
+import os
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+from fakeredis import FakeStrictRedis
+
+from naas.library import result_store
+
+
+@pytest.fixture
+def job():
+    """The running job, with its own Redis connection."""
+    job = MagicMock(id="job1", result_ttl=600, connection=FakeStrictRedis())
+    with patch("naas.library.result_store.get_current_job", return_value=job):
+        yield job
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    """Enable the blob store in a temp directory with a 10 byte threshold."""
+    monkeypatch.setattr("naas.library.result_store.RESULT_STORE_PATH", str(tmp_path))
+    monkeypatch.setattr("naas.library.result_store.RESULT_STORE_THRESHOLD", 10)
+    return tmp_path
+
+
+class TestOffloadResult:
+    """Tests for offload_result."""
+
+    def test_disabled_returns_results(self, monkeypatch):
+        """With no store path configured, results are returned untouched."""
+        monkeypatch.setattr("naas.library.result_store.RESULT_STORE_PATH", "")
+        results = {"show version": "x" * 100}
+        assert result_store.offload_result(results) is results
+
+    def test_small_result_not_offloaded(self, store):
+        """Results under the threshold stay inline."""
+        results = {"a": "b"}
+        assert result_store.offload_result(results) is results
+        assert not any(store.iterdir())
+
+    def test_large_result_offloaded(self, store):
+        """Results over the threshold are written as JSON and replaced by a pointer."""
+        results = {"show tech": "x" * 100, "_detected_platform": "cisco_ios"}
+        pointer = result_store.offload_result(results)
+
+        digest = pointer[result_store.BLOB_KEY]["digest"]
+        assert pointer["_detected_platform"] == "cisco_ios"
+        blob = store / digest[:2] / digest
+        assert json.loads(blob.read_bytes()) == {"show tech": "x" * 100}
+        assert pointer[result_store.BLOB_KEY]["size"] == blob.stat().st_size
+        assert blob.stat().st_mode & 0o777 == 0o644  # Readable by an API running as another user
+
+    def test_expiry_follows_job_ttl(self, store):
+        """Blob mtime is set to now + the current job's result_ttl."""
+        job = MagicMock(result_ttl=1000)
+        with patch("naas.library.result_store.get_current_job", return_value=job):
+            pointer = result_store.offload_result({"cmd": "x" * 100})
+
+        digest = pointer[result_store.BLOB_KEY]["digest"]
+        mtime = (store / digest[:2] / digest).stat().st_mtime
+        assert time.time() + 990 < mtime <= time.time() + 1000
+
+    def test_shared_blob_keeps_longest_expiry(self, store):
+        """A later job with a shorter TTL does not shorten an existing blob's expiry."""
+        with patch("naas.library.result_store.get_current_job", return_value=MagicMock(result_ttl=5000)):
+            pointer = result_store.offload_result({"cmd": "x" * 100})
+        with patch("naas.library.result_store.get_current_job", return_value=MagicMock(result_ttl=10)):
+            assert result_store.offload_result({"cmd": "x" * 100}) == pointer
+
+        digest = pointer[result_store.BLOB_KEY]["digest"]
+        assert (store / digest[:2] / digest).stat().st_mtime > time.time() + 4000
+
+    def test_outputs_stored_per_command(self, job):
+        """In a job, each output gets its own Redis key, expiring with the job's result."""
+        pointer = result_store.offload_result({"show version": "v", "show clock": "c", "_detected_platform": "ios"})
+
+        assert pointer == {result_store.OUTPUTS_KEY: ["show version", "show clock"], "_detected_platform": "ios"}
+        assert job.connection.mget(["naas_output_job1_0", "naas_output_job1_1"]) == [b"v", b"c"]
+        assert 0 < job.connection.ttl("naas_output_job1_0") <= 600
+
+    def test_outputs_kept_without_ttl(self, job):
+        """A job kept forever keeps its outputs forever."""
+        job.result_ttl = -1
+        result_store.offload_result({"show version": "v"})
+        assert job.connection.ttl("naas_output_job1_0") == -1
+
+    def test_non_text_outputs_inline(self, job):
+        """Outputs that aren't text (such as parsed output) stay in the job result."""
+        results = {"show version": [{"version": "15.1"}]}
+        assert result_store.offload_result(results) is results
+
+    def test_blob_records_command_offsets(self, store):
+        """The pointer records where each command's JSON-encoded output lies in the blob."""
+        results = {"show version": "v" * 20, 'show "quoted"': "line\n" * 5}
+        pointer = result_store.offload_result(results)
+
+        digest = pointer[result_store.BLOB_KEY]["digest"]
+        blob = (store / digest[:2] / digest).read_bytes()
+        assert blob == json.dumps(results, separators=(",", ":")).encode()
+        for command, (offset, length) in pointer[result_store.BLOB_KEY]["commands"].items():
+            assert json.loads(blob[offset : offset + length]) == results[command]
+
+
+@pytest.mark.parametrize(
+    ("spec", "first", "expected"),
+    [("0-99", 0, slice(0, 100)), ("100-", 0, slice(100, None)), ("-50", 0, slice(-50, None)), ("1-2", 1, slice(0, 2))],
+)
+def test_range_slice(spec, first, expected):
+    assert result_store.range_slice(spec, first) == expected
+
+
+class TestReadOutputs:
+    """Tests for read_outputs."""
+
+    OUTPUTS = {
+        "show version": "Cisco IOS 15.1\nuptime 1 day\n",
+        "show clock": "12:00:00 UTC\n",
+        "show env": "caf\u00e9",
+    }
+
+    @pytest.fixture(params=["redis", "blob", "legacy blob", "inline"])
+    def stored(self, request, job, store):
+        """The outputs as each storage layout holds them, returning (redis, result)."""
+        if request.param == "redis":
+            with patch("naas.library.result_store.RESULT_STORE_PATH", ""):
+                return job.connection, result_store.offload_result(self.OUTPUTS)
+        if request.param == "inline":
+            return job.connection, dict(self.OUTPUTS)
+        pointer = result_store.offload_result(self.OUTPUTS)
+        if request.param == "legacy blob":
+            del pointer[result_store.BLOB_KEY]["commands"]
+        return job.connection, pointer
+
+    def test_all(self, stored):
+        assert result_store.read_outputs(stored[0], "job1", stored[1]) == self.OUTPUTS
+
+    def test_commands(self, stored):
+        """Only the selected commands are returned; unknown commands are left out."""
+        outputs = result_store.read_outputs(stored[0], "job1", stored[1], ["show clock", "show nothing"])
+        assert outputs == {"show clock": "12:00:00 UTC\n"}
+
+    @pytest.mark.parametrize(
+        ("byte_range", "expected"),
+        [
+            (slice(0, 9), "Cisco IOS"),
+            (slice(-3, None), "ay\n"),
+            (slice(10, 5), ""),
+        ],
+    )
+    def test_byte_range(self, stored, byte_range, expected):
+        outputs = result_store.read_outputs(stored[0], "job1", stored[1], ["show version"], byte_range)
+        assert outputs == {"show version": expected}
+
+    def test_byte_range_splits_character(self, stored):
+        """A character cut by the range is replaced rather than failing to decode."""
+        outputs = result_store.read_outputs(stored[0], "job1", stored[1], ["show env"], slice(0, 4))
+        assert outputs == {"show env": "caf\ufffd"}
+
+    def test_line_range(self, stored):
+        outputs = result_store.read_outputs(stored[0], "job1", stored[1], None, line_range=slice(-1, None))
+        assert outputs == {"show version": "uptime 1 day\n", "show clock": "12:00:00 UTC\n", "show env": "caf\u00e9"}
+
+    @pytest.mark.parametrize(
+        ("line_range", "expected"),
+        [
+            (slice(0, 1), "a\n"),
+            (slice(1, None), "b\nc"),
+            (slice(1, 9), "b\nc"),
+            (slice(5, None), ""),
+            (slice(2, 1), ""),
+            (slice(-2, None), "b\nc"),
+            (slice(-9, None), "a\nb\nc"),
+        ],
+    )
+    def test_line_ranges(self, job, line_range, expected):
+        """Lines end with a newline; a range past either end returns the lines there are."""
+        outputs = result_store.read_outputs(job.connection, "job1", {"cmd": "a\nb\nc"}, line_range=line_range)
+        assert outputs == {"cmd": expected}
+
+    def test_no_commands_selected(self, stored):
+        assert result_store.read_outputs(stored[0], "job1", stored[1], ["show nothing"]) == {}
+
+    def test_parsed_outputs_not_sliced(self, job):
+        parsed = {"show version": [{"version": "15.1"}]}
+        assert result_store.read_outputs(job.connection, "job1", parsed, line_range=slice(0, 1)) == parsed
+
+    @pytest.mark.parametrize("byte_range", [None, slice(0, 10)])
+    def test_expired_outputs(self, job, byte_range):
+        """Outputs whose keys have expired are reported as gone."""
+        pointer = result_store.offload_result(self.OUTPUTS)
+        job.connection.delete("naas_output_job1_1")
+        assert result_store.read_outputs(job.connection, "job1", pointer, byte_range=byte_range) is None
+
+    def test_missing_blob(self, job, store):
+        pointer = {result_store.BLOB_KEY: {"digest": "ab" * 32, "size": 10}}
+        assert result_store.read_outputs(job.connection, "job1", pointer) is None
+
+
+class TestReadBlob:
+    """Tests for open_blob and iter_blob."""
+
+    def test_missing_blob(self, store):
+        """Missing blobs return None."""
+        assert result_store.open_blob("ab" * 32) is None
+
+    def test_iter_blob_chunks(self, store, monkeypatch):
+        """iter_blob yields the full contents in chunks and closes the file."""
+        monkeypatch.setattr("naas.library.result_store._CHUNK_SIZE", 7)
+        pointer = result_store.offload_result({"cmd": "y" * 50})
+
+        f = result_store.open_blob(pointer[result_store.BLOB_KEY]["digest"])
+        chunks = list(result_store.iter_blob(f))
+
+        assert len(chunks) > 1
+        assert json.loads(b"".join(chunks)) == {"cmd": "y" * 50}
+        assert f.closed
+
+
+class TestPurgeExpired:
+    """Tests for purge_expired."""
+
+    def test_disabled(self, monkeypatch):
+        """Nothing to purge when the store is disabled."""
+        monkeypatch.setattr("naas.library.result_store.RESULT_STORE_PATH", "")
+        assert result_store.purge_expired() == 0
+
+    def test_removes_only_expired(self, store):
+        """Expired blobs are removed; live blobs and in-progress writes are kept."""
+        live = result_store.offload_result({"cmd": "live" * 10})[result_store.BLOB_KEY]["digest"]
+        dead = result_store.offload_result({"cmd": "dead" * 10})[result_store.BLOB_KEY]["digest"]
+        past = time.time() - 1
+        os.utime(store / dead[:2] / dead, (past, past))
+        tmp = store / dead[:2] / ".tmp-partial"
+        tmp.write_bytes(b"")
+        os.utime(tmp, (past, past))
+
+        assert result_store.purge_expired() == 1
+        assert (store / live[:2] / live).exists()
+        assert not (store / dead[:2] / dead).exists()
+        assert tmp.exists()
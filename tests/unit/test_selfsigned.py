@@ -1,11 +1,16 @@
 """Unit tests for selfsigned certificate generation."""
 
+import os
+from datetime import timedelta
 from ipaddress import IPv4Address
+from unittest.mock import patch
 
+import pytest
 from cryptography import x509
 from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives.asymmetric import ec
 
-from naas.library.selfsigned import generate_selfsigned_cert
+from naas.library.selfsigned import cached_selfsigned_cert, generate_selfsigned_cert
 
 
 class TestGenerateSelfsignedCert:
@@ -59,3 +64,77 @@ class TestGenerateSelfsignedCert:
         ip_addresses = [str(ip.value) for ip in san_ext.value if isinstance(ip, x509.IPAddress)]
         assert "203.0.113.1" in ip_addresses
         assert "192.168.1.1" in ip_addresses
+
+    def test_ecdsa_key(self):
+        """key_type="ecdsa" generates a P-256 key."""
+        cert_pem, key_pem = generate_selfsigned_cert("test.example.com", key_type="ecdsa")
+
+        assert b"BEGIN EC PRIVATE KEY" in key_pem  # pragma: allowlist secret
+        public_key = x509.load_pem_x509_certificate(cert_pem).public_key()
+        assert isinstance(public_key, ec.EllipticCurvePublicKey)
+        assert public_key.curve.name == "secp256r1"
+
+    def test_unknown_key_type(self):
+        """An unknown key type is rejected."""
+        with pytest.raises(ValueError, match="Unknown key type 'dsa'"):
+            generate_selfsigned_cert("test.example.com", key_type="dsa")
+
+
+class TestCachedSelfsignedCert:
+    """Tests for cached_selfsigned_cert function."""
+
+    @pytest.fixture
+    def paths(self, tmp_path):
+        return str(tmp_path / "cert.pem"), str(tmp_path / "key.pem")
+
+    def test_generates_then_reuses(self, paths):
+        """The first start writes a certificate; later starts reuse it."""
+        cert_file, key_file = paths
+        assert cached_selfsigned_cert(cert_file, key_file, "naas.local")
+        with open(cert_file, "rb") as f:
+            cert_pem = f.read()
+        assert os.stat(key_file).st_mode & 0o777 == 0o600
+
+        with patch("naas.library.selfsigned.generate_selfsigned_cert") as generate:
+            assert not cached_selfsigned_cert(cert_file, key_file, "naas.local")
+        generate.assert_not_called()
+        with open(cert_file, "rb") as f:
+            assert f.read() == cert_pem
+
+    @pytest.mark.parametrize(
+        ("hostname", "key_type"),
+        [
+            pytest.param("other.local", "rsa", id="hostname"),
+            pytest.param("naas.local", "ecdsa", id="key_type"),
+        ],
+    )
+    def test_regenerates_on_change(self, paths, hostname, key_type):
+        """A cached certificate for another hostname or key type is replaced."""
+        cert_file, key_file = paths
+        cached_selfsigned_cert(cert_file, key_file, "naas.local")
+        assert cached_selfsigned_cert(cert_file, key_file, hostname, key_type)
+        with open(cert_file, "rb") as f:
+            cert = x509.load_pem_x509_certificate(f.read())
+        assert cert.subject.get_attributes_for_oid(x509.oid.NameOID.COMMON_NAME)[0].value == hostname
+
+    def test_regenerates_near_expiry(self, paths):
+        """A cached certificate expiring within 30 days is replaced."""
+        cert_file, key_file = paths
+        cached_selfsigned_cert(cert_file, key_file, "naas.local", "ecdsa")
+        with patch("naas.library.selfsigned._RENEW_BEFORE", timedelta(days=10 * 365)):
+            assert cached_selfsigned_cert(cert_file, key_file, "naas.local", "ecdsa")
+
+    def test_regenerates_mismatched_key(self, paths, tmp_path):
+        """A key that doesn't belong to the cached certificate is replaced."""
+        cert_file, key_file = paths
+        cached_selfsigned_cert(cert_file, key_file, "naas.local", "ecdsa")
+        cached_selfsigned_cert(str(tmp_path / "other.pem"), key_file, "naas.local", "ecdsa")
+        assert cached_selfsigned_cert(cert_file, key_file, "naas.local", "ecdsa")
+
+    def test_regenerates_corrupt_file(self, paths):
+        """An unreadable certificate is replaced."""
+        cert_file, key_file = paths
+        cached_selfsigned_cert(cert_file, key_file, "naas.local", "ecdsa")
+        with open(cert_file, "w") as f:
+            f.write("not a certificate")
+        assert cached_selfsigned_cert(cert_file, key_file, "naas.local", "ecdsa")
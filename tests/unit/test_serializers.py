@@ -0,0 +1,106 @@
+"""Unit tests for RQ job serializers."""
+
+import pickle
+import zlib
+
+import msgpack
+import pytest
+from fakeredis import FakeStrictRedis
+from rq import Queue
+from rq.job import Job
+
+from naas.library.auth import Credentials
+from naas.library.serializers import MsgpackSerializer, PickleSerializer
+
+
+class TestMsgpackSerializer:
+    """Tests for the msgpack job serializer."""
+
+    def test_round_trip_credentials(self):
+        """Credentials survive a dumps/loads round trip."""
+        data = MsgpackSerializer.dumps({"credentials": Credentials("user", "pass", "en")})
+        creds = MsgpackSerializer.loads(data)["credentials"]
+        assert isinstance(creds, Credentials)
+        assert (creds.username, creds.password, creds.enable) == ("user", "pass", "en")
+
+    def test_result_tuple_round_trip(self):
+        """The (results, error) tuple comes back as an indexable sequence."""
+        data = MsgpackSerializer.dumps(({"show version": "IOS 15.1"}, None))
+        results = MsgpackSerializer.loads(data)
+        assert results[0] == {"show version": "IOS 15.1"}
+        assert results[1] is None
+
+    def test_empty_dict_round_trip(self):
+        """An empty dict packs to the single byte 0x80 and must not be treated as pickle."""
+        data = MsgpackSerializer.dumps({})
+        assert data == b"\x80"
+        assert MsgpackSerializer.loads(data) == {}
+
+    def test_unknown_type_raises(self):
+        """Objects with no msgpack encoding raise TypeError."""
+        with pytest.raises(TypeError):
+            MsgpackSerializer.dumps(object())
+
+    def test_unknown_ext_type_passthrough(self):
+        """Ext types NAAS does not own are returned untouched."""
+        data = msgpack.packb(msgpack.ExtType(42, b"x"))
+        assert MsgpackSerializer.loads(data) == msgpack.ExtType(42, b"x")
+
+    def test_reads_legacy_pickle(self):
+        """Jobs pickled before the switch to msgpack are still readable."""
+        legacy = pickle.dumps({"credentials": Credentials("user", "pass")}, protocol=pickle.HIGHEST_PROTOCOL)
+        creds = MsgpackSerializer.loads(legacy)["credentials"]
+        assert creds.username == "user"
+
+
+class TestPickleSerializer:
+    """Tests for the migration pickle serializer."""
+
+    def test_writes_pickle(self):
+        """dumps produces pickle data."""
+        data = PickleSerializer.dumps(("a", None))
+        assert pickle.loads(data) == ("a", None)
+
+    def test_reads_msgpack(self):
+        """Jobs written by msgpack-configured processes are readable."""
+        data = MsgpackSerializer.dumps({"credentials": Credentials("user", "pass")})
+        assert PickleSerializer.loads(data)["credentials"].username == "user"
+
+
+class TestRQIntegration:
+    """Tests that RQ jobs round-trip through the serializer."""
+
+    def test_enqueue_and_fetch_job(self):
+        """Job kwargs and meta are stored and restored via msgpack."""
+        redis = FakeStrictRedis()
+        q = Queue("naas", connection=redis, serializer=MsgpackSerializer)
+        q.enqueue(
+            "naas.library.netmiko_lib.netmiko_send_command",
+            ip="192.0.2.1",
+            credentials=Credentials("user", "pass"),
+            commands=["show version"],
+            job_id="job-1",
+            meta={"hash": "abc"},
+        )
+
+        # RQ zlib-compresses the serialized (func, instance, args, kwargs) tuple
+        func_name, _, _, kwargs = msgpack.unpackb(zlib.decompress(redis.hget("rq:job:job-1", "data")))
+        assert func_name == "naas.library.netmiko_lib.netmiko_send_command"
+        assert kwargs["credentials"].code == 1  # Packed as a msgpack ext type, not pickled
+
+        fetched = Job.fetch("job-1", connection=redis, serializer=MsgpackSerializer)
+        assert fetched.func_name == "naas.library.netmiko_lib.netmiko_send_command"
+        assert fetched.kwargs["credentials"].username == "user"
+        assert fetched.meta["hash"] == "abc"
+
+    def test_fetch_legacy_pickled_job(self):
+        """A job enqueued with RQ's default pickle serializer is readable by the msgpack serializer."""
+        redis = FakeStrictRedis()
+        Queue("naas", connection=redis).enqueue(
+            "naas.library.netmiko_lib.netmiko_send_command",
+            credentials=Credentials("user", "pass"),
+            job_id="legacy",
+        )
+
+        fetched = Job.fetch("legacy", connection=redis, serializer=MsgpackSerializer)
+        assert fetched.kwargs["credentials"].username == "user"
@@ -0,0 +1,42 @@
+"""Unit tests for worker host startup."""
+
+import sys
+from unittest.mock import MagicMock, patch
+
+import pytest
+from redis.exceptions import BusyLoadingError, ConnectionError
+
+from naas.library.startup import _PRELOAD_MODULES, preload, wait_for_redis
+
+
+class TestWaitForRedis:
+    """Tests for wait_for_redis."""
+
+    def test_ready_immediately(self):
+        """A reachable Redis returns without sleeping."""
+        redis = MagicMock()
+        with patch("naas.library.startup.time.sleep") as sleep:
+            wait_for_redis(redis, timeout=10)
+        redis.ping.assert_called_once()
+        sleep.assert_not_called()
+
+    def test_retries_with_backoff(self):
+        """Connection errors and a loading Redis are retried with doubling delays."""
+        redis = MagicMock()
+        redis.ping.side_effect = [ConnectionError("refused"), BusyLoadingError("loading"), ConnectionError(), True]
+        with patch("naas.library.startup.time.sleep") as sleep:
+            wait_for_redis(redis, timeout=10, max_delay=0.3)
+        assert [c.args[0] for c in sleep.call_args_list] == [0.1, 0.2, 0.3]
+
+    def test_gives_up_after_timeout(self):
+        """The last error is raised once the next retry would pass the timeout."""
+        redis = MagicMock()
+        redis.ping.side_effect = ConnectionError("refused")
+        with patch("naas.library.startup.time.sleep"), pytest.raises(ConnectionError, match="refused"):
+            wait_for_redis(redis, timeout=0)
+
+
+def test_preload_imports_worker_modules():
+    """Every preloaded module is imported into the parent process."""
+    preload()
+    assert all(module in sys.modules for module in _PRELOAD_MODULES)
@@ -0,0 +1,289 @@
+"""Unit tests for the worker supervisor."""
+
+import os
+import signal
+from unittest.mock import MagicMock, patch
+
+import pytest
+from fakeredis import FakeStrictRedis
+from redis.exceptions import ConnectionError as RedisConnectionError
+from rq import Queue
+
+from naas.library.metrics import supervisor_scale_events, supervisor_worker_exits
+from naas.library.supervisor import WorkerSupervisor, _rss_bytes
+
+
+def _fake_process(*args, **kwargs):
+    """Stand-in for multiprocessing.Process that starts 'alive' with a unique pid."""
+    _fake_process.pid += 1
+    proc = MagicMock()
+    proc.pid = _fake_process.pid
+    proc.kwargs = kwargs["kwargs"]
+    proc.is_alive.return_value = True
+    return proc
+
+
+_fake_process.pid = 100_000
+
+
+@pytest.fixture
+def redis():
+    return FakeStrictRedis()
+
+
+@pytest.fixture
+def supervisor(redis):
+    """Supervisor scaling between 1 and 4 workers, with processes and signals mocked out."""
+    with patch("naas.library.supervisor.Process", side_effect=_fake_process), patch("naas.library.supervisor.os.kill"):
+        yield WorkerSupervisor(
+            target=MagicMock(),
+            worker_kwargs={"log_level": "INFO"},
+            redis=redis,
+            queue_names=["naas_high", "naas"],
+            min_workers=1,
+            max_workers=4,
+            name_prefix="naas_test_",
+        )
+
+
+def _exit_count(reason: str) -> float:
+    return supervisor_worker_exits.labels(reason=reason)._value.get()
+
+
+def _scale_count(direction: str) -> float:
+    return supervisor_scale_events.labels(direction=direction)._value.get()
+
+
+class TestLifecycle:
+    """Tests for starting, stopping and replacing workers."""
+
+    def test_start_spawns_min_workers_with_unique_names(self, supervisor):
+        """Initial workers get the configured kwargs and a sequence-numbered name."""
+        supervisor.start()
+        supervisor.spawn()
+        assert list(supervisor.procs) == ["naas_test_1", "naas_test_2"]
+        assert supervisor.procs["naas_test_1"].kwargs == {"name": "naas_test_1", "log_level": "INFO"}
+        supervisor.procs["naas_test_1"].start.assert_called_once()
+
+    def test_crashed_worker_is_replaced(self, supervisor):
+        """A worker exiting non-zero is counted as a crash and replaced under a new name."""
+        supervisor.start()
+        proc = supervisor.procs["naas_test_1"]
+        proc.is_alive.return_value = False
+        proc.exitcode = -9
+        before = _exit_count("crashed")
+
+        supervisor.tick()
+
+        assert _exit_count("crashed") == before + 1
+        assert list(supervisor.procs) == ["naas_test_2"]
+
+    def test_redis_outage_still_replaces_workers(self, supervisor, redis, caplog):
+        """With Redis down, exited workers are still replaced, but none are stopped without knowing who is busy."""
+        supervisor.desired = 2
+        supervisor.start()
+        supervisor.procs["naas_test_1"].is_alive.return_value = False
+        supervisor.procs["naas_test_1"].exitcode = -9
+
+        with patch.object(redis, "pipeline", side_effect=RedisConnectionError("Connection refused")):
+            supervisor.tick()
+            assert list(supervisor.procs) == ["naas_test_2", "naas_test_3"]
+            assert "skipping autoscaling: Connection refused" in caplog.text
+
+            supervisor.desired = 1
+            supervisor.tick()
+            assert supervisor._stopping == {}
+
+    def test_clean_exit_is_recycled(self, supervisor):
+        """A worker exiting 0 (max_jobs reached) is counted as recycled."""
+        supervisor.start()
+        proc = supervisor.procs["naas_test_1"]
+        proc.is_alive.return_value = False
+        proc.exitcode = 0
+        before = _exit_count("recycled")
+
+        supervisor.reap()
+
+        assert _exit_count("recycled") == before + 1
+        assert supervisor.procs == {}
+
+    def test_reap_marks_multiprocess_metrics_dead(self, supervisor, tmp_path):
+        """Exited workers' live gauge files are cleaned up in multiprocess mode."""
+        supervisor.start()
+        proc = supervisor.procs["naas_test_1"]
+        proc.is_alive.return_value = False
+        proc.exitcode = 0
+        with (
+            patch.dict(os.environ, {"PROMETHEUS_MULTIPROC_DIR": str(tmp_path)}),
+            patch("naas.library.supervisor.multiprocess.mark_process_dead") as mark_dead,
+        ):
+            supervisor.reap()
+        mark_dead.assert_called_once_with(proc.pid)
+
+    def test_stop_worker_signals_once(self, supervisor):
+        """Stopping sends one SIGTERM and the exit is recorded under the stop reason."""
+        supervisor.start()
+        proc = supervisor.procs["naas_test_1"]
+        supervisor.stop_worker("naas_test_1", "scaled_down")
+        supervisor.stop_worker("naas_test_1", "rss")
+
+        os.kill.assert_called_once_with(proc.pid, signal.SIGTERM)
+        proc.is_alive.return_value = False
+        proc.exitcode = 0
+        before = _exit_count("scaled_down")
+        supervisor.reap()
+        assert _exit_count("scaled_down") == before + 1
+
+    def test_stop_worker_not_started(self, supervisor):
+        """A process without a pid cannot be signalled."""
+        supervisor.start()
+        supervisor.procs["naas_test_1"].pid = None
+        supervisor.stop_worker("naas_test_1", "scaled_down")
+        os.kill.assert_not_called()
+
+    def test_shutdown_kills_stragglers(self, supervisor):
+        """Workers still alive after the timeout are killed."""
+        supervisor.start()
+        supervisor.spawn()
+        procs = list(supervisor.procs.values())
+        procs[0].is_alive.return_value = False
+
+        supervisor.shutdown(timeout=0)
+
+        assert os.kill.call_count == 2
+        procs[0].kill.assert_not_called()
+        procs[1].kill.assert_called_once()
+        assert supervisor.procs == {}
+
+
+class TestRecycleOversized:
+    """Tests for RSS-based recycling."""
+
+    def test_disabled_by_default(self, supervisor):
+        """With WORKER_MAX_RSS_MB unset, RSS is not checked."""
+        supervisor.start()
+        with patch("naas.library.supervisor._rss_bytes") as rss:
+            supervisor.recycle_oversized()
+        rss.assert_not_called()
+
+    def test_stops_workers_over_limit(self, supervisor):
+        """Only workers above the ceiling are stopped, and a replacement starts right away."""
+        supervisor.start()
+        supervisor.spawn()
+        supervisor.desired = 2
+        sizes = {supervisor.procs["naas_test_1"].pid: 600 * 1024 * 1024, supervisor.procs["naas_test_2"].pid: None}
+        with (
+            patch("naas.library.supervisor.WORKER_MAX_RSS_MB", 512),
+            patch("naas.library.supervisor._rss_bytes", side_effect=sizes.get),
+        ):
+            supervisor.tick()
+
+        assert supervisor._stopping == {"naas_test_1": "rss"}
+        assert list(supervisor.procs) == ["naas_test_1", "naas_test_2", "naas_test_3"]
+
+    def test_rss_bytes(self):
+        """RSS is read from /proc, and is None for processes that don't exist."""
+        assert _rss_bytes(os.getpid()) > 0
+        assert _rss_bytes(2**22 + 1) is None
+
+
+class TestAutoscale:
+    """Tests for queue-driven scaling."""
+
+    def test_queue_stats(self, supervisor, redis):
+        """Depth sums all queues and wait is the age of the oldest job at the head of one."""
+        assert supervisor.queue_stats() == (0, 0.0)
+
+        Queue("naas", connection=redis).enqueue("os.getcwd")
+        Queue("naas_high", connection=redis).enqueue("os.getcwd")
+        Queue("naas_high", connection=redis).enqueue("os.getcwd")
+        depth, wait = supervisor.queue_stats()
+        assert depth == 3
+        assert 0 <= wait < 5
+
+    def test_queue_stats_missing_job_hash(self, supervisor, redis):
+        """A queued ID whose job hash has expired does not count towards the wait."""
+        redis.rpush("rq:queue:naas", "gone")
+        assert supervisor.queue_stats() == (1, 0.0)
+
+    def test_scales_up_when_jobs_wait(self, supervisor, redis):
+        """A backlog older than WORKER_SCALE_UP_WAIT raises the target to busy workers plus backlog."""
+        supervisor.start()
+        redis.hset("rq:worker:naas_test_1", "state", "busy")
+        before = _scale_count("up")
+        with patch.object(supervisor, "queue_stats", return_value=(2, 10.0)):
+            supervisor.tick()
+        assert supervisor.desired == 3
+        assert len(supervisor.procs) == 3
+        assert _scale_count("up") == before + 1
+
+    def test_scale_up_capped_at_max(self, supervisor):
+        """The target never exceeds max_workers."""
+        with patch.object(supervisor, "queue_stats", return_value=(50, 10.0)):
+            supervisor.autoscale(now=0, busy=1)
+        assert supervisor.desired == 4
+
+    def test_holds_when_backlog_is_fresh(self, supervisor):
+        """Jobs that haven't waited long don't change the target either way."""
+        supervisor.desired = 3
+        with patch.object(supervisor, "queue_stats", return_value=(5, 1.0)):
+            supervisor.autoscale(now=0, busy=0)
+            supervisor.autoscale(now=1000, busy=0)
+        assert supervisor.desired == 3
+
+    def test_scales_down_after_delay(self, supervisor):
+        """A surplus is only acted on once it has lasted WORKER_SCALE_DOWN_DELAY."""
+        supervisor.desired = 3
+        before = _scale_count("down")
+        with patch.object(supervisor, "queue_stats", return_value=(0, 0.0)):
+            supervisor.autoscale(now=0, busy=2)
+            supervisor.autoscale(now=100, busy=2)
+            assert supervisor.desired == 3
+            supervisor.autoscale(now=300, busy=2)
+        assert supervisor.desired == 2
+        assert _scale_count("down") == before + 1
+
+    def test_demand_spike_resets_scale_down_timer(self, supervisor):
+        """Needing the current count again restarts the scale down delay."""
+        supervisor.desired = 3
+        with patch.object(supervisor, "queue_stats", return_value=(0, 0.0)):
+            supervisor.autoscale(now=0, busy=1)
+            supervisor.autoscale(now=200, busy=3)
+            supervisor.autoscale(now=300, busy=1)
+        assert supervisor.desired == 3
+
+    def test_fixed_size_skips_autoscale(self, supervisor):
+        """With min_workers == max_workers the backlog is never read."""
+        supervisor.max_workers = supervisor.min_workers
+        supervisor.start()
+        with patch.object(supervisor, "queue_stats") as stats:
+            supervisor.tick()
+        stats.assert_not_called()
+
+
+class TestReconcile:
+    """Tests for matching the process count to the target."""
+
+    def test_stops_only_idle_workers(self, supervisor, redis):
+        """Scaling down never interrupts a busy worker."""
+        supervisor.desired = 3
+        supervisor.start()
+        redis.hset("rq:worker:naas_test_1", "state", "busy")
+        redis.hset("rq:worker:naas_test_2", "state", "idle")
+        supervisor.desired = 1
+
+        supervisor.reconcile(supervisor.worker_states())
+
+        assert supervisor._stopping == {"naas_test_2": "scaled_down", "naas_test_3": "scaled_down"}
+
+    def test_keeps_surplus_while_all_busy(self, supervisor, redis):
+        """If every worker is busy the surplus waits for the next pass."""
+        supervisor.desired = 2
+        supervisor.start()
+        for name in supervisor.procs:
+            redis.hset(f"rq:worker:{name}", "state", "busy")
+        supervisor.desired = 1
+
+        supervisor.reconcile(supervisor.worker_states())
+
+        assert supervisor._stopping == {}
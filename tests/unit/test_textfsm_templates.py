@@ -0,0 +1,103 @@
+"""Unit tests for the TextFSM template caches."""
+
+from unittest.mock import patch
+
+import pytest
+from netmiko.utilities import get_structured_data_textfsm
+
+from naas.library import textfsm_templates
+from naas.library.textfsm_templates import compile_template, parse_output, resolve_templates
+
+SHOW_IP_INT_BRIEF = """\
+Interface              IP-Address      OK? Method Status                Protocol
+GigabitEthernet0/0     192.0.2.1       YES NVRAM  up                    up
+GigabitEthernet0/1     unassigned      YES NVRAM  administratively down down
+"""
+
+CUSTOM_TEMPLATE = "Value INTF (\\S+)\nValue IP (\\S+)\n\nStart\n  ^${INTF}\\s+${IP}\\s+YES -> Record\n"
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    """Start each test with no compiled templates."""
+    textfsm_templates._compiled.clear()
+    yield
+    textfsm_templates._compiled.clear()
+
+
+class TestParseOutput:
+    """Tests for parse_output."""
+
+    def test_ntc_template_matches_netmiko(self):
+        """Index-resolved parsing returns what Netmiko's parser returns."""
+        result = parse_output(SHOW_IP_INT_BRIEF, "cisco_ios", "show ip int brief")
+        assert result == get_structured_data_textfsm(SHOW_IP_INT_BRIEF, "cisco_ios", "show ip int brief")
+        assert result[0] == {
+            "interface": "GigabitEthernet0/0",
+            "ip_address": "192.0.2.1",
+            "status": "up",
+            "proto": "up",
+        }
+
+    def test_custom_template(self):
+        """A custom template is compiled from its text, with lowercased field names."""
+        result = parse_output(SHOW_IP_INT_BRIEF, "cisco_ios", "show ip int brief", CUSTOM_TEMPLATE)
+        assert result == [
+            {"intf": "GigabitEthernet0/0", "ip": "192.0.2.1"},
+            {"intf": "GigabitEthernet0/1", "ip": "unassigned"},
+        ]
+
+    def test_invalid_custom_template_returns_raw(self):
+        """A template that doesn't compile leaves the output unparsed."""
+        assert parse_output(SHOW_IP_INT_BRIEF, "cisco_ios", "show x", "not a template") == SHOW_IP_INT_BRIEF
+
+    def test_no_records_returns_raw(self):
+        """Output the template doesn't match is returned as-is."""
+        assert parse_output("nothing here", "cisco_ios", "show ip int brief") == "nothing here"
+
+    def test_unknown_command_returns_raw(self):
+        """Commands with no ntc-template are returned as-is."""
+        assert parse_output("output", "cisco_ios", "show nonexistent thing") == "output"
+
+    def test_cisco_xe_falls_back_to_ios(self):
+        """IOS-XE output no XE template parses is retried with the IOS templates."""
+        with patch("naas.library.textfsm_templates.resolve_templates", wraps=resolve_templates) as resolve:
+            result = parse_output(SHOW_IP_INT_BRIEF, "cisco_xe", "show ip int brief")
+        assert result[0]["interface"] == "GigabitEthernet0/0"
+        assert [c.args[0] for c in resolve.call_args_list] == ["cisco_xe", "cisco_ios"]
+
+    def test_multi_template_row_delegates_to_netmiko(self):
+        """Index rows naming several templates are parsed by Netmiko, which merges them."""
+        with patch("naas.library.textfsm_templates.get_structured_data_textfsm", return_value=[{}]) as netmiko_parse:
+            assert parse_output("output", "cisco_ios", "show module") == [{}]
+        netmiko_parse.assert_called_once_with("output", platform="cisco_ios", command="show module")
+
+
+class TestCaches:
+    """Tests for the compiled template LRU and index lookup cache."""
+
+    def test_template_compiled_once(self):
+        """Repeated parses with the same template reuse the compiled object."""
+        parse_output(SHOW_IP_INT_BRIEF, "cisco_ios", "show ip int brief", CUSTOM_TEMPLATE)
+        fsm = next(iter(textfsm_templates._compiled.values()))
+        with patch("naas.library.textfsm_templates.textfsm.TextFSM") as compile_fsm:
+            result = parse_output(SHOW_IP_INT_BRIEF, "cisco_ios", "show ip int brief", CUSTOM_TEMPLATE)
+        compile_fsm.assert_not_called()
+        assert len(result) == 2  # Reset() cleared the previous parse's records
+        assert list(textfsm_templates._compiled.values()) == [fsm]
+
+    def test_lru_eviction(self):
+        """The least recently used template is dropped once the cache is full."""
+        with patch("naas.library.textfsm_templates.TEXTFSM_CACHE_SIZE", 2):
+            compile_template("a", lambda: CUSTOM_TEMPLATE)
+            compile_template("b", lambda: CUSTOM_TEMPLATE)
+            compile_template("a", lambda: CUSTOM_TEMPLATE)
+            compile_template("c", lambda: CUSTOM_TEMPLATE)
+        assert list(textfsm_templates._compiled) == ["a", "c"]
+
+    def test_index_lookup_cached(self):
+        """Resolving the same platform and command again doesn't search the index."""
+        resolve_templates.cache_clear()
+        assert resolve_templates("cisco_ios", "show version") == ("cisco_ios_show_version.textfsm",)
+        resolve_templates("cisco_ios", "show version")
+        assert resolve_templates.cache_info().hits == 1
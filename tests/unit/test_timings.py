@@ -0,0 +1,188 @@
+"""Unit tests for per-phase job timings."""
+
+import json
+import os
+import subprocess
+import sys
+from datetime import UTC, datetime, timedelta
+from unittest.mock import MagicMock, patch
+
+import netmiko
+import pytest
+from prometheus_client import REGISTRY
+
+from naas.library.timings import JobTimings, observe_phases, timed_connect
+from tests.fake_device import FakeDevice
+
+# Run jobs through a LaneWorker, forking a work horse for each, with metrics in multiprocess mode.
+# The horses inherit the worker's pooled client, as in worker.py.
+_RUN_JOBS = """
+import json, os, sys, threading
+from fakeredis import TcpFakeServer
+from prometheus_client import CollectorRegistry
+from prometheus_client.multiprocess import MultiProcessCollector
+from rq import Queue
+from naas.library.lane_worker import LaneWorker
+from naas.library.redis_client import redis_client
+from naas.library.serializers import job_serializer
+
+server = TcpFakeServer(("127.0.0.1", 0), server_type="redis")
+server.daemon_threads = True
+threading.Thread(target=server.serve_forever, daemon=True).start()
+redis = redis_client(*server.server_address, password="")
+queue = Queue("naas", connection=redis, serializer=job_serializer)
+for _ in range(int(sys.argv[1])):
+    queue.enqueue("tests.unit.test_timings._timed_job")
+LaneWorker([queue], connection=redis, serializer=job_serializer).work(burst=True, logging_level="WARNING")
+
+registry = CollectorRegistry()
+MultiProcessCollector(registry)
+labels = {"phase": "tcp_connect", "platform": "cisco_ios", "pool": "miss"}
+print(json.dumps({
+    "files": len(os.listdir(os.environ["PROMETHEUS_MULTIPROC_DIR"])),
+    "observed": registry.get_sample_value("naas_job_phase_seconds_count", labels),
+}))
+"""
+
+
+def _timed_job() -> None:
+    timings = JobTimings("cisco_ios")
+    timings.begin("tcp_connect")
+    timings.record()
+
+
+def _observations(phase: str, platform: str = "cisco_ios", pool: str = "miss") -> float:
+    labels = {"phase": phase, "platform": platform, "pool": pool}
+    return REGISTRY.get_sample_value("naas_job_phase_seconds_count", labels) or 0.0
+
+
+def _device(device: FakeDevice, password: str = "admin") -> dict:
+    return {
+        "device_type": "cisco_ios",
+        "ip": device.host,
+        "port": device.port,
+        "username": "admin",
+        "password": password,
+        "allow_agent": False,
+        "use_keys": False,
+        "fast_cli": True,
+    }
+
+
+class TestJobTimings:
+    """Tests for the JobTimings lap timer."""
+
+    def test_phases_and_commands(self):
+        """Each begin() ends the running phase; repeated phases and commands are summed."""
+        with patch("naas.library.timings.time.perf_counter", side_effect=[1.0, 1.5, 2.0, 2.5, 2.75, 3.0, 4.0, 4.0]):
+            timings = JobTimings("cisco_ios")  # start 1.0
+            timings.begin("connect")  # 1.5
+            timings.begin("disconnect")  # 2.0: connect 0.5
+            timings.begin("connect")  # 2.5: disconnect 0.5
+            with timings.command("show version"):  # 2.75: connect 0.75 in total
+                pass  # 3.0
+            timings.end()  # 4.0
+            assert timings.as_dict() == {
+                "connect": 0.75,
+                "disconnect": 0.5,
+                "commands": {"show version": 0.25},
+                "total": 3.0,
+            }
+
+    def test_record_stores_meta_and_observes(self):
+        """record() saves the timings with the queue wait to the job, and the worker observes each phase and command."""
+        job = MagicMock()
+        job.meta = {}
+        job.get_meta.side_effect = lambda: job.meta
+        job.enqueued_at = datetime(2026, 1, 1, tzinfo=UTC)
+        job.started_at = job.enqueued_at + timedelta(seconds=2.5)
+        before = _observations("tcp_connect", "arista_eos", "hit"), _observations("command", "arista_eos", "hit")
+
+        timings = JobTimings("arista_eos")
+        timings.pool = "hit"
+        timings.begin("tcp_connect")
+        with timings.command("show version"):
+            pass
+        with patch("naas.library.timings.get_current_job", return_value=job):
+            timings.record()
+
+        assert set(job.meta["timings"]) == {"tcp_connect", "commands", "queue_wait", "total"}
+        assert job.meta["timings"]["queue_wait"] == 2.5
+        job.save_meta.assert_called_once()
+        assert (
+            _observations("tcp_connect", "arista_eos", "hit"),
+            _observations("command", "arista_eos", "hit"),
+        ) == before
+
+        observe_phases(job)
+        after = _observations("tcp_connect", "arista_eos", "hit"), _observations("command", "arista_eos", "hit")
+        assert after == (before[0] + 1, before[1] + 1)
+
+    def test_record_outside_a_job(self):
+        """Outside a worker there is no job to store timings on, so the phases are observed directly."""
+        before = _observations("tcp_connect")
+        timings = JobTimings("cisco_ios")
+        timings.begin("tcp_connect")
+        with patch("naas.library.timings.get_current_job", return_value=None):
+            timings.record()
+        assert _observations("tcp_connect") == before + 1
+
+    def test_observe_phases_read_failure_logged(self, caplog):
+        """Failing to read a job's timings back is logged rather than failing the worker."""
+        job = MagicMock(id="job-1")
+        job.get_meta.side_effect = ConnectionError("redis down")
+        observe_phases(job)
+        assert "job-1: Could not read job timings: redis down" in caplog.text
+
+    def test_horses_write_no_metric_files(self, tmp_path):
+        """Each job's work horse leaves its phases to the worker, so running jobs adds no files per job."""
+        runs = []
+        for jobs in (1, 5):
+            multiproc_dir = tmp_path / str(jobs)
+            multiproc_dir.mkdir()
+            env = {**os.environ, "PROMETHEUS_MULTIPROC_DIR": str(multiproc_dir)}
+            run = subprocess.run([sys.executable, "-c", _RUN_JOBS, str(jobs)], env=env, capture_output=True, check=True)
+            runs.append(json.loads(run.stdout))
+        assert runs[1]["files"] == runs[0]["files"]
+        assert [run["observed"] for run in runs] == [1, 5]  # Observed by the worker
+
+    def test_record_save_failure_logged(self, caplog):
+        """Failing to save timings is logged rather than failing the job."""
+        job = MagicMock()
+        job.meta = {}
+        job.enqueued_at = None
+        job.save_meta.side_effect = ConnectionError("redis down")
+        with patch("naas.library.timings.get_current_job", return_value=job):
+            JobTimings("cisco_ios").record()
+        assert "queue_wait" not in job.meta["timings"]
+        assert "Could not save job timings: redis down" in caplog.text
+
+
+class TestTimedConnect:
+    """Tests for timed_connect, against the fake device."""
+
+    def test_connection_phases(self):
+        """TCP connect, key exchange, auth and session preparation are timed separately."""
+        timings = JobTimings("cisco_ios")
+        with FakeDevice("cisco_ios") as device:
+            connection = timed_connect(timings, _device(device))
+            transport = connection.remote_conn.get_transport()
+            connection.disconnect()
+        assert list(timings.phases) == ["tcp_connect", "key_exchange", "auth", "session_prep"]
+        assert transport.timings is None  # Detached, as pooled connections outlive the job
+
+    def test_auth_failure(self):
+        """A failed login ends the auth phase, and doesn't leave Netmiko's secrets filter behind."""
+        timings = JobTimings("cisco_ios")
+        filters = list(netmiko.base_connection.log.filters)
+        with FakeDevice("cisco_ios") as device, pytest.raises(netmiko.NetmikoAuthenticationException):
+            timed_connect(timings, _device(device, password="wrong"))
+        assert list(timings.phases) == ["tcp_connect", "key_exchange", "auth"]
+        assert netmiko.base_connection.log.filters == filters
+
+    def test_unhookable_netmiko(self):
+        """With a Netmiko lacking the hooked methods the connection is made as usual, timed as tcp_connect."""
+        timings = JobTimings("cisco_ios")
+        with FakeDevice("cisco_ios") as device, patch("naas.library.timings._HOOKABLE", False):
+            timed_connect(timings, _device(device)).disconnect()
+        assert list(timings.phases) == ["tcp_connect"]
@@ -0,0 +1,33 @@
+"""Unit tests for the API server's shared SSL context."""
+
+import ssl
+from unittest.mock import MagicMock
+
+import pytest
+
+from naas.library import tls
+from naas.library.tls import server_context
+
+
+@pytest.fixture(autouse=True)
+def reset_context():
+    tls._context = None
+    yield
+    tls._context = None
+
+
+def test_built_once():
+    """Every connection gets the context built on first use."""
+    factory = MagicMock(return_value=ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER))
+    context = server_context(factory)
+    assert server_context(factory) is context
+    factory.assert_called_once_with()
+
+
+def test_settings():
+    """The context requires TLS 1.2 or later and issues session tickets."""
+    base = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    base.options |= ssl.OP_NO_TICKET
+    context = server_context(lambda: base)
+    assert context.minimum_version == ssl.TLSVersion.TLSv1_2
+    assert not context.options & ssl.OP_NO_TICKET
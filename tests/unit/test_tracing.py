@@ -0,0 +1,173 @@
+"""Unit tests for OpenTelemetry tracing."""
+
+import json
+from base64 import b64encode
+from unittest.mock import MagicMock, patch
+
+import pytest
+from fakeredis import FakeStrictRedis
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+from opentelemetry.trace import SpanKind, StatusCode
+from rq import Queue
+
+from naas.library import tracing
+from naas.library.lane_worker import LaneWorker
+from naas.library.lanes import LaneQueue
+from naas.library.timings import JobTimings
+
+TRACE_ID = "0af7651916cd43dd8448eb211c80319c"
+TRACEPARENT = f"00-{TRACE_ID}-b7ad6b7169203331-01"
+
+
+@pytest.fixture
+def spans():
+    """Turn tracing on for the test, collecting finished spans in memory."""
+    exporter = InMemorySpanExporter()
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    with patch.object(tracing, "_provider", provider), patch.object(tracing, "_tracer", provider.get_tracer("test")):
+        yield exporter
+    provider.shutdown()
+
+
+def _by_name(exporter: InMemorySpanExporter) -> dict:
+    return {span.name: span for span in exporter.get_finished_spans()}
+
+
+class TestInitTracing:
+    """Tests for init_tracing and the exporters."""
+
+    def test_disabled(self):
+        """With TRACING_ENABLED off nothing is set up, and every helper is a no-op."""
+        assert tracing.init_tracing("naas-api") is False
+        meta: dict = {}
+        tracing.inject(meta)
+        assert meta == {}
+        with tracing.span("noop") as span:
+            assert span is None
+        assert tracing.start_span("noop") is None
+        tracing.set_error(None, ValueError())
+        tracing.end_span(None)
+        tracing.flush()
+
+    def test_file_exporter(self, tmp_path):
+        """The file exporter writes one JSON span per line."""
+        path = tmp_path / "traces.jsonl"
+        with (
+            patch("naas.library.tracing.TRACING_ENABLED", True),
+            patch("naas.library.tracing.TRACING_EXPORTER", "file"),
+            patch("naas.library.tracing.TRACING_FILE", str(path)),
+            patch.object(tracing, "_provider"),
+            patch.object(tracing, "_tracer"),
+        ):
+            assert tracing.init_tracing("naas-worker") is True
+            tracing.end_span(tracing.start_span("job"))
+            tracing.flush()
+            tracing._provider.shutdown()
+
+        [line] = path.read_text().splitlines()
+        span = json.loads(line)
+        assert span["name"] == "job"
+        assert span["resource"]["attributes"]["service.name"] == "naas-worker"
+
+    def test_otlp_exporter(self):
+        """OTLP over HTTP is the default exporter, configured by the standard OTEL_EXPORTER_OTLP_* variables."""
+        with (
+            patch("naas.library.tracing.TRACING_EXPORTER", "otlp"),
+            patch("opentelemetry.exporter.otlp.proto.http.trace_exporter.OTLPSpanExporter") as mock_exporter,
+        ):
+            assert tracing._exporter() is mock_exporter.return_value
+
+
+class TestApiSpans:
+    """Tests for the spans around API requests."""
+
+    def test_submit_continues_client_trace(self, spans, app, client):
+        """A POST continues the client's traceparent, with validation and enqueue as child spans."""
+        app.config["redis"].set("naas_cred_salt", b"test-salt")
+        auth = b64encode(b"testuser:testpass").decode()
+        with patch("naas.library.validation.tacacs_auth_lockout", return_value=False):
+            response = client.post(
+                "/v1/send_command",
+                json={"ip": "192.168.1.1", "commands": ["show version"]},
+                headers={"Authorization": f"Basic {auth}", "traceparent": TRACEPARENT},
+            )
+        assert response.status_code == 202
+
+        by_name = _by_name(spans)
+        server = by_name["POST /v1/send_command"]
+        assert server.kind == SpanKind.SERVER
+        assert format(server.context.trace_id, "032x") == TRACE_ID
+        assert by_name["valid_post"].parent.span_id == server.context.span_id
+        assert by_name["enqueue"].parent.span_id == server.context.span_id
+        assert by_name["enqueue"].attributes["naas.ip"] == "192.168.1.1"
+
+    def test_get_results_span(self, spans, client):
+        """Fetching results is traced too, under its route rule."""
+        auth = b64encode(b"testuser:testpass").decode()
+        with patch("naas.resources.get_results.job_unlocker", return_value=True):
+            client.get(
+                "/v1/send_command/00000000-0000-0000-0000-000000000000", headers={"Authorization": f"Basic {auth}"}
+            )
+        assert "GET /v1/send_command/<string:job_id>" in _by_name(spans)
+
+
+class TestJobSpans:
+    """Tests for trace context through the queue and the worker's spans."""
+
+    def test_job_meta_carries_context(self, spans):
+        """Jobs created under a span store its trace context for the worker."""
+        queue = LaneQueue("naas", connection=FakeStrictRedis())
+        with tracing.span("enqueue") as span:
+            job = queue.enqueue("os.getcwd")
+        traceparent = job.meta[tracing.TRACE_META_KEY]["traceparent"]
+        assert traceparent.split("-")[1:3] == [
+            format(span.context.trace_id, "032x"),
+            format(span.context.span_id, "016x"),
+        ]
+        assert queue.fetch_job(job.id).meta[tracing.TRACE_META_KEY] == job.meta[tracing.TRACE_META_KEY]
+
+    def test_job_timings_spans(self, spans):
+        """The job span continues the trace from job meta, with a child span per phase and command."""
+        job = MagicMock()
+        job.meta = {tracing.TRACE_META_KEY: {"traceparent": TRACEPARENT}}
+        with patch("naas.library.tracing.get_current_job", return_value=job):
+            timings = JobTimings("cisco_ios", "netmiko.send_command", {"naas.ip": "192.0.2.1"})
+        timings.begin("tcp_connect")
+        with timings.command("show version"):
+            pass
+        with pytest.raises(ValueError), timings.command("show clock"):
+            raise ValueError("timed out")
+        timings.begin("disconnect")
+        timings.fail(OSError("reset"))
+        timings.record()
+
+        finished = spans.get_finished_spans()
+        job_span = next(span for span in finished if span.name == "netmiko.send_command")
+        assert format(job_span.context.trace_id, "032x") == TRACE_ID
+        assert job_span.attributes["naas.ip"] == "192.0.2.1"
+        assert job_span.attributes["naas.pool"] == "miss"
+        assert job_span.status.status_code == StatusCode.ERROR
+        children = [span for span in finished if span is not job_span]
+        assert [span.name for span in children] == ["tcp_connect", "command", "command", "disconnect"]
+        assert all(span.parent.span_id == job_span.context.span_id for span in children)
+        assert [span.status.status_code for span in children] == [
+            StatusCode.UNSET,
+            StatusCode.UNSET,
+            StatusCode.ERROR,
+            StatusCode.ERROR,
+        ]
+
+    def test_worker_flushes_after_job(self):
+        """Spans are exported before the work horse exits, whether or not the job succeeded."""
+        redis = FakeStrictRedis()
+        worker = LaneWorker([Queue("naas", connection=redis)], connection=redis)
+        with (
+            patch("naas.library.lane_worker.Worker.perform_job", side_effect=RuntimeError),
+            patch("naas.library.lane_worker.tracing.flush") as mock_flush,
+            pytest.raises(RuntimeError),
+        ):
+            worker.perform_job(MagicMock(), worker.queues[0])
+        mock_flush.assert_called_once()
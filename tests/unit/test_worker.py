@@ -43,7 +43,7 @@ def test_worker_has_signal_handlers():
     from worker import worker_launch
 
     # Mock Worker to prevent actual work loop
-    with patch("worker.Worker") as mock_worker_class, patch("worker.Redis"):
+    with patch("worker.LaneWorker") as mock_worker_class, patch("worker.redis_client"), patch("worker.use_redis"):
         mock_worker = MagicMock()
         mock_worker.work = MagicMock(side_effect=KeyboardInterrupt)  # Exit immediately
         mock_worker_class.return_value = mock_worker
@@ -72,3 +72,50 @@ def test_worker_has_signal_handlers():
         registered_signals = [sig for sig, _ in signal_calls]
         assert signal.SIGTERM in registered_signals
         assert signal.SIGINT in registered_signals
+
+
+def test_worker_shares_connection_with_circuit_breaker():
+    """The circuit breaker and lockout checks use the worker's RQ connection rather than opening their own"""
+    from unittest.mock import MagicMock, patch
+
+    from worker import worker_launch
+
+    with (
+        patch("worker.LaneWorker") as mock_worker_class,
+        patch("worker.redis_client") as mock_redis_client,
+        patch("worker.use_redis") as mock_use_redis,
+        patch("worker.signal.signal"),
+    ):
+        mock_worker_class.return_value = MagicMock()
+        worker_launch(name="test", queues=["test"], redis_host="localhost", redis_port=6379, log_level="INFO")
+
+    mock_redis_client.assert_called_once_with("localhost", 6379, "")
+    mock_use_redis.assert_called_once_with(mock_redis_client.return_value)
+    assert mock_worker_class.call_args.kwargs["connection"] is mock_redis_client.return_value
+    assert mock_worker_class.call_args.kwargs["shared_connection"] is mock_redis_client.return_value
+
+
+def test_sharded_worker_shares_state_through_main_redis():
+    """With REDIS_SHARDS the worker dequeues from its shard but keeps shared state on REDIS_HOST"""
+    from unittest.mock import MagicMock, patch
+
+    from worker import worker_launch
+
+    shard, main = MagicMock(), MagicMock()
+    main.get.return_value = b"salt"
+    with (
+        patch("worker.REDIS_SHARDS", ["shard-0:6379", "shard-1:6379"]),
+        patch("worker.LaneWorker") as mock_worker_class,
+        patch("worker.redis_client", side_effect=[shard, main]) as mock_redis_client,
+        patch("worker.use_redis") as mock_use_redis,
+        patch("worker.signal.signal"),
+        patch("naas.library.connection_pool.pool.set_salt") as mock_set_salt,
+    ):
+        mock_worker_class.return_value = MagicMock()
+        worker_launch(name="test", queues=["test"], redis_host="shard-1", redis_port=6379, log_level="INFO")
+
+    assert mock_redis_client.call_args_list[1].args == ()  # REDIS_HOST
+    mock_use_redis.assert_called_once_with(main)
+    assert mock_worker_class.call_args.kwargs["connection"] is shard
+    assert mock_worker_class.call_args.kwargs["shared_connection"] is main
+    mock_set_salt.assert_called_once_with("salt")
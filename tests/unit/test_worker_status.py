@@ -0,0 +1,57 @@
+"""Unit tests for the worker status summary."""
+
+import json
+import time
+
+import pytest
+from fakeredis import FakeStrictRedis
+
+from naas.library.worker_status import WORKER_STATUS_KEY, live_statuses, publish_status, remove_status
+
+
+def _statuses(redis) -> dict:
+    return live_statuses(redis, redis.hgetall(WORKER_STATUS_KEY))
+
+
+class TestWorkerStatus:
+    """Tests for publishing and reading worker status."""
+
+    def test_publish_and_read(self):
+        """Published statuses are read back."""
+        redis = FakeStrictRedis()
+        publish_status(redis, "w1", "host-a", 1700000000.5, 3, 60)
+        publish_status(redis, "w2", "host-b", None, 0, 60)
+
+        workers = _statuses(redis)
+
+        assert workers["w1"]["state"] == "busy"
+        assert workers["w1"]["job_started"] == 1700000000.5
+        assert workers["w1"]["pool"] == 3
+        assert workers["w2"] == {
+            "host": "host-b",
+            "state": "idle",
+            "job_started": None,
+            "pool": 0,
+            "expires": workers["w2"]["expires"],
+        }
+        assert workers["w2"]["expires"] == pytest.approx(time.time() + 60, abs=1)
+
+    def test_expired_entries_pruned(self):
+        """Entries whose worker stopped heartbeating are ignored and deleted."""
+        redis = FakeStrictRedis()
+        publish_status(redis, "alive", "host-a", None, 0, 60)
+        redis.hset(
+            WORKER_STATUS_KEY, "dead", json.dumps({"host": "host-b", "state": "busy", "expires": time.time() - 1})
+        )
+
+        workers = _statuses(redis)
+
+        assert list(workers) == ["alive"]
+        assert redis.hkeys(WORKER_STATUS_KEY) == [b"alive"]
+
+    def test_remove(self):
+        """A worker removes its own status on shutdown."""
+        redis = FakeStrictRedis()
+        publish_status(redis, "w1", "host-a", None, 0, 60)
+        remove_status(redis, "w1")
+        assert _statuses(redis) == {}
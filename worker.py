@@ -12,18 +12,36 @@ import signal
 from argparse import ArgumentParser, Namespace
 from collections.abc import Sequence
 from logging import basicConfig, getLogger
-from multiprocessing import Process
 from pathlib import Path
 from socket import gethostname
-from time import sleep
-
-from redis import Redis
-from rq import Queue, Worker
-
+from time import monotonic, sleep
+
+from rq import Queue
+
+from naas.config import (
+    QUEUE_LANES,
+    REDIS_SHARDS,
+    SHUTDOWN_TIMEOUT,
+    WORKER_MAX_JOBS,
+    WORKER_METRICS_PORT,
+    WORKER_SUPERVISE_INTERVAL,
+)
+from naas.library.circuit_breaker import use_redis
+from naas.library.lane_worker import LaneWorker
+from naas.library.metrics import start_metrics_server
 from naas.library.netmiko_lib import netmiko_send_command, netmiko_send_config  # noqa F401
+from naas.library.redis_client import redis_client
+from naas.library.result_store import purge_expired
+from naas.library.serializers import job_serializer
+from naas.library.startup import preload, wait_for_redis
+from naas.library.supervisor import WorkerSupervisor
+from naas.library.tracing import init_tracing
 
 logger = getLogger("naas_worker")
 
+# Seconds between purges of expired result blobs
+_PURGE_INTERVAL = 30
+
 
 def main() -> None:
     """
@@ -41,30 +59,37 @@ def main() -> None:
         datefmt="%Y-%m-%d %H:%M:%S %z",
     )
 
-    # Sleep 10 seconds to allow Redis to come up
-    logger.debug("Sleeping %s seconds to allow Redis to initialize.", args.sleep)
-    sleep(args.sleep)
-
-    # Launch the workers
-    logger.debug("Creating %s workers", args.workers)
-    processes = []
-    hostname = gethostname()
-    for w in range(1, args.workers + 1):
-        proc = Process(
-            target=worker_launch,
-            kwargs={
-                "name": f"naas_{hostname}_{w}",
-                "queues": args.queues,
-                "redis_host": args.redis,
-                "redis_port": args.port,
-                "redis_pw": args.auth_password,
-                "log_level": args.log_level,
-            },
-        )
-        processes.append(proc)
-        proc.start()
-
-    # Main loop: write heartbeat file and monitor child processes
+    # Wait for Redis to come up
+    redis = redis_client(args.redis, args.port, args.auth_password or "")
+    logger.debug("Waiting up to %s seconds for Redis to be ready.", args.ready_timeout)
+    wait_for_redis(redis, args.ready_timeout)
+
+    # Serve metrics aggregated across all worker processes
+    start_metrics_server(args.metrics_port)
+
+    # Import everything workers need before forking them, so they start warm and share it
+    preload()
+
+    # Launch the workers under a supervisor that replaces exited workers and scales on queue backlog
+    logger.debug("Creating %s-%s workers", args.min_workers or args.workers, args.workers)
+    supervisor = WorkerSupervisor(
+        target=worker_launch,
+        worker_kwargs={
+            "queues": args.queues,
+            "redis_host": args.redis,
+            "redis_port": args.port,
+            "redis_pw": args.auth_password,
+            "log_level": args.log_level,
+        },
+        redis=redis,
+        queue_names=args.queues,
+        min_workers=args.min_workers or args.workers,
+        max_workers=args.workers,
+        name_prefix=f"naas_{gethostname()}_",
+    )
+    supervisor.start()
+
+    # Main loop: supervise workers, write heartbeat file and purge expired result blobs
     heartbeat_file = Path(os.environ.get("WORKER_HEARTBEAT_FILE", "/tmp/worker_heartbeat"))
     _running = True
 
@@ -75,10 +100,19 @@ def main() -> None:
     signal.signal(signal.SIGTERM, _stop)
     signal.signal(signal.SIGINT, _stop)
 
-    while _running and any(p.is_alive() for p in processes):
+    last_purge = 0.0
+    while _running:
+        supervisor.tick()
         heartbeat_file.touch()
-        sleep(30)
-
+        if monotonic() - last_purge >= _PURGE_INTERVAL:
+            try:
+                purge_expired()
+            except OSError as e:  # Try again next interval rather than stop supervising
+                logger.warning("Could not purge expired result blobs: %s", e)
+            last_purge = monotonic()
+        sleep(WORKER_SUPERVISE_INTERVAL)
+
+    supervisor.shutdown(SHUTDOWN_TIMEOUT)
     heartbeat_file.unlink(missing_ok=True)
 
 
@@ -90,15 +124,26 @@ def arg_parsing() -> Namespace:
 
     argparser = ArgumentParser(description="RQ Multi-worker Launcher")
     argparser.add_argument(
-        "workers", type=int, nargs="?", default=100, help="The number of workers to launch. Default: 100"
+        "workers",
+        type=int,
+        nargs="?",
+        default=100,
+        help="The (maximum) number of workers to launch. Default: 100",
+    )
+    argparser.add_argument(
+        "-n",
+        "--min_workers",
+        type=int,
+        default=0,
+        help="Scale between this many workers and the maximum based on queue backlog. Default: no autoscaling",
     )
     argparser.add_argument(
         "-q",
         "--queues",
         type=str,
         nargs="+",
-        default="naas",
-        help="What queue(s) are we are working out of?  Default: naas",
+        default=list(QUEUE_LANES.values()),
+        help=f"What queue(s) are we are working out of?  Default: {' '.join(QUEUE_LANES.values())}",
     )
     argparser.add_argument(
         "-r", "--redis", type=str, default="redis", help="What Redis server are we using? Defualt: redis"
@@ -110,12 +155,20 @@ def arg_parsing() -> Namespace:
         "-a", "--auth_password", type=str, help="Password if the Redis server requires authentication."
     )
     argparser.add_argument(
+        "-t",
+        "--ready_timeout",
         "-s",
         "--sleep",
         type=int,
-        default=10,
-        nargs="?",
-        help="How many seconds to sleep to give Redis a chance to initialize. Default: 10",
+        default=60,
+        help="How many seconds to wait for Redis to be ready before giving up. Default: 60",
+    )
+    argparser.add_argument(
+        "-m",
+        "--metrics_port",
+        type=int,
+        default=WORKER_METRICS_PORT,
+        help=f"Port to serve worker Prometheus metrics on, 0 to disable. Default: {WORKER_METRICS_PORT}",
     )
     argparser.add_argument(
         "-l",
@@ -142,12 +195,12 @@ def worker_launch(
     :return:
     """
 
-    # Initialize our Redis connection
+    # Initialize our Redis connection. Circuit breakers, lockouts, device sessions and the salt are
+    # shared by every worker: with REDIS_SHARDS they live on REDIS_HOST, otherwise on this connection
     logger.debug("Initializing Redis connection to redis://%s:%s", redis_host, str(redis_port))
-    if redis_pw:
-        redis_conn = Redis(host=redis_host, port=redis_port, password=redis_pw)
-    else:
-        redis_conn = Redis(host=redis_host, port=redis_port)
+    redis_conn = redis_client(redis_host, redis_port, redis_pw or "")
+    shared_conn = redis_client() if REDIS_SHARDS else redis_conn
+    use_redis(shared_conn)
 
     logger.debug(
         "Starting rq worker %s, with connection to redis://%s:%s, to watch the following queue(s): %s",
@@ -156,12 +209,15 @@ def worker_launch(
         redis_port,
         queues,
     )
-    w = Worker(queues=queues, name=name, connection=redis_conn)
+    w = LaneWorker(
+        queues=queues, name=name, connection=redis_conn, shared_connection=shared_conn, serializer=job_serializer
+    )
+    init_tracing("naas-worker")
 
     # Fetch credential salt from Redis and configure the connection pool
     from naas.library.connection_pool import pool
 
-    salt = redis_conn.get("naas_cred_salt")
+    salt = shared_conn.get("naas_cred_salt")
     if salt:
         pool.set_salt(salt.decode())
     else:
@@ -178,7 +234,9 @@ def worker_launch(
     signal.signal(signal.SIGTERM, request_stop)
     signal.signal(signal.SIGINT, request_stop)
 
-    w.work(logging_level=log_level, max_jobs=None, with_scheduler=False)
+    # The scheduler moves jobs deferred by device session limits back onto their queue.
+    # After max_jobs the worker exits cleanly and the supervisor starts a fresh one.
+    w.work(logging_level=log_level, max_jobs=WORKER_MAX_JOBS or None, with_scheduler=True)
 
 
 if __name__ == "__main__":